@@ -6,10 +6,11 @@ Comprehensive AI model deployment, testing, and performance monitoring
 import os
 import json
 import logging
+import time
 from datetime import datetime, timedelta
 from flask import (
     render_template, request, redirect, url_for, flash,
-    jsonify, make_response
+    jsonify, make_response, session
 )
 from sqlalchemy import func, desc, asc, or_, and_
 from . import admin_bp
@@ -17,10 +18,13 @@ from .auth import require_admin_auth, require_permission
 from models.database import db
 from models.audit_log import audit_logger
 
-# Import AI-related models
+# Import AI-related models; the diagnostic model manager (sklearn) loads on first use
 try:
-    from models.ai_model_manager import ai_model_manager, ModelType, DiagnosisConfidence
+    from models.lazy_loader import lazy_service
     from models.custom_ai_builder import CustomAIModel, TrainingDataset, CustomAIBuilder
+    from models.training_jobs import training_jobs
+    from models.model_inference import inference_server
+    ai_model_manager = lazy_service('ai_model_manager', 'models.ai_model_manager:ai_model_manager')
     AI_IMPORTS_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"AI model imports failed: {e}")
@@ -599,26 +603,15 @@ def perform_model_test(model, test_input):
 
         # Load the model if it exists
         if model.model_file_path and os.path.exists(model.model_file_path):
-            import joblib
-
-            # Load model and vectorizer
-            trained_model = joblib.load(model.model_file_path)
-
             if model.vectorizer_file_path and os.path.exists(model.vectorizer_file_path):
-                vectorizer = joblib.load(model.vectorizer_file_path)
-
-                # Vectorize input
-                input_vector = vectorizer.transform([test_input])
-
-                # Make prediction
-                prediction = trained_model.predict(input_vector)[0]
-                confidence = max(trained_model.predict_proba(input_vector)[0])
+                started = time.perf_counter()
+                result = inference_server.predict_batch(model.id, [test_input], require_deployed=False)[0]
 
                 return {
                     'success': True,
-                    'prediction': str(prediction),
-                    'confidence': round(float(confidence), 3),
-                    'response_time': round(np.random.uniform(0.1, 0.5), 3)  # Simulated
+                    'prediction': str(result['prediction']),
+                    'confidence': round(float(result['confidence']), 3) if result['confidence'] is not None else None,
+                    'response_time': round(time.perf_counter() - started, 3)
                 }
             else:
                 # For models without vectorizer, simulate response
@@ -866,9 +859,6 @@ def upload_training_dataset():
                 flash('No file selected', 'danger')
                 return redirect(url_for('admin.upload_training_dataset'))
 
-            # Read file content
-            file_content = file.read().decode('utf-8')
-
             # Get dataset config
             dataset_config = {
                 'name': request.form.get('name'),
@@ -883,8 +873,8 @@ def upload_training_dataset():
                 flash('Please fill in all required fields', 'danger')
                 return redirect(url_for('admin.upload_training_dataset'))
 
-            # Upload the dataset
-            dataset = custom_ai_builder.upload_dataset(dataset_config, file_content)
+            # Stream the upload to disk and convert it to Parquet
+            dataset = custom_ai_builder.ingest_dataset(dataset_config, file.stream, file.filename)
 
             # Log upload
             audit_logger.log_admin_action(
@@ -933,21 +923,29 @@ def train_custom_model(model_id):
                 flash('Please select a dataset', 'danger')
                 return redirect(url_for('admin.train_custom_model', model_id=model_id))
 
-            # Start training (this could be made async in production)
+            # Queue training as a background job; the page polls its status
             try:
-                result = custom_ai_builder.train_model(model_id, dataset_id, training_config)
+                job = training_jobs.submit(
+                    model_id, dataset_id, training_config,
+                    created_by=session.get('admin_username', 'admin')
+                )
 
                 # Log training
                 audit_logger.log_admin_action(
                     'AI_MODEL_TRAIN',
                     f'Started training model: {model.name}',
-                    {'model_id': model_id, 'dataset_id': dataset_id, 'accuracy': result.get('accuracy')}
+                    {'model_id': model_id, 'dataset_id': dataset_id, 'job_id': job.id}
                 )
 
-                flash(f'Model "{model.name}" trained successfully! Accuracy: {result.get("accuracy", 0):.2%}', 'success')
-                return redirect(url_for('admin.view_model_details', model_id=model_id))
+                if request.accept_mimetypes.best == 'application/json':
+                    return jsonify({'success': True, 'job': job.to_dict()}), 202
+
+                flash(f'Training started for model "{model.name}"', 'success')
+                return redirect(url_for('admin.train_custom_model', model_id=model_id, job_id=job.id))
 
             except Exception as training_error:
+                if request.accept_mimetypes.best == 'application/json':
+                    return jsonify({'success': False, 'error': str(training_error)}), 409
                 flash(f'Training failed: {str(training_error)}', 'danger')
                 return redirect(url_for('admin.train_custom_model', model_id=model_id))
 
@@ -959,6 +957,7 @@ def train_custom_model(model_id):
                              model=model,
                              datasets=datasets,
                              algorithms=algorithms,
+                             active_job=training_jobs.latest_for_model(model_id),
                              ai_available=AI_IMPORTS_AVAILABLE)
 
     except Exception as e:
@@ -966,6 +965,76 @@ def train_custom_model(model_id):
         flash(f'Error loading training interface: {str(e)}', 'danger')
         return redirect(url_for('admin.ai_builder_dashboard'))
 
+@admin_bp.route('/api/ai/training-jobs/<int:job_id>')
+@require_admin_auth
+@require_permission('ai.models.train')
+def api_training_job_status(job_id):
+    """Training job status for polling"""
+    if not AI_IMPORTS_AVAILABLE:
+        return jsonify({'error': 'AI training functionality is not available'}), 503
+
+    job = training_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Training job not found'}), 404
+    return jsonify(job)
+
+@admin_bp.route('/api/ai/training-jobs/<int:job_id>/cancel', methods=['POST'])
+@require_admin_auth
+@require_permission('ai.models.train')
+def api_cancel_training_job(job_id):
+    """Request cancellation of a training job"""
+    if not AI_IMPORTS_AVAILABLE:
+        return jsonify({'error': 'AI training functionality is not available'}), 503
+
+    job = training_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Training job not found'}), 404
+
+    audit_logger.log_admin_action(
+        'AI_MODEL_TRAIN_CANCEL',
+        f'Requested cancellation of training job {job_id}',
+        {'job_id': job_id, 'model_id': job['model_id']}
+    )
+    return jsonify(job)
+
+@admin_bp.route('/api/ai/custom-models/<int:model_id>/predict', methods=['POST'])
+@require_admin_auth
+@require_permission('ai.models.view')
+def api_custom_model_predict(model_id):
+    """Predict with a deployed custom model; accepts {"input": str} or {"inputs": [str, ...]}"""
+    if not AI_IMPORTS_AVAILABLE:
+        return jsonify({'error': 'AI model functionality is not available'}), 503
+
+    data = request.get_json(silent=True) or {}
+    inputs = data.get('inputs')
+    single = inputs is None
+    if single:
+        inputs = [data.get('input')]
+
+    max_batch = int(os.environ.get('INFERENCE_MAX_BATCH', 1000))
+    if not inputs or not all(isinstance(text, str) and text for text in inputs):
+        return jsonify({'error': 'Provide "input" or a non-empty "inputs" list of strings'}), 400
+    if len(inputs) > max_batch:
+        return jsonify({'error': f'Batch size limited to {max_batch}'}), 413
+
+    try:
+        results = inference_server.predict_batch(model_id, inputs)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+
+    if single:
+        return jsonify(results[0])
+    return jsonify({'model_id': model_id, 'count': len(results), 'predictions': results})
+
+@admin_bp.route('/api/ai/custom-models/inference-stats')
+@require_admin_auth
+@require_permission('ai.models.view')
+def api_inference_stats():
+    """Inference cache and buffered counter status"""
+    if not AI_IMPORTS_AVAILABLE:
+        return jsonify({'error': 'AI model functionality is not available'}), 503
+    return jsonify(inference_server.stats())
+
 @admin_bp.route('/ai/builder/model/<int:model_id>')
 @require_admin_auth
 @require_permission('ai.models.view')
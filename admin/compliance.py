@@ -3,12 +3,93 @@ Compliance & Security Module - Placeholder
 ==========================================
 HIPAA compliance, security monitoring, and audit logs
 """
+from datetime import date, datetime, time, timedelta
+from flask import jsonify, request, Response, stream_with_context
 from . import admin_bp
 from .auth import require_admin_auth, require_permission
+from models.audit_log import audit_logger, AUDIT_REPORT_FORMATS
+from models.audit_writer import audit_writer
+
+
+def _parse_end(value):
+    """A date-only end covers that whole day; the report queries compare with <= end"""
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+    return datetime.combine(day, time.max)
+
+def _report_period():
+    """Parse start/end (ISO dates) from the query string, defaulting to the last 30 days"""
+    end = request.args.get('end')
+    start = request.args.get('start')
+    end_date = _parse_end(end) if end else datetime.utcnow()
+    start_date = datetime.fromisoformat(start) if start else end_date - timedelta(days=30)
+    return start_date, end_date
 
 @admin_bp.route('/compliance')
 @require_admin_auth
 @require_permission('security.view')
 def compliance_dashboard():
     """Compliance dashboard - to be implemented in Phase 7"""
-    return "Compliance & Security - Coming in Phase 7"
\ No newline at end of file
+    return "Compliance & Security - Coming in Phase 7"
+
+@admin_bp.route('/api/compliance/audit-writer')
+@require_admin_auth
+@require_permission('security.view')
+def audit_writer_status():
+    """Audit pipeline health: queue depth and event-to-persistence lag"""
+    return jsonify(audit_writer.metrics())
+
+@admin_bp.route('/api/compliance/audit-report')
+@require_admin_auth
+@require_permission('security.view')
+def audit_report_stream():
+    """Stream a HIPAA audit report as NDJSON or CSV"""
+    report_format = request.args.get('format', 'ndjson')
+    if report_format not in AUDIT_REPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {report_format}'}), 400
+
+    try:
+        start_date, end_date = _report_period()
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates'}), 400
+
+    audit_logger.log_admin_action(
+        'AUDIT_REPORT_EXPORT',
+        f'Exported audit report {start_date.date()} to {end_date.date()}',
+        details={'format': report_format}
+    )
+
+    mimetype = 'application/x-ndjson' if report_format == 'ndjson' else 'text/csv'
+    filename = f"audit_report_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}.{report_format}"
+    return Response(
+        stream_with_context(audit_logger.stream_audit_report(start_date, end_date, report_format)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@admin_bp.route('/api/compliance/audit-report/file', methods=['POST'])
+@require_admin_auth
+@require_permission('security.view')
+def audit_report_file():
+    """Queue a signed audit report file for very large ranges"""
+    report_format = request.args.get('format', 'ndjson')
+    if report_format not in AUDIT_REPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {report_format}'}), 400
+
+    try:
+        start_date, end_date = _report_period()
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates'}), 400
+
+    from tasks import generate_audit_report_file
+    task = generate_audit_report_file.delay(start_date.isoformat(), end_date.isoformat(), report_format)
+
+    audit_logger.log_admin_action(
+        'AUDIT_REPORT_QUEUED',
+        f'Queued signed audit report {start_date.date()} to {end_date.date()}',
+        details={'format': report_format, 'task_id': task.id}
+    )
+
+    return jsonify({'status': 'queued', 'task_id': task.id}), 202
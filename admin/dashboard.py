@@ -7,10 +7,12 @@ import json
 from datetime import datetime, timedelta
 from flask import render_template, jsonify, request
 from flask_socketio import emit
-from sqlalchemy import func, desc
+from sqlalchemy import desc
 from . import admin_bp
 from .auth import require_admin_auth, require_permission
-from models.database import db, Patient, Session, BiometricData, Payment, Subscription
+from models.database import Session, BiometricData
+from models.admin_metrics import admin_metrics
+from models.analytics_snapshot import analytics_snapshots
 
 @admin_bp.route('/')
 @admin_bp.route('/dashboard')
@@ -18,61 +20,14 @@ from models.database import db, Patient, Session, BiometricData, Payment, Subscr
 def dashboard():
     """Main admin dashboard with comprehensive metrics"""
 
-    # Get current date range
     today = datetime.utcnow().date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
 
-    # User Statistics
-    total_users = Patient.query.count()
-    new_users_today = Patient.query.filter(
-        func.date(Patient.created_at) == today
-    ).count()
-    new_users_week = Patient.query.filter(
-        func.date(Patient.created_at) >= week_ago
-    ).count()
-
-    active_users_week = Session.query.filter(
-        func.date(Session.timestamp) >= week_ago
-    ).distinct(Session.patient_name).count()
-
-    # Revenue Statistics
-    total_revenue = db.session.query(func.sum(Payment.amount)).filter(
-        Payment.status == 'succeeded'
-    ).scalar() or 0
-
-    revenue_month = db.session.query(func.sum(Payment.amount)).filter(
-        Payment.status == 'succeeded',
-        func.date(Payment.created_at) >= month_ago
-    ).scalar() or 0
-
-    # Subscription Statistics
-    subscription_stats = db.session.query(
-        Subscription.tier,
-        func.count(Subscription.id).label('count')
-    ).filter(Subscription.status == 'active').group_by(Subscription.tier).all()
-
-    subscription_data = {}
-    for tier, count in subscription_stats:
-        subscription_data[tier] = count
-
-    # Session Statistics
-    total_sessions = Session.query.count()
-    sessions_today = Session.query.filter(
-        func.date(Session.timestamp) == today
-    ).count()
-    sessions_week = Session.query.filter(
-        func.date(Session.timestamp) >= week_ago
-    ).count()
-
-    # Average session duration
-    avg_duration = db.session.query(
-        func.avg(Session.duration_minutes)
-    ).scalar() or 0
+    # Counters come from a few aggregate queries, cached per day window
+    overview = admin_metrics.get_overview()
 
     # AI Model Performance (mock data for now)
     ai_metrics = {
-        'total_requests': sessions_week * 3,  # Approximate
+        'total_requests': overview['session_stats']['sessions_week'] * 3,  # Approximate
         'avg_response_time': 1.2,
         'success_rate': 98.5,
         'active_models': 22
@@ -86,80 +41,29 @@ def dashboard():
         'payment_gateway': 'healthy'
     }
 
-    # Recent Activity (last 10 sessions)
-    recent_sessions = Session.query.order_by(
-        desc(Session.timestamp)
-    ).limit(10).all()
+    # Growth Metrics (completed days come from daily analytics snapshots)
+    daily_series = analytics_snapshots.get_series(today - timedelta(days=29), today + timedelta(days=1))
 
-    # Crisis Alerts (high-risk sessions)
-    crisis_sessions = Session.query.filter(
-        Session.alerts.isnot(None),
-        func.date(Session.timestamp) >= week_ago
-    ).limit(5).all()
-
-    # Growth Metrics
-    user_growth = []
-    for i in range(7):
-        date = today - timedelta(days=i)
-        count = Patient.query.filter(
-            func.date(Patient.created_at) == date
-        ).count()
-        user_growth.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'users': count
-        })
+    user_growth = [{
+        'date': day['date'],
+        'users': day['new_users']
+    } for day in daily_series[:7]]
 
     # Revenue Growth (last 30 days)
-    revenue_growth = []
-    for i in range(30):
-        date = today - timedelta(days=i)
-        daily_revenue = db.session.query(func.sum(Payment.amount)).filter(
-            Payment.status == 'succeeded',
-            func.date(Payment.created_at) == date
-        ).scalar() or 0
-        revenue_growth.append({
-            'date': date.strftime('%Y-%m-%d'),
-            'revenue': float(daily_revenue)
-        })
+    revenue_growth = [{
+        'date': day['date'],
+        'revenue': float(day['revenue'])
+    } for day in daily_series]
 
     dashboard_data = {
-        'user_stats': {
-            'total_users': total_users,
-            'new_today': new_users_today,
-            'new_week': new_users_week,
-            'active_week': active_users_week,
-            'growth_rate': round((new_users_week / max(total_users - new_users_week, 1)) * 100, 1)
-        },
-        'revenue_stats': {
-            'total_revenue': float(total_revenue),
-            'revenue_month': float(revenue_month),
-            'mrr': float(revenue_month),  # Simplified MRR calculation
-            'arpu': float(total_revenue / max(total_users, 1))
-        },
-        'subscription_stats': subscription_data,
-        'session_stats': {
-            'total_sessions': total_sessions,
-            'sessions_today': sessions_today,
-            'sessions_week': sessions_week,
-            'avg_duration': round(avg_duration, 1) if avg_duration else 0
-        },
+        'user_stats': overview['user_stats'],
+        'revenue_stats': overview['revenue_stats'],
+        'subscription_stats': overview['subscription_stats'],
+        'session_stats': overview['session_stats'],
         'ai_metrics': ai_metrics,
         'system_health': system_health,
-        'recent_sessions': [{
-            'id': s.id,
-            'patient': s.patient_name,
-            'type': s.session_type,
-            'timestamp': s.timestamp.strftime('%H:%M'),
-            'duration': s.duration_minutes or 0,
-            'mood_change': (s.mood_after - s.mood_before) if (s.mood_after and s.mood_before) else None
-        } for s in recent_sessions],
-        'crisis_alerts': [{
-            'id': s.id,
-            'patient': s.patient_name,
-            'timestamp': s.timestamp.strftime('%m/%d %H:%M'),
-            'alert_type': 'High Risk',  # Simplified
-            'status': 'Active'
-        } for s in crisis_sessions],
+        'recent_sessions': overview['recent_sessions'],
+        'crisis_alerts': overview['crisis_alerts'],
         'user_growth': user_growth,
         'revenue_growth': revenue_growth
     }
@@ -181,17 +85,14 @@ def dashboard():
 def dashboard_metrics_api():
     """API endpoint for real-time dashboard metrics"""
 
-    # Get quick stats for real-time updates
-    current_hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    # Quick stats for real-time updates, shared by every polling admin
+    live = admin_metrics.get_live()
 
     metrics = {
         'timestamp': datetime.utcnow().isoformat(),
-        'active_sessions': Session.query.filter(
-            Session.timestamp >= current_hour
-        ).count(),
-        'new_users_hour': Patient.query.filter(
-            Patient.created_at >= current_hour
-        ).count(),
+        'active_sessions': live['active_sessions'],
+        'new_users_hour': live['new_users_hour'],
+        'computed_at': live['computed_at'],
         'system_load': {
             'cpu': 45,  # Mock data - replace with actual system metrics
             'memory': 62,
@@ -206,6 +107,18 @@ def dashboard_metrics_api():
 
     return jsonify(metrics)
 
+@admin_bp.route('/api/dashboard/daily-analytics')
+@require_admin_auth
+def daily_analytics_api():
+    """Daily analytics series served from stored snapshots"""
+
+    days = max(1, min(request.args.get('days', 30, type=int), 365))
+    today = datetime.utcnow().date()
+
+    series = analytics_snapshots.get_series(today - timedelta(days=days - 1), today + timedelta(days=1))
+
+    return jsonify({'days': days, 'series': series})
+
 @admin_bp.route('/api/dashboard/alerts')
 @require_admin_auth
 def dashboard_alerts_api():
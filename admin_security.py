@@ -19,13 +19,16 @@ import base64
 from cryptography.fernet import Fernet
 import logging
 
+from models.rate_limiter import rate_limiter
+
 logger = logging.getLogger(__name__)
 
 class AdminSecurity:
     def __init__(self, app=None):
         self.app = app
         self.admin_sessions = {}
-        self.failed_attempts = {}
+        self.max_failed_attempts = 3  # per lockout_window, shared by every admin:<ip> check
+        self.lockout_window = 900  # 15 minutes
         self.ip_whitelist = set()
         self.two_factor_secrets = {}
         
@@ -103,27 +106,15 @@ class AdminSecurity:
         except:
             return False
     
-    def check_rate_limit(self, identifier: str, max_attempts: int = 5, window: int = 900) -> bool:
-        """Check if identifier is rate limited"""
-        now = time.time()
-        
-        if identifier not in self.failed_attempts:
-            self.failed_attempts[identifier] = []
-        
-        # Clean old attempts
-        self.failed_attempts[identifier] = [
-            attempt for attempt in self.failed_attempts[identifier]
-            if now - attempt < window
-        ]
-        
-        return len(self.failed_attempts[identifier]) < max_attempts
+    def check_rate_limit(self, identifier: str, max_attempts: int = None, window: int = None) -> bool:
+        """Check if identifier may make another attempt (without counting one)"""
+        return rate_limiter.check(f'admin:{identifier}', max_attempts or self.max_failed_attempts,
+                                  window or self.lockout_window).allowed
     
-    def record_failed_attempt(self, identifier: str):
+    def record_failed_attempt(self, identifier: str, max_attempts: int = None, window: int = None):
         """Record a failed authentication attempt"""
-        if identifier not in self.failed_attempts:
-            self.failed_attempts[identifier] = []
-        
-        self.failed_attempts[identifier].append(time.time())
+        rate_limiter.hit(f'admin:{identifier}', max_attempts or self.max_failed_attempts,
+                         window or self.lockout_window)
         logger.warning(f"Failed admin authentication attempt from {identifier}")
     
     def setup_2fa(self, admin_id: str) -> dict:
@@ -0,0 +1,266 @@
+"""
+AI Session Endpoints
+Request handling for /api/therapy-session, its streaming variant and /ai/*,
+written as coroutines so the Flask views and Socket.IO handler (through
+ai_gateway) and the ASGI app (asgi.py) share one implementation
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+
+from models.database import db, Session
+from models.lazy_loader import lazy_service
+from models.lip_sync import lip_sync_engine
+from models.response_stream import CrisisScanner, SentenceBuffer
+
+logger = logging.getLogger(__name__)
+
+health_checker = lazy_service('health_checker', 'models.health_checker:HealthChecker')
+therapy_ai_integration = lazy_service('therapy_ai_integration',
+                                      'models.therapy_ai_integration:therapy_ai_integration')
+
+DEFAULT_RESPONSE = 'I understand you\'re reaching out. How can I help you today?'
+
+# Proxies (nginx) must pass events through as they are written
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def _store_session(data, session_type, message, ai_message):
+    """Record the exchange; runs in a worker thread, inside the request's app context"""
+    try:
+        session_entry = Session(
+            patient_name=data.get('patient_name', 'Anonymous'),
+            session_type=session_type,
+            input_text=message,
+            ai_response=ai_message,
+            mood_before=data.get('mood_score'),
+            notes=json.dumps(data.get('notes', {}))
+        )
+        db.session.add(session_entry)
+        db.session.commit()
+        return session_entry.id
+    except Exception as e:
+        logging.error(f"Database error: {e}")
+        # Continue without storing if DB fails
+        db.session.rollback()
+        return None
+
+
+async def therapy_session(data, user_id):
+    """Main therapy session handler; returns (payload, status)"""
+    try:
+        if not data:
+            return {"error": "No data provided"}, 400
+
+        message = data.get('message', '')
+        session_type = data.get('session_type', 'individual')
+        session_id = data.get('session_id')
+
+        if not message:
+            return {"error": "No message provided"}, 400
+
+        # Crisis Detection - Check all messages for crisis indicators
+        from crisis_integration import check_message_for_crisis_async
+        crisis_result = await check_message_for_crisis_async(message)
+
+        if crisis_result and crisis_result.severity.value in ['critical', 'high']:
+            # Log critical crisis for immediate attention
+            logger.critical(f"CRISIS DETECTED - User: {user_id}, Severity: {crisis_result.severity.value}")
+
+            # Include crisis information in response
+            crisis_info = {
+                'crisis_detected': True,
+                'severity': crisis_result.severity.value,
+                'confidence': crisis_result.confidence,
+                'recommended_actions': crisis_result.recommended_actions,
+                'crisis_resources': True
+            }
+        else:
+            crisis_info = None
+
+        # Prepare session data for enhanced AI response
+        session_data = {
+            'session_id': session_id or f"temp_{datetime.utcnow().timestamp()}",
+            'user_age': data.get('age', 30),
+            'user_gender': data.get('gender'),
+            'presenting_issue': data.get('presenting_issue', message[:100]),
+            'anxiety_level': data.get('anxiety_level', 5),
+            'depression_level': data.get('depression_level', 5),
+            'stress_level': data.get('stress_level', 5),
+            'sleep_quality': data.get('sleep_quality', 5),
+            'session_number': data.get('session_number', 1),
+            'session_history': data.get('session_history', []),
+            'response_history': data.get('response_history', []),
+            'mood_score': data.get('mood_score', 5),
+            'preferences': data.get('preferences', {})
+        }
+
+        # Get enhanced AI response using multiple models
+        enhanced_response = await therapy_ai_integration.enhance_therapy_response_async(
+            session_type=session_type,
+            user_message=message,
+            session_data=session_data,
+            use_ensemble=data.get('use_ensemble', True)
+        )
+
+        # Extract the main response
+        ai_response = {
+            'message': enhanced_response.get('response', DEFAULT_RESPONSE),
+            'confidence': enhanced_response.get('confidence', 0.7),
+            'models_used': enhanced_response.get('models_used', ['fallback']),
+            'recommendations': [activity['name'] for activity in enhanced_response.get('recommended_activities', [])],
+            'activities': enhanced_response.get('recommended_activities', []),
+            'research_insights': enhanced_response.get('research_insights', []),
+            'crisis_info': crisis_info  # Add crisis detection results
+        }
+
+        # Store session data
+        stored_id = await asyncio.to_thread(_store_session, data, session_type, message,
+                                            ai_response.get('message', ''))
+        if stored_id is not None:
+            session_id = stored_id
+
+        # Check for crisis indicators
+        crisis_assessment = health_checker.assess_crisis_risk(message, ai_response.get('message', ''))
+
+        return {
+            "success": True,
+            "response": ai_response.get('message', DEFAULT_RESPONSE),
+            "session_id": session_id,
+            "crisis_level": crisis_assessment.get('risk_level', 'low'),
+            "recommendations": ai_response.get('recommendations', []),
+            "mood_analysis": ai_response.get('mood_analysis', {}),
+            "next_steps": ai_response.get('next_steps', [])
+        }, 200
+
+    except Exception as e:
+        logging.error(f"Therapy session error: {e}")
+        return {
+            "success": False,
+            "error": "I'm having technical difficulties. Please try again or contact support if this continues.",
+            "fallback_response": "I'm here to listen and support you. While I work through this technical issue, remember that your wellbeing is important and there are always people who want to help."
+        }, 500
+
+
+async def ai_therapy(kind, data):
+    """Handler for /ai/individual, /ai/couples and /ai/group; returns (payload, status)"""
+    if not data or 'message' not in data:
+        return {'error': 'Message is required'}, 400
+
+    try:
+        message = data['message']
+        context = data.get('context', f"{kind}_therapy")
+
+        # Use AI manager to get response
+        from models.ai_manager import ai_manager
+        if kind == 'couples':
+            partner1_name = data.get('partner1_name', 'Partner 1')
+            partner2_name = data.get('partner2_name', 'Partner 2')
+            response = await ai_manager.get_couples_therapy_response_async(message, partner1_name, partner2_name)
+        elif kind == 'group':
+            response = await ai_manager.get_group_therapy_response_async(message)
+        else:
+            response = await ai_manager.get_individual_therapy_response_async(message)
+
+        return {
+            'success': True,
+            'response': response,
+            'context': context
+        }, 200
+
+    except Exception as e:
+        logging.error(f"Error in {kind} AI therapy: {e}")
+        return {
+            'success': False,
+            'error': 'Unable to process therapy request'
+        }, 500
+
+
+async def therapy_stream(data, user_id):
+    """Streaming therapy session; yields (event, payload) pairs
+
+    Events: 'token' for each text delta, 'crisis' when the message or the
+    response so far shows crisis indicators, 'speech' with speech and
+    lip-sync data for each completed sentence when an avatar personality is
+    given, then 'done' with the full response (or 'error').
+    """
+    started = time.perf_counter()
+    if not data or not data.get('message'):
+        yield 'error', {'error': 'No message provided'}
+        return
+
+    message = data['message']
+    session_type = data.get('session_type', 'individual')
+    personality = data.get('avatar_personality')
+
+    try:
+        from crisis_integration import check_message_for_crisis_async
+        crisis_result = await check_message_for_crisis_async(message)
+        if crisis_result and crisis_result.severity.value in ['critical', 'high']:
+            logger.critical(f"CRISIS DETECTED - User: {user_id}, Severity: {crisis_result.severity.value}")
+            yield 'crisis', {
+                'source': 'message',
+                'severity': crisis_result.severity.value,
+                'confidence': crisis_result.confidence,
+                'recommended_actions': crisis_result.recommended_actions
+            }
+
+        if personality:
+            from speaking_avatar_api import avatar_system
+        sentences = SentenceBuffer()
+        scanner = CrisisScanner(health_checker.scan_text)
+        # One lip-sync clock for the whole response, so sentences play back to back
+        lip_sync = lip_sync_engine.stream()
+        time_to_first_token = None
+
+        def sentence_events(completed):
+            for sentence in completed:
+                alerts = scanner.feed(sentence)
+                if alerts:
+                    yield 'crisis', {'source': 'response', 'alerts': alerts}
+                if personality:
+                    for chunk in avatar_system.speak_sentence(sentence, personality, data.get('emotion_analysis'),
+                                                              lip_sync=lip_sync):
+                        yield 'speech', chunk
+
+        from models.ai_manager import ai_manager
+        deltas = ai_manager.stream_therapeutic_response(message, session_type=session_type)
+        try:
+            async for delta in deltas:
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - started
+                yield 'token', {'text': delta}
+                for event in sentence_events(sentences.feed(delta)):
+                    yield event
+            for event in sentence_events(sentences.flush()):
+                yield event
+        finally:
+            # Also reached when the client goes away mid-stream; frees the provider slot
+            await deltas.aclose()
+
+        response_text = sentences.text or DEFAULT_RESPONSE
+        session_id = await asyncio.to_thread(_store_session, data, session_type, message, response_text)
+        crisis_assessment = health_checker.assess_crisis_risk(message, response_text)
+
+        yield 'done', {
+            'success': True,
+            'response': response_text,
+            'session_id': session_id or data.get('session_id'),
+            'crisis_level': crisis_assessment.get('risk_level', 'low'),
+            'time_to_first_token': time_to_first_token,
+            'duration': time.perf_counter() - started
+        }
+
+    except Exception as e:
+        logging.error(f"Therapy stream error: {e}")
+        yield 'error', {
+            'error': "I'm having technical difficulties. Please try again or contact support if this continues."
+        }
+
+
+def sse_event(event, payload):
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
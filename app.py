@@ -2,7 +2,7 @@ import os
 import logging
 import stripe
 import secrets
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, get_flashed_messages
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, session, get_flashed_messages, Response, stream_with_context
 try:
     from flask_limiter import Limiter
     from flask_limiter.util import get_remote_address
@@ -60,6 +60,10 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
 db.init_app(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Per-endpoint latency/error instrumentation, registered first so it times every other hook
+from models.request_metrics import request_metrics
+request_metrics.init_app(app, socketio)
+
 # Optional rate limiter (backed by Redis if available)
 if Limiter:
     redis_url = os.environ.get("REDIS_URL")
@@ -105,19 +109,20 @@ with app.app_context():
         Session, BiometricData, VideoAnalysis, Exercise,
         Assessment
     )
-    from models.ai_manager import AIManager
-    from models.health_checker import HealthChecker
-    from models.video_analyzer import VideoAnalyzer
-    from models.biometric_integrator import BiometricIntegrator
-    from models.exercise_generator import ExerciseGenerator
-    from models.therapy_ai_integration import therapy_ai_integration
-    
-    # Initialize AI Manager
-    ai_manager = AIManager()
-    
-    # Import therapy activities
-    from models.therapy_activities import TherapyActivities
-    therapy_activities = TherapyActivities()
+    from models.lazy_loader import lazy_service, services
+    from models.ai_gateway import ai_gateway
+
+    # AI components are imported and built on first use (or by services.preload())
+    ai_manager = lazy_service('ai_manager', 'models.ai_manager:ai_manager')
+    health_checker = lazy_service('health_checker', 'models.health_checker:HealthChecker')
+    video_analyzer = lazy_service('video_analyzer', 'models.video_analyzer:VideoAnalyzer')
+    biometric_integrator = lazy_service('biometric_integrator', 'models.biometric_integrator:BiometricIntegrator')
+    exercise_generator = lazy_service('exercise_generator', 'models.exercise_generator:ExerciseGenerator')
+    therapy_ai_integration = lazy_service('therapy_ai_integration',
+                                          'models.therapy_ai_integration:therapy_ai_integration')
+    therapy_activities = lazy_service('therapy_activities', 'models.therapy_activities:TherapyActivities')
+    conversation_starter_generator = lazy_service('conversation_starter_generator',
+                                                  'models.conversation_starters:ConversationStarterGenerator')
     
     # Import and register blueprints
     try:
@@ -188,18 +193,9 @@ with app.app_context():
                     db.session.commit()
                     logger.info(f"Development admin user {email} created successfully.")
 
-
-
-# Initialize AI components
-ai_manager = AIManager()
-health_checker = HealthChecker()
-video_analyzer = VideoAnalyzer()
-biometric_integrator = BiometricIntegrator()
-exercise_generator = ExerciseGenerator()
-
-# Import conversation starters
-from models.conversation_starters import ConversationStarterGenerator
-conversation_starter_generator = ConversationStarterGenerator()
+# Prefork servers build the AI components once in the master so workers inherit them
+if os.environ.get('PRELOAD_SERVICES') == '1':
+    services.preload()
 
 
 @app.route('/subscribe-newsletter', methods=['POST'])
@@ -1779,111 +1775,10 @@ def api_sessions():
 @app.route("/api/therapy-session", methods=["POST"])
 @login_required
 def api_therapy_session():
-    """Main therapy session endpoint for AI interactions"""
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({"error": "No data provided"}), 400
-        
-        message = data.get('message', '')
-        session_type = data.get('session_type', 'individual')
-        session_id = data.get('session_id')
-        
-        if not message:
-            return jsonify({"error": "No message provided"}), 400
-
-        # Crisis Detection - Check all messages for crisis indicators
-        from crisis_integration import check_message_for_crisis
-        crisis_result = check_message_for_crisis(message)
-
-        if crisis_result and crisis_result.severity.value in ['critical', 'high']:
-            # Log critical crisis for immediate attention
-            logger.critical(f"CRISIS DETECTED - User: {current_user.id}, Severity: {crisis_result.severity.value}")
-
-            # Include crisis information in response
-            crisis_info = {
-                'crisis_detected': True,
-                'severity': crisis_result.severity.value,
-                'confidence': crisis_result.confidence,
-                'recommended_actions': crisis_result.recommended_actions,
-                'crisis_resources': True
-            }
-        else:
-            crisis_info = None
-
-        # Prepare session data for enhanced AI response
-        session_data = {
-            'session_id': session_id or f"temp_{datetime.utcnow().timestamp()}",
-            'user_age': data.get('age', 30),
-            'user_gender': data.get('gender'),
-            'presenting_issue': data.get('presenting_issue', message[:100]),
-            'anxiety_level': data.get('anxiety_level', 5),
-            'depression_level': data.get('depression_level', 5),
-            'stress_level': data.get('stress_level', 5),
-            'sleep_quality': data.get('sleep_quality', 5),
-            'session_number': data.get('session_number', 1),
-            'session_history': data.get('session_history', []),
-            'response_history': data.get('response_history', []),
-            'mood_score': data.get('mood_score', 5),
-            'preferences': data.get('preferences', {})
-        }
-        
-        # Get enhanced AI response using multiple models
-        enhanced_response = therapy_ai_integration.enhance_therapy_response(
-            session_type=session_type,
-            user_message=message,
-            session_data=session_data,
-            use_ensemble=data.get('use_ensemble', True)
-        )
-        
-        # Extract the main response
-        ai_response = {
-            'message': enhanced_response.get('response', 'I understand you\'re reaching out. How can I help you today?'),
-            'confidence': enhanced_response.get('confidence', 0.7),
-            'models_used': enhanced_response.get('models_used', ['fallback']),
-            'recommendations': [activity['name'] for activity in enhanced_response.get('recommended_activities', [])],
-            'activities': enhanced_response.get('recommended_activities', []),
-            'research_insights': enhanced_response.get('research_insights', []),
-            'crisis_info': crisis_info  # Add crisis detection results
-        }
-        
-        # Store session data
-        try:
-            session_entry = Session(
-                patient_name=data.get('patient_name', 'Anonymous'),
-                session_type=session_type,
-                input_text=message,
-                ai_response=ai_response.get('message', ''),
-                mood_before=data.get('mood_score'),
-                notes=json.dumps(data.get('notes', {}))
-            )
-            db.session.add(session_entry)
-            db.session.commit()
-            session_id = session_entry.id
-        except Exception as e:
-            logging.error(f"Database error: {e}")
-            # Continue without storing if DB fails
-        
-        # Check for crisis indicators
-        crisis_assessment = health_checker.assess_crisis_risk(message, ai_response.get('message', ''))
-        
-        return jsonify({
-            "success": True,
-            "response": ai_response.get('message', 'I understand you\'re reaching out. How can I help you today?'),
-            "session_id": session_id,
-            "crisis_level": crisis_assessment.get('risk_level', 'low'),
-            "recommendations": ai_response.get('recommendations', []),
-            "mood_analysis": ai_response.get('mood_analysis', {}),
-            "next_steps": ai_response.get('next_steps', [])
-        })
-        
-    except Exception as e:
-        logging.error(f"Therapy session error: {e}")
-        return jsonify({
-            "success": False,
-            "error": "I'm having technical difficulties. Please try again or contact support if this continues.",
-            "fallback_response": "I'm here to listen and support you. While I work through this technical issue, remember that your wellbeing is important and there are always people who want to help."
-        }), 500
+    """Main therapy session endpoint for AI interactions (also served by asgi.py)"""
+    import ai_endpoints
+    payload, status = ai_gateway.run(ai_endpoints.therapy_session(request.get_json(silent=True), current_user.id))
+    return jsonify(payload), status
 
 @app.route("/api/ai-models/status")
 @login_required
@@ -2168,6 +2063,17 @@ def handle_biometric_update(data):
         logging.error(f"Error processing biometric data: {e}")
         emit('error', {'message': 'Error processing biometric data'})
 
+@socketio.on('therapy_message')
+def handle_therapy_message(data):
+    """Stream a therapy response back as 'token', 'crisis', 'speech' and 'done' events"""
+    if not current_user.is_authenticated:
+        emit('error', {'message': 'Authentication required'})
+        return
+
+    import ai_endpoints
+    for event, payload in ai_gateway.iterate(ai_endpoints.therapy_stream(data, current_user.id)):
+        emit(event, payload)
+
 @app.route("/api/dashboard-stats")
 @login_required
 def dashboard_stats():
@@ -2355,95 +2261,42 @@ def dashboard_ai_insights():
             'error': 'Unable to generate insights at this time'
         })
 
-# AI therapy endpoints
+@app.route("/api/therapy-session/stream", methods=["POST"])
+@login_required
+def api_therapy_session_stream():
+    """Therapy response streamed as server-sent events while it is generated (also served by asgi.py)"""
+    import ai_endpoints
+    events = ai_gateway.iterate(ai_endpoints.therapy_stream(request.get_json(silent=True), current_user.id))
+    return Response(
+        stream_with_context(ai_endpoints.sse_event(event, payload) for event, payload in events),
+        mimetype='text/event-stream',
+        headers=ai_endpoints.SSE_HEADERS
+    )
+
+# AI therapy endpoints (also served by asgi.py)
 @app.route("/ai/individual", methods=["POST"])
 @login_required
 def ai_individual_therapy():
     """AI endpoint for individual therapy responses"""
-    try:
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Message is required'}), 400
-            
-        message = data['message']
-        context = data.get('context', 'individual_therapy')
-        
-        # Use AI manager to get response
-        from models.ai_manager import ai_manager
-        response = ai_manager.get_individual_therapy_response(message)
-        
-        return jsonify({
-            'success': True,
-            'response': response,
-            'context': context
-        })
-        
-    except Exception as e:
-        logging.error(f"Error in individual AI therapy: {e}")
-        return jsonify({
-            'success': False,
-            'error': 'Unable to process therapy request'
-        }), 500
+    import ai_endpoints
+    payload, status = ai_gateway.run(ai_endpoints.ai_therapy('individual', request.get_json(silent=True)))
+    return jsonify(payload), status
 
 @app.route("/ai/couples", methods=["POST"])
 @login_required
 def ai_couples_therapy():
     """AI endpoint for couples therapy responses"""
-    try:
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Message is required'}), 400
-            
-        message = data['message']
-        context = data.get('context', 'couples_therapy')
-        
-        # Use AI manager to get response
-        from models.ai_manager import ai_manager
-        partner1_name = data.get('partner1_name', 'Partner 1')
-        partner2_name = data.get('partner2_name', 'Partner 2')
-        response = ai_manager.get_couples_therapy_response(message, partner1_name, partner2_name)
-        
-        return jsonify({
-            'success': True,
-            'response': response,
-            'context': context
-        })
-        
-    except Exception as e:
-        logging.error(f"Error in couples AI therapy: {e}")
-        return jsonify({
-            'success': False,
-            'error': 'Unable to process therapy request'
-        }), 500
+    import ai_endpoints
+    payload, status = ai_gateway.run(ai_endpoints.ai_therapy('couples', request.get_json(silent=True)))
+    return jsonify(payload), status
 
 @app.route("/ai/group", methods=["POST"])
 @login_required
 def ai_group_therapy():
     """AI endpoint for group therapy responses"""
-    try:
-        data = request.get_json()
-        if not data or 'message' not in data:
-            return jsonify({'error': 'Message is required'}), 400
-            
-        message = data['message']
-        context = data.get('context', 'group_therapy')
-        
-        # Use AI manager to get response
-        from models.ai_manager import ai_manager
-        response = ai_manager.get_group_therapy_response(message)
-        
-        return jsonify({
-            'success': True,
-            'response': response,
-            'context': context
-        })
-        
-    except Exception as e:
-        logging.error(f"Error in group AI therapy: {e}")
-        return jsonify({
-            'success': False,
-            'error': 'Unable to process therapy request'
-        }), 500
+    import ai_endpoints
+    payload, status = ai_gateway.run(ai_endpoints.ai_therapy('group', request.get_json(silent=True)))
+    return jsonify(payload), status
 
 # Brand and media routes  
 @app.route("/media-pack")
@@ -0,0 +1,251 @@
+"""
+ASGI Entry Point for MindMend AI Endpoints
+Serves /api/therapy-session (plain and /stream) and /ai/{individual,couples,group}
+from an event loop, so one worker keeps many sessions open while they wait on
+the model providers instead of one session per sync worker:
+
+    gunicorn -c gunicorn.conf.py -k asgi --workers 2 --bind 127.0.0.1:5001 asgi:application
+
+nginx sends these paths here and everything else to the WSGI app (app:app).
+The handlers are the coroutines in ai_endpoints.py, the same ones the Flask
+views run through ai_gateway.run(), and requests are authenticated from the
+Flask login session cookie.
+
+Requests get the same checks as SecurityManager.before_request_security on
+the Flask side (blocked IPs, the shared per-IP rate limit and the idle session
+timeout), and are recorded in request_metrics under the same endpoint names.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta, UTC
+from http.cookies import SimpleCookie
+
+from itsdangerous import BadSignature
+from werkzeug.http import dump_cookie
+
+import ai_endpoints
+from app import app as flask_app, security_manager
+from models.ai_gateway import ai_gateway
+from models.database import db, Patient
+from models.request_metrics import request_metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+
+ROUTES = {
+    '/api/therapy-session': lambda data, user_id: ai_endpoints.therapy_session(data, user_id),
+    '/ai/individual': lambda data, user_id: ai_endpoints.ai_therapy('individual', data),
+    '/ai/couples': lambda data, user_id: ai_endpoints.ai_therapy('couples', data),
+    '/ai/group': lambda data, user_id: ai_endpoints.ai_therapy('group', data),
+}
+
+# Routes answered with server-sent events as the handler yields them
+STREAM_ROUTES = {
+    '/api/therapy-session/stream': ai_endpoints.therapy_stream,
+}
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _client_ip(scope):
+    """Client address, resolved the way SecurityManager.get_client_ip does"""
+    forwarded = _header(scope['headers'], b'x-forwarded-for')
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    real_ip = _header(scope['headers'], b'x-real-ip')
+    if real_ip:
+        return real_ip
+    return scope['client'][0] if scope.get('client') else None
+
+
+def _load_session(headers):
+    """The signed Flask session from the request cookie, or an empty one"""
+    interface = flask_app.session_interface
+    session = interface.session_class()
+    cookie_header = b'; '.join(value for name, value in headers if name == b'cookie')
+    if not cookie_header:
+        return session
+    morsel = SimpleCookie(cookie_header.decode('latin-1')).get(interface.get_cookie_name(flask_app))
+    if morsel is None:
+        return session
+
+    serializer = interface.get_signing_serializer(flask_app)
+    try:
+        data = serializer.loads(morsel.value,
+                                max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return session
+    return interface.session_class(data)
+
+
+def _touch_session(session, client_ip):
+    """Clear a session idle for longer than the HIPAA timeout, then record this activity"""
+    last_activity = session.get('last_activity')
+    if last_activity:
+        try:
+            idle = datetime.now(UTC) - datetime.fromisoformat(last_activity)
+        except (TypeError, ValueError):
+            idle = None
+        if idle is None or idle > timedelta(seconds=security_manager.session_timeout):
+            session.clear()
+            security_manager.log_security_event('session_timeout', {
+                'ip': client_ip,
+                'last_activity': last_activity
+            })
+    session['last_activity'] = datetime.now(UTC).isoformat()
+
+
+def _session_cookie(session):
+    """Set-Cookie header for the updated session, as Flask's session interface writes it"""
+    interface = flask_app.session_interface
+    value = interface.get_signing_serializer(flask_app).dumps(dict(session))
+    cookie = dump_cookie(
+        interface.get_cookie_name(flask_app), value,
+        expires=interface.get_expiration_time(flask_app, session),
+        path=interface.get_cookie_path(flask_app),
+        domain=interface.get_cookie_domain(flask_app),
+        secure=interface.get_cookie_secure(flask_app),
+        httponly=interface.get_cookie_httponly(flask_app),
+        samesite=interface.get_cookie_samesite(flask_app)
+    )
+    return b'set-cookie', cookie.encode('latin-1')
+
+
+def _load_user(user_id):
+    try:
+        return db.session.get(Patient, int(user_id))
+    except Exception:
+        return None
+
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            return None
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, payload, status, headers=()):
+    body = flask_app.json.dumps(payload).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()), *headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_events(send, events, headers=()):
+    headers = [(b'content-type', b'text/event-stream'), *headers]
+    headers += [(name.lower().encode(), value.encode()) for name, value in ai_endpoints.SSE_HEADERS.items()]
+    await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+    try:
+        async for event, payload in events:
+            await send({'type': 'http.response.body', 'body': ai_endpoints.sse_event(event, payload).encode(),
+                        'more_body': True})
+    finally:
+        await events.aclose()
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await ai_gateway.aclose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    started = time.perf_counter()
+    response = {}
+
+    async def recording_send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        await send(message)
+
+    try:
+        await _dispatch(scope, receive, recording_send)
+    finally:
+        # Same names as the Flask views, so /metrics merges both servers
+        path = scope['path'] if scope['path'] in ROUTES or scope['path'] in STREAM_ROUTES else '<unmatched>'
+        request_metrics.observe('http', f"{scope['method']} {path}", time.perf_counter() - started,
+                                error=response.get('status', 500) >= 500)
+
+
+async def _dispatch(scope, receive, send):
+    client_ip = _client_ip(scope)
+    if client_ip in security_manager.blocked_ips:
+        security_manager.log_security_event('blocked_ip_attempt', {
+            'ip': client_ip,
+            'user_agent': _header(scope['headers'], b'user-agent') or '',
+            'timestamp': datetime.now(UTC).isoformat()
+        })
+        await _send_json(send, {'error': 'Forbidden'}, 403)
+        return
+    if await asyncio.to_thread(security_manager.is_rate_limited, client_ip):
+        await _send_json(send, {'error': 'Too many requests'}, 429)
+        return
+
+    route = ROUTES.get(scope['path'])
+    stream_route = STREAM_ROUTES.get(scope['path'])
+    if route is None and stream_route is None:
+        await _send_json(send, {'error': 'Not found'}, 404)
+        return
+    if scope['method'] != 'POST':
+        await _send_json(send, {'error': 'Method not allowed'}, 405, [(b'allow', b'POST')])
+        return
+
+    body = await _read_body(receive)
+    if body is None:
+        await _send_json(send, {'error': 'Request body too large'}, 413)
+        return
+
+    # One app context per request, as Flask would push; worker threads see it through to_thread
+    ctx = flask_app.app_context()
+    ctx.push()
+    try:
+        session = _load_session(scope['headers'])
+        _touch_session(session, client_ip)
+        cookie = _session_cookie(session)
+        user_id = session.get('_user_id')
+        user = await asyncio.to_thread(_load_user, user_id) if user_id else None
+        if user is None:
+            payload, status = {'error': 'Authentication required'}, 401
+        else:
+            try:
+                data = json.loads(body) if body else None
+            except ValueError:
+                data = None
+            if stream_route is not None:
+                await _send_events(send, stream_route(data, user.id), [cookie])
+                return
+            payload, status = await route(data, user.id)
+    finally:
+        ctx.pop()
+
+    await _send_json(send, payload, status, [cookie])
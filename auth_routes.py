@@ -67,7 +67,7 @@ def admin_login():
     client_ip = request.headers.get('X-Real-IP', request.remote_addr)
 
     # Rate limiting check
-    if not admin_security.check_rate_limit(client_ip, max_attempts=3, window=900):
+    if not admin_security.check_rate_limit(client_ip):
         AdminAuditLogger.log_login('unknown', False, client_ip)
         flash('Too many failed attempts. Try again later.', 'error')
         return render_template('admin/login.html'), 429
@@ -61,8 +61,9 @@ celery_app = make_celery(flask_app)
 
 # Configure periodic tasks (Celery Beat schedule)
 celery_app.conf.beat_schedule = {
-    'cleanup-old-sessions': {
-        'task': 'tasks.cleanup_old_sessions',
+    # Every enabled retention policy (sessions, biometric data); covers cleanup_old_sessions
+    'apply-retention-policies': {
+        'task': 'tasks.apply_retention_policies',
         'schedule': crontab(hour=2, minute=0),  # Run at 2 AM daily
     },
     'generate-daily-analytics': {
@@ -73,6 +74,10 @@ celery_app.conf.beat_schedule = {
         'task': 'tasks.check_subscription_renewals',
         'schedule': crontab(hour=0, minute=0),  # Run at midnight daily
     },
+    'generate-peer-matches': {
+        'task': 'tasks.generate_peer_matches',
+        'schedule': crontab(hour=4, minute=0),  # Run at 4 AM daily
+    },
     'process-pending-ai-analyses': {
         'task': 'tasks.process_pending_ai_analyses',
         'schedule': crontab(minute='*/15'),  # Run every 15 minutes
@@ -90,6 +95,10 @@ celery_app.conf.beat_schedule = {
         'task': 'tasks.comprehensive_model_retraining',
         'schedule': crontab(hour=3, minute=0),  # Daily at 3 AM
     },
+    'resume-stale-training-jobs': {
+        'task': 'tasks.resume_stale_training_jobs',
+        'schedule': crontab(minute='*/10'),  # Every 10 minutes
+    },
     'generate-training-report': {
         'task': 'tasks.generate_training_report',
         'schedule': crontab(day_of_week=1, hour=6, minute=0),  # Weekly on Monday at 6 AM
@@ -8,7 +8,7 @@ import asyncio
 from flask import Blueprint, request, jsonify, session
 from flask_login import current_user
 from datetime import datetime
-from models.universal_crisis_predictor import crisis_predictor, CrisisSeverity
+from models.lazy_loader import lazy_service
 from models.database import Session as TherapySession, Patient, db
 import json
 
@@ -16,6 +16,9 @@ logger = logging.getLogger(__name__)
 
 crisis_bp = Blueprint('crisis', __name__)
 
+# The predictor loads its ML models on first use; PRELOAD_SERVICES=1 warms it at boot
+crisis_predictor = lazy_service('crisis_predictor', 'models.universal_crisis_predictor:crisis_predictor')
+
 def get_user_tier():
     """Get current user's subscription tier"""
     if not current_user.is_authenticated:
@@ -112,7 +115,7 @@ async def check_for_crisis():
                     db.session.commit()
 
             # Trigger alerts for critical cases
-            if prediction.severity == CrisisSeverity.CRITICAL:
+            if prediction.severity.value == 'critical':
                 await trigger_crisis_alert(context, prediction)
 
         # Prepare response
@@ -321,25 +324,27 @@ def check_message_for_crisis(message):
     Middleware function to check all messages for crisis
     Can be integrated into existing chat/session routes
     """
-    if not message:
+    if not _may_be_crisis(message):
         return None
 
-    # Quick pre-check for efficiency
-    crisis_keywords = ['suicide', 'kill', 'die', 'hurt myself', 'end it']
-    if not any(keyword in message.lower() for keyword in crisis_keywords):
+    # Full check if keywords found
+    return asyncio.run(check_message_for_crisis_async(message))
+
+async def check_message_for_crisis_async(message):
+    """check_message_for_crisis for callers already running on an event loop"""
+    if not _may_be_crisis(message):
         return None
 
-    # Full check if keywords found
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-
-    prediction = loop.run_until_complete(
-        crisis_predictor.predict_crisis(
-            text=message,
-            user_tier='free',
-            context={},
-            force_free=True
-        )
+    prediction = await crisis_predictor.predict_crisis(
+        text=message,
+        user_tier='free',
+        context={},
+        force_free=True
     )
 
-    return prediction if prediction.is_crisis else None
\ No newline at end of file
+    return prediction if prediction.is_crisis else None
+
+def _may_be_crisis(message):
+    # Quick pre-check for efficiency
+    crisis_keywords = ['suicide', 'kill', 'die', 'hurt myself', 'end it']
+    return bool(message) and any(keyword in message.lower() for keyword in crisis_keywords)
\ No newline at end of file
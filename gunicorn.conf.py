@@ -0,0 +1,46 @@
+"""
+Gunicorn settings for MindMend.
+
+Gunicorn reads this file from the working directory; command-line flags
+(workers, bind, log files in mindmend.service) still take precedence.
+
+With GUNICORN_PRELOAD=1 (the default) the app is imported once in the
+master, which then loads every read-only model before forking, so workers
+share those pages copy-on-write instead of each holding its own copy. Set
+GUNICORN_PRELOAD=0 to have each worker import and load everything itself,
+e.g. to compare memory with scripts/measure_worker_memory.py.
+"""
+
+import gc
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+if preload_app:
+    # Avoid leaving freed holes in pages that workers will share; re-enabled in each worker
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        from models import prefork
+        prefork.preload()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        from models import prefork
+        prefork.freeze_heap()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from models import prefork
+        from app import app
+        prefork.after_fork(app)
+
+
+def post_worker_init(worker):
+    if not preload_app:
+        from models import prefork
+        prefork.preload()
@@ -5,12 +5,6 @@ Creates professional marketing materials and brand assets
 
 from datetime import datetime
 from flask import Blueprint, render_template, jsonify, make_response
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
 from io import BytesIO
 import logging
 
@@ -86,6 +80,14 @@ class MediaPackGenerator:
     
     def generate_executive_summary(self):
         """Generate executive summary document"""
+        # reportlab is only needed for this PDF, so it is not imported with the blueprint
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib import colors
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_CENTER
+
         buffer = BytesIO()
         doc = SimpleDocTemplate(buffer, pagesize=letter)
         story = []
@@ -0,0 +1,203 @@
+"""
+Admin Dashboard Metrics for MindMend
+====================================
+Computes the admin dashboard counters with a handful of aggregate queries
+and caches them per metric window.
+
+- Every time window is a plain range on an indexed timestamp column
+  (`created_at >= week_start`), never `func.date(col) >= x`; narrower
+  windows inside it are conditional aggregates over the same rows.
+- Results are cached per window (the overview per day, the live counters
+  per hour) with a short TTL. Only one caller recomputes an expired entry;
+  concurrent callers get the previous value while it refreshes, or wait
+  for the first computation when there is none yet.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable
+
+from sqlalchemy import case, desc, func, select
+
+from models.database import db, Patient, Session, Payment, Subscription
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsCache:
+    """TTL cache with per-key locks so each expiry triggers one computation"""
+
+    def __init__(self):
+        self._entries: Dict[Hashable, tuple] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.computations = 0
+
+    def get_or_compute(self, key: Hashable, ttl: float, compute: Callable[[], Any]) -> Any:
+        entry = self._entries.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0]
+
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+
+        # Someone else is refreshing: serve the stale value rather than queue up
+        if entry and not lock.acquire(blocking=False):
+            return entry[0]
+        if not entry:
+            lock.acquire()
+
+        try:
+            entry = self._entries.get(key)
+            if entry and entry[1] > time.monotonic():
+                return entry[0]
+            value = compute()
+            self.computations += 1
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._evict_expired_windows(key)
+            return value
+        finally:
+            lock.release()
+
+    def _evict_expired_windows(self, current_key):
+        """Drop entries for earlier windows of the same metric group"""
+        with self._guard:
+            for key in [k for k in self._entries if k[0] == current_key[0] and k != current_key]:
+                if self._entries[key][1] <= time.monotonic():
+                    del self._entries[key]
+                    self._locks.pop(key, None)
+
+    def clear(self):
+        with self._guard:
+            self._entries.clear()
+            self._locks.clear()
+
+
+class AdminMetricsService:
+    """Aggregated, cached metrics for the admin dashboard"""
+
+    def __init__(self, overview_ttl: float = None, live_ttl: float = None):
+        self.overview_ttl = overview_ttl if overview_ttl is not None else \
+            float(os.environ.get('ADMIN_METRICS_OVERVIEW_TTL', 60))
+        self.live_ttl = live_ttl if live_ttl is not None else \
+            float(os.environ.get('ADMIN_METRICS_LIVE_TTL', 10))
+        self.cache = MetricsCache()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get_overview(self, now: datetime = None) -> Dict[str, Any]:
+        """Dashboard page metrics; one computation per TTL per day window"""
+        now = now or datetime.utcnow()
+        today = datetime.combine(now.date(), datetime.min.time())
+        return self.cache.get_or_compute(('overview', today), self.overview_ttl,
+                                         lambda: self.compute_overview(today))
+
+    def get_live(self, now: datetime = None) -> Dict[str, Any]:
+        """Polling metrics for the current hour"""
+        now = now or datetime.utcnow()
+        current_hour = now.replace(minute=0, second=0, microsecond=0)
+        return self.cache.get_or_compute(('live', current_hour), self.live_ttl,
+                                         lambda: self.compute_live(current_hour))
+
+    def invalidate(self):
+        self.cache.clear()
+
+    # ------------------------------------------------------------------
+    # Computation
+    # ------------------------------------------------------------------
+
+    def compute_overview(self, today: datetime) -> Dict[str, Any]:
+        week_start = today - timedelta(days=7)
+        month_start = today - timedelta(days=30)
+
+        # Patients: total plus today/week inside one week range scan
+        total_users, new_week, new_today = db.session.query(
+            select(func.count(Patient.id)).scalar_subquery(),
+            func.count(Patient.id),
+            func.coalesce(func.sum(case((Patient.created_at >= today, 1), else_=0)), 0)
+        ).filter(Patient.created_at >= week_start).one()
+
+        # Sessions: lifetime count/average, then the week window
+        total_sessions, avg_duration = db.session.query(
+            func.count(Session.id), func.avg(Session.duration_minutes)
+        ).one()
+        sessions_week, sessions_today, active_week = db.session.query(
+            func.count(Session.id),
+            func.coalesce(func.sum(case((Session.timestamp >= today, 1), else_=0)), 0),
+            func.count(func.distinct(Session.patient_name))
+        ).filter(Session.timestamp >= week_start).one()
+
+        # Revenue: lifetime and month in one pass over succeeded payments
+        total_revenue, revenue_month = db.session.query(
+            func.coalesce(func.sum(Payment.amount), 0),
+            func.coalesce(func.sum(case((Payment.created_at >= month_start, Payment.amount), else_=0)), 0)
+        ).filter(Payment.status == 'succeeded').one()
+
+        subscriptions = dict(db.session.query(
+            Subscription.tier, func.count(Subscription.id)
+        ).filter(Subscription.status == 'active').group_by(Subscription.tier).all())
+
+        recent_sessions = Session.query.order_by(desc(Session.timestamp)).limit(10).all()
+        crisis_sessions = Session.query.filter(
+            Session.timestamp >= week_start,
+            Session.alerts.isnot(None)
+        ).order_by(desc(Session.timestamp)).limit(5).all()
+
+        total_revenue, revenue_month = float(total_revenue), float(revenue_month)
+        return {
+            'user_stats': {
+                'total_users': total_users,
+                'new_today': int(new_today),
+                'new_week': new_week,
+                'active_week': active_week,
+                'growth_rate': round((new_week / max(total_users - new_week, 1)) * 100, 1)
+            },
+            'revenue_stats': {
+                'total_revenue': total_revenue,
+                'revenue_month': revenue_month,
+                'mrr': revenue_month,  # Simplified MRR calculation
+                'arpu': total_revenue / max(total_users, 1)
+            },
+            'subscription_stats': subscriptions,
+            'session_stats': {
+                'total_sessions': total_sessions,
+                'sessions_today': int(sessions_today),
+                'sessions_week': sessions_week,
+                'avg_duration': round(avg_duration, 1) if avg_duration else 0
+            },
+            'recent_sessions': [{
+                'id': s.id,
+                'patient': s.patient_name,
+                'type': s.session_type,
+                'timestamp': s.timestamp.strftime('%H:%M'),
+                'duration': s.duration_minutes or 0,
+                'mood_change': (s.mood_after - s.mood_before) if (s.mood_after and s.mood_before) else None
+            } for s in recent_sessions],
+            'crisis_alerts': [{
+                'id': s.id,
+                'patient': s.patient_name,
+                'timestamp': s.timestamp.strftime('%m/%d %H:%M'),
+                'alert_type': 'High Risk',  # Simplified
+                'status': 'Active'
+            } for s in crisis_sessions],
+            'computed_at': datetime.utcnow().isoformat()
+        }
+
+    def compute_live(self, current_hour: datetime) -> Dict[str, Any]:
+        active_sessions, new_users_hour = db.session.query(
+            select(func.count(Session.id)).where(Session.timestamp >= current_hour).scalar_subquery(),
+            select(func.count(Patient.id)).where(Patient.created_at >= current_hour).scalar_subquery()
+        ).one()
+        return {
+            'active_sessions': active_sessions,
+            'new_users_hour': new_users_hour,
+            'computed_at': datetime.utcnow().isoformat()
+        }
+
+
+admin_metrics = AdminMetricsService()
@@ -0,0 +1,278 @@
+"""
+AI Provider Gateway for MindMend
+================================
+Every outbound model request from the therapy and /ai/* endpoints goes
+through here, so a worker can wait on OpenAI or Ollama without being tied
+up for the whole round trip.
+
+- Provider calls are coroutines. Under the ASGI entry point (asgi.py) they
+  run on the worker's own event loop, so one process keeps many sessions
+  in flight at once.
+- Sync callers (Flask views, Celery tasks) use `ai_gateway.run(coro)`. It
+  hands the coroutine to one background loop thread per process and blocks
+  only the calling thread. The coroutine sees the caller's context
+  variables, so Flask's app and request context carry over.
+  `ai_gateway.iterate(agen)` does the same for streams, one item at a time.
+- Connections are pooled. Each event loop gets one AsyncOpenAI client per
+  API key and one HTTP client for Ollama, all with keep-alive connections.
+  Previously every request built a new client and paid a new TLS handshake.
+- Each provider has a concurrency cap per event loop
+  (AI_MAX_CONCURRENCY_OPENAI, AI_MAX_CONCURRENCY_OLLAMA). Requests beyond
+  the cap queue. A request that waits longer than AI_QUEUE_TIMEOUT seconds
+  fails with `ProviderBusy` rather than piling onto a saturated provider.
+- `ai_gateway.coalesce(key, factory)` collapses identical calls that are
+  in flight at the same time into one provider request (single-flight).
+  Nothing is cached once the call completes.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMITS = {'openai': 32, 'ollama': 4}
+
+
+class ProviderBusy(RuntimeError):
+    """A request waited longer than the queue timeout for a provider slot"""
+
+
+def _http_module():
+    try:
+        import httpx
+    except ImportError:  # newer openai releases ship their HTTP client as httpx2
+        import httpx2 as httpx
+    return httpx
+
+
+class _LoopState:
+    """Clients and semaphores bound to one event loop"""
+
+    def __init__(self, limits: Dict[str, int]):
+        self.semaphores = {provider: asyncio.Semaphore(limit) for provider, limit in limits.items()}
+        self.openai_clients = {}
+        self.http_client = None
+        self.in_flight = {}
+
+
+class AIGateway:
+    """Pooled, concurrency-limited access to the model providers"""
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None,
+                 queue_timeout: Optional[float] = None,
+                 request_timeout: Optional[float] = None):
+        self.limits = {
+            provider: int(os.environ.get(f'AI_MAX_CONCURRENCY_{provider.upper()}', default))
+            for provider, default in DEFAULT_LIMITS.items()
+        }
+        self.limits.update(limits or {})
+        self.queue_timeout = queue_timeout if queue_timeout is not None else \
+            float(os.environ.get('AI_QUEUE_TIMEOUT', 10))
+        self.request_timeout = request_timeout if request_timeout is not None else \
+            float(os.environ.get('AI_REQUEST_TIMEOUT', 60))
+        self.stats_by_provider = {
+            provider: {'requests': 0, 'errors': 0, 'rejected': 0, 'in_flight': 0, 'waiting': 0,
+                       'total_seconds': 0.0}
+            for provider in self.limits
+        }
+        self.coalesced = 0
+        self._states = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    # Event loop plumbing
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState(self.limits)
+        return state
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            # A forked worker inherits the attribute but not the thread
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ai-gateway', daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+            return self._loop
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the gateway loop and wait for its result (for sync callers)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            coro.close()
+            raise RuntimeError("ai_gateway.run() called from a running event loop; await the coroutine instead")
+
+        future = asyncio.run_coroutine_threadsafe(coro, self._background_loop())
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator, timeout: Optional[float] = None) -> Iterator:
+        """Consume an async iterator from sync code (SSE responses, Socket.IO handlers)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError("ai_gateway.iterate() called from a running event loop; use async for instead")
+
+        loop = self._background_loop()
+
+        async def step():
+            return await agen.__anext__()
+
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(step(), loop).result(timeout)
+                except StopAsyncIteration:
+                    return
+        finally:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result(timeout)
+
+    @asynccontextmanager
+    async def slot(self, provider: str):
+        """Hold one of the provider's concurrency slots for the duration of a request"""
+        semaphore = self._state().semaphores[provider]
+        stats = self.stats_by_provider[provider]
+
+        stats['waiting'] += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            stats['rejected'] += 1
+            raise ProviderBusy(f"{provider} is at its limit of {self.limits[provider]} concurrent requests")
+        finally:
+            stats['waiting'] -= 1
+
+        stats['in_flight'] += 1
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            stats['errors'] += 1
+            raise
+        finally:
+            semaphore.release()
+            stats['in_flight'] -= 1
+            stats['requests'] += 1
+            stats['total_seconds'] += time.perf_counter() - started
+
+    async def coalesce(self, key: Any, factory: Callable[[], Awaitable]) -> Any:
+        """Await factory(), unless an identical call (same key) is already in flight on this loop
+
+        Every caller gets the leader's result or exception. A caller that is
+        cancelled stops waiting without cancelling the shared call.
+        """
+        in_flight = self._state().in_flight
+        task = in_flight.get(key)
+        if task is None:
+            def forget(done):
+                if in_flight.get(key) is done:
+                    del in_flight[key]
+                if not done.cancelled():
+                    done.exception()  # mark retrieved even if every caller has given up
+
+            task = in_flight[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(forget)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    # Clients
+
+    def openai_client(self, api_key: Optional[str] = None):
+        """Shared AsyncOpenAI client for this loop; without a key the SDK falls back to OPENAI_API_KEY"""
+        state = self._state()
+        client = state.openai_clients.get(api_key)
+        if client is None:
+            import openai
+            httpx = _http_module()
+            limit = self.limits['openai']
+            client = openai.AsyncOpenAI(
+                api_key=api_key,
+                timeout=self.request_timeout,
+                http_client=openai.DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit,
+                                        keepalive_expiry=30)
+                )
+            )
+            state.openai_clients[api_key] = client
+        return client
+
+    def http_client(self):
+        """Shared HTTP client for this loop, used for Ollama"""
+        state = self._state()
+        if state.http_client is None:
+            httpx = _http_module()
+            limit = self.limits['ollama']
+            state.http_client = httpx.AsyncClient(
+                timeout=self.request_timeout,
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit, keepalive_expiry=30)
+            )
+        return state.http_client
+
+    # Provider calls
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], api_key: Optional[str] = None,
+                   **params) -> str:
+        """OpenAI chat completion; returns the message text"""
+        client = self.openai_client(api_key)
+        async with self.slot('openai'):
+            response = await client.chat.completions.create(model=model, messages=messages, **params)
+        return response.choices[0].message.content
+
+    async def chat_stream(self, model: str, messages: List[Dict[str, str]], api_key: Optional[str] = None,
+                          **params) -> AsyncIterator[str]:
+        """OpenAI chat completion streamed as text deltas; holds the slot until the stream ends"""
+        client = self.openai_client(api_key)
+        async with self.slot('openai'):
+            stream = await client.chat.completions.create(model=model, messages=messages, stream=True, **params)
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+
+    async def ollama_generate(self, endpoint: str, model: str, prompt: str, timeout: float = 30):
+        """Non-streaming Ollama generate call; returns the HTTP response"""
+        client = self.http_client()
+        async with self.slot('ollama'):
+            return await client.post(endpoint, json={"model": model, "prompt": prompt, "stream": False},
+                                     timeout=timeout)
+
+    async def aclose(self):
+        """Close the clients bound to the running loop (ASGI shutdown)"""
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is None:
+            return
+        for client in state.openai_clients.values():
+            await client.close()
+        if state.http_client is not None:
+            await state.http_client.aclose()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            provider: dict(values, limit=self.limits[provider])
+            for provider, values in self.stats_by_provider.items()
+        }
+
+
+ai_gateway = AIGateway()
@@ -1,11 +1,166 @@
 import os
 import json
 import logging
+from functools import lru_cache
 from openai import OpenAI
+from models.ai_gateway import ai_gateway
+
+# System prompts by session type, built once at import rather than on every message
+SYSTEM_PROMPTS = {
+    "individual": """You are Dr. Sarah Chen, a highly experienced AI therapist with advanced training in:
+- Cognitive Behavioral Therapy (CBT): Help identify and modify negative thought patterns
+- Dialectical Behavior Therapy (DBT): Teach distress tolerance, emotion regulation, interpersonal effectiveness
+- Acceptance and Commitment Therapy (ACT): Foster psychological flexibility and values-based living
+- Mindfulness-Based Stress Reduction (MBSR): Integrate mindfulness practices
+- Trauma-Informed Care: Use safety, trustworthiness, collaboration, and empowerment
+- Solution-Focused Brief Therapy: Emphasize strengths and future-oriented solutions
+- Psychodynamic approaches: Explore unconscious patterns when appropriate
+
+Your therapeutic approach:
+1. Start with validation and empathetic reflection
+2. Ask open-ended questions to deepen understanding
+3. Identify patterns and gently challenge cognitive distortions
+4. Provide specific, actionable coping strategies
+5. Monitor for crisis indicators (suicidal ideation, self-harm, violence)
+6. Normalize experiences while maintaining professional boundaries
+7. Integrate psychoeducation naturally into responses
+8. End with hope and encouragement for progress
+
+Remember to be warm yet professional, using language that's accessible but not condescending.""",
+
+    "couple": """You are Dr. Michael Rivera, an expert couples therapist with specialized training in:
+- Emotionally Focused Therapy (EFT): Help partners identify attachment needs and negative cycles
+- The Gottman Method: Address the Four Horsemen, build Love Maps, enhance fondness and admiration
+- Imago Relationship Therapy: Explore childhood wounds affecting current relationships
+- Cognitive Behavioral Couples Therapy: Modify dysfunctional relationship patterns
+- Integrative Behavioral Couple Therapy: Promote acceptance alongside change
+
+Your therapeutic approach:
+1. Create safety for vulnerable expression from both partners
+2. Identify negative interaction cycles (pursue-withdraw, blame-defend)
+3. Help each partner understand the other's emotional experience
+4. Teach and model healthy communication (I-statements, active listening, validation)
+5. Address the Four Horsemen (criticism, contempt, defensiveness, stonewalling)
+6. Foster emotional attunement and secure connection
+7. Guide partners toward win-win solutions and compromise
+8. Celebrate positive interactions and progress
+9. Remain neutral while holding both partners' experiences
+
+Use phrases like "I'm hearing that..." and "It sounds like both of you...".""",
+
+    "group": """You are Dr. Lisa Thompson, an experienced group therapy facilitator specializing in:
+- Process-oriented group therapy: Focus on here-and-now interactions
+- Psychoeducational groups: Teach skills while processing experiences
+- Support groups: Foster mutual aid and universality
+- Interpersonal process groups: Use group as social microcosm
+
+Therapeutic factors to cultivate:
+1. Universality: Help members see they're not alone
+2. Instillation of hope: Highlight progress and possibility
+3. Imparting information: Share psychoeducation appropriately
+4. Altruism: Encourage members helping each other
+5. Interpersonal learning: Use group interactions for insight
+6. Group cohesiveness: Build trust and belonging
+7. Catharsis: Create space for emotional expression
+8. Existential factors: Address meaning and responsibility
+
+Your facilitation approach:
+- Balance participation among members
+- Link similar experiences between members
+- Process group dynamics as they emerge
+- Maintain appropriate boundaries and safety
+- Use "I notice..." and "I wonder..." statements
+- Encourage direct communication between members""",
+
+    "relationship": """You are Dr. Morgan Foster, a relationship specialist focusing on all types of relationships:
+- Romantic partnerships: Dating, committed relationships, marriages
+- Family relationships: Parent-child, siblings, extended family
+- Friendships: Building and maintaining healthy friendships
+- Professional relationships: Workplace dynamics and boundaries
+
+Key areas of focus:
+1. Attachment styles and their impact on relationships
+2. Communication skills and conflict resolution
+3. Boundary setting and maintenance
+4. Trust building and repair after betrayal
+5. Intimacy and vulnerability
+6. Codependency and interdependence
+7. Relationship transitions and life changes
+8. Cultural and individual differences in relationships
+
+Help clients develop secure, fulfilling relationships through understanding patterns, improving communication, and fostering mutual respect and care."""
+}
+
+# Prebuilt system messages; shared by every request, never modified
+SYSTEM_MESSAGES = {session_type: {"role": "system", "content": prompt}
+                   for session_type, prompt in SYSTEM_PROMPTS.items()}
+
+POSITIVE_WORDS = ('happy', 'good', 'great', 'wonderful', 'excited', 'joy')
+NEGATIVE_WORDS = ('sad', 'depressed', 'anxious', 'worried', 'angry', 'frustrated')
+
+# (keywords, recommendations added when any keyword appears)
+RECOMMENDATION_RULES = (
+    (('anxious', 'anxiety', 'worry'), ("Practice deep breathing exercises", "Try progressive muscle relaxation")),
+    (('sad', 'depressed', 'down'), ("Engage in pleasant activities", "Connect with supportive people")),
+    (('stress', 'overwhelmed'), ("Break tasks into smaller steps", "Practice mindfulness meditation")),
+)
+DEFAULT_RECOMMENDATIONS = ("Continue journaling your thoughts", "Maintain regular self-care routines")
+
+FALLBACK_MESSAGE = "I understand you're sharing something important with me. While I'm experiencing technical difficulties with my advanced AI features, I want you to know that I'm here to support you. In our {session_type} session, your wellbeing is my priority. Please consider reaching out to a mental health professional if you need immediate support."
+
+
+def normalize_message(message):
+    """Lowercased text with whitespace collapsed; the key for cached analysis and shared requests"""
+    return " ".join((message or "").split()).lower()
+
+
+# The keyword helpers below are pure functions of the normalized message,
+# so repeated onboarding and check-in messages are analysed once.
+
+@lru_cache(maxsize=4096)
+def _mood(normalized):
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in normalized)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in normalized)
+    
+    if negative_count > positive_count:
+        return "negative", min(negative_count * 2, 10)
+    elif positive_count > negative_count:
+        return "positive", min(positive_count * 2, 10)
+    else:
+        return "neutral", 5
+
+
+@lru_cache(maxsize=4096)
+def _recommendations(normalized):
+    recommendations = []
+    for keywords, advice in RECOMMENDATION_RULES:
+        if any(word in normalized for word in keywords):
+            recommendations.extend(advice)
+    return tuple(recommendations[:3]) or DEFAULT_RECOMMENDATIONS[:3]  # Limit to 3 recommendations
+
+
+@lru_cache(maxsize=4096)
+def _next_steps(normalized, session_type):
+    steps = []
+    if session_type == "individual":
+        steps.append("Reflect on today's insights")
+        if any(word in normalized for word in ['pattern', 'behavior', 'habit']):
+            steps.append("Track patterns in a journal")
+    elif session_type == "couple":
+        steps.append("Practice active listening with your partner")
+        steps.append("Schedule regular check-ins")
+    elif session_type == "group":
+        steps.append("Share insights with the group")
+        steps.append("Support other group members")
+    
+    steps.append("Schedule your next session")
+    return tuple(steps[:3])  # Limit to 3 steps
+
 
 class AIManager:
     def __init__(self):
-        self.openai_client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY", "demo-key"))
+        self.api_key = os.environ.get("OPENAI_API_KEY", "demo-key")
+        self.openai_client = OpenAI(api_key=self.api_key)
         self.models = {
             "default": self.get_openai_response,
             "advanced": self.get_advanced_analysis,
@@ -18,21 +173,26 @@ class AIManager:
     
     def get_therapeutic_response(self, message, session_type="individual", context=None):
         """Enhanced therapeutic response method for Level 2 features"""
+        return ai_gateway.run(self.get_therapeutic_response_async(message, session_type, context))
+    
+    async def get_therapeutic_response_async(self, message, session_type="individual", context=None):
+        """Async version of get_therapeutic_response, through the shared provider gateway
+
+        Identical messages of the same session type that arrive while one is
+        already with the provider share its reply instead of sending another request.
+        """
         try:
-            system_prompt = self._get_system_prompt(session_type)
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": message}
-                ],
-                temperature=0.7,
-                max_tokens=500
+            ai_message = await ai_gateway.coalesce(
+                ("therapeutic", session_type, normalize_message(message)),
+                lambda: ai_gateway.chat(
+                    "gpt-4o",  # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+                    self._chat_messages(message, session_type),
+                    api_key=self.api_key,
+                    temperature=0.7,
+                    max_tokens=500
+                )
             )
             
-            ai_message = response.choices[0].message.content
-            
             # Return enhanced response object
             return {
                 "message": ai_message,
@@ -47,6 +207,25 @@ class AIManager:
             logging.error(f"OpenAI API error: {e}")
             return self._get_enhanced_fallback_response(message, session_type)
     
+    async def stream_therapeutic_response(self, message, session_type="individual", context=None):
+        """Therapeutic response text as it is generated, one delta at a time"""
+        streamed = False
+        try:
+            async for delta in ai_gateway.chat_stream(
+                "gpt-4o",
+                self._chat_messages(message, session_type),
+                api_key=self.api_key,
+                temperature=0.7,
+                max_tokens=500
+            ):
+                streamed = True
+                yield delta
+        except Exception as e:
+            logging.error(f"OpenAI streaming error: {e}")
+            # Nothing reached the user yet: answer with the fallback instead of an empty reply
+            if not streamed:
+                yield self._get_enhanced_fallback_response(message, session_type)["message"]
+    
     def get_openai_response(self, text, session_type="individual"):
         """Get therapeutic response using OpenAI GPT-4o"""
         result = self.get_therapeutic_response(text, session_type)
@@ -212,179 +391,132 @@ class AIManager:
                 "individual_notes": [],
                 "support_needed": False
             }
-    
+
+    def analyze_sessions_batch(self, sessions):
+        """
+        Analyze several therapy sessions with a single model call.
+
+        Args:
+            sessions: List of dicts with session_id, input_text, ai_response and session_type
+
+        Returns:
+            dict: Analysis per session_id. Sessions the model omits fall back to
+            the local keyword analysis.
+        """
+        if not sessions:
+            return {}
+
+        results = {}
+        try:
+            system_prompt = """You are a clinical AI assistant reviewing completed therapy sessions.
+            For each session provide sentiment, key themes, risk level (low/medium/high) and up to 3 recommendations.
+
+            Respond in JSON format:
+            {"analyses": [{"session_id": 0, "sentiment": "", "themes": [], "risk_level": "", "recommendations": []}]}"""
+
+            payload = [
+                {
+                    "session_id": item["session_id"],
+                    "session_type": item.get("session_type", "individual"),
+                    "client": item.get("input_text") or "",
+                    "therapist": item.get("ai_response") or ""
+                }
+                for item in sessions
+            ]
+
+            response = self.openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": json.dumps({"sessions": payload})}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.3,
+                max_tokens=300 * len(sessions)
+            )
+
+            for analysis in json.loads(response.choices[0].message.content).get("analyses", []):
+                session_id = analysis.get("session_id")
+                if session_id is not None:
+                    results[int(session_id)] = analysis
+
+        except Exception as e:
+            logging.error(f"Batch session analysis error: {e}")
+
+        for item in sessions:
+            if item["session_id"] not in results:
+                text = item.get("input_text") or ""
+                session_type = item.get("session_type", "individual")
+                results[item["session_id"]] = {
+                    "session_id": item["session_id"],
+                    "sentiment": self._analyze_mood(text)["mood"],
+                    "themes": [],
+                    "risk_level": "unknown",
+                    "recommendations": self._generate_recommendations(text, session_type),
+                    "fallback": True
+                }
+
+        return results
+
     def get_response(self, text, session_type="individual"):
         """Main entry point for getting AI responses"""
         return self.models["default"](text, session_type)
     
     def get_individual_therapy_response(self, message):
         """Get AI response for individual therapy sessions"""
-        result = self.get_therapeutic_response(message, session_type="individual")
-        return result.get('message', self.fake_ai_response(message, "individual"))
+        return ai_gateway.run(self.get_individual_therapy_response_async(message))
 
     def get_couples_therapy_response(self, message, partner1_name, partner2_name):
         """Get AI response for couples therapy sessions"""
-        context = f"This is a couples therapy session between {partner1_name} and {partner2_name}."
-        result = self.get_therapeutic_response(message, session_type="couple", context=context)
-        return result.get('message', self.fake_ai_response(message, "couple"))
+        return ai_gateway.run(self.get_couples_therapy_response_async(message, partner1_name, partner2_name))
 
     def get_group_therapy_response(self, message, participant_count=None):
         """Get AI response for group therapy sessions"""
+        return ai_gateway.run(self.get_group_therapy_response_async(message, participant_count))
+
+    async def get_individual_therapy_response_async(self, message):
+        result = await self.get_therapeutic_response_async(message, session_type="individual")
+        return result.get('message', self.fake_ai_response(message, "individual"))
+
+    async def get_couples_therapy_response_async(self, message, partner1_name, partner2_name):
+        context = f"This is a couples therapy session between {partner1_name} and {partner2_name}."
+        result = await self.get_therapeutic_response_async(message, session_type="couple", context=context)
+        return result.get('message', self.fake_ai_response(message, "couple"))
+
+    async def get_group_therapy_response_async(self, message, participant_count=None):
         context = f"This is a group therapy session with {participant_count or 'several'} participants."
-        result = self.get_therapeutic_response(message, session_type="group", context=context)
+        result = await self.get_therapeutic_response_async(message, session_type="group", context=context)
         return result.get('message', self.fake_ai_response(message, "group"))
     
     def _get_system_prompt(self, session_type):
         """Get appropriate system prompt based on session type"""
-        prompts = {
-            "individual": """You are Dr. Sarah Chen, a highly experienced AI therapist with advanced training in:
-            - Cognitive Behavioral Therapy (CBT): Help identify and modify negative thought patterns
-            - Dialectical Behavior Therapy (DBT): Teach distress tolerance, emotion regulation, interpersonal effectiveness
-            - Acceptance and Commitment Therapy (ACT): Foster psychological flexibility and values-based living
-            - Mindfulness-Based Stress Reduction (MBSR): Integrate mindfulness practices
-            - Trauma-Informed Care: Use safety, trustworthiness, collaboration, and empowerment
-            - Solution-Focused Brief Therapy: Emphasize strengths and future-oriented solutions
-            - Psychodynamic approaches: Explore unconscious patterns when appropriate
-            
-            Your therapeutic approach:
-            1. Start with validation and empathetic reflection
-            2. Ask open-ended questions to deepen understanding
-            3. Identify patterns and gently challenge cognitive distortions
-            4. Provide specific, actionable coping strategies
-            5. Monitor for crisis indicators (suicidal ideation, self-harm, violence)
-            6. Normalize experiences while maintaining professional boundaries
-            7. Integrate psychoeducation naturally into responses
-            8. End with hope and encouragement for progress
-            
-            Remember to be warm yet professional, using language that's accessible but not condescending.""",
-            
-            "couple": """You are Dr. Michael Rivera, an expert couples therapist with specialized training in:
-            - Emotionally Focused Therapy (EFT): Help partners identify attachment needs and negative cycles
-            - The Gottman Method: Address the Four Horsemen, build Love Maps, enhance fondness and admiration
-            - Imago Relationship Therapy: Explore childhood wounds affecting current relationships
-            - Cognitive Behavioral Couples Therapy: Modify dysfunctional relationship patterns
-            - Integrative Behavioral Couple Therapy: Promote acceptance alongside change
-            
-            Your therapeutic approach:
-            1. Create safety for vulnerable expression from both partners
-            2. Identify negative interaction cycles (pursue-withdraw, blame-defend)
-            3. Help each partner understand the other's emotional experience
-            4. Teach and model healthy communication (I-statements, active listening, validation)
-            5. Address the Four Horsemen (criticism, contempt, defensiveness, stonewalling)
-            6. Foster emotional attunement and secure connection
-            7. Guide partners toward win-win solutions and compromise
-            8. Celebrate positive interactions and progress
-            9. Remain neutral while holding both partners' experiences
-            
-            Use phrases like "I'm hearing that..." and "It sounds like both of you...".""",
-            
-            "group": """You are Dr. Lisa Thompson, an experienced group therapy facilitator specializing in:
-            - Process-oriented group therapy: Focus on here-and-now interactions
-            - Psychoeducational groups: Teach skills while processing experiences
-            - Support groups: Foster mutual aid and universality
-            - Interpersonal process groups: Use group as social microcosm
-            
-            Therapeutic factors to cultivate:
-            1. Universality: Help members see they're not alone
-            2. Instillation of hope: Highlight progress and possibility
-            3. Imparting information: Share psychoeducation appropriately
-            4. Altruism: Encourage members helping each other
-            5. Interpersonal learning: Use group interactions for insight
-            6. Group cohesiveness: Build trust and belonging
-            7. Catharsis: Create space for emotional expression
-            8. Existential factors: Address meaning and responsibility
-            
-            Your facilitation approach:
-            - Balance participation among members
-            - Link similar experiences between members
-            - Process group dynamics as they emerge
-            - Maintain appropriate boundaries and safety
-            - Use "I notice..." and "I wonder..." statements
-            - Encourage direct communication between members""",
-            
-            "relationship": """You are Dr. Morgan Foster, a relationship specialist focusing on all types of relationships:
-            - Romantic partnerships: Dating, committed relationships, marriages
-            - Family relationships: Parent-child, siblings, extended family
-            - Friendships: Building and maintaining healthy friendships
-            - Professional relationships: Workplace dynamics and boundaries
-            
-            Key areas of focus:
-            1. Attachment styles and their impact on relationships
-            2. Communication skills and conflict resolution
-            3. Boundary setting and maintenance
-            4. Trust building and repair after betrayal
-            5. Intimacy and vulnerability
-            6. Codependency and interdependence
-            7. Relationship transitions and life changes
-            8. Cultural and individual differences in relationships
-            
-            Help clients develop secure, fulfilling relationships through understanding patterns, improving communication, and fostering mutual respect and care."""
-        }
-        
-        return prompts.get(session_type, prompts["individual"])
+        return SYSTEM_PROMPTS.get(session_type, SYSTEM_PROMPTS["individual"])
+    
+    def _chat_messages(self, message, session_type):
+        """System and user messages for a therapeutic reply"""
+        return [
+            SYSTEM_MESSAGES.get(session_type, SYSTEM_MESSAGES["individual"]),
+            {"role": "user", "content": message}
+        ]
     
     def _analyze_mood(self, message):
         """Analyze mood from message content"""
         # Simple keyword-based mood analysis
-        positive_words = ['happy', 'good', 'great', 'wonderful', 'excited', 'joy']
-        negative_words = ['sad', 'depressed', 'anxious', 'worried', 'angry', 'frustrated']
-        
-        message_lower = message.lower()
-        positive_count = sum(1 for word in positive_words if word in message_lower)
-        negative_count = sum(1 for word in negative_words if word in message_lower)
-        
-        if negative_count > positive_count:
-            return {"mood": "negative", "intensity": min(negative_count * 2, 10)}
-        elif positive_count > negative_count:
-            return {"mood": "positive", "intensity": min(positive_count * 2, 10)}
-        else:
-            return {"mood": "neutral", "intensity": 5}
+        mood, intensity = _mood(normalize_message(message))
+        return {"mood": mood, "intensity": intensity}
     
     def _generate_recommendations(self, message, session_type):
         """Generate therapeutic recommendations"""
-        recommendations = []
-        message_lower = message.lower()
-        
-        if any(word in message_lower for word in ['anxious', 'anxiety', 'worry']):
-            recommendations.append("Practice deep breathing exercises")
-            recommendations.append("Try progressive muscle relaxation")
-        
-        if any(word in message_lower for word in ['sad', 'depressed', 'down']):
-            recommendations.append("Engage in pleasant activities")
-            recommendations.append("Connect with supportive people")
-        
-        if any(word in message_lower for word in ['stress', 'overwhelmed']):
-            recommendations.append("Break tasks into smaller steps")
-            recommendations.append("Practice mindfulness meditation")
-        
-        if not recommendations:
-            recommendations = ["Continue journaling your thoughts", "Maintain regular self-care routines"]
-        
-        return recommendations[:3]  # Limit to 3 recommendations
+        return list(_recommendations(normalize_message(message)))
     
     def _suggest_next_steps(self, message, session_type):
         """Suggest next therapeutic steps"""
-        steps = []
-        message_lower = message.lower()
-        
-        if session_type == "individual":
-            steps.append("Reflect on today's insights")
-            if any(word in message_lower for word in ['pattern', 'behavior', 'habit']):
-                steps.append("Track patterns in a journal")
-        elif session_type == "couple":
-            steps.append("Practice active listening with your partner")
-            steps.append("Schedule regular check-ins")
-        elif session_type == "group":
-            steps.append("Share insights with the group")
-            steps.append("Support other group members")
-        
-        steps.append("Schedule your next session")
-        return steps[:3]  # Limit to 3 steps
+        return list(_next_steps(normalize_message(message), session_type))
     
     def _get_enhanced_fallback_response(self, message, session_type):
         """Enhanced fallback response when API is unavailable"""
         return {
-            "message": f"I understand you're sharing something important with me. While I'm experiencing technical difficulties with my advanced AI features, I want you to know that I'm here to support you. In our {session_type} session, your wellbeing is my priority. Please consider reaching out to a mental health professional if you need immediate support.",
+            "message": FALLBACK_MESSAGE.format(session_type=session_type),
             "mood_analysis": self._analyze_mood(message),
             "recommendations": self._generate_recommendations(message, session_type),
             "next_steps": self._suggest_next_steps(message, session_type),
@@ -5,6 +5,7 @@ Supports multiple AI models including OpenAI, Ollama, and custom ML models
 
 import os
 import json
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
@@ -17,6 +18,7 @@ import joblib
 import requests
 from dataclasses import dataclass
 from enum import Enum
+from models.ai_gateway import ai_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +59,8 @@ class AIModelManager:
         self.model_weights = {}
         self.scalers = {}
         self.performance_history = []
+        # Fitted estimators by path, loaded once per process (or once in the prefork master)
+        self.loaded_models = {}
         self._initialize_models()
     
     def _initialize_models(self):
@@ -315,6 +319,7 @@ class AIModelManager:
             model_path = f"models/ml/{model_name}.pkl"
             os.makedirs(os.path.dirname(model_path), exist_ok=True)
             joblib.dump(model, model_path)
+            self.loaded_models[model_path] = model
             
             # Register the trained model
             config = ModelConfig(
@@ -335,30 +340,37 @@ class AIModelManager:
     
     def diagnose_with_ensemble(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
         """Perform diagnosis using ensemble of models"""
-        diagnosis_results = []
-        confidence_scores = []
+        return ai_gateway.run(self.diagnose_with_ensemble_async(patient_data))
+    
+    async def diagnose_with_ensemble_async(self, patient_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Perform diagnosis using ensemble of models, querying them concurrently"""
+        model_names = []
+        calls = []
         
-        # Get predictions from each active model
         for model_name in self.active_models:
             config = self.models[model_name]
             
-            try:
-                if config.type == ModelType.OPENAI_GPT:
-                    result = self._diagnose_with_openai(patient_data, config)
-                elif config.type == ModelType.OLLAMA:
-                    result = self._diagnose_with_ollama(patient_data, config)
-                elif config.type == ModelType.CUSTOM_ML:
-                    result = self._diagnose_with_ml(patient_data, config)
-                else:
-                    continue
-                
-                if result:
-                    diagnosis_results.append(result)
-                    confidence_scores.append(
-                        (result['confidence'], self.model_weights.get(model_name, 1.0))
-                    )
-            except Exception as e:
-                logger.error(f"Error with model {model_name}: {str(e)}")
+            if config.type == ModelType.OPENAI_GPT:
+                calls.append(self._diagnose_with_openai_async(patient_data, config))
+            elif config.type == ModelType.OLLAMA:
+                calls.append(self._diagnose_with_ollama_async(patient_data, config))
+            elif config.type == ModelType.CUSTOM_ML:
+                calls.append(asyncio.to_thread(self._diagnose_with_ml, patient_data, config))
+            else:
+                continue
+            model_names.append(model_name)
+        
+        diagnosis_results = []
+        confidence_scores = []
+        
+        for model_name, result in zip(model_names, await asyncio.gather(*calls, return_exceptions=True)):
+            if isinstance(result, Exception):
+                logger.error(f"Error with model {model_name}: {str(result)}")
+            elif result:
+                diagnosis_results.append(result)
+                confidence_scores.append(
+                    (result['confidence'], self.model_weights.get(model_name, 1.0))
+                )
         
         # Aggregate results
         if not diagnosis_results:
@@ -379,25 +391,25 @@ class AIModelManager:
     def _diagnose_with_openai(self, patient_data: Dict[str, Any], 
                              config: ModelConfig) -> Dict[str, Any]:
         """Diagnose using OpenAI GPT models"""
+        return ai_gateway.run(self._diagnose_with_openai_async(patient_data, config))
+    
+    async def _diagnose_with_openai_async(self, patient_data: Dict[str, Any], 
+                                          config: ModelConfig) -> Dict[str, Any]:
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=config.api_key)
-            
             # Prepare prompt
             prompt = self._create_diagnosis_prompt(patient_data)
             
-            response = client.chat.completions.create(
-                model=config.name,
-                messages=[
+            result_text = await ai_gateway.chat(
+                config.name,
+                [
                     {"role": "system", "content": "You are an expert mental health diagnostician. Provide detailed assessment based on provided data."},
                     {"role": "user", "content": prompt}
                 ],
+                api_key=config.api_key,
                 temperature=config.parameters.get('temperature', 0.7),
                 max_tokens=config.parameters.get('max_tokens', 1000)
             )
             
-            result_text = response.choices[0].message.content
-            
             # Parse structured response
             return self._parse_diagnosis_response(result_text, "openai")
             
@@ -408,18 +420,14 @@ class AIModelManager:
     def _diagnose_with_ollama(self, patient_data: Dict[str, Any], 
                              config: ModelConfig) -> Dict[str, Any]:
         """Diagnose using Ollama local models"""
+        return ai_gateway.run(self._diagnose_with_ollama_async(patient_data, config))
+    
+    async def _diagnose_with_ollama_async(self, patient_data: Dict[str, Any], 
+                                          config: ModelConfig) -> Dict[str, Any]:
         try:
             prompt = self._create_diagnosis_prompt(patient_data)
             
-            response = requests.post(
-                config.endpoint,
-                json={
-                    "model": config.name,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
+            response = await ai_gateway.ollama_generate(config.endpoint, config.name, prompt, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
@@ -441,7 +449,7 @@ class AIModelManager:
                 logger.warning(f"Model file not found: {config.model_path}")
                 return None
             
-            model = joblib.load(config.model_path)
+            model = self.load_ml_model(config.model_path)
             
             # Prepare features
             features = self._extract_ml_features(patient_data)
@@ -827,6 +835,25 @@ class AIModelManager:
         
         logger.info(f"Updated {model_name} accuracy: {new_accuracy:.3f}")
     
+    def load_ml_model(self, model_path: str):
+        """Fitted estimator at `model_path`, unpickled on first use only"""
+        model = self.loaded_models.get(model_path)
+        if model is None:
+            model = self.loaded_models[model_path] = joblib.load(model_path)
+        return model
+
+    def preload_ml_models(self) -> List[str]:
+        """Load every registered model file that exists, e.g. before forking workers"""
+        loaded = []
+        for config in self.models.values():
+            if config.model_path and os.path.exists(config.model_path):
+                try:
+                    self.load_ml_model(config.model_path)
+                    loaded.append(config.name)
+                except Exception as e:
+                    logger.error(f"Could not preload {config.model_path}: {e}")
+        return loaded
+
     def get_model_status(self) -> Dict[str, Any]:
         """Get status of all registered models"""
         status = {
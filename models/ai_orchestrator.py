@@ -505,13 +505,14 @@ class AIOrchestrator:
                           request: ModelRequest) -> ModelResponse:
         """Call OpenAI API"""
 
-        # Use existing AI manager
-        response_text = await asyncio.get_event_loop().run_in_executor(
-            self.executor,
-            self.ai_manager.get_therapeutic_response,
+        # Use existing AI manager; its async path shares the gateway's connection pool,
+        # prebuilt system prompts and single-flight for identical prompts
+        result = await self.ai_manager.get_therapeutic_response_async(
             request.prompt,
-            request.context.get('context', '')
+            session_type=request.context.get('session_type', 'individual'),
+            context=request.context.get('context')
         )
+        response_text = result['message']
 
         return ModelResponse(
             model_name='gpt-4o',
@@ -0,0 +1,175 @@
+"""
+Daily Analytics Snapshots for MindMend
+=====================================
+Computes per-day platform metrics with index-friendly range predicates and
+persists them to DailyAnalyticsSnapshot so dashboards read a small fact table
+instead of scanning Session/Patient/Payment.
+"""
+
+import logging
+from datetime import date, datetime, time, timedelta, UTC
+
+from sqlalchemy import func, delete, insert
+
+from models.database import db, Patient, Session, Payment, DailyAnalyticsSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _day_start(day):
+    """Naive UTC midnight for a date (timestamps are stored as naive UTC)"""
+    return datetime.combine(day, time.min)
+
+
+def _as_date(value):
+    """func.date() returns a string on SQLite and a date on PostgreSQL"""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class AnalyticsSnapshotManager:
+    """Builds, stores and serves daily analytics snapshots"""
+
+    def compute_range(self, start_date, end_date):
+        """
+        Compute metrics for every day in [start_date, end_date).
+
+        The WHERE clauses are plain ranges on the timestamp columns so their
+        indexes are used; grouping by day only touches the matching rows.
+
+        Returns:
+            dict: Mapping of date to metrics dict
+        """
+        start, end = _day_start(start_date), _day_start(end_date)
+        metrics = {}
+        day = start_date
+        while day < end_date:
+            metrics[day] = {
+                'new_users': 0,
+                'total_sessions': 0,
+                'active_users': 0,
+                'avg_sessions_per_user': 0.0,
+                'revenue': 0.0
+            }
+            day += timedelta(days=1)
+
+        user_day = func.date(Patient.created_at)
+        for day, count in db.session.query(user_day, func.count(Patient.id)).filter(
+            Patient.created_at >= start, Patient.created_at < end
+        ).group_by(user_day):
+            metrics[_as_date(day)]['new_users'] = count
+
+        session_day = func.date(Session.timestamp)
+        for day, sessions, active in db.session.query(
+            session_day,
+            func.count(Session.id),
+            func.count(func.distinct(Session.patient_name))
+        ).filter(
+            Session.timestamp >= start, Session.timestamp < end
+        ).group_by(session_day):
+            row = metrics[_as_date(day)]
+            row['total_sessions'] = sessions
+            row['active_users'] = active
+            row['avg_sessions_per_user'] = round(sessions / max(active, 1), 2)
+
+        payment_day = func.date(Payment.created_at)
+        for day, revenue in db.session.query(payment_day, func.sum(Payment.amount)).filter(
+            Payment.created_at >= start, Payment.created_at < end,
+            Payment.status == 'succeeded'
+        ).group_by(payment_day):
+            metrics[_as_date(day)]['revenue'] = float(revenue or 0)
+
+        return metrics
+
+    def store(self, metrics):
+        """Replace the snapshots for the given days in one transaction"""
+        if not metrics:
+            return 0
+
+        generated_at = datetime.now(UTC)
+        try:
+            db.session.execute(
+                delete(DailyAnalyticsSnapshot).where(
+                    DailyAnalyticsSnapshot.snapshot_date.in_(list(metrics))
+                )
+            )
+            db.session.execute(insert(DailyAnalyticsSnapshot), [
+                dict(values, snapshot_date=day, generated_at=generated_at)
+                for day, values in metrics.items()
+            ])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return len(metrics)
+
+    def snapshot_day(self, day):
+        """Compute and persist a single day, returning its metrics"""
+        metrics = self.compute_range(day, day + timedelta(days=1))
+        self.store(metrics)
+        return dict(metrics[day], date=day.isoformat())
+
+    def snapshot_range(self, start_date, end_date):
+        """Compute and persist [start_date, end_date); used by backfill chunks"""
+        return self.store(self.compute_range(start_date, end_date))
+
+    def missing_days(self, start_date, end_date):
+        """Days in [start_date, end_date) with no stored snapshot"""
+        stored = {
+            row.snapshot_date for row in db.session.query(DailyAnalyticsSnapshot.snapshot_date).filter(
+                DailyAnalyticsSnapshot.snapshot_date >= start_date,
+                DailyAnalyticsSnapshot.snapshot_date < end_date
+            )
+        }
+        days = []
+        day = start_date
+        while day < end_date:
+            if day not in stored:
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def missing_chunks(self, start_date, end_date, chunk_days=7):
+        """Group missing days into contiguous [start, end) ranges of at most chunk_days"""
+        chunks = []
+        for day in self.missing_days(start_date, end_date):
+            if chunks and chunks[-1][1] == day and (day - chunks[-1][0]).days < chunk_days:
+                chunks[-1][1] = day + timedelta(days=1)
+            else:
+                chunks.append([day, day + timedelta(days=1)])
+        return [tuple(chunk) for chunk in chunks]
+
+    def get_series(self, start_date, end_date):
+        """
+        Daily metrics for [start_date, end_date), newest first.
+
+        Completed days come from stored snapshots. Today and any days that
+        have not been snapshotted yet are computed live with range queries.
+        """
+        today = datetime.now(UTC).date()
+        snapshots = {
+            row.snapshot_date: row.to_dict()
+            for row in DailyAnalyticsSnapshot.query.filter(
+                DailyAnalyticsSnapshot.snapshot_date >= start_date,
+                DailyAnalyticsSnapshot.snapshot_date < end_date
+            )
+        }
+
+        live_days = [
+            day for day in (start_date + timedelta(days=i) for i in range((end_date - start_date).days))
+            if day not in snapshots or day >= today
+        ]
+        if live_days:
+            live = self.compute_range(min(live_days), max(live_days) + timedelta(days=1))
+            for day in live_days:
+                snapshots[day] = dict(live[day], date=day.isoformat())
+
+        return [snapshots[day] for day in sorted(snapshots, reverse=True)]
+
+
+# Global snapshot manager instance
+analytics_snapshots = AnalyticsSnapshotManager()
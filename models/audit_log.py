@@ -3,11 +3,24 @@ HIPAA-Compliant Audit Logging System
 ====================================
 Tracks all administrative actions, data access, and security events
 """
+import os
+import io
+import csv
+import hmac
 import json
 import hashlib
+import logging
 from datetime import datetime
-from sqlalchemy import Index
+from sqlalchemy import Index, select, func, case, and_, or_
 from models.database import db
+from models.audit_writer import audit_writer
+
+AUDIT_REPORT_FORMATS = ('ndjson', 'csv')
+AUDIT_REPORT_CSV_COLUMNS = [
+    'id', 'timestamp', 'event_type', 'event_category', 'severity',
+    'admin_username', 'admin_role', 'target_type', 'target_id', 'target_name',
+    'ip_address', 'description', 'phi_accessed', 'success', 'details'
+]
 
 class AuditLog(db.Model):
     """HIPAA-compliant audit log for all admin and system actions"""
@@ -65,32 +78,41 @@ class AuditLog(db.Model):
     )
 
     def __init__(self, event_type, description, **kwargs):
-        self.event_type = event_type
-        self.description = description
-
-        # Set defaults
-        self.event_category = kwargs.get('event_category', self._get_category_from_type(event_type))
-        self.severity = kwargs.get('severity', 'INFO')
-        self.admin_user_id = kwargs.get('admin_user_id')
-        self.admin_username = kwargs.get('admin_username')
-        self.admin_role = kwargs.get('admin_role')
-        self.target_type = kwargs.get('target_type')
-        self.target_id = kwargs.get('target_id')
-        self.target_name = kwargs.get('target_name')
-        self.ip_address = kwargs.get('ip_address')
-        self.user_agent = kwargs.get('user_agent')
-        self.request_method = kwargs.get('request_method')
-        self.request_url = kwargs.get('request_url')
-        self.phi_accessed = kwargs.get('phi_accessed', False)
-        self.success = kwargs.get('success', True)
-        self.error_message = kwargs.get('error_message')
+        for column, value in self.build_row(event_type, description, **kwargs).items():
+            setattr(self, column, value)
+
+    @classmethod
+    def build_row(cls, event_type, description, **kwargs):
+        """Column values for an audit event (shared by the ORM and the async writer)"""
+        row = {
+            'event_type': event_type,
+            'description': description,
+            'event_category': kwargs.get('event_category', cls._get_category_from_type(event_type)),
+            'severity': kwargs.get('severity', 'INFO'),
+            'admin_user_id': kwargs.get('admin_user_id'),
+            'admin_username': kwargs.get('admin_username'),
+            'admin_role': kwargs.get('admin_role'),
+            'target_type': kwargs.get('target_type'),
+            'target_id': kwargs.get('target_id'),
+            'target_name': kwargs.get('target_name'),
+            'ip_address': kwargs.get('ip_address'),
+            'user_agent': kwargs.get('user_agent'),
+            'request_method': kwargs.get('request_method'),
+            'request_url': kwargs.get('request_url'),
+            'phi_accessed': kwargs.get('phi_accessed', False),
+            'success': kwargs.get('success', True),
+            'error_message': kwargs.get('error_message'),
+            'timestamp': kwargs.get('timestamp', datetime.utcnow()),
+        }
 
         # Handle details
         details_dict = kwargs.get('details', {})
         if details_dict:
-            self.details = json.dumps(details_dict, default=str)
+            row['details'] = json.dumps(details_dict, default=str)
             # Create hash for data integrity
-            self.data_hash = hashlib.sha256(self.details.encode()).hexdigest()
+            row['data_hash'] = hashlib.sha256(row['details'].encode()).hexdigest()
+
+        return row
 
     @staticmethod
     def _get_category_from_type(event_type):
@@ -110,24 +132,39 @@ class AuditLog(db.Model):
 
     def to_dict(self):
         """Convert to dictionary for JSON serialization"""
+        return self.serialize(self)
+
+    @staticmethod
+    def serialize(log):
+        """Serialize an AuditLog instance or a raw audit_logs row"""
         return {
-            'id': self.id,
-            'event_type': self.event_type,
-            'event_category': self.event_category,
-            'severity': self.severity,
-            'admin_username': self.admin_username,
-            'admin_role': self.admin_role,
-            'target_type': self.target_type,
-            'target_id': self.target_id,
-            'target_name': self.target_name,
-            'ip_address': self.ip_address,
-            'description': self.description,
-            'phi_accessed': self.phi_accessed,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
-            'success': self.success,
-            'details': json.loads(self.details) if self.details else {}
+            'id': log.id,
+            'event_type': log.event_type,
+            'event_category': log.event_category,
+            'severity': log.severity,
+            'admin_username': log.admin_username,
+            'admin_role': log.admin_role,
+            'target_type': log.target_type,
+            'target_id': log.target_id,
+            'target_name': log.target_name,
+            'ip_address': log.ip_address,
+            'description': log.description,
+            'phi_accessed': log.phi_accessed,
+            'timestamp': log.timestamp.isoformat() if log.timestamp else None,
+            'success': log.success,
+            'details': json.loads(log.details) if log.details else {}
         }
 
+class AuditWalCheckpoint(db.Model):
+    """Persisted byte offset of each audit write-ahead log segment"""
+
+    __tablename__ = 'audit_wal_checkpoints'
+
+    id = db.Column(db.Integer, primary_key=True)
+    segment = db.Column(db.String(255), unique=True, nullable=False)
+    offset = db.Column(db.BigInteger, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class AuditLogger:
     """HIPAA-compliant audit logger"""
 
@@ -136,11 +173,26 @@ class AuditLogger:
         """
         Log an audit event
 
+        In async mode (the default, AUDIT_LOG_MODE=async) the event is appended
+        to the local write-ahead log and persisted by the background writer,
+        so the caller's transaction is never committed or rolled back here.
+
         Args:
             event_type (str): Type of event (LOGIN, DATA_ACCESS, etc.)
             description (str): Human-readable description
             **kwargs: Additional event details
+
+        Returns:
+            int: AuditLog id in sync mode, None when written asynchronously
         """
+        if os.environ.get('AUDIT_LOG_MODE', 'async') == 'async':
+            try:
+                audit_writer.append(AuditLog.build_row(event_type, description, **kwargs))
+                return None
+            except Exception as e:
+                # Fall back to a synchronous write rather than losing the event
+                logging.error(f"AUDIT_WAL_APPEND_FAILED: {e} - Event: {event_type} - {description}")
+
         try:
             audit_log = AuditLog(
                 event_type=event_type,
@@ -157,7 +209,6 @@ class AuditLogger:
             # Critical: audit logging must never fail silently
             db.session.rollback()
             # Log to system logger as backup
-            import logging
             logging.error(f"AUDIT_LOG_FAILED: {e} - Event: {event_type} - {description}")
             raise
 
@@ -232,6 +283,7 @@ class AuditLogger:
     @staticmethod
     def get_audit_logs(limit=100, offset=0, filters=None):
         """Retrieve audit logs with filtering"""
+        audit_writer.flush(timeout=5)
         query = AuditLog.query
 
         if filters:
@@ -258,28 +310,208 @@ class AuditLogger:
 
         return query.order_by(AuditLog.timestamp.desc()).offset(offset).limit(limit).all()
 
+    @staticmethod
+    def get_audit_summary(start_date, end_date):
+        """Summary counters for a period, computed in a single aggregate query"""
+        total, phi_events, security_events, failed_events = db.session.query(
+            func.count(AuditLog.id),
+            func.coalesce(func.sum(case((AuditLog.phi_accessed == True, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((AuditLog.event_category == 'SECURITY', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((AuditLog.success == False, 1), else_=0)), 0)
+        ).filter(
+            AuditLog.timestamp >= start_date,
+            AuditLog.timestamp <= end_date
+        ).one()
+
+        return {
+            'report_generated': datetime.utcnow().isoformat(),
+            'period_start': start_date.isoformat(),
+            'period_end': end_date.isoformat(),
+            'total_events': int(total),
+            'phi_access_events': int(phi_events),
+            'security_events': int(security_events),
+            'failed_events': int(failed_events)
+        }
+
+    @staticmethod
+    def iter_audit_events(start_date, end_date, chunk_size=1000):
+        """
+        Yield serialized events newest first, one keyset-paginated chunk at a time.
+
+        Pages continue from the last (timestamp, id) seen, so each query is an
+        index range scan and no ORM objects accumulate in the session.
+        """
+        table = AuditLog.__table__
+        last_timestamp = last_id = None
+
+        while True:
+            query = select(table).where(
+                table.c.timestamp >= start_date,
+                table.c.timestamp <= end_date
+            )
+            if last_id is not None:
+                query = query.where(or_(
+                    table.c.timestamp < last_timestamp,
+                    and_(table.c.timestamp == last_timestamp, table.c.id < last_id)
+                ))
+            rows = db.session.execute(
+                query.order_by(table.c.timestamp.desc(), table.c.id.desc()).limit(chunk_size)
+            ).all()
+
+            if not rows:
+                return
+
+            for row in rows:
+                yield AuditLog.serialize(row)
+
+            last_timestamp, last_id = rows[-1].timestamp, rows[-1].id
+            if len(rows) < chunk_size:
+                return
+
+    @staticmethod
+    def stream_audit_report(start_date, end_date, format='ndjson', chunk_size=1000):
+        """
+        Stream a HIPAA audit report as NDJSON or CSV text chunks.
+
+        NDJSON starts with a summary record followed by one event per line;
+        CSV has a header row followed by one row per event.
+        """
+        if format not in AUDIT_REPORT_FORMATS:
+            raise ValueError(f"Unsupported audit report format: {format}")
+
+        audit_writer.flush(timeout=5)
+        events = AuditLogger.iter_audit_events(start_date, end_date, chunk_size)
+
+        if format == 'ndjson':
+            summary = AuditLogger.get_audit_summary(start_date, end_date)
+            yield json.dumps(dict(summary, record_type='summary'), default=str) + '\n'
+            buffer = []
+            for event in events:
+                buffer.append(json.dumps(event, default=str))
+                if len(buffer) >= chunk_size:
+                    yield '\n'.join(buffer) + '\n'
+                    buffer = []
+            if buffer:
+                yield '\n'.join(buffer) + '\n'
+            return
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(AUDIT_REPORT_CSV_COLUMNS)
+        rows = 0
+        for event in events:
+            writer.writerow([
+                json.dumps(event[column]) if column == 'details' else event[column]
+                for column in AUDIT_REPORT_CSV_COLUMNS
+            ])
+            rows += 1
+            if rows % chunk_size == 0:
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+        yield output.getvalue()
+
+    @staticmethod
+    def write_signed_report(start_date, end_date, format='ndjson', output_dir=None, signing_key=None):
+        """
+        Write a report file to disk with an HMAC-SHA256 signature manifest.
+
+        The report is streamed to a temporary file while its SHA-256 digest is
+        computed, then renamed into place next to a ``.sig.json`` manifest.
+
+        Returns:
+            dict: Report path, manifest path, digest and summary
+        """
+        from flask import current_app
+
+        output_dir = output_dir or os.environ.get('AUDIT_REPORT_DIR') or os.path.join(
+            current_app.instance_path, 'audit_reports'
+        )
+        os.makedirs(output_dir, exist_ok=True)
+        key = signing_key or os.environ.get('AUDIT_REPORT_SIGNING_KEY') or current_app.secret_key
+
+        extension = 'ndjson' if format == 'ndjson' else 'csv'
+        filename = (
+            f"audit_report_{start_date.strftime('%Y%m%d')}_{end_date.strftime('%Y%m%d')}_"
+            f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{extension}"
+        )
+        path = os.path.join(output_dir, filename)
+        temp_path = path + '.tmp'
+
+        summary = AuditLogger.get_audit_summary(start_date, end_date)
+        digest = hashlib.sha256()
+        with open(temp_path, 'w', encoding='utf-8', newline='') as handle:
+            for chunk in AuditLogger.stream_audit_report(start_date, end_date, format):
+                handle.write(chunk)
+                digest.update(chunk.encode('utf-8'))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.rename(temp_path, path)
+
+        manifest = {
+            'file': filename,
+            'format': format,
+            'sha256': digest.hexdigest(),
+            'summary': summary,
+            'algorithm': 'HMAC-SHA256'
+        }
+        manifest['signature'] = AuditLogger._sign_manifest(manifest, key)
+
+        manifest_path = path + '.sig.json'
+        with open(manifest_path, 'w') as handle:
+            json.dump(manifest, handle, indent=2)
+
+        return {
+            'report_path': path,
+            'manifest_path': manifest_path,
+            'sha256': manifest['sha256'],
+            'summary': manifest['summary']
+        }
+
+    @staticmethod
+    def verify_signed_report(manifest_path, signing_key=None):
+        """Check a report file against its signature manifest"""
+        from flask import current_app
+
+        key = signing_key or os.environ.get('AUDIT_REPORT_SIGNING_KEY') or current_app.secret_key
+        with open(manifest_path) as handle:
+            manifest = json.load(handle)
+
+        digest = hashlib.sha256()
+        with open(os.path.join(os.path.dirname(manifest_path), manifest['file']), 'rb') as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b''):
+                digest.update(block)
+
+        unsigned = {k: v for k, v in manifest.items() if k != 'signature'}
+        return (
+            digest.hexdigest() == manifest['sha256']
+            and hmac.compare_digest(AuditLogger._sign_manifest(unsigned, key), manifest['signature'])
+        )
+
+    @staticmethod
+    def _sign_manifest(manifest, key):
+        payload = json.dumps(manifest, sort_keys=True, default=str).encode('utf-8')
+        key_bytes = key.encode('utf-8') if isinstance(key, str) else key
+        return hmac.new(key_bytes, payload, hashlib.sha256).hexdigest()
+
     @staticmethod
     def generate_audit_report(start_date, end_date, format='json'):
         """Generate HIPAA audit report for specified date range"""
-        logs = AuditLog.query.filter(
+        if format == 'json':
+            audit_writer.flush(timeout=5)
+            report = AuditLogger.get_audit_summary(start_date, end_date)
+            report['events'] = list(AuditLogger.iter_audit_events(start_date, end_date))
+            return report
+
+        if format in AUDIT_REPORT_FORMATS:
+            return AuditLogger.stream_audit_report(start_date, end_date, format)
+
+        # Additional formats (PDF) can be added here
+        audit_writer.flush(timeout=5)
+        return AuditLog.query.filter(
             AuditLog.timestamp >= start_date,
             AuditLog.timestamp <= end_date
         ).order_by(AuditLog.timestamp.desc()).all()
 
-        if format == 'json':
-            return {
-                'report_generated': datetime.utcnow().isoformat(),
-                'period_start': start_date.isoformat(),
-                'period_end': end_date.isoformat(),
-                'total_events': len(logs),
-                'phi_access_events': sum(1 for log in logs if log.phi_accessed),
-                'security_events': sum(1 for log in logs if log.event_category == 'SECURITY'),
-                'failed_events': sum(1 for log in logs if not log.success),
-                'events': [log.to_dict() for log in logs]
-            }
-
-        # Additional formats (CSV, PDF) can be added here
-        return logs
-
 # Initialize audit logger instance
 audit_logger = AuditLogger()
\ No newline at end of file
@@ -0,0 +1,380 @@
+"""
+Durable Asynchronous Audit Writer
+=================================
+Write-ahead pipeline for HIPAA audit events. The request path only appends a
+JSON line to a local segment file; a background thread batches the lines into
+AuditLog on its own database connection. Progress is checkpointed in the same
+transaction as the inserts, so events survive crashes and are stored once.
+"""
+import os
+import json
+import time
+import fcntl
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError, DataError
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'audit-'
+SEGMENT_SUFFIX = '.wal'
+
+
+class _Segment:
+    """An owned WAL segment: open append handle plus an exclusive flock"""
+
+    def __init__(self, path, handle):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.handle = handle
+        self.offset = 0  # Bytes already persisted to the database
+        self.sealed = False
+
+
+class AuditWriter:
+    """Appends audit rows to a local WAL and persists them in background batches"""
+
+    def __init__(self, wal_dir=None, batch_size=500, flush_interval=1.0,
+                 segment_max_bytes=16 * 1024 * 1024, fsync=None):
+        self.wal_dir = wal_dir or os.environ.get('AUDIT_WAL_DIR')
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+        if fsync is None:
+            fsync = os.environ.get('AUDIT_WAL_FSYNC', '1') != '0'
+        self.fsync = fsync
+
+        self._app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._persisted = threading.Condition(threading.Lock())
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._segments = []
+        self._seq = 0
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._appended = 0
+        self._persisted_count = 0
+        self._recovered_count = 0
+        self._pending_times = deque()
+        self._last_batch_lag = 0.0
+        self._max_batch_lag = 0.0
+        self._last_persist_at = None
+
+    # ------------------------------------------------------------------
+    # Hot path
+    # ------------------------------------------------------------------
+
+    def append(self, row, app=None):
+        """
+        Durably append one audit row (a dict of AuditLog columns).
+
+        Returns once the line is in the WAL (fsynced unless disabled); the
+        database insert happens later on the writer thread.
+        """
+        event_time = row.get('timestamp') or datetime.utcnow()
+        record = dict(row, timestamp=event_time.isoformat())
+        line = (json.dumps(record, default=str) + '\n').encode('utf-8')
+
+        with self._lock:
+            self._ensure_started(app)
+            segment = self._active_segment()
+            segment.handle.write(line)
+            segment.handle.flush()
+            if self.fsync:
+                os.fsync(segment.handle.fileno())
+            self._appended += 1
+            self._pending_times.append(event_time)
+            if segment.handle.tell() >= self.segment_max_bytes:
+                segment.sealed = True
+
+        if self._appended - self._persisted_count >= self.batch_size:
+            self._wake.set()
+
+    def flush(self, timeout=10.0):
+        """Block until everything appended by this process is persisted"""
+        if self._thread is None:
+            return True
+        target = self._appended
+        deadline = time.monotonic() + timeout
+        self._wake.set()
+        with self._persisted:
+            while self._persisted_count < target:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._persisted.wait(remaining)
+        return True
+
+    def metrics(self):
+        """Lag between event time and persistence, plus queue depth"""
+        now = datetime.utcnow()
+        oldest = self._pending_times[0] if self._pending_times else None
+        return {
+            'pending_events': self._appended - self._persisted_count,
+            'lag_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+            'last_batch_lag_seconds': round(self._last_batch_lag, 3),
+            'max_batch_lag_seconds': round(self._max_batch_lag, 3),
+            'persisted_total': self._persisted_count,
+            'recovered_total': self._recovered_count,
+            'wal_segments': len(self._segments),
+            'last_persist_at': self._last_persist_at.isoformat() if self._last_persist_at else None,
+            'running': bool(self._thread and self._thread.is_alive())
+        }
+
+    def stop(self, timeout=10.0):
+        """Drain outstanding events and stop the writer thread"""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    # ------------------------------------------------------------------
+    # Segment management
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self, app):
+        """Start (or restart after fork) the writer thread for this process"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        if app is None:
+            from flask import current_app
+            app = current_app._get_current_object()
+
+        # After a fork the parent's segments and thread belong to the parent
+        self._app = app
+        self._pid = os.getpid()
+        self._segments = []
+        self._reset_stats()
+        self._stop.clear()
+
+        if not self.wal_dir:
+            self.wal_dir = os.path.join(app.instance_path, 'audit_wal')
+        os.makedirs(self.wal_dir, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _active_segment(self):
+        if self._segments and not self._segments[-1].sealed:
+            return self._segments[-1]
+
+        self._seq += 1
+        name = f"{SEGMENT_PREFIX}{self._pid}-{int(time.time() * 1000)}-{self._seq:06d}{SEGMENT_SUFFIX}"
+        final_path = os.path.join(self.wal_dir, name)
+        temp_path = os.path.join(self.wal_dir, '.' + name + '.tmp')
+
+        # Lock before the file becomes visible so recovery never claims a live segment
+        handle = open(temp_path, 'ab')
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        os.rename(temp_path, final_path)
+
+        segment = _Segment(final_path, handle)
+        self._segments.append(segment)
+        return segment
+
+    # ------------------------------------------------------------------
+    # Background writer
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        last_recovery = None
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+
+            try:
+                with self._app.app_context():
+                    if last_recovery is None or time.monotonic() - last_recovery > 60:
+                        self._recover_orphans()
+                        last_recovery = time.monotonic()
+                    self._drain_owned()
+            except Exception as e:
+                logger.error(f"AUDIT_WRITER_FAILED: {e}")
+                if not stopping:
+                    time.sleep(min(self.flush_interval * 5, 30))
+
+            if stopping:
+                break
+
+    def _drain_owned(self):
+        with self._lock:
+            segments = list(self._segments)
+            if segments and not segments[-1].sealed and self._stop.is_set():
+                segments[-1].sealed = True
+
+        for segment in segments:
+            persisted = self._drain_file(segment.path, segment.name, segment.offset)
+            segment.offset = persisted['offset']
+            self._mark_persisted(persisted['times'])
+
+            with self._lock:
+                finished = segment.sealed and segment.offset >= os.path.getsize(segment.path)
+                if finished:
+                    self._segments.remove(segment)
+            if finished:
+                self._retire(segment.path, segment.name, segment.handle)
+
+    def _recover_orphans(self):
+        """Persist segments left behind by processes that crashed or exited"""
+        owned = {segment.name for segment in self._segments}
+        for name in sorted(os.listdir(self.wal_dir)):
+            if not (name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)) or name in owned:
+                continue
+            path = os.path.join(self.wal_dir, name)
+            try:
+                handle = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()  # Still owned by a live process
+                continue
+
+            if not os.path.exists(path):
+                handle.close()  # Retired while we were waiting for the lock
+                continue
+
+            offset = self._checkpoint_offset(name)
+            persisted = self._drain_file(path, name, offset, sealed=True)
+            self._recovered_count += persisted['count']
+            logger.info(f"Recovered {persisted['count']} audit events from {name}")
+            self._retire(path, name, handle)
+
+    def _drain_file(self, path, name, offset, sealed=False):
+        """Insert complete lines after offset in batches; returns new offset and event times"""
+        from models.audit_log import AuditLog
+        table = AuditLog.__table__
+
+        times = []
+        count = 0
+        with open(path, 'rb') as reader:
+            reader.seek(offset)
+            while True:
+                records = self._read_batch(reader, sealed)
+                if not records:
+                    break
+
+                rows = [row for row, _ in records if row is not None]
+                try:
+                    with self._engine().begin() as conn:
+                        if rows:
+                            conn.execute(insert(table), rows)
+                        self._save_checkpoint(conn, name, records[-1][1])
+                except (IntegrityError, DataError):
+                    # Isolate the rows the database refuses so they cannot block the pipeline
+                    for row, end_offset in records:
+                        with self._engine().begin() as conn:
+                            if row is not None:
+                                try:
+                                    with conn.begin_nested():
+                                        conn.execute(insert(table), [row])
+                                except (IntegrityError, DataError) as e:
+                                    self._dead_letter(row, e)
+                            self._save_checkpoint(conn, name, end_offset)
+
+                offset = records[-1][1]
+                count += len(rows)
+                times.extend(row['timestamp'] if row else datetime.utcnow() for row, _ in records)
+
+        return {'offset': offset, 'count': count, 'times': times}
+
+    def _read_batch(self, reader, sealed):
+        """
+        Read up to batch_size complete lines as (row, end_offset) pairs.
+
+        Unreadable lines yield a None row so their offset is still consumed. A
+        torn tail line is left for later in live segments and dropped in sealed ones.
+        """
+        records = []
+        while len(records) < self.batch_size:
+            start = reader.tell()
+            line = reader.readline()
+            if not line:
+                break
+            if not line.endswith(b'\n'):
+                if sealed:
+                    logger.error(f"AUDIT_WAL_TRUNCATED: dropping partial record ({len(line)} bytes)")
+                    records.append((None, reader.tell()))
+                else:
+                    reader.seek(start)
+                break
+            try:
+                record = json.loads(line)
+                record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+            except (ValueError, KeyError) as e:
+                logger.error(f"AUDIT_WAL_CORRUPT: skipping unreadable record: {e}")
+                record = None
+            records.append((record, reader.tell()))
+        return records
+
+    def _dead_letter(self, row, error):
+        """Keep rejected events on disk next to the WAL for manual review"""
+        logger.error(f"AUDIT_LOG_REJECTED: {error} - Event: {row.get('event_type')} - {row.get('description')}")
+        with open(os.path.join(self.wal_dir, 'rejected.jsonl'), 'a') as handle:
+            handle.write(json.dumps(dict(row, error=str(error)), default=str) + '\n')
+
+    def _mark_persisted(self, event_times):
+        if not event_times:
+            return
+        now = datetime.utcnow()
+        lag = max((now - t).total_seconds() for t in event_times)
+        with self._persisted:
+            for _ in event_times:
+                if self._pending_times:
+                    self._pending_times.popleft()
+            self._persisted_count += len(event_times)
+            self._last_batch_lag = lag
+            self._max_batch_lag = max(self._max_batch_lag, lag)
+            self._last_persist_at = now
+            self._persisted.notify_all()
+
+    def _retire(self, path, name, handle):
+        """Remove a fully persisted segment, then its checkpoint"""
+        try:
+            os.unlink(path)
+        finally:
+            handle.close()
+        from models.audit_log import AuditWalCheckpoint
+        with self._engine().begin() as conn:
+            conn.execute(delete(AuditWalCheckpoint.__table__).where(
+                AuditWalCheckpoint.__table__.c.segment == name
+            ))
+
+    def _engine(self):
+        from models.database import db
+        return db.engine
+
+    def _checkpoint_offset(self, name):
+        from models.audit_log import AuditWalCheckpoint
+        table = AuditWalCheckpoint.__table__
+        with self._engine().connect() as conn:
+            offset = conn.execute(select(table.c.offset).where(table.c.segment == name)).scalar()
+        return offset or 0
+
+    def _save_checkpoint(self, conn, name, offset):
+        from models.audit_log import AuditWalCheckpoint
+        table = AuditWalCheckpoint.__table__
+        result = conn.execute(
+            update(table).where(table.c.segment == name).values(offset=offset, updated_at=datetime.utcnow())
+        )
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(segment=name, offset=offset, updated_at=datetime.utcnow()))
+
+
+# Global writer instance shared by AuditLogger
+audit_writer = AuditWriter()
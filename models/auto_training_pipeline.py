@@ -5,23 +5,55 @@ Continuously improves models based on multi-model responses and outcomes
 
 import os
 import json
+import hashlib
 import logging
 import asyncio
+import multiprocessing
+import time
 import schedule
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.ensemble import RandomForestClassifier, VotingClassifier
-from sklearn.neural_network import MLPClassifier
+from sklearn.model_selection import cross_val_score
 from sklearn.metrics import classification_report, roc_auc_score
 import joblib
 import sqlite3
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from models.crisis_features import consensus_features, dataset_hash, feature_cache
+from models.incremental_models import IncrementalCrisisEnsemble
 
 logger = logging.getLogger(__name__)
 
+# Share of inputs held out from training to validate crisis models
+CRISIS_HOLDOUT_PERCENT = 20
+
+
+def crisis_holdout(input_hashes: pd.Series) -> pd.Series:
+    """Mask of inputs reserved for validating crisis models
+
+    Chosen by hashing input_hash, so an input stays in (or out of) the
+    holdout across full rebuilds and incremental updates.
+    """
+    return input_hashes.map(
+        lambda value: int(hashlib.sha256(str(value).encode()).hexdigest()[:8], 16) % 100 < CRISIS_HOLDOUT_PERCENT
+    ).astype(bool)
+
+
+def _run_training_process(analytics_db: str, model_dir: str, model_type: str, mode: str,
+                          cycle_id: str) -> Dict[str, Any]:
+    """Worker-process entry point for one model type's training"""
+    pipeline = AutoTrainingPipeline(analytics_db=analytics_db)
+    pipeline.model_dir = model_dir
+    result = pipeline.run_training(model_type, mode, cycle_id)
+    result['remote'] = True
+    return result
+
+
 class AutoTrainingPipeline:
     """
     Automated pipeline for training custom models from multi-model responses
@@ -43,6 +75,13 @@ class AutoTrainingPipeline:
             'general': 500     # Minimum for general models
         }
 
+        # Incremental training: rows after the watermark are applied as updates,
+        # with a full rebuild at least this often
+        self.full_rebuild_interval = timedelta(days=int(os.environ.get('TRAINING_FULL_REBUILD_DAYS', 7)))
+        self.min_incremental_samples = {'crisis': 10, 'emotion': 1, 'therapy': 1}
+        self.max_workers = int(os.environ.get('TRAINING_PARALLEL_PROCESSES', 3))
+        self.model_dir = 'models'
+
         # Model registry
         self.active_models = {}
         self.model_performance = defaultdict(list)
@@ -93,23 +132,14 @@ class AutoTrainingPipeline:
         logger.info(f"Recent samples: {recent_samples}, Unlabeled: {unlabeled_samples}")
 
         # Decide what to train
-        training_tasks = []
-
-        if recent_samples >= self.min_samples['crisis']:
-            training_tasks.append(('crisis', self.train_crisis_model))
-
-        if recent_samples >= self.min_samples['emotion']:
-            training_tasks.append(('emotion', self.train_emotion_model))
-
-        if recent_samples >= self.min_samples['therapy']:
-            training_tasks.append(('therapy', self.train_therapy_enhancer))
-
-        # Execute training tasks
-        for model_type, training_func in training_tasks:
-            await self.training_queue.put((model_type, training_func))
+        model_types = [
+            model_type for model_type in ('crisis', 'emotion', 'therapy')
+            if recent_samples >= self.min_samples[model_type]
+        ]
 
-        # Process training queue
-        await self.process_training_queue()
+        # Independent models train in parallel processes
+        if model_types:
+            await self.run_training_cycle(model_types)
 
     async def process_training_queue(self):
         """Process queued training tasks"""
@@ -137,206 +167,445 @@ class AutoTrainingPipeline:
         finally:
             self.is_training = False
 
-    async def train_crisis_model(self) -> bool:
-        """Train or update crisis detection model"""
+    # ------------------------------------------------------------------
+    # Incremental training
+    # ------------------------------------------------------------------
+
+    def _ensure_incremental_tables(self, conn: sqlite3.Connection):
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS training_watermarks (
+                model_type TEXT PRIMARY KEY,
+                watermark TEXT,
+                model_path TEXT,
+                last_full_rebuild TEXT,
+                last_full_seconds REAL,
+                last_full_rows INTEGER,
+                needs_full INTEGER DEFAULT 0
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS training_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cycle_id TEXT,
+                model_type TEXT,
+                mode TEXT,
+                success INTEGER,
+                rows INTEGER,
+                duration_seconds REAL,
+                estimated_full_seconds REAL,
+                time_saved_seconds REAL,
+                created_at TEXT
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS training_cycles (
+                cycle_id TEXT PRIMARY KEY,
+                model_types TEXT,
+                started_at TEXT,
+                wall_seconds REAL,
+                model_seconds REAL,
+                estimated_full_seconds REAL,
+                time_saved_seconds REAL
+            )
+        """)
 
-        logger.info("Starting crisis model training...")
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.analytics_db, timeout=30)
+        conn.row_factory = sqlite3.Row
+        self._ensure_incremental_tables(conn)
+        return conn
 
+    def get_watermark(self, model_type: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
         try:
-            # Load training data
-            conn = sqlite3.connect(self.analytics_db)
-
-            # Get crisis-related responses
-            df = pd.read_sql_query("""
-                SELECT
-                    mr.input_hash,
-                    mr.model_name,
-                    mr.confidence,
-                    mr.crisis_detected,
-                    mr.risk_level,
-                    td.ground_truth
-                FROM model_responses mr
-                LEFT JOIN training_data td ON mr.session_id = td.input_text
-                WHERE mr.crisis_detected IS NOT NULL
-                AND mr.timestamp > datetime('now', '-30 days')
-            """, conn)
-
+            row = conn.execute("SELECT * FROM training_watermarks WHERE model_type = ?", (model_type,)).fetchone()
+            return dict(row) if row else None
+        finally:
             conn.close()
 
-            if len(df) < self.min_samples['crisis']:
-                logger.warning(f"Insufficient crisis samples: {len(df)}")
-                return False
-
-            # Prepare features
-            X, y = self._prepare_crisis_features(df)
+    def _choose_mode(self, model_type: str, mode: str, state: Optional[Dict[str, Any]]) -> str:
+        """Incremental unless there is no base model or a full rebuild is due"""
+        if mode != 'auto':
+            return mode
+        if not state or not state.get('watermark') or state.get('needs_full'):
+            return 'full'
+        if model_type == 'crisis' and not (state.get('model_path') and os.path.exists(state['model_path'])):
+            return 'full'
+        last_full = state.get('last_full_rebuild')
+        if not last_full or datetime.now() - datetime.fromisoformat(last_full) >= self.full_rebuild_interval:
+            return 'full'
+        return 'incremental'
+
+    def run_training(self, model_type: str, mode: str = 'auto', cycle_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Train one model type and record the run.
+
+        mode is 'full', 'incremental' or 'auto'. Incremental runs read only
+        rows newer than the model's watermark; 'auto' falls back to a full
+        rebuild when there is no base model, the last full rebuild is older
+        than full_rebuild_interval, or an update failed validation.
+        """
+        trainers = {
+            'crisis': self._train_crisis,
+            'emotion': self._train_emotion,
+            'therapy': self._train_therapy
+        }
+        state = self.get_watermark(model_type)
+        chosen = self._choose_mode(model_type, mode, state)
+
+        started = time.perf_counter()
+        result = self._attempt_training(trainers[model_type], model_type, chosen, state)
+        if result.pop('fallback_full', False):
+            logger.info(f"{model_type} incremental update rejected, rebuilding from full history")
+            chosen = 'full'
+            result = self._attempt_training(trainers[model_type], model_type, chosen, state)
+        duration = time.perf_counter() - started
+
+        result.update({'model_type': model_type, 'mode': chosen, 'duration_seconds': duration,
+                       'cycle_id': cycle_id})
+        self._record_run(result, state)
+        return result
+
+    @staticmethod
+    def _attempt_training(trainer, model_type: str, mode: str, state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run one trainer; errors become a failed result so the run is still recorded"""
+        try:
+            return trainer(mode, state)
+        except Exception as e:
+            logger.error(f"{model_type} model training error ({mode}): {e}")
+            return {'success': False, 'rows': 0, 'error': str(e)}
+
+    def _record_run(self, result: Dict[str, Any], state: Optional[Dict[str, Any]]):
+        """Advance the watermark and estimate what a full rebuild would have cost"""
+        model_type, duration = result['model_type'], result['duration_seconds']
+        estimated_full = duration
+        if result['mode'] == 'incremental' and state and state.get('last_full_seconds'):
+            # Full rebuild cost grows linearly with the history it reads
+            growth = result.get('history_rows', 0) / max(state.get('last_full_rows') or 1, 1)
+            estimated_full = state['last_full_seconds'] * max(growth, 1.0)
+        result['estimated_full_seconds'] = estimated_full
+        result['time_saved_seconds'] = max(estimated_full - duration, 0.0)
+
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT INTO training_runs
+                (cycle_id, model_type, mode, success, rows, duration_seconds,
+                 estimated_full_seconds, time_saved_seconds, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (result.get('cycle_id'), model_type, result['mode'], int(bool(result['success'])),
+                  result.get('rows', 0), duration, estimated_full, result['time_saved_seconds'],
+                  datetime.now().isoformat()))
+
+            if result['success'] and result.get('watermark'):
+                values = {
+                    'watermark': result['watermark'],
+                    'model_path': result.get('state_path') or (state or {}).get('model_path'),
+                    'needs_full': 0
+                }
+                if result['mode'] == 'full':
+                    values.update(last_full_rebuild=datetime.now().isoformat(),
+                                  last_full_seconds=duration, last_full_rows=result.get('rows', 0))
+                else:
+                    values.update({key: (state or {}).get(key) for key in
+                                   ('last_full_rebuild', 'last_full_seconds', 'last_full_rows')})
+                    values['needs_full'] = int(bool(result.get('needs_full')))
+                conn.execute("""
+                    INSERT OR REPLACE INTO training_watermarks
+                    (model_type, watermark, model_path, last_full_rebuild,
+                     last_full_seconds, last_full_rows, needs_full)
+                    VALUES (:model_type, :watermark, :model_path, :last_full_rebuild,
+                            :last_full_seconds, :last_full_rows, :needs_full)
+                """, {'model_type': model_type, **values})
+            elif not result['success'] and state:
+                conn.execute("UPDATE training_watermarks SET needs_full = 1 WHERE model_type = ?", (model_type,))
+            conn.commit()
+        finally:
+            conn.close()
 
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y
-            )
 
-            # Train ensemble model
-            models = [
-                ('rf', RandomForestClassifier(
-                    n_estimators=100,
-                    max_depth=10,
-                    class_weight='balanced',
-                    random_state=42
-                )),
-                ('nn', MLPClassifier(
-                    hidden_layer_sizes=(50, 25),
-                    activation='relu',
-                    max_iter=500,
-                    random_state=42
-                ))
-            ]
-
-            ensemble = VotingClassifier(
-                estimators=models,
-                voting='soft'
-            )
+    async def run_training_cycle(self, model_types: List[str], mode: str = 'auto') -> Dict[str, Any]:
+        """Train independent model types in parallel worker processes"""
 
-            # Train
-            ensemble.fit(X_train, y_train)
+        if self.is_training:
+            logger.info("Training already in progress, skipping")
+            return {}
+        self.is_training = True
 
-            # Evaluate
-            y_pred = ensemble.predict(X_test)
-            y_pred_proba = ensemble.predict_proba(X_test)[:, 1]
+        cycle_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
+        started = time.perf_counter()
+        started_at = datetime.now()
+        try:
+            results = await self._run_parallel(model_types, mode, cycle_id)
+        finally:
+            self.is_training = False
+        wall = time.perf_counter() - started
+
+        # Models registered in worker processes still need to be active here
+        for result in results:
+            if result.get('remote') and result.get('success') and result.get('registered_path'):
+                self._remember_model(result['model_type'], result['registered_path'], result.get('metrics', {}))
+
+        model_seconds = sum(r.get('duration_seconds', 0) for r in results)
+        estimated_full = sum(r.get('estimated_full_seconds', 0) for r in results)
+        cycle = {
+            'cycle_id': cycle_id,
+            'model_types': model_types,
+            'started_at': started_at.isoformat(),
+            'wall_seconds': wall,
+            'model_seconds': model_seconds,
+            'estimated_full_seconds': estimated_full,
+            # Versus training every model from scratch, one after another
+            'time_saved_seconds': max(estimated_full - wall, 0.0),
+            'results': results
+        }
 
-            # Calculate metrics
-            report = classification_report(y_test, y_pred, output_dict=True)
-            auc_score = roc_auc_score(y_test, y_pred_proba)
+        conn = self._connect()
+        try:
+            conn.execute("""
+                INSERT OR REPLACE INTO training_cycles
+                (cycle_id, model_types, started_at, wall_seconds, model_seconds,
+                 estimated_full_seconds, time_saved_seconds)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (cycle_id, json.dumps(model_types), cycle['started_at'], wall, model_seconds,
+                  estimated_full, cycle['time_saved_seconds']))
+            conn.commit()
+        finally:
+            conn.close()
 
-            logger.info(f"Crisis model - Accuracy: {report['accuracy']:.3f}, "
-                       f"Recall: {report['1']['recall']:.3f}, "
-                       f"AUC: {auc_score:.3f}")
+        self.last_training = started_at
+        logger.info(f"Training cycle {cycle_id}: {sum(1 for r in results if r.get('success'))}/"
+                    f"{len(results)} successful in {wall:.1f}s, saved {cycle['time_saved_seconds']:.1f}s")
+        return cycle
+
+    async def _run_parallel(self, model_types: List[str], mode: str, cycle_id: str) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        workers = min(len(model_types), self.max_workers)
+        if workers > 1:
+            try:
+                # spawn: sklearn/OpenMP state and sqlite handles must not be forked
+                with ProcessPoolExecutor(max_workers=workers,
+                                         mp_context=multiprocessing.get_context('spawn')) as pool:
+                    results = await asyncio.gather(*[
+                        loop.run_in_executor(pool, _run_training_process, self.analytics_db, self.model_dir,
+                                             model_type, mode, cycle_id)
+                        for model_type in model_types
+                    ], return_exceptions=True)
+                return [
+                    {'model_type': model_type, 'success': False, 'error': str(result)}
+                    if isinstance(result, BaseException) else result
+                    for model_type, result in zip(model_types, results)
+                ]
+            except (OSError, BrokenProcessPool) as e:
+                logger.warning(f"Process pool unavailable, training sequentially: {e}")
+
+        return [self.run_training(model_type, mode, cycle_id) for model_type in model_types]
+
+    # ------------------------------------------------------------------
+    # Crisis model
+    # ------------------------------------------------------------------
+
+    async def train_crisis_model(self, mode: str = 'auto') -> bool:
+        """Train or update crisis detection model"""
+        logger.info("Starting crisis model training...")
+        return self.run_training('crisis', mode)['success']
 
-            # Save if performance is good
-            if report['1']['recall'] >= 0.8:  # High recall is critical for crisis
-                model_path = f"models/crisis_ensemble_{datetime.now().strftime('%Y%m%d_%H%M%S')}.joblib"
-                joblib.dump(ensemble, model_path)
+    def _crisis_query(self, since: Optional[str]) -> Tuple[str, tuple]:
+        query = """
+            SELECT
+                mr.input_hash,
+                mr.model_name,
+                mr.confidence,
+                mr.crisis_detected,
+                mr.risk_level,
+                mr.timestamp,
+                td.ground_truth
+            FROM model_responses mr
+            LEFT JOIN training_data td ON mr.session_id = td.input_text
+            WHERE mr.crisis_detected IS NOT NULL
+        """
+        if since is None:
+            return query + " AND mr.timestamp > datetime('now', '-30 days')", ()
+        # Whole groups for every input that received a response after the watermark
+        return query + """
+            AND mr.input_hash IN (
+                SELECT input_hash FROM model_responses WHERE timestamp > ?
+            )
+        """, (since,)
 
-                # Update registry
-                self._register_model('crisis', model_path, report)
+    def _crisis_history_rows(self, conn) -> int:
+        return conn.execute("""
+            SELECT COUNT(*) FROM model_responses
+            WHERE crisis_detected IS NOT NULL
+            AND timestamp > datetime('now', '-30 days')
+        """).fetchone()[0]
 
-                logger.info(f"Crisis model saved: {model_path}")
-                return True
+    def _train_crisis(self, mode: str, state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        incremental = mode == 'incremental'
+        conn = sqlite3.connect(self.analytics_db, timeout=30)
+        try:
+            query, params = self._crisis_query(state['watermark'] if incremental else None)
+            df = pd.read_sql_query(query, conn, params=params)
+            if incremental:
+                # Updates are judged on the held-out inputs of recent history, not a slice of the delta
+                recent_query, recent_params = self._crisis_query(None)
+                recent = pd.read_sql_query(recent_query, conn, params=recent_params)
+                history_rows = self._crisis_history_rows(conn)
             else:
-                logger.warning("Crisis model performance below threshold")
-                return False
+                recent = df
+                history_rows = len(df)
+        finally:
+            conn.close()
 
-        except Exception as e:
-            logger.error(f"Crisis model training error: {e}")
-            return False
+        # Samples are inputs (one per input_hash), not response rows
+        X_train, y_train = self._prepare_crisis_features(
+            df[~crisis_holdout(df['input_hash'])].drop(columns=['timestamp'])
+        )
+        X_test, y_test = self._prepare_crisis_features(
+            recent[crisis_holdout(recent['input_hash'])].drop(columns=['timestamp'])
+        )
+
+        samples = len(X_train) if incremental else len(X_train) + len(X_test)
+        minimum = self.min_incremental_samples['crisis'] if incremental else self.min_samples['crisis']
+        if samples < minimum or not len(X_test):
+            if incremental:
+                # Nothing new worth an update; keep the current model and watermark
+                return {'success': True, 'rows': len(df), 'history_rows': history_rows, 'skipped': True}
+            logger.warning(f"Insufficient crisis samples: {samples} inputs, {len(X_test)} held out")
+            return {'success': False, 'rows': len(df)}
+
+        watermark = df['timestamp'].max()
+        if incremental:
+            model = joblib.load(state['model_path'])
+            model.partial_fit(X_train, y_train)
+        else:
+            model = IncrementalCrisisEnsemble().fit(X_train, y_train)
+
+        # Evaluate
+        y_pred = model.predict(X_test)
+        report = classification_report(y_test, y_pred, output_dict=True, zero_division=0)
+        recall = report.get('1', {}).get('recall', 0.0)
+        if len(np.unique(y_test)) > 1:
+            auc_score = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+            logger.info(f"Crisis model ({mode}) - Accuracy: {report['accuracy']:.3f}, "
+                        f"Recall: {recall:.3f}, AUC: {auc_score:.3f}")
+
+        # High recall is critical for crisis; a rejected update triggers a full rebuild
+        if '1' in report and recall < 0.8:
+            if incremental:
+                return {'success': False, 'rows': len(df), 'fallback_full': True}
+            logger.warning("Crisis model performance below threshold")
+            return {'success': False, 'rows': len(df)}
+
+        model_path = f"{self.model_dir}/crisis_ensemble_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.joblib"
+        joblib.dump(model, model_path)
+        self._register_model('crisis', model_path, report)
+        logger.info(f"Crisis model saved: {model_path}")
 
-    def _prepare_crisis_features(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
-        """Prepare features for crisis model"""
-
-        # Aggregate by input_hash
-        feature_list = []
-        label_list = []
-
-        for input_hash, group in df.groupby('input_hash'):
-            features = []
-
-            # Model consensus features
-            features.append(group['crisis_detected'].mean())  # Crisis consensus
-            features.append(group['confidence'].mean())        # Avg confidence
-            features.append(group['confidence'].std())         # Confidence variance
-            features.append(len(group))                        # Number of models
-
-            # Risk level features
-            risk_map = {'critical': 5, 'high': 4, 'medium': 3, 'low': 2, 'minimal': 1}
-            risk_scores = [risk_map.get(r, 3) for r in group['risk_level'].dropna()]
-            features.append(np.mean(risk_scores) if risk_scores else 3)
-            features.append(np.max(risk_scores) if risk_scores else 3)
-
-            # Model diversity
-            unique_models = group['model_name'].nunique()
-            features.append(unique_models)
-
-            # Ground truth or majority vote
-            if pd.notna(group['ground_truth'].iloc[0]):
-                label = int(group['ground_truth'].iloc[0] == 'crisis')
-            else:
-                label = int(group['crisis_detected'].mean() > 0.5)
+        return {
+            'success': True,
+            'rows': len(df),
+            'history_rows': history_rows,
+            'watermark': watermark,
+            'state_path': model_path,
+            'registered_path': model_path,
+            'metrics': report,
+            'needs_full': model.needs_rebuild
+        }
 
-            feature_list.append(features)
-            label_list.append(label)
+    def _prepare_crisis_features(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """Prepare features for crisis model (cached by dataset hash)"""
+        return feature_cache.get_or_compute(
+            dataset_hash('crisis_consensus', df),
+            lambda: consensus_features(df)
+        )
 
-        return np.array(feature_list), np.array(label_list)
+    # ------------------------------------------------------------------
+    # Emotion and therapy models
+    # ------------------------------------------------------------------
 
-    async def train_emotion_model(self) -> bool:
+    async def train_emotion_model(self, mode: str = 'auto') -> bool:
         """Train emotion classification model"""
-
         logger.info("Starting emotion model training...")
+        return self.run_training('emotion', mode)['success']
 
+    def _train_emotion(self, mode: str, state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         # Simplified version - would be more complex in production
+        incremental = mode == 'incremental'
+        conn = sqlite3.connect(self.analytics_db, timeout=30)
         try:
-            # Load emotion-tagged data
-            conn = sqlite3.connect(self.analytics_db)
-
             # This would load actual emotion labels
             # For now, using placeholder logic
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT COUNT(*) FROM model_responses
-                WHERE timestamp > datetime('now', '-7 days')
-            """)
-            count = cursor.fetchone()[0]
+            if incremental:
+                count, watermark = conn.execute("""
+                    SELECT COUNT(*), MAX(timestamp) FROM model_responses WHERE timestamp > ?
+                """, (state['watermark'],)).fetchone()
+            else:
+                count, watermark = conn.execute("""
+                    SELECT COUNT(*), MAX(timestamp) FROM model_responses
+                    WHERE timestamp > datetime('now', '-7 days')
+                """).fetchone()
+            history_rows = conn.execute("""
+                SELECT COUNT(*) FROM model_responses WHERE timestamp > datetime('now', '-7 days')
+            """).fetchone()[0]
+        finally:
             conn.close()
 
-            if count < self.min_samples['emotion']:
-                return False
+        if incremental and count < self.min_incremental_samples['emotion']:
+            return {'success': True, 'rows': count, 'history_rows': history_rows, 'skipped': True}
+        if not incremental and count < self.min_samples['emotion']:
+            return {'success': False, 'rows': count}
 
-            # Train emotion classifier
-            # (Placeholder - would use actual emotion data)
-            logger.info("Emotion model training completed (simulated)")
-            return True
-
-        except Exception as e:
-            logger.error(f"Emotion model training error: {e}")
-            return False
+        # Train emotion classifier
+        # (Placeholder - would use actual emotion data)
+        logger.info(f"Emotion model training completed (simulated, {mode})")
+        return {'success': True, 'rows': count, 'history_rows': history_rows, 'watermark': watermark}
 
-    async def train_therapy_enhancer(self) -> bool:
+    async def train_therapy_enhancer(self, mode: str = 'auto') -> bool:
         """Train model to enhance therapy responses"""
-
         logger.info("Starting therapy enhancer training...")
-
+        return self.run_training('therapy', mode)['success']
+
+    def _train_therapy(self, mode: str, state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # This would train a model to:
+        # 1. Learn from high-rated therapy responses
+        # 2. Identify effective therapeutic techniques
+        # 3. Enhance future responses
+        incremental = mode == 'incremental'
+        query = """
+            SELECT
+                response,
+                confidence,
+                user_feedback,
+                clinical_validation,
+                timestamp
+            FROM model_responses
+            WHERE model_name LIKE '%therapy%'
+            AND user_feedback IS NOT NULL
+        """
+        conn = sqlite3.connect(self.analytics_db, timeout=30)
         try:
-            # This would train a model to:
-            # 1. Learn from high-rated therapy responses
-            # 2. Identify effective therapeutic techniques
-            # 3. Enhance future responses
-
-            conn = sqlite3.connect(self.analytics_db)
-
             # Get therapy responses with feedback
-            df = pd.read_sql_query("""
-                SELECT
-                    response,
-                    confidence,
-                    user_feedback,
-                    clinical_validation
-                FROM model_responses
-                WHERE model_name LIKE '%therapy%'
-                AND user_feedback IS NOT NULL
-                AND timestamp > datetime('now', '-30 days')
-            """, conn)
-
+            if incremental:
+                df = pd.read_sql_query(query + " AND timestamp > ?", conn, params=(state['watermark'],))
+            else:
+                df = pd.read_sql_query(query + " AND timestamp > datetime('now', '-30 days')", conn)
+            history_rows = conn.execute(
+                "SELECT COUNT(*) FROM (" + query + " AND timestamp > datetime('now', '-30 days'))"
+            ).fetchone()[0]
+        finally:
             conn.close()
 
-            if len(df) < self.min_samples['therapy']:
-                return False
+        if incremental and len(df) < self.min_incremental_samples['therapy']:
+            return {'success': True, 'rows': len(df), 'history_rows': history_rows, 'skipped': True}
+        if not incremental and len(df) < self.min_samples['therapy']:
+            return {'success': False, 'rows': len(df)}
 
-            # Train enhancer model
-            # (Simplified - would use NLP techniques in production)
-            logger.info("Therapy enhancer training completed")
-            return True
-
-        except Exception as e:
-            logger.error(f"Therapy enhancer training error: {e}")
-            return False
+        # Train enhancer model
+        # (Simplified - would use NLP techniques in production)
+        logger.info(f"Therapy enhancer training completed ({mode})")
+        return {'success': True, 'rows': len(df), 'history_rows': history_rows,
+                'watermark': df['timestamp'].max()}
 
     async def check_crisis_model_performance(self):
         """Monitor crisis model performance and trigger emergency training if needed"""
@@ -367,8 +636,8 @@ class AutoTrainingPipeline:
 
         logger.warning("EMERGENCY: Retraining crisis model due to performance issues")
 
-        # Prioritize crisis model training
-        await self.training_queue.put(('crisis_emergency', self.train_crisis_model))
+        # Prioritize crisis model training, rebuilt from the full history
+        await self.training_queue.put(('crisis_emergency', partial(self.train_crisis_model, 'full')))
 
         # Process immediately
         await self.process_training_queue()
@@ -381,26 +650,22 @@ class AutoTrainingPipeline:
 
         logger.info("Starting comprehensive model retraining...")
 
-        # Train all models
-        tasks = [
-            self.train_crisis_model(),
-            self.train_emotion_model(),
-            self.train_therapy_enhancer()
-        ]
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Train all models in parallel; each is incremental unless a full rebuild is due
+        cycle = await self.run_training_cycle(['crisis', 'emotion', 'therapy'])
+        results = cycle.get('results', [])
 
-        success_count = sum(1 for r in results if r is True)
-        logger.info(f"Comprehensive retraining complete: {success_count}/{len(tasks)} successful")
+        success_count = sum(1 for r in results if r.get('success'))
+        logger.info(f"Comprehensive retraining complete: {success_count}/{len(results)} successful")
 
     def _register_model(self, model_type: str, path: str, metrics: Dict[str, Any]):
         """Register a trained model"""
 
-        conn = sqlite3.connect(self.analytics_db)
+        conn = sqlite3.connect(self.analytics_db, timeout=30)
         cursor = conn.cursor()
 
+        # Incremental cycles re-register several versions a day; keep the latest
         cursor.execute("""
-            INSERT INTO custom_models
+            INSERT OR REPLACE INTO custom_models
             (model_name, model_type, training_samples, accuracy,
              precision, recall, f1_score, model_path, created_at)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -419,7 +684,10 @@ class AutoTrainingPipeline:
         conn.commit()
         conn.close()
 
-        # Update active models
+        self._remember_model(model_type, path, metrics)
+
+    def _remember_model(self, model_type: str, path: str, metrics: Dict[str, Any]):
+        """Update active models"""
         self.active_models[model_type] = path
         self.model_performance[model_type].append({
             'timestamp': datetime.now(),
@@ -443,7 +711,7 @@ class AutoTrainingPipeline:
         cursor.execute("""
             SELECT
                 COUNT(*) as total_samples,
-                SUM(CASE WHEN ground_truth IS NOT NULL THEN 1 ELSE 0 END) as labeled_samples,
+                COALESCE(SUM(CASE WHEN ground_truth IS NOT NULL THEN 1 ELSE 0 END), 0) as labeled_samples,
                 COUNT(DISTINCT input_text) as unique_sessions
             FROM training_data
         """)
@@ -464,16 +732,51 @@ class AutoTrainingPipeline:
                 'labeling_rate': training_stats[1] / max(training_stats[0], 1)
             },
             'performance_trends': self._calculate_performance_trends(),
+            'incremental_training': self._incremental_training_summary(),
             'next_training': (self.last_training + self.training_interval).isoformat()
         }
 
         # Save report
+        os.makedirs('reports', exist_ok=True)
         with open(f"reports/training_report_{datetime.now().strftime('%Y%m%d')}.json", 'w') as f:
             json.dump(report, f, indent=2, default=str)
 
         logger.info("Training report generated")
         return report
 
+    def _incremental_training_summary(self, cycles: int = 10) -> Dict[str, Any]:
+        """Per-cycle time saved by incremental updates and parallel training"""
+
+        conn = self._connect()
+        try:
+            recent = [dict(row) for row in conn.execute("""
+                SELECT * FROM training_cycles ORDER BY started_at DESC LIMIT ?
+            """, (cycles,))]
+            for cycle in recent:
+                cycle['model_types'] = json.loads(cycle['model_types'])
+                cycle['runs'] = [dict(row) for row in conn.execute("""
+                    SELECT model_type, mode, success, rows, duration_seconds,
+                           estimated_full_seconds, time_saved_seconds
+                    FROM training_runs WHERE cycle_id = ?
+                """, (cycle['cycle_id'],))]
+            total_saved = conn.execute(
+                "SELECT COALESCE(SUM(time_saved_seconds), 0) FROM training_cycles"
+            ).fetchone()[0]
+            watermarks = {row['model_type']: {
+                'watermark': row['watermark'],
+                'last_full_rebuild': row['last_full_rebuild'],
+                'needs_full': bool(row['needs_full'])
+            } for row in conn.execute("SELECT * FROM training_watermarks")}
+        finally:
+            conn.close()
+
+        return {
+            'recent_cycles': recent,
+            'total_time_saved_seconds': total_saved,
+            'watermarks': watermarks,
+            'full_rebuild_interval_days': self.full_rebuild_interval.days
+        }
+
     def _calculate_performance_trends(self) -> Dict[str, Any]:
         """Calculate model performance trends"""
 
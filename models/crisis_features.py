@@ -0,0 +1,301 @@
+"""
+Crisis Feature Extraction for MindMend
+======================================
+One definition of the text and model-consensus features used by the crisis
+models, shared by training (AutoTrainingPipeline, emergency retraining) and
+inference (UniversalCrisisPredictor, ModelTrainingAnalytics).
+
+- Batch extraction works on whole text columns with pandas string ops; the
+  keyword vocabulary is compiled once into a column table so every keyword
+  is scanned a single time per batch, whichever tiers it belongs to.
+- Single-text extraction uses the same compiled patterns and is memoized,
+  so the predictor and the analytics recorder extracting the same message
+  only pay once. Both paths return identical values.
+- FeatureCache stores extracted matrices on disk keyed by a hash of the
+  source data, so retraining on unchanged data skips extraction.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+# Bump when any feature definition changes so cached matrices are not reused
+FEATURE_VERSION = 1
+
+# Keywords counted by the custom crisis model
+MODEL_KEYWORDS = ['suicide', 'die', 'kill', 'hurt', 'pain', 'hopeless', 'worthless']
+
+# Keywords by urgency tier, with their weight in the urgency score
+TIER_KEYWORDS = {
+    'immediate': ['suicide', 'kill myself', 'end it all', 'can\'t go on',
+                  'want to die', 'no point', 'worthless', 'hopeless'],
+    'high': ['self harm', 'hurt myself', 'cutting', 'overdose',
+             'pills', 'jump', 'gun', 'rope'],
+    'medium': ['depressed', 'anxious', 'panic', 'scared', 'alone',
+               'nobody cares', 'burden', 'failure'],
+    'warning': ['tired', 'exhausted', 'giving up', 'done trying',
+                'goodbye', 'sorry', 'forgive me']
+}
+TIER_WEIGHTS = {'immediate': 10, 'high': 5, 'medium': 2, 'warning': 1}
+
+NEGATION_WORDS = ['not', 'no', 'never', 'nothing', 'nobody', 'nowhere']
+
+TEXT_FEATURES = [
+    'text_length', 'word_count', 'exclamation_marks', 'question_marks', 'all_caps_ratio',
+    'crisis_keyword_count', 'immediate_keywords', 'high_keywords', 'medium_keywords',
+    'warning_keywords', 'negation_count', 'urgency_score'
+]
+
+# Feature vector of the custom crisis model (order matters for saved models)
+MODEL_FEATURES = TEXT_FEATURES[:6] + ['session_count', 'days_since_last_crisis', 'user_age']
+CONTEXT_DEFAULTS = {'session_count': 0.0, 'days_since_last_crisis': 30.0, 'user_age': 25.0}
+
+RISK_SCORES = {'critical': 5, 'high': 4, 'medium': 3, 'low': 2, 'minimal': 1}
+CONSENSUS_FEATURES = [
+    'crisis_consensus', 'avg_confidence', 'confidence_std', 'model_count',
+    'avg_risk', 'max_risk', 'unique_models'
+]
+
+
+def _uppercase_class() -> str:
+    """Regex character class matching str.isupper() characters in the BMP"""
+    ranges, start, previous = [], None, None
+    for code in range(0x10000):
+        if chr(code).isupper():
+            if start is None:
+                start = code
+            previous = code
+        elif start is not None:
+            ranges.append(re.escape(chr(start)) if start == previous
+                          else f'{re.escape(chr(start))}-{re.escape(chr(previous))}')
+            start = None
+    return '[' + ''.join(ranges) + ']'
+
+
+_UPPER = _uppercase_class()
+_WORD = r'\S+'
+_NEGATION = r'(?<!\S)(' + '|'.join(NEGATION_WORDS) + r')(?!\S)'
+_NEGATION_RE = re.compile(_NEGATION)
+_UPPER_RE = re.compile(_UPPER)
+_WORD_RE = re.compile(_WORD)
+
+# Compiled keyword table: each distinct keyword once, with the tiers using it
+VOCABULARY = list(dict.fromkeys(MODEL_KEYWORDS + [kw for kws in TIER_KEYWORDS.values() for kw in kws]))
+_INDEX = {keyword: i for i, keyword in enumerate(VOCABULARY)}
+_MODEL_COLUMNS = np.array([_INDEX[kw] for kw in MODEL_KEYWORDS])
+_TIER_COLUMNS = {tier: np.array([_INDEX[kw] for kw in kws]) for tier, kws in TIER_KEYWORDS.items()}
+_TIER_ORDER = list(TIER_KEYWORDS)
+_TIER_WEIGHT_VECTOR = np.array([TIER_WEIGHTS[tier] for tier in _TIER_ORDER])
+
+
+# ----------------------------------------------------------------------
+# Text features
+# ----------------------------------------------------------------------
+
+@lru_cache(maxsize=4096)
+def text_features(text: str) -> Tuple:
+    """Feature row for one text, in TEXT_FEATURES order"""
+    text = text or ''
+    lower = text.lower()
+    present = np.fromiter((kw in lower for kw in VOCABULARY), dtype=bool, count=len(VOCABULARY))
+    tiers = [int(present[_TIER_COLUMNS[tier]].sum()) for tier in _TIER_ORDER]
+
+    return (
+        len(text),
+        len(_WORD_RE.findall(text)),
+        text.count('!'),
+        text.count('?'),
+        len(_UPPER_RE.findall(text)) / max(len(text), 1),
+        int(present[_MODEL_COLUMNS].sum()),
+        *tiers,
+        len(set(_NEGATION_RE.findall(lower))),
+        int(np.dot(tiers, _TIER_WEIGHT_VECTOR))
+    )
+
+
+def text_feature_frame(texts: Iterable[str]) -> pd.DataFrame:
+    """Vectorized TEXT_FEATURES for a whole column of texts"""
+    column = pd.Series(list(texts) if not isinstance(texts, pd.Series) else texts, dtype=object)
+    column = column.fillna('').astype(str)
+
+    # Training data repeats texts (one row per model response): extract each once
+    codes, uniques = pd.factorize(column)
+    s = pd.Series(uniques, dtype=object)
+    lower = s.str.lower()
+    length = s.str.len().to_numpy(dtype=np.int64)
+
+    # Literal substring search runs in Arrow's C++ kernels, one pass per keyword
+    raw_arrow = pa.array(s.tolist(), type=pa.large_string())
+    lower_arrow = pa.array(lower.tolist(), type=pa.large_string())
+    present = np.zeros((len(s), len(VOCABULARY)), dtype=bool)
+    for i, keyword in enumerate(VOCABULARY):
+        present[:, i] = pc.match_substring(lower_arrow, keyword).to_numpy(zero_copy_only=False)
+    tiers = np.stack([present[:, _TIER_COLUMNS[tier]].sum(axis=1) for tier in _TIER_ORDER], axis=1)
+
+    frame = pd.DataFrame({
+        'text_length': length,
+        'word_count': s.str.count(_WORD).to_numpy(dtype=np.int64),
+        'exclamation_marks': pc.count_substring(raw_arrow, '!').to_numpy(zero_copy_only=False),
+        'question_marks': pc.count_substring(raw_arrow, '?').to_numpy(zero_copy_only=False),
+        'all_caps_ratio': s.str.count(_UPPER).to_numpy(dtype=np.float64) / np.maximum(length, 1),
+        'crisis_keyword_count': present[:, _MODEL_COLUMNS].sum(axis=1),
+        'immediate_keywords': tiers[:, 0],
+        'high_keywords': tiers[:, 1],
+        'medium_keywords': tiers[:, 2],
+        'warning_keywords': tiers[:, 3],
+        'negation_count': lower.str.findall(_NEGATION).map(lambda found: len(set(found))).to_numpy(dtype=np.int64),
+        'urgency_score': tiers @ _TIER_WEIGHT_VECTOR
+    })
+    frame = frame.astype({name: np.int64 for name in TEXT_FEATURES if name != 'all_caps_ratio'})
+    return frame.iloc[codes].set_index(column.index)
+
+
+def crisis_feature_dict(text: str) -> Dict[str, Any]:
+    """Nested feature dict recorded with crisis patterns"""
+    row = dict(zip(TEXT_FEATURES, text_features(text)))
+    return {
+        'text_length': row['text_length'],
+        'word_count': row['word_count'],
+        'exclamation_marks': row['exclamation_marks'],
+        'question_marks': row['question_marks'],
+        'all_caps_ratio': row['all_caps_ratio'],
+        'crisis_keywords': {tier: row[f'{tier}_keywords'] for tier in _TIER_ORDER},
+        'sentiment_indicators': {'negation_count': row['negation_count']},
+        'urgency_score': row['urgency_score']
+    }
+
+
+# ----------------------------------------------------------------------
+# Custom crisis model features
+# ----------------------------------------------------------------------
+
+def _context_row(context: Optional[Dict[str, Any]]) -> List[float]:
+    context = context or {}
+    return [float(context.get(name, default)) for name, default in CONTEXT_DEFAULTS.items()]
+
+
+def model_features(text: str, context: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """MODEL_FEATURES vector for one text"""
+    return np.array(list(text_features(text)[:6]) + _context_row(context), dtype=np.float64)
+
+
+def model_feature_matrix(texts: Sequence[str],
+                         contexts: Optional[Sequence[Optional[Dict[str, Any]]]] = None) -> np.ndarray:
+    """MODEL_FEATURES matrix for many texts; identical rows to model_features()"""
+    text_part = text_feature_frame(texts)[TEXT_FEATURES[:6]].to_numpy(dtype=np.float64)
+    if contexts is None:
+        context_part = np.tile(_context_row(None), (len(text_part), 1))
+    else:
+        context_part = np.array([_context_row(c) for c in contexts], dtype=np.float64).reshape(-1, 3)
+    return np.hstack([text_part, context_part])
+
+
+# ----------------------------------------------------------------------
+# Multi-model consensus features
+# ----------------------------------------------------------------------
+
+def consensus_features(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-input features from model_responses rows grouped by input_hash.
+
+    Labels come from the first row's ground truth when present, otherwise
+    from the majority crisis vote.
+    """
+    if df.empty:
+        return np.empty((0, len(CONSENSUS_FEATURES))), np.empty(0, dtype=np.int64)
+
+    risk = df['risk_level'].map(RISK_SCORES)
+    risk = risk.where(df['risk_level'].isna(), risk.fillna(3)).astype(float)
+    frame = df.assign(crisis_detected=df['crisis_detected'].astype(float),
+                      confidence=df['confidence'].astype(float), risk=risk)
+
+    grouped = frame.groupby('input_hash', sort=True)
+    features = pd.DataFrame({
+        'crisis_consensus': grouped['crisis_detected'].mean(),
+        'avg_confidence': grouped['confidence'].mean(),
+        'confidence_std': grouped['confidence'].std(),
+        'model_count': grouped.size(),
+        'avg_risk': grouped['risk'].mean().fillna(3),
+        'max_risk': grouped['risk'].max().fillna(3),
+        'unique_models': grouped['model_name'].nunique()
+    })
+
+    truth = frame.drop_duplicates('input_hash', keep='first').set_index('input_hash')['ground_truth']
+    truth = truth.reindex(features.index)
+    labels = np.where(truth.notna(), truth == 'crisis', features['crisis_consensus'] > 0.5).astype(np.int64)
+
+    return features[CONSENSUS_FEATURES].to_numpy(dtype=np.float64), labels
+
+
+# ----------------------------------------------------------------------
+# Feature matrix cache
+# ----------------------------------------------------------------------
+
+def dataset_hash(*parts: Any) -> str:
+    """Stable hash of DataFrames, arrays and scalars plus the feature version"""
+    digest = hashlib.sha256(f'v{FEATURE_VERSION}'.encode())
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            digest.update(','.join(map(str, part.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=False).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """On-disk cache of extracted feature matrices keyed by dataset hash"""
+
+    def __init__(self, directory: str = None, max_entries: int = 20):
+        self.directory = directory or os.environ.get('FEATURE_CACHE_DIR', 'data/feature_cache')
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: str, compute: Callable[[], Tuple[np.ndarray, ...]]) -> Tuple[np.ndarray, ...]:
+        path = os.path.join(self.directory, f'{key}.npz')
+        if os.path.exists(path):
+            try:
+                with np.load(path) as cached:
+                    arrays = tuple(cached[f'arr_{i}'] for i in range(len(cached.files)))
+                os.utime(path)
+                self.hits += 1
+                return arrays
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable feature cache {path}: {e}")
+
+        self.misses += 1
+        arrays = compute()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, *arrays)
+            os.replace(tmp_path, path)
+            self._prune()
+        except OSError as e:
+            logger.warning(f"Could not write feature cache {path}: {e}")
+        return arrays
+
+    def _prune(self):
+        entries = sorted(
+            (os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.npz')),
+            key=os.path.getmtime
+        )
+        for path in entries[:-self.max_entries]:
+            os.remove(path)
+
+
+feature_cache = FeatureCache()
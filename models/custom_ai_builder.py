@@ -2,24 +2,20 @@
 Custom AI Model Builder for MindMend Platform
 Allows admins to create, train, and deploy custom AI models for therapy
 """
+import io
 import os
 import json
 import pickle
 import logging
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, BinaryIO, Callable, Optional
+import importlib
+import joblib
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.naive_bayes import MultinomialNB
-from sklearn.svm import SVC
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
-from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import classification_report, accuracy_score
-import openai
+import pyarrow as pa
 
 from models.database import db
+from models.dataset_ingestion import DatasetIngestor, read_columns, read_metadata as read_dataset_metadata
 
 class CustomAIModel(db.Model):
     """Database model for custom AI models"""
@@ -62,6 +58,50 @@ class TrainingDataset(db.Model):
     def __repr__(self):
         return f'<TrainingDataset {self.name}>'
 
+class TrainingJob(db.Model):
+    """Background training run for a custom AI model"""
+    id = db.Column(db.Integer, primary_key=True)
+    model_id = db.Column(db.Integer, db.ForeignKey('custom_ai_model.id'), nullable=False, index=True)
+    dataset_id = db.Column(db.Integer, db.ForeignKey('training_dataset.id'), nullable=False)
+    status = db.Column(db.String(20), default='queued', index=True)  # queued, running, succeeded, failed, cancelled
+    stage = db.Column(db.String(50), default='queued')
+    progress = db.Column(db.Float, default=0.0)  # 0-1
+    message = db.Column(db.String(255))
+    training_config = db.Column(db.Text)  # JSON string
+    result = db.Column(db.Text)  # JSON string
+    error = db.Column(db.Text)
+    cancel_requested = db.Column(db.Boolean, default=False)
+    task_id = db.Column(db.String(155))  # Celery task id, if any
+    executor = db.Column(db.String(20))  # celery, process
+    work_dir = db.Column(db.String(200))  # stage checkpoints for resuming
+    attempts = db.Column(db.Integer, default=0)
+    created_by = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<TrainingJob {self.id} model={self.model_id} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'model_id': self.model_id,
+            'dataset_id': self.dataset_id,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': round(self.progress or 0.0, 3),
+            'message': self.message,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'cancel_requested': bool(self.cancel_requested),
+            'attempts': self.attempts,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
 class CustomAIBuilder:
     """Main class for building custom AI models"""
 
@@ -71,34 +111,34 @@ class CustomAIBuilder:
         os.makedirs(self.model_storage_path, exist_ok=True)
         os.makedirs(self.dataset_storage_path, exist_ok=True)
 
-        # Available algorithms
+        # Available algorithms; classes are dotted paths so sklearn is only imported to train
         self.algorithms = {
             'naive_bayes': {
-                'class': MultinomialNB,
+                'class': 'sklearn.naive_bayes.MultinomialNB',
                 'name': 'Naive Bayes',
                 'description': 'Fast and effective for text classification',
                 'params': {'alpha': [0.1, 0.5, 1.0]}
             },
             'svm': {
-                'class': SVC,
+                'class': 'sklearn.svm.SVC',
                 'name': 'Support Vector Machine',
                 'description': 'Powerful for high-dimensional data',
                 'params': {'C': [0.1, 1.0, 10.0], 'kernel': ['linear', 'rbf']}
             },
             'random_forest': {
-                'class': RandomForestClassifier,
+                'class': 'sklearn.ensemble.RandomForestClassifier',
                 'name': 'Random Forest',
                 'description': 'Robust ensemble method',
                 'params': {'n_estimators': [50, 100, 200], 'max_depth': [10, 20, None]}
             },
             'logistic_regression': {
-                'class': LogisticRegression,
+                'class': 'sklearn.linear_model.LogisticRegression',
                 'name': 'Logistic Regression',
                 'description': 'Simple and interpretable',
                 'params': {'C': [0.1, 1.0, 10.0], 'max_iter': [1000]}
             },
             'neural_network': {
-                'class': MLPClassifier,
+                'class': 'sklearn.neural_network.MLPClassifier',
                 'name': 'Neural Network',
                 'description': 'Deep learning for complex patterns',
                 'params': {'hidden_layer_sizes': [(50,), (100,), (50, 50)], 'activation': ['relu', 'tanh']}
@@ -128,25 +168,29 @@ class CustomAIBuilder:
             raise e
 
     def upload_dataset(self, dataset_config: Dict, file_content: str) -> TrainingDataset:
-        """Upload and process training dataset"""
+        """Upload and process training dataset supplied as a string"""
+        return self.ingest_dataset(dataset_config, io.BytesIO(file_content.encode('utf-8')),
+                                   dataset_config.get('filename', 'dataset.json'))
+
+    def ingest_dataset(self, dataset_config: Dict, stream: BinaryIO, filename: str) -> TrainingDataset:
+        """
+        Stream an uploaded dataset (JSON Lines, CSV or JSON array) into
+        Parquet. Row count and column names come from the ingestion pass;
+        schema and column stats are kept in the sidecar metadata file.
+        """
         try:
-            # Save dataset file
-            filename = f"dataset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            file_path = os.path.join(self.dataset_storage_path, filename)
-
-            with open(file_path, 'w') as f:
-                f.write(file_content)
-
-            # Parse dataset to get metadata
-            data = json.loads(file_content)
+            basename = f"dataset_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+            metadata = DatasetIngestor(self.dataset_storage_path).ingest(
+                stream, filename, dataset_config.get('target_column'), basename
+            )
 
             dataset = TrainingDataset(
                 name=dataset_config['name'],
                 description=dataset_config.get('description', ''),
                 data_type=dataset_config.get('data_type', 'text'),
-                file_path=file_path,
-                size=len(data) if isinstance(data, list) else len(data.get('records', [])),
-                columns=json.dumps(list(data[0].keys()) if isinstance(data, list) and data else []),
+                file_path=metadata['parquet_path'],
+                size=metadata['rows'],
+                columns=json.dumps([column['name'] for column in metadata['schema']]),
                 target_column=dataset_config.get('target_column'),
                 created_by=dataset_config.get('created_by', 'admin')
             )
@@ -160,8 +204,72 @@ class CustomAIBuilder:
             logging.error(f"Error uploading dataset: {e}")
             raise e
 
-    def train_model(self, model_id: int, dataset_id: int, training_config: Dict = None) -> Dict:
-        """Train a custom AI model"""
+    def get_dataset_profile(self, dataset_id: int) -> Optional[Dict]:
+        """Schema, row count and column stats captured at ingestion"""
+        dataset = db.session.get(TrainingDataset, dataset_id)
+        if not dataset or not dataset.file_path.endswith('.parquet'):
+            return None
+        return read_dataset_metadata(dataset.file_path)
+
+    def _load_training_data(self, dataset: TrainingDataset, model_type: str):
+        """Return (X, y, rows), reading only the text and target columns of Parquet datasets"""
+        if not dataset.file_path.endswith('.parquet'):
+            with open(dataset.file_path, 'r') as f:
+                data = json.load(f)
+            if model_type == 'classification':
+                X, y = self._prepare_classification_data(data, dataset.target_column)
+            else:
+                X, y = self._prepare_regression_data(data, dataset.target_column)
+            return X, y, len(data)
+
+        target_column = dataset.target_column
+        table = read_columns(dataset.file_path, ['text', target_column])
+        if 'text' in table.column_names:
+            # Missing text would reach the vectorizer as None and fail the whole fit
+            X = table.column('text').cast(pa.string()).fill_null('').to_pylist()
+        else:
+            # No text column: fall back to the stringified record, as for JSON uploads
+            X = [str(row) for row in read_columns(dataset.file_path, json.loads(dataset.columns or '[]')).to_pylist()]
+
+        if target_column not in table.column_names:
+            y = [None] * table.num_rows if model_type == 'classification' else np.zeros(table.num_rows)
+        elif model_type == 'classification':
+            y = table.column(target_column).to_pylist()
+        else:
+            y = table.column(target_column).cast(pa.float64()).fill_null(0).to_numpy()
+        return X, y, table.num_rows
+
+    def train_model(self, model_id: int, dataset_id: int, training_config: Dict = None,
+                    progress: Optional[Callable] = None, work_dir: Optional[str] = None) -> Dict:
+        """
+        Train a custom AI model.
+
+        progress(stage, fraction, message) is called between stages and may
+        raise to abort the run. With a work_dir each expensive stage
+        (prepared data, fitted estimator, cross-validation) is checkpointed
+        there, so a re-run after a crash resumes from the last finished stage.
+        """
+        from sklearn.base import clone
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.model_selection import train_test_split, cross_val_score
+        from sklearn.metrics import classification_report, accuracy_score, r2_score
+
+        report = progress or (lambda stage, fraction, message=None: None)
+        training_config = training_config or {}
+
+        def checkpoint(name):
+            return os.path.join(work_dir, f'{name}.joblib') if work_dir else None
+
+        def restore(name):
+            path = checkpoint(name)
+            return joblib.load(path) if path and os.path.exists(path) else None
+
+        def save(name, value):
+            path = checkpoint(name)
+            if path:
+                joblib.dump(value, path + '.tmp')
+                os.replace(path + '.tmp', path)
+
         try:
             model = CustomAIModel.query.get(model_id)
             dataset = TrainingDataset.query.get(dataset_id)
@@ -173,56 +281,75 @@ class CustomAIBuilder:
             model.status = 'training'
             db.session.commit()
 
-            # Load dataset
-            with open(dataset.file_path, 'r') as f:
-                data = json.load(f)
+            if work_dir:
+                os.makedirs(work_dir, exist_ok=True)
 
-            # Prepare training data based on model type
-            if model.model_type == 'classification':
-                X, y = self._prepare_classification_data(data, dataset.target_column)
-            elif model.model_type == 'regression':
-                X, y = self._prepare_regression_data(data, dataset.target_column)
-            else:
-                raise ValueError(f"Unsupported model type: {model.model_type}")
+            report('preparing', 0.05, 'Loading dataset')
+            prepared = restore('prepared')
+            if prepared is None:
+                if model.model_type not in ('classification', 'regression'):
+                    raise ValueError(f"Unsupported model type: {model.model_type}")
 
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42, stratify=y if model.model_type == 'classification' else None
-            )
+                # Load only the columns training needs
+                X, y, dataset_size = self._load_training_data(dataset, model.model_type)
+
+                # Split data
+                X_train, X_test, y_train, y_test = train_test_split(
+                    X, y, test_size=0.2, random_state=42, stratify=y if model.model_type == 'classification' else None
+                )
 
-            # Vectorize text data if needed
-            vectorizer = None
-            if isinstance(X_train[0], str):
-                vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
-                X_train = vectorizer.fit_transform(X_train)
-                X_test = vectorizer.transform(X_test)
+                # Vectorize text data if needed
+                vectorizer = None
+                if isinstance(X_train[0], str):
+                    report('vectorizing', 0.15, 'Fitting TF-IDF vectorizer')
+                    vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
+                    X_train = vectorizer.fit_transform(X_train)
+                    X_test = vectorizer.transform(X_test)
+
+                prepared = (X_train, X_test, y_train, y_test, vectorizer, dataset_size)
+                save('prepared', prepared)
+            X_train, X_test, y_train, y_test, vectorizer, dataset_size = prepared
 
             # Get algorithm class and parameters
             algorithm_info = self.algorithms[model.algorithm]
-            algorithm_class = algorithm_info['class']
+            module_name, _, class_name = algorithm_info['class'].rpartition('.')
+            algorithm_class = getattr(importlib.import_module(module_name), class_name)
 
             # Use provided parameters or defaults
-            if training_config and 'parameters' in training_config:
-                params = training_config['parameters']
-            else:
-                params = {}
+            params = training_config.get('parameters', {})
 
             # Train model
-            trained_model = algorithm_class(**params)
-            trained_model.fit(X_train, y_train)
-
-            # Evaluate model
-            train_accuracy = trained_model.score(X_train, y_train)
-            test_accuracy = trained_model.score(X_test, y_test)
-
-            # Cross-validation
-            cv_scores = cross_val_score(trained_model, X_train, y_train, cv=5)
-
-            # Generate classification report
+            report('fitting', 0.3, f"Training {algorithm_info['name']}")
+            trained_model = restore('fitted')
+            if trained_model is None:
+                trained_model = algorithm_class(**params)
+                trained_model.fit(X_train, y_train)
+                save('fitted', trained_model)
+
+            # Evaluate the fitted estimator once per split and reuse the predictions
+            report('evaluating', 0.55, 'Evaluating on held-out data')
             y_pred = trained_model.predict(X_test)
-            report = classification_report(y_test, y_pred, output_dict=True)
+            if model.model_type == 'classification':
+                train_accuracy = accuracy_score(y_train, trained_model.predict(X_train))
+                test_accuracy = accuracy_score(y_test, y_pred)
+                report_data = classification_report(y_test, y_pred, output_dict=True)
+            else:
+                train_accuracy = r2_score(y_train, trained_model.predict(X_train))
+                test_accuracy = r2_score(y_test, y_pred)
+                report_data = {}
+
+            # Cross-validation folds run in parallel on unfitted clones
+            report('cross_validating', 0.65, 'Running 5-fold cross-validation')
+            cv_scores = restore('cv_scores')
+            if cv_scores is None:
+                cv_scores = cross_val_score(
+                    clone(trained_model), X_train, y_train, cv=5,
+                    n_jobs=training_config.get('n_jobs', int(os.environ.get('TRAINING_CV_N_JOBS', -1)))
+                )
+                save('cv_scores', cv_scores)
 
             # Save model and vectorizer
+            report('saving', 0.9, 'Saving model artifacts')
             model_filename = f"model_{model_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pkl"
             model_path = os.path.join(self.model_storage_path, model_filename)
 
@@ -238,7 +365,7 @@ class CustomAIBuilder:
 
             # Update model record
             model.model_file_path = model_path
-            model.training_data_size = len(X_train)
+            model.training_data_size = X_train.shape[0] if hasattr(X_train, 'shape') else len(X_train)
             model.accuracy_score = test_accuracy
             model.validation_score = cv_scores.mean()
             model.status = 'ready'
@@ -250,9 +377,9 @@ class CustomAIBuilder:
                 'cv_scores': cv_scores.tolist(),
                 'cv_mean': cv_scores.mean(),
                 'cv_std': cv_scores.std(),
-                'classification_report': report,
+                'classification_report': report_data,
                 'training_date': datetime.utcnow().isoformat(),
-                'dataset_size': len(data),
+                'dataset_size': dataset_size,
                 'parameters': params
             }
 
@@ -269,7 +396,8 @@ class CustomAIBuilder:
 
         except Exception as e:
             # Update model status to error
-            if 'model' in locals():
+            db.session.rollback()
+            if 'model' in locals() and model is not None:
                 model.status = 'error'
                 db.session.commit()
 
@@ -322,52 +450,23 @@ class CustomAIBuilder:
     def predict(self, model_id: int, input_data: str) -> Dict:
         """Make prediction using deployed model"""
         try:
-            model = CustomAIModel.query.get(model_id)
-            if not model or model.status != 'deployed':
-                raise ValueError("Model not deployed or not found")
-
-            # Load trained model
-            with open(model.model_file_path, 'rb') as f:
-                trained_model = pickle.load(f)
-
-            # Load vectorizer if exists
-            vectorizer = None
-            if model.vectorizer_file_path and os.path.exists(model.vectorizer_file_path):
-                with open(model.vectorizer_file_path, 'rb') as f:
-                    vectorizer = pickle.load(f)
-
-            # Prepare input
-            if vectorizer:
-                X = vectorizer.transform([input_data])
-            else:
-                X = [input_data]
-
-            # Make prediction
-            prediction = trained_model.predict(X)
-
-            # Get prediction probability if available
-            prob = None
-            if hasattr(trained_model, 'predict_proba'):
-                prob = trained_model.predict_proba(X).max()
-
-            # Update prediction count
-            model.prediction_count += 1
-            db.session.commit()
-
-            return {
-                'success': True,
-                'prediction': prediction[0] if isinstance(prediction, np.ndarray) else prediction,
-                'confidence': prob,
-                'model_name': model.name
-            }
+            return self.predict_batch(model_id, [input_data])[0]
 
         except Exception as e:
             logging.error(f"Error making prediction: {e}")
             raise e
 
+    def predict_batch(self, model_id: int, inputs: List[str]) -> List[Dict]:
+        """Predict many inputs with a cached model in a single vectorized pass"""
+        from models.model_inference import inference_server
+        return inference_server.predict_batch(model_id, inputs)
+
     def get_model_performance(self, model_id: int) -> Dict:
         """Get detailed performance metrics for a model"""
         try:
+            from models.model_inference import inference_server
+            inference_server.flush()
+
             model = CustomAIModel.query.get(model_id)
             if not model:
                 raise ValueError("Model not found")
@@ -443,6 +542,9 @@ class CustomAIBuilder:
             db.session.delete(model)
             db.session.commit()
 
+            from models.model_inference import inference_server
+            inference_server.evict(model_id)
+
             return True
 
         except Exception as e:
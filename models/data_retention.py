@@ -0,0 +1,288 @@
+"""
+Data Retention Engine for MindMend
+==================================
+Set-based, resumable retention jobs. Each policy deletes expired rows in
+bounded primary-key ranges, clears or removes dependent rows explicitly,
+checkpoints its progress and throttles itself between batches.
+"""
+
+import time
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, UTC
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import select, delete, update, func
+
+from models.database import (
+    db, Session, Patient, BiometricData, VideoAnalysis, Exercise,
+    SessionReview, ClinicalAssessment, InterventionTracking, SessionAnalysis, RetentionCheckpoint
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DependentRule:
+    """Rows in another table that reference the rows being deleted"""
+    model: type
+    foreign_key: str
+    action: str = 'delete'  # delete, nullify
+    dependents: List['DependentRule'] = field(default_factory=list)
+
+
+@dataclass
+class RetentionPolicy:
+    """Retention rule for a single table"""
+    name: str
+    model: type
+    timestamp_column: str
+    days: int
+    dependents: List[DependentRule] = field(default_factory=list)
+    extra_filter: Optional[Callable] = None  # Returns an extra WHERE clause
+    batch_size: int = 1000
+    enabled: bool = True
+
+
+def _free_tier_sessions():
+    """Sessions belonging to free-tier patients (premium users keep data longer)"""
+    free_patients = select(Patient.name).where(Patient.subscription_tier == 'free')
+    return Session.patient_name.in_(free_patients)
+
+
+def default_retention_policies() -> Dict[str, RetentionPolicy]:
+    """Built-in retention policies, keyed by policy name"""
+    return {
+        'sessions': RetentionPolicy(
+            name='sessions',
+            model=Session,
+            timestamp_column='timestamp',
+            days=90,
+            extra_filter=_free_tier_sessions,
+            dependents=[
+                DependentRule(VideoAnalysis, 'session_id', 'delete'),
+                DependentRule(SessionAnalysis, 'session_id', 'delete'),
+                DependentRule(Exercise, 'session_id', 'delete', dependents=[
+                    DependentRule(InterventionTracking, 'exercise_id', 'nullify'),
+                ]),
+                DependentRule(SessionReview, 'session_id', 'delete'),
+                DependentRule(ClinicalAssessment, 'session_id', 'nullify'),
+                DependentRule(InterventionTracking, 'session_id', 'nullify'),
+            ],
+        ),
+        'biometric_data': RetentionPolicy(
+            name='biometric_data',
+            model=BiometricData,
+            timestamp_column='timestamp',
+            days=180,
+            batch_size=5000,
+        ),
+    }
+
+
+class RetentionManager:
+    """Runs retention policies in bounded, checkpointed batches"""
+
+    def __init__(self, policies=None, overrides=None, throttle_ratio=0.5,
+                 max_batch_seconds=2.0, min_batch_size=100, max_runtime_seconds=20 * 60):
+        """
+        Args:
+            policies: Mapping of policy name to RetentionPolicy (defaults to built-ins)
+            overrides: Mapping of policy name to field overrides, e.g.
+                {'sessions': {'days': 60, 'batch_size': 500}}
+            throttle_ratio: Sleep this fraction of each batch's duration before the next one
+            max_batch_seconds: Halve the batch size when a batch takes longer than this
+            min_batch_size: Lower bound for adaptive batch sizing
+            max_runtime_seconds: Stop and leave a checkpoint once this budget is used
+        """
+        self.policies = policies or default_retention_policies()
+        self.throttle_ratio = throttle_ratio
+        self.max_batch_seconds = max_batch_seconds
+        self.min_batch_size = min_batch_size
+        self.max_runtime_seconds = max_runtime_seconds
+
+        if overrides is None:
+            overrides = self._config_overrides()
+        for name, values in (overrides or {}).items():
+            policy = self.policies.get(name)
+            if not policy:
+                logger.warning(f"Ignoring retention override for unknown policy '{name}'")
+                continue
+            for key, value in values.items():
+                if hasattr(policy, key):
+                    setattr(policy, key, value)
+
+    @staticmethod
+    def _config_overrides():
+        """Read RETENTION_POLICIES from the Flask config when an app is active"""
+        try:
+            from flask import current_app
+            return current_app.config.get('RETENTION_POLICIES', {})
+        except RuntimeError:
+            return {}
+
+    def run_all(self):
+        """Run every enabled policy and return a summary per policy"""
+        return {
+            name: self.run_policy(name)
+            for name, policy in self.policies.items()
+            if policy.enabled
+        }
+
+    def run_policy(self, name, days=None):
+        """
+        Run (or resume) a single retention policy.
+
+        Args:
+            name: Policy name
+            days: Optional override of the policy's retention window
+
+        Returns:
+            dict: Deleted row count, batches, cutoff and whether the run finished
+        """
+        policy = self.policies[name]
+        if days is not None:
+            policy.days = days
+
+        checkpoint = self._load_checkpoint(policy)
+        cutoff_date = checkpoint.cutoff_date
+        last_id = checkpoint.last_id or 0
+        batch_size = policy.batch_size
+        started = time.monotonic()
+        deleted_this_run = 0
+        completed = False
+
+        while True:
+            if time.monotonic() - started > self.max_runtime_seconds:
+                logger.info(f"Retention '{name}' paused at id {last_id}, will resume next run")
+                break
+
+            batch_started = time.monotonic()
+            upper_id = self._next_upper_bound(policy, cutoff_date, last_id, batch_size)
+            if upper_id is None:
+                completed = True
+                break
+
+            try:
+                deleted = self._delete_range(policy, cutoff_date, last_id, upper_id)
+                checkpoint.last_id = upper_id
+                checkpoint.rows_deleted = (checkpoint.rows_deleted or 0) + deleted
+                checkpoint.batches = (checkpoint.batches or 0) + 1
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            last_id = upper_id
+            deleted_this_run += deleted
+            batch_size = self._throttle(policy, batch_size, time.monotonic() - batch_started)
+
+        if completed:
+            checkpoint.status = 'completed'
+            checkpoint.completed_at = datetime.now(UTC)
+            db.session.commit()
+
+        logger.info(f"Retention '{name}' deleted {deleted_this_run} rows (cutoff {cutoff_date.isoformat()})")
+
+        return {
+            'policy': name,
+            'deleted': deleted_this_run,
+            'total_deleted': checkpoint.rows_deleted,
+            'batches': checkpoint.batches,
+            'last_id': checkpoint.last_id,
+            'cutoff_date': cutoff_date.isoformat(),
+            'completed': completed
+        }
+
+    def _load_checkpoint(self, policy):
+        """Resume an unfinished run, or start a new one with a fresh cutoff"""
+        checkpoint = RetentionCheckpoint.query.filter_by(policy_name=policy.name).first()
+        if checkpoint is None:
+            checkpoint = RetentionCheckpoint(policy_name=policy.name)
+            db.session.add(checkpoint)
+
+        if checkpoint.status != 'running' or checkpoint.cutoff_date is None:
+            checkpoint.status = 'running'
+            checkpoint.cutoff_date = datetime.now(UTC) - timedelta(days=policy.days)
+            checkpoint.last_id = 0
+            checkpoint.rows_deleted = 0
+            checkpoint.batches = 0
+            checkpoint.started_at = datetime.now(UTC)
+            checkpoint.completed_at = None
+        else:
+            logger.info(f"Resuming retention '{policy.name}' from id {checkpoint.last_id}")
+
+        db.session.commit()
+        return checkpoint
+
+    def _expired_ids(self, policy, cutoff_date, lower_id, upper_id=None):
+        """SELECT of expired primary keys in (lower_id, upper_id]"""
+        model = policy.model
+        conditions = [
+            model.id > lower_id,
+            getattr(model, policy.timestamp_column) < cutoff_date,
+        ]
+        if upper_id is not None:
+            conditions.append(model.id <= upper_id)
+        if policy.extra_filter is not None:
+            conditions.append(policy.extra_filter())
+        return select(model.id).where(*conditions)
+
+    def _next_upper_bound(self, policy, cutoff_date, lower_id, batch_size):
+        """Highest key of the next batch, or None when nothing is left to delete"""
+        window = (
+            self._expired_ids(policy, cutoff_date, lower_id)
+            .order_by(policy.model.id)
+            .limit(batch_size)
+            .subquery()
+        )
+        return db.session.execute(select(func.max(window.c.id))).scalar()
+
+    def _delete_range(self, policy, cutoff_date, lower_id, upper_id):
+        """Delete one key range with set-based statements, dependents first"""
+        parent_ids = self._expired_ids(policy, cutoff_date, lower_id, upper_id)
+
+        for rule in policy.dependents:
+            self._apply_dependent(rule, parent_ids)
+
+        result = db.session.execute(
+            delete(policy.model)
+            .where(policy.model.id.in_(parent_ids))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    def _apply_dependent(self, rule, parent_ids):
+        """Delete or detach rows referencing parent_ids (recursing into their own dependents)"""
+        column = getattr(rule.model, rule.foreign_key)
+
+        if rule.action == 'nullify':
+            db.session.execute(
+                update(rule.model)
+                .where(column.in_(parent_ids))
+                .values({rule.foreign_key: None})
+                .execution_options(synchronize_session=False)
+            )
+            return
+
+        child_ids = select(rule.model.id).where(column.in_(parent_ids))
+        for child_rule in rule.dependents:
+            self._apply_dependent(child_rule, child_ids)
+
+        db.session.execute(
+            delete(rule.model)
+            .where(column.in_(parent_ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    def _throttle(self, policy, batch_size, elapsed):
+        """Back off between batches and shrink batches when the database is slow"""
+        if elapsed > self.max_batch_seconds:
+            batch_size = max(self.min_batch_size, batch_size // 2)
+        elif batch_size < policy.batch_size:
+            batch_size = min(policy.batch_size, batch_size * 2)
+
+        if self.throttle_ratio > 0:
+            time.sleep(elapsed * self.throttle_ratio)
+
+        return batch_size
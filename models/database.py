@@ -26,7 +26,7 @@ class Session(db.Model):
     video_analysis = db.Column(Text)  # JSON string of video analysis
     biometric_data = db.Column(Text)  # JSON string of biometric data
     exercises_assigned = db.Column(Text)  # JSON string of exercises
-    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(UTC), index=True)
     duration_minutes = db.Column(db.Integer)
     mood_before = db.Column(db.Integer)  # 1-10 scale
     mood_after = db.Column(db.Integer)  # 1-10 scale
@@ -108,7 +108,7 @@ class Patient(UserMixin, db.Model):
     consent_data_sharing = db.Column(db.Boolean, default=False)
     premium_status = db.Column(db.Boolean, default=False)
     risk_level = db.Column(db.String(20), default='low')  # low, medium, high
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), index=True)
     last_session = db.Column(db.DateTime)
     subscription_tier = db.Column(db.String(20), default='free')  # free, premium, enterprise
     oauth_providers = db.Column(Text)  # JSON string of linked OAuth providers
@@ -584,7 +584,7 @@ class Payment(db.Model):
     refund_amount = db.Column(db.Float, default=0.0)
     refunded_at = db.Column(db.DateTime)
     payment_metadata = db.Column(Text)  # JSON string for additional data (renamed from metadata)
-    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), index=True)
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
 
     patient = db.relationship('Patient', backref=db.backref('payments', lazy=True))
@@ -953,3 +953,134 @@ class TrialParticipant(db.Model):
 
     def __repr__(self):
         return f'<TrialParticipant Trial {self.trial_id}, Patient {self.patient_id}: {self.group_assignment}>'
+
+
+class RetentionCheckpoint(db.Model):
+    """Progress marker for a retention policy so interrupted runs can resume"""
+
+    __tablename__ = 'retention_checkpoints'
+
+    id = db.Column(db.Integer, primary_key=True)
+    policy_name = db.Column(db.String(100), unique=True, nullable=False)
+    status = db.Column(db.String(20), default='completed')  # running, completed
+    cutoff_date = db.Column(db.DateTime)  # Cutoff pinned for the current run
+    last_id = db.Column(db.Integer, default=0)  # Highest primary key already processed
+    rows_deleted = db.Column(db.Integer, default=0)
+    batches = db.Column(db.Integer, default=0)
+    started_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    completed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<RetentionCheckpoint {self.policy_name}: {self.status} @ {self.last_id}>'
+
+
+class SessionAnalysis(db.Model):
+    """Background AI analysis of a therapy session (one row per session)"""
+
+    __tablename__ = 'session_analysis'
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('session.id'), unique=True, nullable=False)
+    status = db.Column(db.String(20), default='processing', index=True)  # processing, completed, failed
+    claimed_by = db.Column(db.String(155))  # Celery task id holding the claim
+    claimed_at = db.Column(db.DateTime)
+    analysis_data = db.Column(Text)  # JSON string of analysis results
+    analyzed_at = db.Column(db.DateTime)
+
+    session = db.relationship('Session', backref=db.backref('analysis', lazy=True, uselist=False))
+
+    def __repr__(self):
+        return f'<SessionAnalysis Session {self.session_id}: {self.status}>'
+
+
+class DailyAnalyticsSnapshot(db.Model):
+    """Daily platform metrics fact table written by the analytics snapshot job"""
+
+    __tablename__ = 'daily_analytics_snapshot'
+
+    id = db.Column(db.Integer, primary_key=True)
+    snapshot_date = db.Column(db.Date, unique=True, nullable=False, index=True)
+    new_users = db.Column(db.Integer, default=0)
+    total_sessions = db.Column(db.Integer, default=0)
+    active_users = db.Column(db.Integer, default=0)
+    avg_sessions_per_user = db.Column(db.Float, default=0.0)
+    revenue = db.Column(db.Float, default=0.0)  # Succeeded payments
+    generated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+
+    def __repr__(self):
+        return f'<DailyAnalyticsSnapshot {self.snapshot_date}>'
+
+    def to_dict(self):
+        return {
+            'date': self.snapshot_date.isoformat(),
+            'new_users': self.new_users,
+            'total_sessions': self.total_sessions,
+            'active_users': self.active_users,
+            'avg_sessions_per_user': self.avg_sessions_per_user,
+            'revenue': self.revenue,
+            'generated_at': self.generated_at.isoformat() if self.generated_at else None
+        }
+
+
+class PeerProfile(db.Model):
+    """Opt-in peer support profile used by the peer matching engine"""
+
+    __tablename__ = 'peer_profile'
+
+    id = db.Column(db.Integer, primary_key=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient.id'), unique=True, nullable=False)
+    age = db.Column(db.Integer)
+    conditions = db.Column(db.JSON, default=list)
+    interests = db.Column(db.JSON, default=list)
+    therapy_stage = db.Column(db.String(30))  # beginning, active_treatment, maintenance
+    city = db.Column(db.String(100))
+    state = db.Column(db.String(50))
+    availability = db.Column(db.JSON, default=list)  # e.g. weekday_evenings
+    connection_types = db.Column(db.JSON, default=list)  # empty = open to all
+    communication_style = db.Column(db.String(50))
+    experience_level = db.Column(db.String(30))
+    verified = db.Column(db.Boolean, default=False)
+    active = db.Column(db.Boolean, default=True, index=True)
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC),
+                           onupdate=lambda: datetime.now(UTC))
+
+    def __repr__(self):
+        return f'<PeerProfile Patient {self.patient_id}>'
+
+    def to_matching_profile(self):
+        """Profile dict in the shape SocialConnectionManager scores"""
+        return {
+            'user_id': self.patient_id,
+            'age': self.age or 0,
+            'conditions': self.conditions or [],
+            'interests': self.interests or [],
+            'therapy_stage': self.therapy_stage,
+            'location': {'city': self.city, 'state': self.state},
+            'availability': self.availability or [],
+            'connection_types': self.connection_types or [],
+            'communication_style': self.communication_style,
+            'experience_level': self.experience_level,
+            'verified': bool(self.verified)
+        }
+
+
+class PeerMatchSuggestion(db.Model):
+    """Precomputed peer matches written by the nightly batch job"""
+
+    __tablename__ = 'peer_match_suggestion'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    peer_id = db.Column(db.Integer, nullable=False)
+    connection_type = db.Column(db.String(30), nullable=False)
+    compatibility_score = db.Column(db.Float, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    generated_at = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
+
+    __table_args__ = (
+        db.Index('ix_peer_match_user_type_rank', 'user_id', 'connection_type', 'rank'),
+    )
+
+    def __repr__(self):
+        return f'<PeerMatchSuggestion {self.user_id}->{self.peer_id} {self.compatibility_score:.2f}>'
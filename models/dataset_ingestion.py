@@ -0,0 +1,371 @@
+"""
+Training Dataset Ingestion for MindMend Custom AI
+=================================================
+Streams uploaded datasets to disk in fixed-size chunks, parses them
+incrementally (JSON Lines, CSV, or a top-level JSON array) and writes them
+as Parquet in bounded-size record batches. Schema, row count and per-column
+statistics are gathered while the batches go past and stored next to the
+Parquet file, so nothing ever holds the whole dataset in memory.
+
+Training reads back only the columns it needs, memory-mapped.
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import os
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+BATCH_ROWS = 10000
+MAX_DISTINCT_VALUES = 100
+SUPPORTED_FORMATS = ('jsonl', 'csv', 'json')
+
+
+def metadata_path(parquet_path: str) -> str:
+    return parquet_path + '.meta.json'
+
+
+def detect_format(filename: str, head: bytes) -> str:
+    """Pick a parser from the extension, falling back to sniffing the first bytes"""
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension in ('csv', 'json'):
+        return extension
+
+    stripped = head.lstrip()
+    if stripped.startswith(b'['):
+        return 'json'
+    if stripped.startswith(b'{'):
+        return 'jsonl'
+    return 'csv'
+
+
+class _ColumnStats:
+    """Running statistics for one column, updated batch by batch"""
+
+    def __init__(self, name: str, data_type: pa.DataType, track_values: bool):
+        self.name = name
+        self.type = data_type
+        self.count = 0
+        self.nulls = 0
+        self.minimum = None
+        self.maximum = None
+        self.total = 0.0
+        self.values = {} if track_values else None
+
+    def update(self, column: pa.ChunkedArray):
+        self.count += len(column)
+        self.nulls += column.null_count
+
+        measured = None
+        if pa.types.is_integer(self.type) or pa.types.is_floating(self.type):
+            measured = column
+        elif pa.types.is_string(self.type) or pa.types.is_large_string(self.type):
+            measured = pc.utf8_length(column)
+
+        if measured is not None and len(measured) > measured.null_count:
+            bounds = pc.min_max(measured).as_py()
+            self.minimum = bounds['min'] if self.minimum is None else min(self.minimum, bounds['min'])
+            self.maximum = bounds['max'] if self.maximum is None else max(self.maximum, bounds['max'])
+            self.total += pc.sum(measured).as_py() or 0
+
+        if self.values is not None and len(self.values) <= MAX_DISTINCT_VALUES:
+            for entry in pc.value_counts(column).to_pylist():
+                key = str(entry['values'])
+                self.values[key] = self.values.get(key, 0) + entry['counts']
+
+    def to_dict(self) -> Dict[str, Any]:
+        present = self.count - self.nulls
+        stats = {'type': str(self.type), 'count': self.count, 'null_count': self.nulls}
+        if self.minimum is not None:
+            prefix = 'length_' if pa.types.is_string(self.type) or pa.types.is_large_string(self.type) else ''
+            stats.update({
+                f'{prefix}min': self.minimum,
+                f'{prefix}max': self.maximum,
+                f'{prefix}mean': round(self.total / present, 4) if present else None
+            })
+        if self.values is not None:
+            if len(self.values) > MAX_DISTINCT_VALUES:
+                stats['distinct_values'] = f'>{MAX_DISTINCT_VALUES}'
+            else:
+                stats['value_counts'] = dict(sorted(self.values.items(), key=lambda kv: -kv[1]))
+        return stats
+
+
+class DatasetIngestor:
+    """Chunked upload -> incremental parse -> Parquet with schema and stats"""
+
+    def __init__(self, storage_path: str, chunk_size: int = CHUNK_SIZE, batch_rows: int = BATCH_ROWS,
+                 max_bytes: Optional[int] = None):
+        self.storage_path = storage_path
+        self.chunk_size = chunk_size
+        self.batch_rows = batch_rows
+        self.max_bytes = max_bytes or int(os.environ.get('DATASET_MAX_UPLOAD_BYTES', 2 * 1024 ** 3))
+
+    # ------------------------------------------------------------------
+    # Upload
+    # ------------------------------------------------------------------
+
+    def stream_to_disk(self, stream: BinaryIO, destination: str) -> Dict[str, Any]:
+        """Copy an upload stream to disk chunk by chunk, hashing as it goes"""
+        digest = hashlib.sha256()
+        written = 0
+        head = b''
+        with open(destination, 'wb') as out:
+            while True:
+                chunk = stream.read(self.chunk_size)
+                if not chunk:
+                    break
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                written += len(chunk)
+                if written > self.max_bytes:
+                    raise ValueError(f"Dataset exceeds the {self.max_bytes} byte upload limit")
+                if len(head) < 4096:
+                    head += chunk[:4096 - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+        return {'bytes': written, 'sha256': digest.hexdigest(), 'head': head}
+
+    def ingest(self, stream: BinaryIO, filename: str, target_column: Optional[str],
+               basename: str) -> Dict[str, Any]:
+        """
+        Ingest an upload into `<basename>.parquet` under storage_path.
+
+        Returns the metadata dict (also written next to the Parquet file).
+        """
+        os.makedirs(self.storage_path, exist_ok=True)
+        raw_path = os.path.join(self.storage_path, f'{basename}.upload')
+        parquet_path = os.path.join(self.storage_path, f'{basename}.parquet')
+
+        try:
+            upload = self.stream_to_disk(stream, raw_path)
+            source_format = detect_format(filename, upload.pop('head'))
+            metadata = self._convert(raw_path, source_format, parquet_path, target_column)
+        except Exception:
+            for path in (parquet_path, parquet_path + '.tmp'):
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+
+        metadata.update({
+            'source_filename': filename,
+            'source_format': source_format,
+            'source_bytes': upload['bytes'],
+            'sha256': upload['sha256'],
+            'parquet_path': parquet_path
+        })
+        with open(metadata_path(parquet_path), 'w') as f:
+            json.dump(metadata, f, indent=2, default=str)
+        return metadata
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    def _iter_jsonl(self, path: str) -> Iterator[Dict[str, Any]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON on line {line_number}: {e.msg}")
+
+    def _iter_json_array(self, path: str, target_column: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Decode the elements of a top-level JSON array without loading it whole"""
+        decoder = json.JSONDecoder()
+        with open(path, 'r', encoding='utf-8') as f:
+            buffer = ''
+            started = False
+            eof = False
+            while True:
+                if not eof and len(buffer) < self.chunk_size:
+                    chunk = f.read(self.chunk_size)
+                    eof = not chunk
+                    buffer += chunk
+
+                buffer = buffer.lstrip()
+                if not started:
+                    if not buffer:
+                        if eof:
+                            return
+                        continue
+                    if buffer[0] == '{':
+                        # Legacy column-oriented {"texts": [...], "labels": [...]} upload
+                        yield from self._columnar_records(json.loads(buffer + f.read()), target_column)
+                        return
+                    if buffer[0] != '[':
+                        raise ValueError("JSON datasets must be an array of records")
+                    buffer = buffer[1:]
+                    started = True
+                    continue
+
+                buffer = buffer.lstrip(', \t\r\n')
+                if buffer.startswith(']'):
+                    return
+                if not buffer:
+                    if eof:
+                        raise ValueError("Unterminated JSON array")
+                    continue
+                try:
+                    record, end = decoder.raw_decode(buffer)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise ValueError("Invalid JSON record in dataset")
+                    # Element spans the chunk boundary: read more
+                    chunk = f.read(self.chunk_size)
+                    eof = not chunk
+                    buffer += chunk
+                    continue
+                buffer = buffer[end:]
+                yield record
+
+    @staticmethod
+    def _columnar_records(data: Dict[str, Any], target_column: Optional[str]) -> Iterator[Dict[str, Any]]:
+        if 'records' in data:
+            yield from data['records']
+            return
+        texts = data.get('texts', [])
+        targets = data.get('labels', data.get('values', []))
+        target = target_column or ('label' if 'labels' in data else 'value')
+        for text, value in zip(texts, targets):
+            yield {'text': text, target: value}
+
+    def _record_batches(self, records: Iterator[Dict[str, Any]]) -> Iterator[pa.RecordBatch]:
+        """Group records into RecordBatches; the first batch fixes the schema"""
+        schema = None
+        batch: List[Dict[str, Any]] = []
+        for record in records:
+            if not isinstance(record, dict):
+                record = {'text': str(record)}
+            batch.append(record)
+            if len(batch) >= self.batch_rows:
+                schema, converted = self._to_batch(batch, schema)
+                yield converted
+                batch = []
+        if batch:
+            _, converted = self._to_batch(batch, schema)
+            yield converted
+
+    @staticmethod
+    def _to_batch(rows, schema):
+        if schema is None:
+            table = pa.Table.from_pylist(rows)
+            # Columns that are null throughout the first batch become strings
+            schema = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+        try:
+            return schema, pa.RecordBatch.from_pylist(rows, schema=schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ValueError(f"Records do not match the dataset schema {schema}: {e}")
+
+    def _csv_batches(self, path: str) -> Iterator[pa.RecordBatch]:
+        read_options = pa_csv.ReadOptions(block_size=self.chunk_size)
+        try:
+            reader = pa_csv.open_csv(path, read_options=read_options)
+        except pa.ArrowInvalid as e:
+            raise ValueError(f"Could not parse CSV dataset: {e}")
+
+        try:
+            for batch in reader:
+                yield batch
+        except pa.ArrowInvalid:
+            # A later block contradicted the inferred types; re-read everything as text
+            raise _RetryAsText()
+
+    def _csv_text_batches(self, path: str) -> Iterator[pa.RecordBatch]:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            header = next(csv.reader(f), [])
+        yield from pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(block_size=self.chunk_size),
+            convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in header})
+        )
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    def _convert(self, raw_path, source_format, parquet_path, target_column):
+        if source_format == 'csv':
+            try:
+                return self._write_parquet(self._csv_batches(raw_path), parquet_path, target_column)
+            except _RetryAsText:
+                logger.info("CSV types changed mid-file; storing all columns as text")
+                return self._write_parquet(self._csv_text_batches(raw_path), parquet_path, target_column)
+        if source_format == 'jsonl':
+            records = self._iter_jsonl(raw_path)
+        else:
+            records = self._iter_json_array(raw_path, target_column)
+        return self._write_parquet(self._record_batches(records), parquet_path, target_column)
+
+    def _write_parquet(self, batches, parquet_path, target_column):
+        tmp_path = parquet_path + '.tmp'
+        writer = None
+        stats: Dict[str, _ColumnStats] = {}
+        rows = 0
+        try:
+            for batch in batches:
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, batch.schema, compression='zstd')
+                    stats = {
+                        field.name: _ColumnStats(field.name, field.type, field.name == target_column)
+                        for field in batch.schema
+                    }
+                writer.write_batch(batch)
+                rows += batch.num_rows
+                for name, column_stats in stats.items():
+                    column_stats.update(pa.chunked_array([batch.column(name)]))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            raise ValueError("Dataset contains no records")
+        if target_column and target_column not in stats:
+            os.remove(tmp_path)
+            raise ValueError(f"Target column '{target_column}' not found in dataset")
+
+        os.replace(tmp_path, parquet_path)
+        return {
+            'format': 'parquet',
+            'rows': rows,
+            'schema': [{'name': s.name, 'type': str(s.type)} for s in stats.values()],
+            'stats': {name: s.to_dict() for name, s in stats.items()}
+        }
+
+
+class _RetryAsText(Exception):
+    """CSV type inference failed part-way through the file"""
+
+
+def read_columns(parquet_path: str, columns: List[str]) -> pa.Table:
+    """Memory-map just the requested columns of a stored dataset"""
+    available = pq.read_schema(parquet_path).names
+    return pq.read_table(parquet_path, columns=[c for c in columns if c in available], memory_map=True)
+
+
+def read_metadata(parquet_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(metadata_path(parquet_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
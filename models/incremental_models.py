@@ -0,0 +1,80 @@
+"""
+Incrementally Updatable Models for the Auto-Training Pipeline
+=============================================================
+Estimators that can be fully rebuilt or updated with only the rows that
+arrived since the previous training cycle.
+"""
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.utils.class_weight import compute_class_weight
+
+
+class IncrementalCrisisEnsemble:
+    """
+    Soft-voting ensemble of a warm-start random forest and an MLP.
+
+    fit() rebuilds both members from scratch. partial_fit() grows the forest
+    by `trees_per_update` trees trained on the new rows only and continues
+    the MLP's SGD on them, so an update costs O(new rows). Once the forest
+    reaches `max_trees` the pipeline schedules a full rebuild.
+    """
+
+    def __init__(self, n_estimators: int = 100, trees_per_update: int = 20, max_trees: int = 300,
+                 update_epochs: int = 5, random_state: int = 42):
+        self.n_estimators = n_estimators
+        self.trees_per_update = trees_per_update
+        self.max_trees = max_trees
+        self.update_epochs = update_epochs
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        self.classes_ = np.unique(y)
+        self.scaler_ = StandardScaler().fit(X)
+        # Balanced weights from the full history; warm-start batches reuse them
+        weights = compute_class_weight('balanced', classes=self.classes_, y=y)
+        self.forest_ = RandomForestClassifier(
+            n_estimators=self.n_estimators,
+            max_depth=10,
+            class_weight=dict(zip(self.classes_.tolist(), weights)),
+            warm_start=True,
+            random_state=self.random_state
+        ).fit(X, y)
+        self.mlp_ = MLPClassifier(
+            hidden_layer_sizes=(50, 25),
+            activation='relu',
+            max_iter=500,
+            random_state=self.random_state
+        ).fit(self.scaler_.transform(X), y)
+        self.samples_seen_ = len(X)
+        self.updates_ = 0
+        return self
+
+    def partial_fit(self, X, y):
+        X = np.asarray(X, dtype=np.float64)
+        # Warm-start trees must see every class or the forest's classes_ change
+        if np.array_equal(np.unique(y), self.classes_):
+            self.forest_.n_estimators += self.trees_per_update
+            self.forest_.fit(X, y)
+
+        scaled = self.scaler_.transform(X)
+        for _ in range(self.update_epochs):
+            self.mlp_.partial_fit(scaled, y, classes=self.classes_)
+
+        self.samples_seen_ += len(X)
+        self.updates_ += 1
+        return self
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return (self.forest_.predict_proba(X) + self.mlp_.predict_proba(self.scaler_.transform(X))) / 2
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return self.forest_.n_estimators >= self.max_trees
@@ -0,0 +1,128 @@
+"""
+Lazy Service Loading for MindMend
+=================================
+Module-level singletons that are imported and constructed on first use
+instead of when app.py is imported.
+
+- `lazy_service('ai_manager', 'models.ai_manager:ai_manager')` returns a
+  proxy that stands in for the instance wherever it used to be bound at
+  import time. The first attribute access imports the module and builds
+  the object under a lock; a target naming a class is instantiated, any
+  other object (e.g. an existing module singleton) is used as is.
+- Proxies are registered by name in `services`, so modules asking for the
+  same service share one instance and status pages can report what has
+  been loaded without forcing anything.
+- `services.preload()` builds everything up front. Under a prefork server
+  (gunicorn --preload, PRELOAD_SERVICES=1) that happens once in the master
+  and workers inherit the result instead of paying for it on their first
+  request.
+"""
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LazyService:
+    """Proxy that resolves `module:attribute` the first time it is used"""
+
+    __slots__ = ('_name', '_target', '_instance', '_lock', '_load_seconds')
+
+    def __init__(self, name: str, target: str):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_instance', _MISSING)
+        object.__setattr__(self, '_lock', threading.Lock())
+        object.__setattr__(self, '_load_seconds', None)
+
+    def _build(self):
+        module_name, _, attribute = self._target.partition(':')
+        obj = importlib.import_module(module_name)
+        if attribute:
+            obj = getattr(obj, attribute)
+        return obj() if isinstance(obj, type) else obj
+
+    def _resolve(self):
+        instance = self._instance
+        if instance is _MISSING:
+            with self._lock:
+                instance = self._instance
+                if instance is _MISSING:
+                    started = time.perf_counter()
+                    instance = self._build()
+                    object.__setattr__(self, '_load_seconds', time.perf_counter() - started)
+                    object.__setattr__(self, '_instance', instance)
+                    logger.info(f"Loaded {self._name} in {self._load_seconds * 1000:.0f} ms")
+        return instance
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not _MISSING
+
+    def __getattr__(self, attribute):
+        return getattr(self._resolve(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._resolve(), attribute, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __bool__(self):
+        return bool(self._resolve())
+
+    def __repr__(self):
+        state = repr(self._instance) if self.loaded else 'not loaded'
+        return f'<LazyService {self._name} ({state})>'
+
+
+class ServiceRegistry:
+    """Named lazy services with bulk preloading"""
+
+    def __init__(self):
+        self._services: Dict[str, LazyService] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, target: str) -> LazyService:
+        with self._lock:
+            service = self._services.get(name)
+            if service is None:
+                service = self._services[name] = LazyService(name, target)
+            elif service._target != target:
+                raise ValueError(f"Service {name} is already registered for {service._target}")
+        return service
+
+    def get(self, name: str) -> Any:
+        return self._services[name]._resolve()
+
+    def preload(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """Build the named (default: all) services; failures are logged and left lazy"""
+        timings = {}
+        for name in list(names or self._services):
+            try:
+                self._services[name]._resolve()
+                timings[name] = self._services[name]._load_seconds or 0.0
+            except Exception as e:
+                logger.error(f"Preloading {name} failed: {e}")
+        return timings
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {'target': service._target, 'loaded': service.loaded, 'load_seconds': service._load_seconds}
+            for name, service in self._services.items()
+        }
+
+
+# Global registry of lazily constructed services
+services = ServiceRegistry()
+
+
+def lazy_service(name: str, target: str) -> LazyService:
+    """Register (or look up) a lazily constructed service"""
+    return services.register(name, target)
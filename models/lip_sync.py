@@ -0,0 +1,168 @@
+"""
+Lip-Sync Timelines for the Speaking Avatar
+==========================================
+Turns response text into the word-level mouth-shape timeline the avatar
+animates against.
+
+- The phoneme table is compiled once into a single regular expression with
+  digraphs ahead of single letters, so "th" maps to tongue_teeth instead of
+  the "t" that a character-by-character scan would stop at. The mouth shape
+  of each distinct word is memoized.
+- LipSyncEngine keeps an LRU of finished timelines keyed by text. Greetings,
+  fallbacks and other canned replies are generated once per process.
+- LipSyncStream builds the timeline incrementally from streamed text deltas,
+  emitting each word once the whitespace after it arrives. Fed a whole reply
+  it produces exactly what LipSyncEngine.timeline() would.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Simplified phoneme mapping for lip sync; multi-letter entries win over single letters
+MOUTH_SHAPES = {
+    'th': 'tongue_teeth',
+    'a': 'open_wide',
+    'e': 'open_medium',
+    'i': 'closed_smile',
+    'o': 'rounded_open',
+    'u': 'rounded_closed',
+    'm': 'lips_together',
+    'p': 'lips_together',
+    'b': 'lips_together',
+    'f': 'lower_lip_teeth',
+    'v': 'lower_lip_teeth',
+    's': 'teeth_together',
+    'z': 'teeth_together',
+    'l': 'tongue_tip',
+    'n': 'tongue_tip',
+    't': 'tongue_tip',
+    'd': 'tongue_tip'
+}
+NEUTRAL_SHAPE = 'neutral'
+
+SECONDS_PER_LETTER = 0.1  # Rough timing
+WORD_PAUSE = 0.1  # Brief pause between words
+SYNC_ACCURACY = 'simplified'  # In production, use advanced phoneme analysis
+
+_PHONEME_RE = re.compile('|'.join(re.escape(phoneme) for phoneme in
+                                  sorted(MOUTH_SHAPES, key=len, reverse=True)))
+_WHITESPACE_RE = re.compile(r'\s')
+
+# Mouth shape by word as spoken; bounded so unusual vocabulary cannot grow it forever
+_WORD_SHAPES: Dict[str, str] = {}
+MAX_WORD_SHAPES = 8192
+
+
+def mouth_shape(word: str) -> str:
+    """Shape of the first phoneme in the word that has one"""
+    shape = _WORD_SHAPES.get(word)
+    if shape is None:
+        match = _PHONEME_RE.search(word.lower())
+        shape = MOUTH_SHAPES[match.group()] if match else NEUTRAL_SHAPE
+        if len(_WORD_SHAPES) >= MAX_WORD_SHAPES:
+            _WORD_SHAPES.clear()
+        _WORD_SHAPES[word] = shape
+    return shape
+
+
+def _entries(words: Iterable[str], current_time: float) -> Tuple[List[Dict[str, Any]], float]:
+    entries = []
+    append = entries.append
+    for word in words:
+        word_duration = len(word) * SECONDS_PER_LETTER
+        shape = _WORD_SHAPES.get(word) or mouth_shape(word)
+        append({'start_time': current_time, 'end_time': current_time + word_duration,
+                'mouth_shape': shape, 'word': word})
+        current_time += word_duration + WORD_PAUSE
+    return entries, current_time
+
+
+class LipSyncStream:
+    """Incremental timeline for text arriving in deltas"""
+
+    def __init__(self, start_time: float = 0.0):
+        self.current_time = start_time
+        self._pending = ''
+
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        """Timeline entries for the words completed by this delta"""
+        text = self._pending + delta
+        if not _WHITESPACE_RE.search(delta):
+            self._pending = text
+            return []
+        words = text.split()
+        # The last word may continue in the next delta
+        self._pending = words.pop() if words and not text[-1].isspace() else ''
+        entries, self.current_time = _entries(words, self.current_time)
+        return entries
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Entry for the final word once the stream has ended"""
+        words = [self._pending] if self._pending else []
+        self._pending = ''
+        entries, self.current_time = _entries(words, self.current_time)
+        return entries
+
+
+class LipSyncEngine:
+    """Timeline generation with an LRU of recently spoken texts"""
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.environ.get('LIP_SYNC_CACHE_ENTRIES', 512))
+        self._timelines: "OrderedDict[str, Tuple[List[Dict[str, Any]], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def timeline(self, text: str) -> Dict[str, Any]:
+        """Lip-sync data for the whole text
+
+        The timeline list is shared with the cache and later callers; treat it as read-only.
+        """
+        with self._lock:
+            cached = self._timelines.get(text)
+            if cached is not None:
+                self._timelines.move_to_end(text)
+                self.hits += 1
+
+        if cached is None:
+            cached = _entries(text.split(), 0)
+            with self._lock:
+                self.misses += 1
+                self._timelines[text] = cached
+                while len(self._timelines) > self.max_entries:
+                    self._timelines.popitem(last=False)
+
+        entries, total_duration = cached
+        return {
+            'timeline': entries,
+            'total_duration': total_duration,
+            'sync_accuracy': SYNC_ACCURACY
+        }
+
+    def stream(self, start_time: float = 0.0) -> LipSyncStream:
+        return LipSyncStream(start_time)
+
+    def warm(self, texts: Iterable[str]):
+        """Precompute timelines for canned phrases"""
+        for text in texts:
+            self.timeline(text)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached = len(self._timelines)
+        lookups = self.hits + self.misses
+        return {
+            'cached_timelines': cached,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'word_shapes': len(_WORD_SHAPES)
+        }
+
+
+lip_sync_engine = LipSyncEngine()
@@ -0,0 +1,277 @@
+"""
+Incremental Log Analyzer for MindMend Monitoring
+================================================
+Tails a log file between monitoring cycles instead of re-reading it.
+
+- Remembers the byte offset and inode of the file, persisted next to it
+  as `<log>.analyzer-<N>m.json` so one-shot cron runs resume too. A new
+  inode means the file was rotated: the rest of the old file is drained
+  from `<log>.1` when it is still there, then the new file is read from
+  the start. A file shorter than the offset was truncated in place and is
+  re-read from the start.
+- Timestamps are parsed from Python logging (`2025-09-15 08:57:21,123`),
+  gunicorn (`[2025-09-15 08:57:21 +0000]`) and access-log
+  (`[15/Sep/2025:08:57:21 +0000]`) lines; lines without one (tracebacks,
+  bare `LEVEL:name:msg` output) inherit the previous line's time.
+- Errors, warnings and requests land in a ring of per-minute buckets that
+  covers the window; running totals and top-error counts are adjusted as
+  buckets enter and leave it, so producing the report does not depend on
+  how large the file is.
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LEVEL_RE = re.compile(r'\b(CRITICAL|ERROR|WARNING)\b')
+REQUEST_RE = re.compile(r'"(?:GET|POST|PUT|DELETE|PATCH) ')
+ASCTIME_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2})')
+BRACKET_ISO_RE = re.compile(r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) ([+-]\d{4})\]')
+ACCESS_RE = re.compile(r'\[(\d{2}/\w{3}/\d{4}:\d{2}:\d{2}:\d{2}) ([+-]\d{4})\]')
+VARIABLE_RE = re.compile(r'0x[0-9a-fA-F]+|\d+')
+
+MAX_SIGNATURES = 500
+
+
+def parse_timestamp(line: str) -> Optional[float]:
+    """Epoch seconds for a log line, or None when it carries no timestamp"""
+    try:
+        match = ASCTIME_RE.match(line)
+        if match:
+            return time.mktime(time.strptime(match.group(1).replace('T', ' '), '%Y-%m-%d %H:%M:%S'))
+        match = BRACKET_ISO_RE.search(line)
+        if match:
+            return datetime.strptime(' '.join(match.groups()), '%Y-%m-%d %H:%M:%S %z').timestamp()
+        match = ACCESS_RE.search(line)
+        if match:
+            return datetime.strptime(' '.join(match.groups()), '%d/%b/%Y:%H:%M:%S %z').timestamp()
+    except ValueError:
+        pass
+    return None
+
+
+def error_signature(line: str, level_end: int) -> str:
+    """Message after the level marker with numbers and ids folded together"""
+    message = line[level_end:].lstrip(' :-]').strip()
+    return VARIABLE_RE.sub('N', message)[:80]
+
+
+class LogTailAnalyzer:
+    """Per-minute error/warning/request counts for the last `window_seconds` of a log"""
+
+    def __init__(self, path: str, window_seconds: int = 3600, state_path: Optional[str] = None,
+                 initial_backfill_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.window_minutes = max(1, window_seconds // 60)
+        self.state_path = state_path or f'{path}.analyzer-{self.window_minutes}m.json'
+        self.initial_backfill_bytes = initial_backfill_bytes
+
+        self.inode = None
+        self.offset = 0
+        self.last_timestamp = None
+        self._reset_buckets()
+        self._load_state()
+
+    def _reset_buckets(self):
+        size = self.window_minutes
+        self.minutes = [None] * size
+        self.errors = [0] * size
+        self.warnings = [0] * size
+        self.requests = [0] * size
+        self.signatures = [Counter() for _ in range(size)]
+        self.totals = {'errors': 0, 'warnings': 0, 'requests': 0}
+        self.top_errors = Counter()
+
+    # State
+
+    def _load_state(self):
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        if state.get('window_minutes') != self.window_minutes:
+            return
+        self.inode = state['inode']
+        self.offset = state['offset']
+        self.last_timestamp = state.get('last_timestamp')
+        for bucket in state['buckets']:
+            self._open_bucket(bucket['minute'])
+            slot = bucket['minute'] % self.window_minutes
+            self._add(slot, 'errors', bucket['errors'])
+            self._add(slot, 'warnings', bucket['warnings'])
+            self._add(slot, 'requests', bucket['requests'])
+            for signature, count in bucket['signatures'].items():
+                self.signatures[slot][signature] += count
+                self.top_errors[signature] += count
+
+    def _save_state(self):
+        state = {
+            'inode': self.inode,
+            'offset': self.offset,
+            'last_timestamp': self.last_timestamp,
+            'window_minutes': self.window_minutes,
+            'buckets': [{
+                'minute': minute,
+                'errors': self.errors[slot],
+                'warnings': self.warnings[slot],
+                'requests': self.requests[slot],
+                'signatures': dict(self.signatures[slot])
+            } for slot, minute in enumerate(self.minutes) if minute is not None]
+        }
+        try:
+            tmp_path = f'{self.state_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not persist log analyzer state: {e}")
+
+    # Buckets
+
+    def _add(self, slot: int, field: str, count: int):
+        getattr(self, field)[slot] += count
+        self.totals[field] += count
+
+    def _clear_slot(self, slot: int):
+        for field in ('errors', 'warnings', 'requests'):
+            self.totals[field] -= getattr(self, field)[slot]
+            getattr(self, field)[slot] = 0
+        self.top_errors.subtract(self.signatures[slot])
+        self.top_errors += Counter()  # drop non-positive counts
+        self.signatures[slot] = Counter()
+        self.minutes[slot] = None
+
+    def _open_bucket(self, minute: int) -> Optional[int]:
+        """Slot for `minute`, evicting the minute it replaces; None if too old for the ring"""
+        slot = minute % self.window_minutes
+        current = self.minutes[slot]
+        if current == minute:
+            return slot
+        if current is not None:
+            if current > minute:
+                return None
+            self._clear_slot(slot)
+        self.minutes[slot] = minute
+        return slot
+
+    def _expire(self, now: float):
+        oldest = int(now // 60) - self.window_minutes + 1
+        for slot, minute in enumerate(self.minutes):
+            if minute is not None and minute < oldest:
+                self._clear_slot(slot)
+
+    # Reading
+
+    def _ingest(self, line: str):
+        timestamp = parse_timestamp(line)
+        if timestamp is None:
+            timestamp = self.last_timestamp if self.last_timestamp is not None else time.time()
+        else:
+            self.last_timestamp = timestamp
+
+        level = LEVEL_RE.search(line)
+        is_request = REQUEST_RE.search(line) is not None
+        if not level and not is_request:
+            return
+
+        slot = self._open_bucket(int(timestamp // 60))
+        if slot is None:
+            return
+        if is_request:
+            self._add(slot, 'requests', 1)
+        if level is None:
+            return
+        if level.group(1) == 'WARNING':
+            self._add(slot, 'warnings', 1)
+            return
+
+        self._add(slot, 'errors', 1)
+        signature = error_signature(line, level.end())
+        if signature in self.top_errors or len(self.top_errors) < MAX_SIGNATURES:
+            self.signatures[slot][signature] += 1
+            self.top_errors[signature] += 1
+
+    def _read_from(self, path: str, offset: int) -> int:
+        """Ingest complete lines after `offset`; returns the offset after the last one"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            pending = b''
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                lines = (pending + chunk).split(b'\n')
+                pending = lines.pop()
+                for raw in lines:
+                    self._ingest(raw.decode('utf-8', 'replace'))
+                    offset += len(raw) + 1
+        return offset
+
+    def _start_offset(self, path: str, size: int) -> int:
+        """Where to start on a file seen for the first time: at most the backfill budget from its end"""
+        if size <= self.initial_backfill_bytes:
+            return 0
+        with open(path, 'rb') as f:
+            f.seek(size - self.initial_backfill_bytes)
+            f.readline()  # skip the partial line
+            return f.tell()
+
+    def poll(self) -> bool:
+        """Read whatever was appended since the previous poll"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+
+        if self.inode is None:
+            self.offset = self._start_offset(self.path, stat.st_size)
+        elif stat.st_ino != self.inode:
+            rotated = f'{self.path}.1'
+            try:
+                if os.stat(rotated).st_ino == self.inode:
+                    self._read_from(rotated, self.offset)
+            except OSError:
+                pass
+            self.offset = 0
+        elif stat.st_size < self.offset:
+            self.offset = 0
+
+        self.inode = stat.st_ino
+        self.offset = self._read_from(self.path, self.offset)
+        return True
+
+    def analyze(self, now: Optional[float] = None) -> Dict:
+        """Poll the file and report the window; cost is bounded by the window size"""
+        if not self.poll():
+            return {"error": "Log file not found"}
+        now = now if now is not None else time.time()
+        self._expire(now)
+        self._save_state()
+
+        current = int(now // 60)
+        per_minute = []
+        for minute in range(current - self.window_minutes + 1, current + 1):
+            slot = minute % self.window_minutes
+            if self.minutes[slot] == minute:
+                per_minute.append({
+                    'minute': datetime.fromtimestamp(minute * 60).isoformat(),
+                    'errors': self.errors[slot],
+                    'warnings': self.warnings[slot],
+                    'requests': self.requests[slot]
+                })
+
+        return {
+            "error_count": self.totals['errors'],
+            "warning_count": self.totals['warnings'],
+            "total_requests": self.totals['requests'],
+            "error_rate": (self.totals['errors'] / max(self.totals['requests'], 1)) * 100,
+            "top_errors": heapq.nlargest(5, self.top_errors.items(), key=lambda item: item[1]),
+            "per_minute": per_minute,
+            "window_seconds": self.window_minutes * 60
+        }
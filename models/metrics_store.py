@@ -0,0 +1,294 @@
+"""
+Monitoring Time-Series Store for MindMend
+=========================================
+Fixed-size numpy ring buffers for the metrics collected by
+MindMendMonitoring, with hourly and daily rollups persisted to disk.
+
+- Raw samples (one row of floats per monitoring cycle) go into a ring of
+  `raw_capacity` rows; the oldest row is overwritten in place, so the
+  store never grows or re-slices.
+- Every sample also feeds running hourly and daily accumulators. When a
+  period closes, its mean and max are appended to the matching rollup
+  ring, so long windows are answered from a few hundred rows.
+- Queries work on (at most two) chronological views of a ring. Means,
+  extremes and least-squares trends are summed per view; only the one
+  column of the requested window is gathered for percentiles.
+"""
+
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FIELDS = (
+    'cpu_percent', 'memory_percent', 'disk_percent', 'bytes_sent', 'bytes_recv', 'process_count',
+    'active_sessions', 'response_time_avg', 'error_rate'
+)
+
+HOUR = 3600
+DAY = 86400
+
+
+class RingSeries:
+    """Fixed-capacity ring of timestamped rows"""
+
+    def __init__(self, capacity: int, width: int):
+        self.timestamps = np.full(capacity, np.nan)
+        self.values = np.full((capacity, width), np.nan)
+        self.head = 0
+        self.size = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, row):
+        self.timestamps[self.head] = timestamp
+        self.values[self.head] = row
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def last_timestamp(self) -> Optional[float]:
+        return float(self.timestamps[self.head - 1]) if self.size else None
+
+    def first_timestamp(self) -> Optional[float]:
+        if not self.size:
+            return None
+        return float(self.timestamps[self.head if self.size == self.capacity else 0])
+
+    def views(self, since: Optional[float] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Chronological (timestamps, values) views of rows at or after `since`, without copying"""
+        if self.size < self.capacity:
+            parts = [slice(0, self.size)]
+        else:
+            parts = [slice(self.head, self.capacity), slice(0, self.head)]
+
+        views = []
+        for part in parts:
+            timestamps = self.timestamps[part]
+            start = int(np.searchsorted(timestamps, since)) if since is not None else 0
+            if start < len(timestamps):
+                views.append((timestamps[start:], self.values[part][start:]))
+        return views
+
+    def state(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {
+            f'{prefix}_timestamps': self.timestamps,
+            f'{prefix}_values': self.values,
+            f'{prefix}_cursor': np.array([self.head, self.size])
+        }
+
+    def restore(self, prefix: str, arrays) -> bool:
+        timestamps = arrays[f'{prefix}_timestamps']
+        values = arrays[f'{prefix}_values']
+        if timestamps.shape != self.timestamps.shape or values.shape != self.values.shape:
+            return False
+        self.timestamps[:] = timestamps
+        self.values[:] = values
+        self.head, self.size = (int(v) for v in arrays[f'{prefix}_cursor'])
+        return True
+
+
+class _PeriodAccumulator:
+    """Running mean/max of the samples in the current hour or day"""
+
+    def __init__(self, period: int, width: int):
+        self.period = period
+        self.start = None
+        self.count = np.zeros(width)
+        self.total = np.zeros(width)
+        self.maximum = np.full(width, -np.inf)
+
+    def add(self, timestamp: float, row: np.ndarray) -> Optional[Tuple[float, np.ndarray]]:
+        """Accumulate a sample; returns the closed period's (start, [means, maxes]) on rollover"""
+        start = math.floor(timestamp / self.period) * self.period
+        closed = None
+        if self.start is not None and start != self.start:
+            closed = self.flush()
+        self.start = start
+
+        present = ~np.isnan(row)
+        self.count[present] += 1
+        self.total[present] += row[present]
+        self.maximum[present] = np.maximum(self.maximum[present], row[present])
+        return closed
+
+    def flush(self) -> Optional[Tuple[float, np.ndarray]]:
+        if self.start is None:
+            return None
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(self.count > 0, self.total / self.count, np.nan)
+        maxes = np.where(self.count > 0, self.maximum, np.nan)
+        closed = (self.start, np.concatenate([means, maxes]))
+        self.count[:] = 0
+        self.total[:] = 0
+        self.maximum[:] = -np.inf
+        return closed
+
+    def state(self, prefix: str) -> Dict[str, np.ndarray]:
+        return {
+            f'{prefix}_start': np.array([np.nan if self.start is None else self.start]),
+            f'{prefix}_acc': np.stack([self.count, self.total, self.maximum])
+        }
+
+    def restore(self, prefix: str, arrays):
+        start = float(arrays[f'{prefix}_start'][0])
+        self.start = None if np.isnan(start) else start
+        self.count[:], self.total[:], self.maximum[:] = arrays[f'{prefix}_acc']
+
+
+class MetricsTimeSeries:
+    """Raw ring plus hourly/daily rollups of the monitoring metrics"""
+
+    def __init__(self, path: Optional[str] = None, fields: Iterable[str] = FIELDS,
+                 raw_capacity: int = 1440, hourly_capacity: int = 24 * 30, daily_capacity: int = 365):
+        self.path = path
+        self.fields = tuple(fields)
+        self._index = {field: i for i, field in enumerate(self.fields)}
+        self._capacities = (raw_capacity, hourly_capacity, daily_capacity)
+        self._reset()
+
+        if path:
+            self.load()
+
+    def _reset(self):
+        width = len(self.fields)
+        raw_capacity, hourly_capacity, daily_capacity = self._capacities
+        self.raw = RingSeries(raw_capacity, width)
+        self.hourly = RingSeries(hourly_capacity, 2 * width)
+        self.daily = RingSeries(daily_capacity, 2 * width)
+        self._hour = _PeriodAccumulator(HOUR, width)
+        self._day = _PeriodAccumulator(DAY, width)
+
+    # Writing
+
+    def record(self, sample: Dict[str, Any], timestamp: Optional[float] = None):
+        """Append one sample; missing or None fields are stored as NaN"""
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        last = self.raw.last_timestamp()
+        if last is not None and timestamp <= last:
+            logger.warning("Dropping out-of-order metrics sample")
+            return
+
+        row = np.array([np.nan if sample.get(field) is None else float(sample[field]) for field in self.fields])
+        self.raw.append(timestamp, row)
+
+        closed = self._hour.add(timestamp, row)
+        if closed:
+            self.hourly.append(*closed)
+        closed = self._day.add(timestamp, row)
+        if closed:
+            self.daily.append(*closed)
+
+    def save(self):
+        if not self.path:
+            return
+        arrays = {'fields': np.array(self.fields)}
+        for prefix, ring in (('raw', self.raw), ('hourly', self.hourly), ('daily', self.daily)):
+            arrays.update(ring.state(prefix))
+        arrays.update(self._hour.state('hour'))
+        arrays.update(self._day.state('day'))
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, self.path)
+
+    def load(self) -> bool:
+        try:
+            with np.load(self.path) as arrays:
+                if tuple(arrays['fields'].tolist()) != self.fields:
+                    logger.warning("Metrics store fields changed; starting a new history")
+                    return False
+                restored = all([self.raw.restore('raw', arrays), self.hourly.restore('hourly', arrays),
+                                self.daily.restore('daily', arrays)])
+                if not restored:
+                    logger.warning("Metrics store capacity changed; starting a new history")
+                    self._reset()
+                    return False
+                self._hour.restore('hour', arrays)
+                self._day.restore('day', arrays)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Error loading metrics store: {e}")
+            return False
+
+    # Querying
+
+    def _source(self, seconds: float, now: float) -> Tuple[str, RingSeries]:
+        """Finest series whose history covers the window"""
+        since = now - seconds
+        for resolution, series in (('raw', self.raw), ('hourly', self.hourly)):
+            first = series.first_timestamp()
+            if first is not None and (first <= since or series.size < series.capacity):
+                return resolution, series
+        return 'daily', self.daily
+
+    def latest(self) -> Dict[str, Optional[float]]:
+        if not self.raw.size:
+            return {}
+        row = self.raw.values[self.raw.head - 1]
+        return {field: None if np.isnan(row[i]) else float(row[i]) for i, field in enumerate(self.fields)}
+
+    def summary(self, field: str, seconds: float, now: Optional[float] = None,
+                percentiles: Tuple[int, ...] = (50, 95, 99)) -> Dict[str, Any]:
+        """Mean/min/max/percentiles and trend (change per hour) of one field over the last `seconds`"""
+        now = time.time() if now is None else now
+        resolution, series = self._source(seconds, now)
+        column = self._index[field]
+        # Rollup rows hold the period means followed by the period maxima
+        max_column = column if resolution == 'raw' else column + len(self.fields)
+        views = series.views(since=now - seconds)
+
+        count = 0
+        total = minimum = maximum = None
+        sums = np.zeros(5)  # n, Σt, Σy, Σty, Σt²
+        columns = []
+        for timestamps, values in views:
+            y = values[:, column]
+            present = ~np.isnan(y)
+            if not present.any():
+                continue
+            peak = float(np.nanmax(values[:, max_column]))
+            y, t = y[present], (timestamps[present] - now) / HOUR
+            columns.append(y)
+            count += len(y)
+            total = (total or 0.0) + float(y.sum())
+            minimum = float(y.min()) if minimum is None else min(minimum, float(y.min()))
+            maximum = peak if maximum is None else max(maximum, peak)
+            sums += (len(y), t.sum(), y.sum(), (t * y).sum(), (t * t).sum())
+
+        result = {'resolution': resolution, 'samples': count, 'mean': None, 'min': minimum,
+                  'max': maximum, 'trend_per_hour': None}
+        result.update({f'p{q}': None for q in percentiles})
+        if not count:
+            return result
+
+        result['mean'] = total / count
+        values = columns[0] if len(columns) == 1 else np.concatenate(columns)
+        for q, value in zip(percentiles, np.percentile(values, percentiles)):
+            result[f'p{q}'] = float(value)
+
+        n, st, sy, sty, stt = sums
+        denominator = n * stt - st * st
+        if n > 1 and denominator > 0:
+            result['trend_per_hour'] = float((n * sty - st * sy) / denominator)
+        return result
+
+    def report(self, fields: Iterable[str] = ('cpu_percent', 'memory_percent', 'disk_percent',
+                                              'response_time_avg', 'error_rate'),
+               windows: Dict[str, int] = None, now: Optional[float] = None) -> Dict[str, Any]:
+        """Summaries of several fields over several windows, for the health report"""
+        windows = windows or {'1h': HOUR, '24h': DAY, '7d': 7 * DAY}
+        now = time.time() if now is None else now
+        return {field: {name: self.summary(field, seconds, now) for name, seconds in windows.items()}
+                for field in fields}
@@ -0,0 +1,242 @@
+"""
+Custom Model Inference Server for MindMend
+==========================================
+Serves predictions for deployed CustomAIModel records without touching disk
+or writing to the database on every call.
+
+- Unpickled estimators and vectorizers are kept in an LRU cache keyed by
+  (model id, model file, vectorizer file), so a retrain that writes new
+  files naturally misses the cache and the stale entry ages out.
+- A batch is vectorized with one transform and scored with one
+  predict_proba (or predict) call.
+- prediction_count increments accumulate in memory and are flushed to the
+  database with one UPDATE per model every `flush_interval` seconds.
+"""
+
+import atexit
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, update
+
+from models.database import db
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadedModel:
+    """An unpickled estimator and its (optional) vectorizer"""
+    model_id: int
+    name: str
+    estimator: Any
+    vectorizer: Any
+    loaded_at: float
+
+
+def _to_python(value):
+    """numpy scalars are not JSON serialisable"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class InferenceServer:
+    """LRU model cache, batched prediction and buffered usage counters"""
+
+    def __init__(self, max_models: int = None, flush_interval: float = None):
+        self.max_models = max_models or int(os.environ.get('INFERENCE_CACHE_MODELS', 8))
+        self.flush_interval = flush_interval if flush_interval is not None else \
+            float(os.environ.get('INFERENCE_COUNTER_FLUSH_SECONDS', 30))
+
+        self._models: "OrderedDict[tuple, LoadedModel]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._load_locks: Dict[tuple, threading.Lock] = {}
+
+        self._counts = Counter()
+        self._counts_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._app = None
+
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Model cache
+    # ------------------------------------------------------------------
+
+    def _load(self, key, name) -> LoadedModel:
+        model_id, model_path, vectorizer_path = key
+        with open(model_path, 'rb') as f:
+            estimator = pickle.load(f)
+
+        vectorizer = None
+        if vectorizer_path and os.path.exists(vectorizer_path):
+            with open(vectorizer_path, 'rb') as f:
+                vectorizer = pickle.load(f)
+
+        return LoadedModel(model_id, name, estimator, vectorizer, time.time())
+
+    def get_model(self, model_id: int, model_path: str, vectorizer_path: Optional[str],
+                  name: str = '') -> LoadedModel:
+        """Return a cached model, loading it (once per key) on a miss"""
+        key = (model_id, model_path, vectorizer_path)
+        with self._cache_lock:
+            loaded = self._models.get(key)
+            if loaded is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return loaded
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Concurrent misses for the same model wait for a single unpickle
+        with load_lock:
+            with self._cache_lock:
+                loaded = self._models.get(key)
+                if loaded is not None:
+                    self.hits += 1
+                    return loaded
+            loaded = self._load(key, name)
+            with self._cache_lock:
+                self.misses += 1
+                self._models[key] = loaded
+                self._models.move_to_end(key)
+                while len(self._models) > self.max_models:
+                    evicted, _ = self._models.popitem(last=False)
+                    self._load_locks.pop(evicted, None)
+                self._load_locks.pop(key, None)
+            return loaded
+
+    def evict(self, model_id: int):
+        """Drop every cached version of a model"""
+        with self._cache_lock:
+            for key in [k for k in self._models if k[0] == model_id]:
+                del self._models[key]
+
+    # ------------------------------------------------------------------
+    # Prediction
+    # ------------------------------------------------------------------
+
+    def _lookup(self, model_id: int, require_deployed: bool):
+        from models.custom_ai_builder import CustomAIModel
+
+        row = db.session.query(
+            CustomAIModel.id, CustomAIModel.name, CustomAIModel.status,
+            CustomAIModel.model_file_path, CustomAIModel.vectorizer_file_path
+        ).filter(CustomAIModel.id == model_id).first()
+
+        if not row or (require_deployed and row.status != 'deployed'):
+            raise ValueError("Model not deployed or not found")
+        if not row.model_file_path:
+            raise ValueError("Model has not been trained")
+        return row
+
+    def predict_batch(self, model_id: int, inputs: List[str],
+                      require_deployed: bool = True) -> List[Dict[str, Any]]:
+        """Predict a batch with one transform and one predict_proba call"""
+        if not inputs:
+            return []
+
+        row = self._lookup(model_id, require_deployed)
+        loaded = self.get_model(row.id, row.model_file_path, row.vectorizer_file_path, row.name)
+        estimator = loaded.estimator
+
+        X = loaded.vectorizer.transform(inputs) if loaded.vectorizer else inputs
+
+        if hasattr(estimator, 'predict_proba'):
+            proba = estimator.predict_proba(X)
+            best = proba.argmax(axis=1)
+            predictions = estimator.classes_[best]
+            confidences = proba[np.arange(len(best)), best]
+        else:
+            predictions = estimator.predict(X)
+            confidences = [None] * len(inputs)
+
+        self._count(model_id, len(inputs))
+
+        return [{
+            'success': True,
+            'prediction': _to_python(prediction),
+            'confidence': _to_python(confidence),
+            'model_name': loaded.name
+        } for prediction, confidence in zip(predictions, confidences)]
+
+    # ------------------------------------------------------------------
+    # Usage counters
+    # ------------------------------------------------------------------
+
+    def _count(self, model_id: int, n: int):
+        with self._counts_lock:
+            self._counts[model_id] += n
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+
+        if self._app is None:
+            self._register_exit_flush()
+        if due:
+            self.flush()
+
+    def _register_exit_flush(self):
+        try:
+            from flask import current_app
+            self._app = current_app._get_current_object()
+        except RuntimeError:
+            return
+        atexit.register(self._flush_at_exit)
+
+    def _flush_at_exit(self):
+        if self._app is not None:
+            with self._app.app_context():
+                self.flush()
+
+    def pending_count(self, model_id: int) -> int:
+        with self._counts_lock:
+            return self._counts.get(model_id, 0)
+
+    def flush(self) -> int:
+        """Write accumulated prediction counts; returns the number flushed"""
+        from models.custom_ai_builder import CustomAIModel
+
+        with self._counts_lock:
+            counts, self._counts = self._counts, Counter()
+            self._last_flush = time.monotonic()
+        if not counts:
+            return 0
+
+        table = CustomAIModel.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    update(table)
+                    .where(table.c.id == bindparam('model_id'))
+                    .values(prediction_count=db.func.coalesce(table.c.prediction_count, 0) + bindparam('n')),
+                    [{'model_id': model_id, 'n': n} for model_id, n in counts.items()]
+                )
+        except Exception as e:
+            # Keep the counts for the next attempt
+            logger.error(f"Prediction counter flush failed: {e}")
+            with self._counts_lock:
+                self._counts.update(counts)
+            return 0
+        return sum(counts.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            cached = [{'model_id': m.model_id, 'name': m.name, 'loaded_at': m.loaded_at}
+                      for m in self._models.values()]
+        with self._counts_lock:
+            pending = dict(self._counts)
+        return {
+            'cached_models': cached,
+            'max_models': self.max_models,
+            'hits': self.hits,
+            'misses': self.misses,
+            'pending_prediction_counts': pending
+        }
+
+
+inference_server = InferenceServer()
@@ -23,6 +23,8 @@ from collections import defaultdict
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
+from models.crisis_features import crisis_feature_dict
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -256,50 +258,7 @@ class ModelTrainingAnalytics:
 
     def _extract_crisis_features(self, text: str) -> Dict[str, Any]:
         """Extract features indicative of crisis from text"""
-
-        crisis_keywords = {
-            'immediate': ['suicide', 'kill myself', 'end it all', 'can\'t go on',
-                         'want to die', 'no point', 'worthless', 'hopeless'],
-            'high': ['self harm', 'hurt myself', 'cutting', 'overdose',
-                    'pills', 'jump', 'gun', 'rope'],
-            'medium': ['depressed', 'anxious', 'panic', 'scared', 'alone',
-                      'nobody cares', 'burden', 'failure'],
-            'warning': ['tired', 'exhausted', 'giving up', 'done trying',
-                       'goodbye', 'sorry', 'forgive me']
-        }
-
-        features = {
-            'text_length': len(text),
-            'word_count': len(text.split()),
-            'exclamation_marks': text.count('!'),
-            'question_marks': text.count('?'),
-            'all_caps_ratio': sum(1 for c in text if c.isupper()) / max(len(text), 1),
-            'crisis_keywords': {},
-            'sentiment_indicators': {}
-        }
-
-        # Check for crisis keywords
-        text_lower = text.lower()
-        for severity, keywords in crisis_keywords.items():
-            features['crisis_keywords'][severity] = sum(
-                1 for keyword in keywords if keyword in text_lower
-            )
-
-        # Add sentiment indicators
-        negative_words = ['not', 'no', 'never', 'nothing', 'nobody', 'nowhere']
-        features['sentiment_indicators']['negation_count'] = sum(
-            1 for word in negative_words if word in text_lower.split()
-        )
-
-        # Calculate urgency score
-        features['urgency_score'] = (
-            features['crisis_keywords'].get('immediate', 0) * 10 +
-            features['crisis_keywords'].get('high', 0) * 5 +
-            features['crisis_keywords'].get('medium', 0) * 2 +
-            features['crisis_keywords'].get('warning', 0)
-        )
-
-        return features
+        return crisis_feature_dict(text)
 
     def _calculate_severity(self, risk_level: Optional[str]) -> int:
         """Convert risk level to severity score"""
@@ -0,0 +1,294 @@
+"""
+Peer Matching Engine
+====================
+Vectorized peer matching for SocialConnectionManager.
+
+Profiles are encoded once into columnar numpy arrays: conditions and
+interests as bit-packed uint8 rows, therapy stage as a small integer code and
+age as float32. Candidate sets come from inverted indexes on connection type,
+availability slot and location, are scored in fixed-size blocks with the same
+formula as SocialConnectionManager._calculate_compatibility, and the best k
+are kept in a bounded heap.
+"""
+
+import heapq
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Population count of every byte value, used to count shared bits
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+THERAPY_STAGES = ['beginning', 'active_treatment', 'maintenance']
+
+STAGE_COMPATIBILITY = {
+    ("beginning", "beginning"): 0.9,
+    ("beginning", "active_treatment"): 0.7,
+    ("active_treatment", "active_treatment"): 0.95,
+    ("active_treatment", "maintenance"): 0.8,
+    ("maintenance", "maintenance"): 0.85
+}
+
+DEFAULT_STAGE_SCORE = 0.5
+
+
+class _Vocabulary:
+    """Term -> bit position, growing in whole bytes"""
+
+    def __init__(self):
+        self.positions: Dict[str, int] = {}
+
+    def add(self, terms) -> bool:
+        """Register terms; returns True when the packed width had to grow"""
+        width = self.nbytes
+        for term in terms:
+            if term not in self.positions:
+                self.positions[term] = len(self.positions)
+        return self.nbytes != width
+
+    @property
+    def nbytes(self) -> int:
+        return max(1, (len(self.positions) + 7) // 8)
+
+    def pack(self, terms) -> np.ndarray:
+        bits = np.zeros(self.nbytes * 8, dtype=np.uint8)
+        for term in terms:
+            position = self.positions.get(term)
+            if position is not None:
+                bits[position] = 1
+        return np.packbits(bits)
+
+
+class PeerMatchingEngine:
+    """In-memory profile index with vectorized block scoring"""
+
+    def __init__(self, block_size: int = 8192, initial_capacity: int = 1024):
+        self.block_size = block_size
+        self.initial_capacity = initial_capacity
+        self._lock = threading.RLock()
+
+        self.conditions = _Vocabulary()
+        self.interests = _Vocabulary()
+        self.stage_codes = {stage: code for code, stage in enumerate(THERAPY_STAGES)}
+        self._stage_table = self._build_stage_table()
+
+        self.count = 0
+        self.capacity = 0
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.ages = np.empty(0, dtype=np.float32)
+        self.stages = np.empty(0, dtype=np.int16)
+        self.condition_bits = np.empty((0, 1), dtype=np.uint8)
+        self.interest_bits = np.empty((0, 1), dtype=np.uint8)
+
+        self.profiles: Dict[int, Dict[str, Any]] = {}
+        self._row_of: Dict[int, int] = {}
+
+        # Inverted indexes: key -> set of user ids
+        self.by_connection_type: Dict[str, set] = {}
+        self.by_availability: Dict[str, set] = {}
+        self.by_state: Dict[str, set] = {}
+        self.by_city: Dict[str, set] = {}
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def _build_stage_table(self) -> np.ndarray:
+        size = len(self.stage_codes) + 1  # last code is "unknown"
+        table = np.full((size, size), DEFAULT_STAGE_SCORE, dtype=np.float32)
+        for (first, second), score in STAGE_COMPATIBILITY.items():
+            table[self.stage_codes[first], self.stage_codes[second]] = score
+        return table
+
+    def _stage_code(self, stage: Optional[str]) -> int:
+        return self.stage_codes.get(stage, len(self.stage_codes))
+
+    def _repack(self, name: str, vocabulary: _Vocabulary):
+        """Widen a packed bit matrix after its vocabulary crossed a byte boundary"""
+        old = getattr(self, name)
+        wider = np.zeros((self.capacity, vocabulary.nbytes), dtype=np.uint8)
+        wider[:, :old.shape[1]] = old
+        setattr(self, name, wider)
+
+    def _ensure_capacity(self, needed: int):
+        if needed <= self.capacity:
+            return
+        capacity = max(self.capacity * 2, needed, self.initial_capacity)
+        self.user_ids = np.resize(self.user_ids, capacity)
+        self.ages = np.resize(self.ages, capacity)
+        self.stages = np.resize(self.stages, capacity)
+        for name in ('condition_bits', 'interest_bits'):
+            old = getattr(self, name)
+            grown = np.zeros((capacity, old.shape[1]), dtype=np.uint8)
+            grown[:self.count] = old[:self.count]
+            setattr(self, name, grown)
+        self.capacity = capacity
+
+    @staticmethod
+    def _location_keys(profile: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        location = profile.get("location") or {}
+        state = (location.get("state") or '').upper() or None
+        city = (location.get("city") or '').lower() or None
+        return state, (f"{state}:{city}" if city else None)
+
+    def _postings(self, profile: Dict[str, Any]):
+        """Yield (index, key) pairs a profile is listed under"""
+        for connection_type in profile.get("connection_types") or ['*']:
+            yield self.by_connection_type, connection_type
+        for slot in profile.get("availability") or []:
+            yield self.by_availability, slot
+        state, city = self._location_keys(profile)
+        if state:
+            yield self.by_state, state
+        if city:
+            yield self.by_city, city
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def load(self, profiles: Iterable[Dict[str, Any]]) -> int:
+        """Index many profiles"""
+        with self._lock:
+            for profile in profiles:
+                self.upsert(profile)
+            return self.count
+
+    def upsert(self, profile: Dict[str, Any]):
+        """Insert or replace one profile"""
+        user_id = int(profile["user_id"])
+        with self._lock:
+            if user_id in self._row_of:
+                self.remove(user_id)
+
+            if self.conditions.add(profile.get("conditions") or []):
+                self._repack('condition_bits', self.conditions)
+            if self.interests.add(profile.get("interests") or []):
+                self._repack('interest_bits', self.interests)
+            self._ensure_capacity(self.count + 1)
+
+            row = self.count
+            self.user_ids[row] = user_id
+            self.ages[row] = profile.get("age") or 0
+            self.stages[row] = self._stage_code(profile.get("therapy_stage"))
+            self.condition_bits[row] = self.conditions.pack(profile.get("conditions") or [])
+            self.interest_bits[row] = self.interests.pack(profile.get("interests") or [])
+            self.count += 1
+
+            self._row_of[user_id] = row
+            self.profiles[user_id] = profile
+            for index, key in self._postings(profile):
+                index.setdefault(key, set()).add(user_id)
+
+    def remove(self, user_id: int) -> bool:
+        """Drop a profile, moving the last row into its slot"""
+        with self._lock:
+            row = self._row_of.pop(user_id, None)
+            if row is None:
+                return False
+            profile = self.profiles.pop(user_id)
+            for index, key in self._postings(profile):
+                index.get(key, set()).discard(user_id)
+
+            last = self.count - 1
+            if row != last:
+                for array in (self.user_ids, self.ages, self.stages, self.condition_bits, self.interest_bits):
+                    array[row] = array[last]
+                self._row_of[int(self.user_ids[row])] = row
+            self.count = last
+            return True
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def candidate_rows(self, profile: Dict[str, Any], connection_type: str,
+                       location_scope: Optional[str] = None) -> np.ndarray:
+        """Intersect the inverted indexes to get candidate rows for a user"""
+        candidates = self.by_connection_type.get(connection_type, set()) | \
+            self.by_connection_type.get('*', set())
+
+        slots = profile.get("availability") or []
+        if slots:
+            available = set()
+            for slot in slots:
+                available |= self.by_availability.get(slot, set())
+            candidates &= available
+
+        state, city = self._location_keys(profile)
+        if location_scope == 'city' and city:
+            candidates &= self.by_city.get(city, set())
+        elif location_scope == 'state' and state:
+            candidates &= self.by_state.get(state, set())
+
+        candidates.discard(int(profile["user_id"]))
+        return np.fromiter((self._row_of[uid] for uid in candidates), dtype=np.int64,
+                           count=len(candidates))
+
+    def score_rows(self, profile: Dict[str, Any], rows: np.ndarray,
+                   weights: Dict[str, float]) -> np.ndarray:
+        """Compatibility scores for candidate rows (mirrors _calculate_compatibility)"""
+        scores = np.zeros(len(rows), dtype=np.float32)
+
+        if "similar_conditions" in weights:
+            query = self.conditions.pack(profile.get("conditions") or [])
+            shared = _POPCOUNT[self.condition_bits[rows] & query].sum(axis=1, dtype=np.float32)
+            scores += shared / max(len(profile.get("conditions") or []), 1) * weights["similar_conditions"]
+
+        if "age_similarity" in weights:
+            age_diff = np.abs(self.ages[rows] - (profile.get("age") or 0))
+            scores += np.maximum(0, 1 - age_diff / 20) * weights["age_similarity"]
+
+        if "shared_interests" in weights:
+            query = self.interests.pack(profile.get("interests") or [])
+            shared = _POPCOUNT[self.interest_bits[rows] & query].sum(axis=1, dtype=np.float32)
+            scores += shared / max(len(profile.get("interests") or []), 1) * weights["shared_interests"]
+
+        if "therapy_stage" in weights:
+            stage = self._stage_code(profile.get("therapy_stage"))
+            scores += self._stage_table[stage, self.stages[rows]] * weights["therapy_stage"]
+
+        return np.minimum(scores, 1.0)
+
+    def top_matches(self, profile: Dict[str, Any], connection_type: str,
+                    weights: Dict[str, float], minimum_score: float = 0.0, k: int = 10,
+                    location_scope: Optional[str] = None) -> List[Tuple[float, int]]:
+        """Return up to k (score, user_id) pairs, best first"""
+        with self._lock:
+            rows = self.candidate_rows(profile, connection_type, location_scope)
+            heap: List[Tuple[float, int]] = []
+
+            for start in range(0, len(rows), self.block_size):
+                block = rows[start:start + self.block_size]
+                scores = self.score_rows(profile, block, weights)
+
+                keep = np.flatnonzero(scores >= minimum_score)
+                if len(keep) > k:
+                    keep = keep[np.argpartition(-scores[keep], k - 1)[:k]]
+
+                for i in keep:
+                    item = (float(scores[i]), int(self.user_ids[block[i]]))
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+
+            return sorted(heap, reverse=True)
+
+    def generate_all_matches(self, connection_type: str, weights: Dict[str, float],
+                             minimum_score: float = 0.0, k: int = 10,
+                             location_scope: Optional[str] = None):
+        """Yield (user_id, [(score, peer_id), ...]) for every indexed profile"""
+        for user_id in list(self.profiles):
+            profile = self.profiles.get(user_id)
+            if profile is None:
+                continue
+            types = profile.get("connection_types") or ['*']
+            if '*' not in types and connection_type not in types:
+                continue
+            yield user_id, self.top_matches(profile, connection_type, weights,
+                                            minimum_score, k, location_scope)
@@ -0,0 +1,100 @@
+"""
+Prefork Preloading for MindMend
+===============================
+Loads the read-only parts of the app once in the gunicorn master so that
+forked workers share them copy-on-write instead of each building a copy.
+
+- `preload()` builds every lazy service (AI manager, crisis predictor with
+  its custom model and compiled patterns, therapy integration and the
+  diagnostic model manager), unpickles the registered `models/ml/*.pkl`
+  estimators and marks every numpy array reachable from them read-only,
+  so an accidental in-place write fails loudly instead of quietly copying
+  pages into one worker.
+- `freeze_heap()` runs right before each fork. It collects garbage once and
+  moves every surviving object into the permanent generation
+  (`gc.freeze()`), so collections in the workers never write to the GC
+  headers of objects inherited from the master.
+- `after_fork()` runs first thing in each worker: it re-enables the
+  collector and drops database connections inherited from the master.
+"""
+
+import gc
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def freeze_arrays(obj: Any, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """Mark numpy arrays reachable from `obj` read-only; returns the bytes covered"""
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen or _depth > 12:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        if obj.dtype == object:
+            return sum(freeze_arrays(item, seen, _depth + 1) for item in obj.flat)
+        obj.flags.writeable = False
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(freeze_arrays(value, seen, _depth + 1) for value in obj.values())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return sum(freeze_arrays(item, seen, _depth + 1) for item in obj)
+    if hasattr(obj, '__dict__') and not isinstance(obj, type):
+        return sum(freeze_arrays(value, seen, _depth + 1) for value in vars(obj).values())
+    return 0
+
+
+def preload() -> Dict[str, Any]:
+    """Build services and load read-only models in the current (master) process"""
+    from models.lazy_loader import services
+
+    started = time.perf_counter()
+    timings = services.preload()
+
+    ml_models = []
+    frozen_bytes = 0
+    try:
+        manager = services.get('ai_model_manager')
+        ml_models = manager.preload_ml_models()
+        frozen_bytes += freeze_arrays(manager.loaded_models)
+    except KeyError:
+        pass
+
+    try:
+        predictor = services.get('crisis_predictor')
+        if predictor.custom_model is not None:
+            frozen_bytes += freeze_arrays(predictor.custom_model)
+    except KeyError:
+        pass
+
+    summary = {
+        'services': timings,
+        'ml_models': ml_models,
+        'frozen_bytes': frozen_bytes,
+        'seconds': time.perf_counter() - started
+    }
+    logger.info(f"Preloaded {len(timings)} services and {len(ml_models)} ML models "
+                f"({frozen_bytes / 1024 / 1024:.1f} MiB of arrays frozen) in {summary['seconds']:.1f}s")
+    return summary
+
+
+def freeze_heap():
+    """Move everything allocated so far out of the collector's reach before forking"""
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork(app=None):
+    """Per-worker setup after fork: GC back on, no connections shared with the master"""
+    gc.enable()
+    if app is None:
+        return
+    from models.database import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,239 @@
+"""
+Shared Rate Limiting for MindMend
+=================================
+One GCRA (generic cell rate algorithm) engine behind the request, admin
+and payment rate limits.
+
+- A limit of `limit` hits per `period` seconds allows one hit every
+  `period / limit` seconds with bursts up to `limit`. The only state per
+  key is its theoretical arrival time (TAT), a single float, so a check is
+  O(1) regardless of the limit size.
+- A key whose TAT is in the past is indistinguishable from a new one, so
+  idle keys can be dropped at any time: the memory backend sweeps them,
+  the shared-memory table reuses their slots and Redis expires them.
+- Backends (RATE_LIMIT_BACKEND):
+  * `shm` (default): a fixed-size hash table in a memory-mapped file under
+    /dev/shm shared by every gunicorn worker on the host, with per-bucket
+    fcntl record locks.
+  * `redis`: a Lua script on REDIS_URL, for limits shared across hosts.
+  * `memory`: a per-process dict, for development and tests.
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+def gcra(tat: float, now: float, interval: float, period: float, cost: int) -> Tuple[bool, float]:
+    """Apply `cost` hits to a key whose TAT is `tat`; returns (allowed, TAT afterwards)"""
+    tat = max(tat, now)
+    new_tat = tat + interval * cost
+    if new_tat - period > now:
+        return False, tat
+    return True, new_tat
+
+
+def _key_hash(key: str) -> int:
+    # Stable across processes (unlike hash()); 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+class MemoryBackend:
+    """Per-process TAT dictionary with periodic sweeping of idle keys"""
+
+    def __init__(self, sweep_every: int = 10000):
+        self._tats = {}
+        self._lock = threading.Lock()
+        self._sweep_every = sweep_every
+        self._operations = 0
+
+    def apply(self, key: str, now: float, interval: float, period: float, cost: int,
+              consume: bool) -> Tuple[bool, float]:
+        with self._lock:
+            allowed, tat = gcra(self._tats.get(key, now), now, interval, period, cost)
+            if allowed and consume:
+                self._tats[key] = tat
+
+            self._operations += 1
+            if self._operations >= self._sweep_every:
+                self._operations = 0
+                self._tats = {k: v for k, v in self._tats.items() if v > now}
+        return allowed, tat
+
+    def __len__(self):
+        return len(self._tats)
+
+
+class SharedMemoryBackend:
+    """
+    Open-addressed (key hash, TAT) table in a memory-mapped file.
+
+    A key hashes to one bucket of `bucket_size` slots. The bucket is
+    locked with an fcntl byte-range lock (plus a thread lock, since
+    record locks are per process), scanned with numpy and updated in
+    place. A new key takes the slot with the smallest TAT: an empty or
+    idle slot when there is one, otherwise the key closest to expiring.
+    """
+
+    SLOT = np.dtype([('key', '<u8'), ('tat', '<f8')])
+
+    def __init__(self, path: Optional[str] = None, buckets: int = 4096, bucket_size: int = 32):
+        if fcntl is None:
+            raise RuntimeError("Shared-memory rate limiting needs fcntl")
+        if path is None:
+            base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+            path = os.environ.get('RATE_LIMIT_SHM_PATH', os.path.join(base, 'mindmend-ratelimit.bin'))
+        self.path = path
+        self.buckets = buckets
+        self.bucket_size = bucket_size
+        self._bucket_bytes = bucket_size * self.SLOT.itemsize
+
+        size = buckets * self._bucket_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        # A plain ndarray over the mapping: np.memmap's subclass hooks cost more than the lookup itself
+        self._map = mmap.mmap(self._fd, size)
+        table = np.frombuffer(self._map, dtype=self.SLOT).reshape(buckets, bucket_size)
+        self._keys = table['key']
+        self._tats = table['tat']
+        self._thread_lock = threading.Lock()
+
+    def apply(self, key: str, now: float, interval: float, period: float, cost: int,
+              consume: bool) -> Tuple[bool, float]:
+        key_hash = _key_hash(key)
+        bucket = key_hash % self.buckets
+        keys, tats = self._keys[bucket], self._tats[bucket]
+
+        with self._thread_lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self._bucket_bytes, bucket * self._bucket_bytes)
+            try:
+                matches = np.flatnonzero(keys == key_hash)
+                slot = int(matches[0]) if matches.size else None
+                allowed, tat = gcra(tats[slot] if slot is not None else now, now, interval, period, cost)
+                if allowed and consume and tat > now:
+                    if slot is None:
+                        slot = int(np.argmin(tats))
+                        keys[slot] = key_hash
+                    tats[slot] = tat
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self._bucket_bytes, bucket * self._bucket_bytes)
+        return allowed, tat
+
+    def __len__(self):
+        return int(np.count_nonzero(self._tats > time.time()))
+
+
+class RedisBackend:
+    """GCRA evaluated atomically by a Lua script; keys expire when they go idle"""
+
+    SCRIPT = """
+    local now = tonumber(ARGV[1])
+    local interval = tonumber(ARGV[2])
+    local period = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+    local new_tat = tat + interval * cost
+    if new_tat - period > now then
+        return {0, tostring(tat)}
+    end
+    if ARGV[5] == '1' and new_tat > now then
+        redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+    end
+    return {1, tostring(new_tat)}
+    """
+
+    def __init__(self, client=None, prefix: str = 'ratelimit:'):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def apply(self, key: str, now: float, interval: float, period: float, cost: int,
+              consume: bool) -> Tuple[bool, float]:
+        allowed, tat = self._script(keys=[self.prefix + key],
+                                    args=[repr(now), repr(interval), repr(period), cost, '1' if consume else '0'])
+        return bool(int(allowed)), float(tat)
+
+
+def create_backend(name: Optional[str] = None):
+    """Backend named by RATE_LIMIT_BACKEND, falling back to per-process memory"""
+    name = (name or os.environ.get('RATE_LIMIT_BACKEND', 'shm')).lower()
+    try:
+        if name == 'redis':
+            return RedisBackend()
+        if name == 'shm':
+            return SharedMemoryBackend()
+    except Exception as e:
+        logger.warning(f"Rate limit backend '{name}' unavailable ({e}); using per-process memory")
+    return MemoryBackend()
+
+
+class RateLimiter:
+    """Rate limits keyed by arbitrary strings, e.g. 'ip:1.2.3.4' or 'payment:42'"""
+
+    def __init__(self, backend=None):
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._lock:
+                if self._backend is None:
+                    self._backend = create_backend()
+        return self._backend
+
+    def _apply(self, key: str, limit: int, period: float, cost: int, consume: bool,
+               now: Optional[float]) -> RateLimitResult:
+        now = time.time() if now is None else now
+        interval = period / limit
+        try:
+            allowed, tat = self.backend.apply(key, now, interval, period, cost, consume)
+        except Exception as e:
+            # Never take the site down because the limiter's store is unreachable
+            logger.error(f"Rate limit check failed for {key}: {e}")
+            return RateLimitResult(True, limit, 0.0)
+
+        if allowed:
+            return RateLimitResult(True, max(int((now + period - tat) // interval), 0), 0.0)
+        return RateLimitResult(False, 0, tat + interval * cost - period - now)
+
+    def hit(self, key: str, limit: int, period: float, cost: int = 1,
+            now: Optional[float] = None) -> RateLimitResult:
+        """Count `cost` hits against the key if the limit allows them"""
+        return self._apply(key, limit, period, cost, True, now)
+
+    def check(self, key: str, limit: int, period: float, cost: int = 1,
+              now: Optional[float] = None) -> RateLimitResult:
+        """Whether `cost` more hits would be allowed, without counting them"""
+        return self._apply(key, limit, period, cost, False, now)
+
+
+# Global rate limiter shared by the security modules
+rate_limiter = RateLimiter()
@@ -0,0 +1,385 @@
+"""
+Request Instrumentation for MindMend
+====================================
+Per-endpoint latency histograms and error counts for HTTP requests and
+Socket.IO events, shared across gunicorn workers.
+
+- Each worker process owns one memory-mapped file in METRICS_SHM_DIR
+  (tmpfs under /dev/shm by default), named by pid plus a per-process
+  nonce so a reused pid never overwrites an exited worker's counters. The
+  worker is the file's only writer, so recording a request never takes a
+  cross-process lock: it is a handful of integer increments on a numpy
+  view of the file.
+- Latencies go into log-spaced buckets (1ms doubling up to ~65s).
+- Readers (the /metrics endpoint, MindMendMonitoring) merge every worker's
+  file by endpoint name. Counters from exited workers are kept so totals
+  stay monotonic; gauges only count workers that are still alive.
+- /metrics requires METRICS_TOKEN as a bearer token; without one it only
+  answers direct scrapes from loopback.
+"""
+
+import glob
+import hmac
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+from flask import Response, g, request
+
+logger = logging.getLogger(__name__)
+
+BUCKET_BOUNDS = tuple(0.001 * 2 ** i for i in range(17))
+MAX_ENDPOINTS = 256
+NAME_BYTES = 120
+OVERFLOW_ENDPOINT = 'other <overflow>'
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+RETIRED_PID = -1  # header pid of a file whose worker exited and whose pid was reused
+
+HEADER_DTYPE = np.dtype([
+    ('pid', '<i8'),
+    ('socketio_connections', '<i8'),
+    ('in_flight', '<i8')
+])
+SLOT_DTYPE = np.dtype([
+    ('name', f'S{NAME_BYTES}'),
+    ('count', '<u8'),
+    ('errors', '<u8'),
+    ('sum', '<f8'),
+    ('buckets', '<u8', (len(BUCKET_BOUNDS) + 1,))
+])
+
+
+def _default_directory() -> str:
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'mindmend-metrics')
+
+
+def _retire_files(directory: str, pid: int):
+    """Mark other files written under this pid as belonging to exited workers"""
+    for path in glob.glob(os.path.join(directory, f'requests_{pid}_*.bin')):
+        try:
+            header = np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+        except (OSError, ValueError):
+            continue
+        if int(header['pid'][0]) == pid:
+            header['pid'][0] = RETIRED_PID
+            header.flush()
+        del header
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def bucket_quantile(buckets, q: float) -> Optional[float]:
+    """Estimate a quantile from histogram bucket counts (log interpolation inside a bucket)"""
+    total = int(np.sum(buckets))
+    if not total:
+        return None
+    rank = q * total
+    cumulative = np.cumsum(buckets)
+    index = int(np.searchsorted(cumulative, rank))
+    if index >= len(BUCKET_BOUNDS):
+        return BUCKET_BOUNDS[-1]
+    upper = BUCKET_BOUNDS[index]
+    lower = BUCKET_BOUNDS[index - 1] if index else upper / 2
+    below = cumulative[index - 1] if index else 0
+    fraction = (rank - below) / max(int(buckets[index]), 1)
+    return float(lower * (upper / lower) ** fraction)
+
+
+class RequestMetrics:
+    """Flask/Socket.IO instrumentation backed by per-worker shared memory"""
+
+    def __init__(self, app=None, socketio=None, directory: Optional[str] = None):
+        self.directory = directory or os.environ.get('METRICS_SHM_DIR') or _default_directory()
+        self._pid = None
+        self._slots = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, socketio)
+
+    def init_app(self, app, socketio=None):
+        """Register request hooks, Socket.IO wrappers and the /metrics endpoint"""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'prometheus_metrics', self.metrics_view)
+        if socketio is not None:
+            self.instrument_socketio(socketio)
+
+    # Writing (current worker only)
+
+    def _open(self):
+        """Map this process's file, re-creating it after a fork"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            # Files from earlier processes with this pid are dead workers' counters
+            _retire_files(self.directory, pid)
+            # The nonce keeps a reused pid from truncating a dead worker's file
+            path = os.path.join(self.directory, f'requests_{pid}_{os.urandom(4).hex()}.bin')
+            size = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * MAX_ENDPOINTS
+            with open(path, 'xb') as f:
+                f.truncate(size)
+            self._header = np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+            table = np.memmap(path, dtype=SLOT_DTYPE, mode='r+', offset=HEADER_DTYPE.itemsize,
+                              shape=(MAX_ENDPOINTS,))
+            self._header['pid'][0] = pid
+            self._names = table['name']
+            self._count = table['count']
+            self._errors = table['errors']
+            self._sum = table['sum']
+            self._buckets = table['buckets']
+            self._slots = {}
+            self._pid = pid
+
+    def _slot(self, name: str) -> int:
+        slot = self._slots.get(name)
+        if slot is not None:
+            return slot
+        with self._lock:
+            slot = self._slots.get(name)
+            if slot is None:
+                if len(self._slots) >= MAX_ENDPOINTS - 1:
+                    name = OVERFLOW_ENDPOINT
+                slot = self._slots.get(name)
+                if slot is None:
+                    slot = len(self._slots)
+                    self._names[slot] = name.encode('utf-8')[:NAME_BYTES]
+                    self._slots[name] = slot
+        return slot
+
+    def observe(self, transport: str, endpoint: str, seconds: float, error: bool = False):
+        """Record one request or event"""
+        self._open()
+        slot = self._slot(f'{transport} {endpoint}')
+        self._count[slot] += 1
+        self._sum[slot] += seconds
+        self._buckets[slot, np.searchsorted(BUCKET_BOUNDS, seconds)] += 1
+        if error:
+            self._errors[slot] += 1
+
+    def _gauge(self, name: str, delta: int):
+        self._open()
+        self._header[name][0] += delta
+
+    # Flask hooks
+
+    def _before_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_recorded = False
+        self._gauge('in_flight', 1)
+
+    def _endpoint(self) -> str:
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        return f'{request.method} {rule}'
+
+    def _after_request(self, response):
+        started = g.get('_metrics_started')
+        if started is not None and not g.get('_metrics_recorded'):
+            g._metrics_recorded = True
+            self.observe('http', self._endpoint(), time.perf_counter() - started,
+                         error=response.status_code >= 500)
+        return response
+
+    def _teardown_request(self, exc=None):
+        started = g.get('_metrics_started')
+        if started is None:
+            return
+        # Unhandled exceptions skip after_request when they propagate
+        if not g.get('_metrics_recorded'):
+            g._metrics_recorded = True
+            self.observe('http', self._endpoint(), time.perf_counter() - started, error=True)
+        g._metrics_started = None
+        self._gauge('in_flight', -1)
+
+    # Socket.IO
+
+    def instrument_socketio(self, socketio):
+        """Time every Socket.IO event handler and track open connections"""
+        handle_event = socketio._handle_event
+
+        def _handle_event(handler, message, namespace, sid, *args):
+            def timed(*handler_args):
+                started = time.perf_counter()
+                failed = False
+                try:
+                    return handler(*handler_args)
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    self.observe('socketio', f'{namespace} {message}', time.perf_counter() - started, failed)
+            return handle_event(timed, message, namespace, sid, *args)
+
+        socketio._handle_event = _handle_event
+
+        server = getattr(socketio, 'server', None)
+        if server is None or not hasattr(server, '_trigger_event'):
+            return
+        trigger_event = server._trigger_event
+
+        def _trigger_event(event, namespace, *args):
+            result = trigger_event(event, namespace, *args)
+            if namespace in (None, '/'):
+                if event == 'connect' and result is not False:
+                    self._gauge('socketio_connections', 1)
+                elif event == 'disconnect':
+                    self._gauge('socketio_connections', -1)
+            return result
+
+        server._trigger_event = _trigger_event
+
+    # Reading (all workers)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Merge every worker's counters by endpoint"""
+        endpoints = {}
+        gauges = {'socketio_connections': 0, 'in_flight': 0, 'workers': 0}
+        size = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * MAX_ENDPOINTS
+
+        for path in glob.glob(os.path.join(self.directory, 'requests_*.bin')):
+            try:
+                raw = np.fromfile(path, dtype=np.uint8)
+            except OSError:
+                continue
+            if raw.size != size:
+                continue
+            header = raw[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+            table = raw[HEADER_DTYPE.itemsize:].view(SLOT_DTYPE)
+            if _pid_alive(int(header['pid'])):
+                gauges['workers'] += 1
+                gauges['socketio_connections'] += int(header['socketio_connections'])
+                gauges['in_flight'] += int(header['in_flight'])
+
+            for row in table[table['count'] > 0]:
+                name = row['name'].decode('utf-8', 'replace')
+                merged = endpoints.get(name)
+                if merged is None:
+                    merged = endpoints[name] = {
+                        'count': 0, 'errors': 0, 'sum': 0.0,
+                        'buckets': np.zeros(len(BUCKET_BOUNDS) + 1, dtype=np.uint64)
+                    }
+                merged['count'] += int(row['count'])
+                merged['errors'] += int(row['errors'])
+                merged['sum'] += float(row['sum'])
+                merged['buckets'] += row['buckets']
+
+        return {'endpoints': endpoints, 'gauges': gauges, 'timestamp': time.time()}
+
+    @staticmethod
+    def window(current: Dict[str, Any], previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Per-endpoint activity between two snapshots (all of it without a previous one)"""
+        if not previous:
+            return current
+        endpoints = {}
+        for name, stats in current['endpoints'].items():
+            before = previous['endpoints'].get(name)
+            if before is None:
+                endpoints[name] = stats
+            elif stats['count'] > before['count']:
+                endpoints[name] = {
+                    'count': stats['count'] - before['count'],
+                    'errors': stats['errors'] - before['errors'],
+                    'sum': stats['sum'] - before['sum'],
+                    'buckets': stats['buckets'] - before['buckets']
+                }
+        return {'endpoints': endpoints, 'gauges': current['gauges'], 'timestamp': current['timestamp']}
+
+    @staticmethod
+    def summarize(stats: Dict[str, Any]) -> Dict[str, Any]:
+        count = stats['count']
+        return {
+            'count': count,
+            'errors': stats['errors'],
+            'error_rate': round(stats['errors'] / count * 100, 3) if count else 0.0,
+            'avg': stats['sum'] / count if count else 0.0,
+            'p50': bucket_quantile(stats['buckets'], 0.5),
+            'p95': bucket_quantile(stats['buckets'], 0.95),
+            'p99': bucket_quantile(stats['buckets'], 0.99)
+        }
+
+    def render_prometheus(self, snapshot: Optional[Dict[str, Any]] = None) -> str:
+        """Prometheus text exposition format"""
+        snapshot = snapshot or self.snapshot()
+
+        def labels(name, **extra):
+            transport, endpoint = name.split(' ', 1)
+            pairs = {'transport': transport, 'endpoint': endpoint, **extra}
+            return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in pairs.items()) + '}'
+
+        lines = [
+            '# HELP mindmend_request_duration_seconds Request and Socket.IO event latency',
+            '# TYPE mindmend_request_duration_seconds histogram'
+        ]
+        endpoints = sorted(snapshot['endpoints'].items())
+        for name, stats in endpoints:
+            cumulative = np.cumsum(stats['buckets'])
+            for bound, value in zip(BUCKET_BOUNDS, cumulative):
+                lines.append(f'mindmend_request_duration_seconds_bucket{labels(name, le=format(bound, "g"))} {int(value)}')
+            lines.append(f'mindmend_request_duration_seconds_bucket{labels(name, le="+Inf")} {stats["count"]}')
+            lines.append(f'mindmend_request_duration_seconds_sum{labels(name)} {stats["sum"]:.6f}')
+            lines.append(f'mindmend_request_duration_seconds_count{labels(name)} {stats["count"]}')
+
+        lines += [
+            '# HELP mindmend_request_errors_total Requests answered with 5xx or raising',
+            '# TYPE mindmend_request_errors_total counter'
+        ]
+        lines += [f'mindmend_request_errors_total{labels(name)} {stats["errors"]}' for name, stats in endpoints]
+
+        gauges = snapshot['gauges']
+        lines += [
+            '# HELP mindmend_requests_in_flight HTTP requests being served',
+            '# TYPE mindmend_requests_in_flight gauge',
+            f'mindmend_requests_in_flight {gauges["in_flight"]}',
+            '# HELP mindmend_socketio_connections Open Socket.IO connections',
+            '# TYPE mindmend_socketio_connections gauge',
+            f'mindmend_socketio_connections {gauges["socketio_connections"]}',
+            '# HELP mindmend_workers Worker processes reporting metrics',
+            '# TYPE mindmend_workers gauge',
+            f'mindmend_workers {gauges["workers"]}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def metrics_view(self):
+        """Prometheus scrape endpoint"""
+        token = os.environ.get('METRICS_TOKEN')
+        if token:
+            if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        elif not self._is_local_scrape():
+            # No token configured: only a scraper on this host may read the metrics
+            return Response('Forbidden\n', status=403, mimetype='text/plain')
+        return Response(self.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    @staticmethod
+    def _is_local_scrape():
+        # A reverse proxy on this host also connects from loopback, but adds X-Forwarded-For
+        if request.headers.get('X-Forwarded-For'):
+            return False
+        return request.remote_addr in LOOPBACK_ADDRESSES
+
+
+# Global instrumentation instance
+request_metrics = RequestMetrics()
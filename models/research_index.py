@@ -0,0 +1,362 @@
+"""
+Research Retrieval Index for Mind Mend
+======================================
+Dense vector index over research papers. A TF-IDF + truncated SVD (LSA)
+pipeline is fitted once over the whole corpus, every paper is projected to a
+unit-length float32 row in one contiguous memory-mapped matrix, and a query is
+answered with a single matrix-vector product followed by argpartition.
+
+Papers are added, replaced and removed incrementally. The vectorizer is only
+refitted when the corpus has grown well past the size it was fitted on.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import joblib
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.pipeline import make_pipeline
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+ROWS_FILE = 'rows.npz'
+MATRIX_FILE = 'embeddings.f32'
+VECTORIZER_FILE = 'vectorizer.joblib'
+
+
+def paper_text(paper):
+    """Text indexed for a paper, or None when it has no searchable body"""
+    if not (paper.abstract or paper.full_text):
+        return None
+    return f"{paper.title} {paper.abstract or ''} {(paper.full_text or '')[:1000]}"
+
+
+class ResearchIndex:
+    """Memory-mapped embedding matrix with incremental updates"""
+
+    def __init__(self, index_dir=None, dimensions=256, max_features=50000,
+                 refit_growth=2.0, initial_capacity=1024):
+        self.index_dir = index_dir or os.environ.get('RESEARCH_INDEX_DIR')
+        self.dimensions = dimensions
+        self.max_features = max_features
+        self.refit_growth = refit_growth
+        self.initial_capacity = initial_capacity
+
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._meta_mtime = None
+        self._reset()
+
+    def _reset(self):
+        self.vectorizer = None
+        self.dim = 0
+        self.count = 0
+        self.capacity = 0
+        self.fitted_docs = 0
+        self.matrix = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.category_codes = np.empty(0, dtype=np.int32)
+        self.categories = []
+        self._row_of = {}
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _directory(self):
+        if not self.index_dir:
+            try:
+                from flask import current_app
+                self.index_dir = os.path.join(current_app.instance_path, 'research_index')
+            except RuntimeError:
+                self.index_dir = os.path.join('instance', 'research_index')
+        os.makedirs(self.index_dir, exist_ok=True)
+        return self.index_dir
+
+    def _path(self, name):
+        return os.path.join(self._directory(), name)
+
+    def _open_matrix(self, capacity, mode):
+        return np.memmap(self._path(MATRIX_FILE), dtype=np.float32, mode=mode,
+                         shape=(max(capacity, 1), max(self.dim, 1)))
+
+    def _write_atomic(self, name, writer):
+        tmp = self._path(name + '.tmp')
+        with open(tmp, 'wb') as fh:
+            writer(fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self._path(name))
+
+    def _save_rows(self):
+        """Persist ids/categories and metadata; the matrix is flushed in place"""
+        if self.matrix is not None:
+            self.matrix.flush()
+        n = self.count
+        self._write_atomic(ROWS_FILE, lambda fh: np.savez(
+            fh, ids=self.ids[:n], category_codes=self.category_codes[:n]))
+        meta = {
+            'dim': self.dim,
+            'count': self.count,
+            'capacity': self.capacity,
+            'fitted_docs': self.fitted_docs,
+            'categories': self.categories,
+        }
+        self._write_atomic(META_FILE, lambda fh: fh.write(json.dumps(meta).encode()))
+        self._meta_mtime = os.stat(self._path(META_FILE)).st_mtime_ns
+
+    def load(self):
+        """Load a persisted index; returns False when none exists"""
+        with self._lock:
+            meta_path = self._path(META_FILE)
+            if not os.path.exists(meta_path):
+                return False
+            try:
+                with open(meta_path) as fh:
+                    meta = json.load(fh)
+                rows = np.load(self._path(ROWS_FILE))
+                vectorizer = joblib.load(self._path(VECTORIZER_FILE))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Research index unreadable, rebuilding: {e}")
+                return False
+
+            self._reset()
+            self.vectorizer = vectorizer
+            self.dim = meta['dim']
+            self.count = meta['count']
+            self.capacity = meta['capacity']
+            self.fitted_docs = meta['fitted_docs']
+            self.categories = meta['categories']
+            self.matrix = self._open_matrix(self.capacity, 'r+')
+            self.ids = np.zeros(self.capacity, dtype=np.int64)
+            self.category_codes = np.zeros(self.capacity, dtype=np.int32)
+            self.ids[:self.count] = rows['ids']
+            self.category_codes[:self.count] = rows['category_codes']
+            self._row_of = {int(pid): row for row, pid in enumerate(self.ids[:self.count])}
+            self._meta_mtime = os.stat(meta_path).st_mtime_ns
+            self._loaded = True
+            return True
+
+    def _refresh(self):
+        """Pick up changes persisted by another worker process"""
+        try:
+            mtime = os.stat(self._path(META_FILE)).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._meta_mtime:
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def _fit(self, texts):
+        """
+        Fit TF-IDF (+ SVD when the corpus supports it) over the corpus.
+
+        Returns the pipeline, its output dimension and the corpus TF-IDF
+        matrix so the build can project it without re-tokenising.
+        """
+        tfidf = TfidfVectorizer(max_features=self.max_features, stop_words='english',
+                                sublinear_tf=True, dtype=np.float32)
+        term_matrix = tfidf.fit_transform(texts)
+        components = min(self.dimensions, term_matrix.shape[1] - 1, term_matrix.shape[0] - 1)
+        if components >= 2:
+            svd = TruncatedSVD(n_components=components, random_state=42).fit(term_matrix)
+            return make_pipeline(tfidf, svd), components, term_matrix
+        return make_pipeline(tfidf), term_matrix.shape[1], term_matrix
+
+    @staticmethod
+    def _normalise(vectors):
+        if hasattr(vectors, 'toarray'):
+            vectors = vectors.toarray()
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+    def embed(self, texts):
+        """Project texts into the index space as L2-normalised float32 rows"""
+        return self._normalise(self.vectorizer.transform(texts))
+
+    def _project_batched(self, term_matrix, out, batch_size=4096):
+        """Project an already-vectorised TF-IDF matrix in bounded-memory batches"""
+        projection = self.vectorizer.steps[-1][1] if len(self.vectorizer.steps) > 1 else None
+        for start in range(0, term_matrix.shape[0], batch_size):
+            block = term_matrix[start:start + batch_size]
+            if projection is not None:
+                block = projection.transform(block)
+            out[start:start + batch_size] = self._normalise(block)
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialise writers across worker processes sharing the index files"""
+        with open(self._path('.lock'), 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def build(self, entries):
+        """
+        Rebuild the whole index from (paper_id, category, text) entries.
+
+        The vectorizer is fitted once over every text, then rows are
+        projected in batches straight into a fresh memory-mapped matrix.
+        """
+        entries = [e for e in entries if e[2]]
+        with self._lock, self._exclusive():
+            self._reset()
+            self._loaded = True
+            if not entries:
+                self._remove_files()
+                return 0
+
+            texts = [text for _, _, text in entries]
+            self.vectorizer, self.dim, term_matrix = self._fit(texts)
+            self.fitted_docs = len(texts)
+            self.capacity = max(self.initial_capacity, len(texts))
+
+            tmp_matrix = self._path(MATRIX_FILE + '.tmp')
+            matrix = np.memmap(tmp_matrix, dtype=np.float32, mode='w+',
+                               shape=(self.capacity, self.dim))
+            self._project_batched(term_matrix, matrix)
+            matrix.flush()
+            del matrix
+            os.replace(tmp_matrix, self._path(MATRIX_FILE))
+            self.matrix = self._open_matrix(self.capacity, 'r+')
+
+            self.ids = np.zeros(self.capacity, dtype=np.int64)
+            self.category_codes = np.zeros(self.capacity, dtype=np.int32)
+            for row, (paper_id, category, _) in enumerate(entries):
+                self.ids[row] = paper_id
+                self.category_codes[row] = self._category_code(category)
+                self._row_of[int(paper_id)] = row
+            self.count = len(entries)
+
+            self._write_atomic(VECTORIZER_FILE, lambda fh: joblib.dump(self.vectorizer, fh))
+            self._save_rows()
+            logger.info(f"Research index built: {self.count} papers, {self.dim} dimensions")
+            return self.count
+
+    def _remove_files(self):
+        for name in (META_FILE, ROWS_FILE, MATRIX_FILE, VECTORIZER_FILE):
+            try:
+                os.remove(self._path(name))
+            except FileNotFoundError:
+                pass
+        self._meta_mtime = None
+
+    def _category_code(self, category):
+        category = category or ''
+        try:
+            return self.categories.index(category)
+        except ValueError:
+            self.categories.append(category)
+            return len(self.categories) - 1
+
+    def _grow(self, needed):
+        """Double the matrix capacity, copying rows into a new file"""
+        capacity = max(self.capacity * 2, needed, self.initial_capacity)
+        tmp_matrix = self._path(MATRIX_FILE + '.tmp')
+        matrix = np.memmap(tmp_matrix, dtype=np.float32, mode='w+', shape=(capacity, self.dim))
+        matrix[:self.count] = self.matrix[:self.count]
+        matrix.flush()
+        del matrix
+        self.matrix = None
+        os.replace(tmp_matrix, self._path(MATRIX_FILE))
+        self.matrix = self._open_matrix(capacity, 'r+')
+
+        self.ids = np.resize(self.ids, capacity)
+        self.category_codes = np.resize(self.category_codes, capacity)
+        self.capacity = capacity
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def needs_refit(self):
+        return self.vectorizer is None or self.count + 1 > self.fitted_docs * self.refit_growth
+
+    def add(self, paper_id, category, text):
+        """Insert or replace one paper's row; a text of None removes it"""
+        if not text:
+            return self.remove(paper_id)
+        with self._lock, self._exclusive():
+            self._refresh()
+            vector = self.embed([text])[0]
+            row = self._row_of.get(int(paper_id))
+            if row is None:
+                if self.count >= self.capacity:
+                    self._grow(self.count + 1)
+                row = self.count
+                self.count += 1
+                self._row_of[int(paper_id)] = row
+            self.matrix[row] = vector
+            self.ids[row] = paper_id
+            self.category_codes[row] = self._category_code(category)
+            self._save_rows()
+            return True
+
+    def remove(self, paper_id):
+        """Remove a paper by moving the last row into its slot"""
+        with self._lock, self._exclusive():
+            self._refresh()
+            row = self._row_of.pop(int(paper_id), None)
+            if row is None:
+                return False
+            last = self.count - 1
+            if row != last:
+                self.matrix[row] = self.matrix[last]
+                self.ids[row] = self.ids[last]
+                self.category_codes[row] = self.category_codes[last]
+                self._row_of[int(self.ids[row])] = row
+            self.count = last
+            self._save_rows()
+            return True
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def search(self, text, limit=10, category=None):
+        """Return [(paper_id, similarity)] for the top `limit` papers"""
+        with self._lock:
+            self._refresh()
+            if not self.count or limit <= 0:
+                return []
+            query = self.embed([text])[0]
+            scores = self.matrix[:self.count] @ query
+
+            if category is not None:
+                if category not in self.categories:
+                    return []
+                mask = self.category_codes[:self.count] != self.categories.index(category)
+                scores[mask] = -np.inf
+                available = self.count - int(mask.sum())
+            else:
+                available = self.count
+
+            k = min(limit, available)
+            if k == 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [(int(self.ids[i]), float(scores[i])) for i in top]
+
+    def stats(self):
+        return {
+            'papers': self.count,
+            'dimensions': self.dim,
+            'capacity': self.capacity,
+            'fitted_docs': self.fitted_docs,
+            'matrix_bytes': self.capacity * self.dim * 4,
+        }
@@ -6,8 +6,8 @@ Handles research papers, clinical datasets, and knowledge base for early diagnos
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import logging
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, Boolean, ForeignKey, JSON, case, func, select
+from sqlalchemy.orm import relationship, validates, joinedload
 try:
     from models.database import db
 except ImportError:
@@ -19,8 +19,7 @@ except ImportError:
             Model = object
         db = MockDB()
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from models.research_index import ResearchIndex, paper_text
 
 logger = logging.getLogger(__name__)
 
@@ -103,10 +102,33 @@ class ResearchInsight(db.Model):
     
     # Relationships
     paper = relationship("ResearchPaper", back_populates="insights")
+    condition_links = relationship("ResearchInsightCondition", back_populates="insight",
+                                   cascade="all, delete-orphan")
     
     created_date = Column(DateTime, default=datetime.utcnow)
     validated_by = Column(String(100))
     validation_date = Column(DateTime)
+    
+    @validates('applicable_conditions')
+    def _sync_condition_links(self, key, conditions):
+        """Keep the normalized condition index in step with the JSON list"""
+        wanted = {c.strip().lower() for c in conditions or [] if c and c.strip()}
+        self.condition_links = [link for link in self.condition_links if link.condition in wanted]
+        existing = {link.condition for link in self.condition_links}
+        for condition in sorted(wanted - existing):
+            self.condition_links.append(ResearchInsightCondition(condition=condition))
+        return conditions
+
+class ResearchInsightCondition(db.Model):
+    """Normalized condition -> insight association for indexed lookups"""
+    __tablename__ = 'research_insight_conditions'
+    
+    id = Column(Integer, primary_key=True)
+    insight_id = Column(Integer, ForeignKey('research_insights.id', ondelete='CASCADE'),
+                        nullable=False, index=True)
+    condition = Column(String(100), nullable=False, index=True)  # lower-cased
+    
+    insight = relationship("ResearchInsight", back_populates="condition_links")
 
 class DataAnalysis(db.Model):
     """Model for storing dataset analysis results"""
@@ -137,9 +159,10 @@ class ResearchManager:
     """Manager class for research and dataset operations"""
     
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+        self.index = ResearchIndex()
         self.research_cache = {}
         self.insight_templates = self._load_insight_templates()
+        self._condition_index_checked = False
         
     def _load_insight_templates(self):
         """Load templates for extracting insights from research"""
@@ -180,17 +203,15 @@ class ResearchManager:
                 added_by=paper_data.get('added_by', 'system')
             )
             
-            # Generate embeddings for similarity search
-            if paper.abstract or paper.full_text:
-                text = f"{paper.title} {paper.abstract} {paper.full_text[:1000]}"
-                paper.embeddings = self._generate_embeddings(text)
-            
             # Calculate initial relevance score
             paper.relevance_score = self._calculate_relevance_score(paper)
             
             db.session.add(paper)
             db.session.commit()
             
+            # Add the paper's vector to the search index
+            self._index_paper(paper)
+            
             # Extract insights asynchronously
             self._extract_insights_from_paper(paper)
             
@@ -236,47 +257,75 @@ class ResearchManager:
             db.session.rollback()
             raise
     
+    def remove_research_paper(self, paper_id: int) -> bool:
+        """Delete a research paper and drop it from the search index"""
+        try:
+            paper = db.session.get(ResearchPaper, paper_id)
+            if not paper:
+                return False
+            for insight in ResearchInsight.query.filter_by(paper_id=paper_id):
+                db.session.delete(insight)
+            ClinicalDataset.query.filter_by(paper_id=paper_id).update({'paper_id': None})
+            db.session.delete(paper)
+            db.session.commit()
+            self.index.remove(paper_id)
+            logger.info(f"Removed research paper {paper_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Error removing research paper: {str(e)}")
+            db.session.rollback()
+            raise
+    
+    def rebuild_index(self) -> int:
+        """Refit the corpus vectorizer and rebuild the search index from the database"""
+        rows = db.session.query(
+            ResearchPaper.id, ResearchPaper.category, ResearchPaper.title,
+            ResearchPaper.abstract, ResearchPaper.full_text
+        ).order_by(ResearchPaper.id).yield_per(5000)
+        return self.index.build((row.id, row.category, paper_text(row)) for row in rows)
+    
+    def _ensure_index(self):
+        """Load the persisted index, building it on first use"""
+        if not self.index._loaded and not self.index.load():
+            self.rebuild_index()
+    
+    def _index_paper(self, paper: ResearchPaper):
+        """Incrementally index a paper, refitting once the corpus has outgrown the vectorizer"""
+        try:
+            self._ensure_index()
+            if self.index.needs_refit():
+                self.rebuild_index()
+            else:
+                self.index.add(paper.id, paper.category, paper_text(paper))
+        except Exception as e:
+            # The paper is stored; the next rebuild will pick it up
+            logger.error(f"Error indexing research paper {paper.id}: {str(e)}")
+    
     def search_research(self, query: str, category: Optional[str] = None, 
                        limit: int = 10) -> List[Dict[str, Any]]:
         """Search research papers using natural language query"""
         try:
-            # Get all papers
-            papers_query = ResearchPaper.query
-            if category:
-                papers_query = papers_query.filter_by(category=category)
-            
-            papers = papers_query.all()
-            
-            if not papers:
+            self._ensure_index()
+            hits = self.index.search(query, limit=limit, category=category)
+            if not hits:
                 return []
             
-            # Generate query embedding
-            query_embedding = self._generate_embeddings(query)
-            
-            # Calculate similarity scores
-            results = []
-            for paper in papers:
-                if paper.embeddings:
-                    similarity = self._calculate_similarity(query_embedding, paper.embeddings)
-                    results.append({
-                        'paper': paper,
-                        'similarity': similarity
-                    })
-            
-            # Sort by similarity and return top results
-            results.sort(key=lambda x: x['similarity'], reverse=True)
+            # Load only the top-k papers, then restore ranking order
+            papers = {p.id: p for p in ResearchPaper.query.filter(
+                ResearchPaper.id.in_([paper_id for paper_id, _ in hits])
+            )}
             
             return [{
-                'id': r['paper'].id,
-                'title': r['paper'].title,
-                'authors': r['paper'].authors,
-                'abstract': r['paper'].abstract[:500] + '...' if r['paper'].abstract else '',
-                'category': r['paper'].category,
-                'tags': r['paper'].tags,
-                'relevance_score': r['paper'].relevance_score,
-                'similarity_score': r['similarity'],
-                'publication_date': r['paper'].publication_date.isoformat() if r['paper'].publication_date else None
-            } for r in results[:limit]]
+                'id': paper.id,
+                'title': paper.title,
+                'authors': paper.authors,
+                'abstract': paper.abstract[:500] + '...' if paper.abstract else '',
+                'category': paper.category,
+                'tags': paper.tags,
+                'relevance_score': paper.relevance_score,
+                'similarity_score': similarity,
+                'publication_date': paper.publication_date.isoformat() if paper.publication_date else None
+            } for paper_id, similarity in hits if (paper := papers.get(paper_id))]
             
         except Exception as e:
             logger.error(f"Error searching research: {str(e)}")
@@ -286,20 +335,26 @@ class ResearchManager:
                                  insight_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get research insights for a specific mental health condition"""
         try:
-            insights_query = ResearchInsight.query
+            self._ensure_condition_index()
             
-            # Filter by condition
-            insights = []
-            for insight in insights_query.all():
-                if condition.lower() in [c.lower() for c in insight.applicable_conditions or []]:
-                    if not insight_type or insight.insight_type == insight_type:
-                        insights.append(insight)
+            # Indexed lookup on the normalized condition table; papers are
+            # eager-loaded and the database returns rows already ranked
+            relevance_rank = case(
+                {'high': 3, 'medium': 2, 'low': 1},
+                value=ResearchInsight.clinical_relevance,
+                else_=0
+            )
+            insights_query = ResearchInsight.query.join(ResearchInsight.condition_links).filter(
+                ResearchInsightCondition.condition == condition.strip().lower()
+            ).options(joinedload(ResearchInsight.paper))
+            if insight_type:
+                insights_query = insights_query.filter(ResearchInsight.insight_type == insight_type)
             
-            # Sort by confidence and clinical relevance
-            insights.sort(key=lambda x: (
-                x.confidence_level or 0,
-                {'high': 3, 'medium': 2, 'low': 1}.get(x.clinical_relevance, 0)
-            ), reverse=True)
+            insights = insights_query.order_by(
+                func.coalesce(ResearchInsight.confidence_level, 0).desc(),
+                relevance_rank.desc(),
+                ResearchInsight.id
+            ).all()
             
             return [{
                 'id': insight.id,
@@ -317,6 +372,24 @@ class ResearchManager:
             logger.error(f"Error getting insights: {str(e)}")
             return []
     
+    def rebuild_condition_index(self) -> int:
+        """Backfill condition links for insights stored before the index existed"""
+        unlinked = ResearchInsight.query.filter(
+            ~ResearchInsight.id.in_(select(ResearchInsightCondition.insight_id))
+        ).all()
+        for insight in unlinked:
+            insight.applicable_conditions = list(insight.applicable_conditions or [])
+        db.session.commit()
+        return len(unlinked)
+    
+    def _ensure_condition_index(self):
+        """Backfill once per process; new insights are linked on write"""
+        if not self._condition_index_checked:
+            backfilled = self.rebuild_condition_index()
+            if backfilled:
+                logger.info(f"Indexed conditions for {backfilled} research insights")
+            self._condition_index_checked = True
+    
     def analyze_dataset_for_patterns(self, dataset_id: int, 
                                    analysis_type: str = 'correlation') -> Dict[str, Any]:
         """Analyze a clinical dataset for patterns relevant to mental health"""
@@ -411,30 +484,21 @@ class ResearchManager:
         }
     
     def _generate_embeddings(self, text: str) -> List[float]:
-        """Generate text embeddings for similarity search"""
+        """Generate text embeddings in the search index space"""
         try:
-            # Simple TF-IDF based embeddings
-            # In production, use more sophisticated embeddings (e.g., BERT)
-            if not hasattr(self, '_fitted_vectorizer'):
-                # Fit on a sample if not already fitted
-                sample_texts = ["mental health", "therapy", "diagnosis", "treatment"]
-                self.vectorizer.fit(sample_texts)
-                self._fitted_vectorizer = True
-            
-            vector = self.vectorizer.transform([text]).toarray()[0]
-            return vector.tolist()
+            self._ensure_index()
+            return self.index.embed([text])[0].tolist()
         except Exception:
-            return [0.0] * 100  # Return zero vector on error
+            return []
     
     def _calculate_similarity(self, embedding1: List[float], 
                             embedding2: List[float]) -> float:
         """Calculate cosine similarity between embeddings"""
         try:
-            sim = cosine_similarity(
-                np.array(embedding1).reshape(1, -1),
-                np.array(embedding2).reshape(1, -1)
-            )[0][0]
-            return float(sim)
+            a = np.asarray(embedding1, dtype=np.float32)
+            b = np.asarray(embedding2, dtype=np.float32)
+            denom = np.linalg.norm(a) * np.linalg.norm(b)
+            return float(a @ b / denom) if denom else 0.0
         except Exception:
             return 0.0
     
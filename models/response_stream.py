@@ -0,0 +1,62 @@
+"""
+Streaming Response Helpers for MindMend
+=======================================
+Small pieces that let a therapy response be acted on while it is still
+being generated.
+
+- `SentenceBuffer` collects token deltas. It hands back each sentence once
+  the token after it arrives, because "3." followed by "5" is not the end
+  of a sentence. The avatar starts speaking at the first complete sentence
+  instead of waiting for the whole reply.
+- `CrisisScanner` runs the health checker's risk scan over the growing
+  response. Each call scans only the newly completed text plus a short
+  overlap, so phrases split across sentences still match and the cost
+  stays flat however long the reply gets. Every category is reported
+  once per response.
+"""
+
+import re
+from typing import Any, Callable, Dict, List
+
+SENTENCE_END = re.compile(r'[.!?]+(?=\s)')
+
+
+class SentenceBuffer:
+    """Accumulates streamed text and releases complete sentences"""
+
+    def __init__(self):
+        self.text = ''
+        self._released = 0
+
+    def feed(self, delta: str) -> List[str]:
+        self.text += delta
+        sentences = []
+        for match in SENTENCE_END.finditer(self.text, self._released):
+            sentence = self.text[self._released:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            self._released = match.end()
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Whatever is left once the stream has ended"""
+        rest = self.text[self._released:].strip()
+        self._released = len(self.text)
+        return [rest] if rest else []
+
+
+class CrisisScanner:
+    """Scans completed text for crisis indicators without rescanning the whole buffer"""
+
+    def __init__(self, scan: Callable[[str], List[Dict[str, Any]]], overlap: int = 60):
+        self.scan = scan
+        self.overlap = overlap
+        self.reported = set()
+        self._tail = ''
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        window = f"{self._tail} {text}" if self._tail else text
+        self._tail = window[-self.overlap:]
+        alerts = [alert for alert in self.scan(window) if alert.get('category') not in self.reported]
+        self.reported.update(alert.get('category') for alert in alerts)
+        return alerts
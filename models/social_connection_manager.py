@@ -14,7 +14,9 @@ from dataclasses import dataclass
 from enum import Enum
 import uuid
 import hashlib
-from sqlalchemy import text
+import time
+from sqlalchemy import text, delete, insert
+from models.peer_matching import PeerMatchingEngine
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +99,9 @@ class SocialConnectionManager:
         self.safety_protocols = self._initialize_safety_protocols()
         self.active_connections = {}
         self.moderation_queue = []
+        self.matching_engine = PeerMatchingEngine()
+        self.matching_engine_ttl = int(os.environ.get('PEER_MATCHING_ENGINE_TTL', 900))
+        self._matching_engine_loaded_at = None
 
     def _initialize_matching_algorithms(self) -> Dict[str, Any]:
         """Initialize peer matching algorithms"""
@@ -322,47 +327,137 @@ class SocialConnectionManager:
     def find_peer_matches(self, user_id: int, connection_type: ConnectionType,
                          user_preferences: Dict[str, Any] = None) -> List[PeerMatch]:
         """Find compatible peer matches for a user"""
+        user_preferences = user_preferences or {}
+        engine = self._ensure_matching_engine()
 
-        # Get user profile (in production, fetch from database)
         user_profile = self._get_user_profile(user_id)
+        algorithm = self.matching_algorithms.get(connection_type.value, self.matching_algorithms["support_buddy"])
 
-        # Get potential matches (in production, query database)
-        potential_matches = self._get_potential_matches(user_id, connection_type)
+        # Inverted-index prefilter, vectorized block scoring, heap top-k
+        top = engine.top_matches(
+            user_profile,
+            connection_type.value,
+            algorithm["weight_factors"],
+            minimum_score=algorithm.get("minimum_compatibility", 0.6),
+            k=user_preferences.get("limit", 10),
+            location_scope=user_preferences.get("location_scope")
+        )
 
+        # Only the winners get the descriptive (Python-level) treatment
         matches = []
+        for compatibility_score, peer_id in top:
+            candidate = engine.profiles[peer_id]
+            matches.append(PeerMatch(
+                user1_id=user_id,
+                user2_id=peer_id,
+                connection_type=connection_type,
+                compatibility_score=compatibility_score,
+                shared_attributes=self._find_shared_attributes(user_profile, candidate),
+                recommended_activities=self._get_recommended_activities(
+                    user_profile, candidate, connection_type
+                ),
+                match_reasoning=self._generate_match_reasoning(
+                    user_profile, candidate, compatibility_score
+                ),
+                safety_level=self._assess_safety_level(user_profile, candidate)
+            ))
+
+        return matches
+
+    def generate_batch_matches(self, connection_type: ConnectionType = ConnectionType.SUPPORT_BUDDY,
+                               k: int = 10, chunk_size: int = 5000) -> Dict[str, Any]:
+        """Precompute top-k matches for every profile and store them (nightly job)"""
+        from models.database import db, PeerMatchSuggestion
+
+        started = time.perf_counter()
+        engine = self._ensure_matching_engine(force=True)
         algorithm = self.matching_algorithms.get(connection_type.value, self.matching_algorithms["support_buddy"])
+        generated_at = datetime.utcnow()
+
+        db.session.execute(delete(PeerMatchSuggestion).where(
+            PeerMatchSuggestion.connection_type == connection_type.value
+        ))
+
+        users = 0
+        rows = []
+        stored = 0
+        for user_id, top in engine.generate_all_matches(
+            connection_type.value,
+            algorithm["weight_factors"],
+            minimum_score=algorithm.get("minimum_compatibility", 0.6),
+            k=k
+        ):
+            users += 1
+            rows.extend({
+                'user_id': user_id,
+                'peer_id': peer_id,
+                'connection_type': connection_type.value,
+                'compatibility_score': score,
+                'rank': rank,
+                'generated_at': generated_at
+            } for rank, (score, peer_id) in enumerate(top, 1))
+            if len(rows) >= chunk_size:
+                db.session.execute(insert(PeerMatchSuggestion), rows)
+                stored += len(rows)
+                rows = []
+        if rows:
+            db.session.execute(insert(PeerMatchSuggestion), rows)
+            stored += len(rows)
+        db.session.commit()
 
-        for candidate in potential_matches:
-            compatibility_score = self._calculate_compatibility(
-                user_profile,
-                candidate,
-                algorithm["weight_factors"]
-            )
+        return {
+            'connection_type': connection_type.value,
+            'users': users,
+            'matches_stored': stored,
+            'duration_seconds': round(time.perf_counter() - started, 2)
+        }
 
-            if compatibility_score >= algorithm["minimum_compatibility"]:
-                shared_attributes = self._find_shared_attributes(user_profile, candidate)
-                recommended_activities = self._get_recommended_activities(
-                    user_profile, candidate, connection_type
-                )
-
-                match = PeerMatch(
-                    user1_id=user_id,
-                    user2_id=candidate["user_id"],
-                    connection_type=connection_type,
-                    compatibility_score=compatibility_score,
-                    shared_attributes=shared_attributes,
-                    recommended_activities=recommended_activities,
-                    match_reasoning=self._generate_match_reasoning(
-                        user_profile, candidate, compatibility_score
-                    ),
-                    safety_level=self._assess_safety_level(user_profile, candidate)
-                )
-                matches.append(match)
-
-        # Sort by compatibility score
-        matches.sort(key=lambda x: x.compatibility_score, reverse=True)
-
-        return matches[:10]  # Return top 10 matches
+    def get_suggested_matches(self, user_id: int,
+                              connection_type: ConnectionType = ConnectionType.SUPPORT_BUDDY) -> List[Dict[str, Any]]:
+        """Read matches precomputed by generate_batch_matches"""
+        from models.database import PeerMatchSuggestion
+
+        suggestions = PeerMatchSuggestion.query.filter_by(
+            user_id=user_id, connection_type=connection_type.value
+        ).order_by(PeerMatchSuggestion.rank).all()
+        return [{
+            'peer_id': s.peer_id,
+            'compatibility_score': s.compatibility_score,
+            'rank': s.rank,
+            'generated_at': s.generated_at.isoformat() if s.generated_at else None
+        } for s in suggestions]
+
+    def update_peer_profile(self, profile: Dict[str, Any]):
+        """Reflect a profile change in the matching engine immediately"""
+        self._ensure_matching_engine().upsert(profile)
+
+    def _ensure_matching_engine(self, force: bool = False) -> PeerMatchingEngine:
+        """(Re)load the engine from stored peer profiles once its TTL has expired"""
+        loaded_at = self._matching_engine_loaded_at
+        if not force and loaded_at and time.monotonic() - loaded_at < self.matching_engine_ttl:
+            return self.matching_engine
+
+        profiles = self._load_peer_profiles()
+        if not profiles:
+            # No stored profiles (demo mode): index the sample pool
+            profiles = self._get_potential_matches(0, ConnectionType.SUPPORT_BUDDY)
+
+        engine = PeerMatchingEngine()
+        engine.load(profiles)
+        self.matching_engine = engine
+        self._matching_engine_loaded_at = time.monotonic()
+        logger.info(f"Peer matching engine loaded with {engine.count} profiles")
+        return engine
+
+    def _load_peer_profiles(self) -> List[Dict[str, Any]]:
+        """Active peer profiles from the database"""
+        try:
+            from models.database import PeerProfile
+            return [p.to_matching_profile() for p in
+                    PeerProfile.query.filter_by(active=True).yield_per(5000)]
+        except Exception as e:
+            logger.warning(f"Peer profiles unavailable: {e}")
+            return []
 
     def create_group_session(self, session_type: GroupSessionType,
                            moderator_id: int,
@@ -622,7 +717,11 @@ class SocialConnectionManager:
 
     def _get_user_profile(self, user_id: int) -> Dict[str, Any]:
         """Get user profile for matching"""
-        # Mock profile - in production, fetch from database
+        profile = self.matching_engine.profiles.get(user_id)
+        if profile:
+            return profile
+
+        # Mock profile for users without a stored peer profile
         return {
             "user_id": user_id,
             "age": 28,
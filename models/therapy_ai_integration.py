@@ -3,10 +3,12 @@ Integration module for AI-powered therapy sessions
 Connects multiple AI models with the therapy system
 """
 
+import asyncio
 import logging
 from typing import Dict, Any, List
 from datetime import datetime
 import numpy as np
+from models.ai_gateway import ai_gateway
 from models.ai_model_manager import ai_model_manager, ModelType
 from models.treatment_recommender import TreatmentRecommender
 from models.research_manager import research_manager
@@ -29,20 +31,30 @@ class TherapyAIIntegration:
                                session_data: Dict[str, Any],
                                use_ensemble: bool = True) -> Dict[str, Any]:
         """Enhanced therapy response using multiple AI models"""
+        return ai_gateway.run(self.enhance_therapy_response_async(
+            session_type, user_message, session_data, use_ensemble
+        ))
+    
+    async def enhance_therapy_response_async(self, 
+                                           session_type: str,
+                                           user_message: str,
+                                           session_data: Dict[str, Any],
+                                           use_ensemble: bool = True) -> Dict[str, Any]:
+        """Enhanced therapy response; model calls in each step run concurrently"""
         
         # Extract patient profile from session
         patient_profile = self._extract_patient_profile(session_data)
         
         # Get initial diagnosis if needed
         if not session_data.get('diagnosis'):
-            diagnosis = self.ai_manager.diagnose_with_ensemble(patient_profile)
+            diagnosis = await self.ai_manager.diagnose_with_ensemble_async(patient_profile)
             session_data['diagnosis'] = diagnosis
         else:
             diagnosis = session_data['diagnosis']
         
         # Get treatment recommendations
         if not session_data.get('treatment_plan'):
-            treatment_plan = self.treatment_recommender.generate_personalized_treatment_plan(
+            treatment_plan = await self.treatment_recommender.generate_personalized_treatment_plan_async(
                 diagnosis,
                 patient_profile,
                 session_data.get('preferences', {})
@@ -53,7 +65,7 @@ class TherapyAIIntegration:
         
         # Generate enhanced therapy response
         if use_ensemble:
-            response = self._generate_ensemble_response(
+            response = await self._generate_ensemble_response(
                 session_type,
                 user_message,
                 diagnosis,
@@ -61,7 +73,7 @@ class TherapyAIIntegration:
                 session_data
             )
         else:
-            response = self._generate_single_model_response(
+            response = await self._generate_single_model_response(
                 session_type,
                 user_message,
                 diagnosis,
@@ -69,8 +81,8 @@ class TherapyAIIntegration:
                 session_data
             )
         
-        # Enhance with research insights
-        response = self._enhance_with_research(response, diagnosis)
+        # Enhance with research insights (a database query, kept off the event loop)
+        response = await asyncio.to_thread(self._enhance_with_research, response, diagnosis)
         
         # Add recommended activities
         response['recommended_activities'] = self._get_session_activities(
@@ -110,7 +122,7 @@ class TherapyAIIntegration:
             'motivation_level': session_data.get('motivation_level', 7)
         }
     
-    def _generate_ensemble_response(self,
+    async def _generate_ensemble_response(self,
                                   session_type: str,
                                   user_message: str,
                                   diagnosis: Dict[str, Any],
@@ -131,30 +143,32 @@ class TherapyAIIntegration:
             'previous_responses': session_data.get('response_history', [])[-3:]  # Last 3 exchanges
         }
         
-        # Get responses from different models
+        # Get responses from different models, all at once
         active_models = self.ai_manager.active_models[:3]  # Use top 3 models
+        model_names = []
+        calls = []
         
         for model_name in active_models:
-            try:
-                model_config = self.ai_manager.models[model_name]
-                
-                # Generate prompt based on model specialization
-                prompt = self._create_therapy_prompt(context, model_config.specialization)
-                
-                # Get response based on model type
-                if model_config.type == ModelType.OPENAI_GPT:
-                    response = self._get_openai_therapy_response(prompt, model_config)
-                elif model_config.type == ModelType.OLLAMA:
-                    response = self._get_ollama_therapy_response(prompt, model_config)
-                else:
-                    continue
-                
-                if response:
-                    responses.append(response)
-                    model_weights[model_name] = model_config.accuracy_score or 0.8
-                    
-            except Exception as e:
-                logger.error(f"Error getting response from {model_name}: {str(e)}")
+            model_config = self.ai_manager.models[model_name]
+            
+            # Generate prompt based on model specialization
+            prompt = self._create_therapy_prompt(context, model_config.specialization)
+            
+            # Get response based on model type
+            if model_config.type == ModelType.OPENAI_GPT:
+                calls.append(self._get_openai_therapy_response_async(prompt, model_config))
+            elif model_config.type == ModelType.OLLAMA:
+                calls.append(self._get_ollama_therapy_response_async(prompt, model_config))
+            else:
+                continue
+            model_names.append(model_name)
+        
+        for model_name, response in zip(model_names, await asyncio.gather(*calls, return_exceptions=True)):
+            if isinstance(response, Exception):
+                logger.error(f"Error getting response from {model_name}: {str(response)}")
+            elif response:
+                responses.append(response)
+                model_weights[model_name] = self.ai_manager.models[model_name].accuracy_score or 0.8
         
         # Aggregate responses
         if not responses:
@@ -196,22 +210,23 @@ class TherapyAIIntegration:
     
     def _get_openai_therapy_response(self, prompt: str, config: Any) -> Dict[str, Any]:
         """Get therapy response from OpenAI"""
+        return ai_gateway.run(self._get_openai_therapy_response_async(prompt, config))
+    
+    async def _get_openai_therapy_response_async(self, prompt: str, config: Any) -> Dict[str, Any]:
         try:
-            from openai import OpenAI
-            client = OpenAI(api_key=config.api_key)
-            
-            response = client.chat.completions.create(
-                model=config.name,
-                messages=[
+            text = await ai_gateway.chat(
+                config.name,
+                [
                     {"role": "system", "content": "You are a compassionate and professional therapist."},
                     {"role": "user", "content": prompt}
                 ],
+                api_key=config.api_key,
                 temperature=0.8,
                 max_tokens=500
             )
             
             return {
-                'text': response.choices[0].message.content,
+                'text': text,
                 'model': config.name,
                 'confidence': 0.9
             }
@@ -222,18 +237,11 @@ class TherapyAIIntegration:
     
     def _get_ollama_therapy_response(self, prompt: str, config: Any) -> Dict[str, Any]:
         """Get therapy response from Ollama"""
+        return ai_gateway.run(self._get_ollama_therapy_response_async(prompt, config))
+    
+    async def _get_ollama_therapy_response_async(self, prompt: str, config: Any) -> Dict[str, Any]:
         try:
-            import requests
-            
-            response = requests.post(
-                config.endpoint,
-                json={
-                    "model": config.name,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
+            response = await ai_gateway.ollama_generate(config.endpoint, config.name, prompt, timeout=30)
             
             if response.status_code == 200:
                 result = response.json()
@@ -386,7 +394,7 @@ class TherapyAIIntegration:
         self.session_contexts[session_id]['exchanges'] = \
             self.session_contexts[session_id]['exchanges'][-10:]
     
-    def _generate_single_model_response(self,
+    async def _generate_single_model_response(self,
                                       session_type: str,
                                       user_message: str,
                                       diagnosis: Dict[str, Any],
@@ -408,7 +416,7 @@ class TherapyAIIntegration:
         for model_name in self.ai_manager.active_models:
             config = self.ai_manager.models[model_name]
             if config.type == ModelType.OPENAI_GPT:
-                response = self._get_openai_therapy_response(prompt, config)
+                response = await self._get_openai_therapy_response_async(prompt, config)
                 if response:
                     return {
                         'response': response['text'],
@@ -0,0 +1,340 @@
+"""
+Training Job Manager for MindMend Custom AI Models
+==================================================
+Runs CustomAIBuilder.train_model outside the admin HTTP request.
+
+A TrainingJob row records status, stage, progress and cancellation. Jobs are
+dispatched to Celery (tasks_ai_training.run_training_job); when no broker is
+reachable they fall back to a local process pool. Each job checkpoints its
+expensive stages to a work directory, so a job whose worker died is resumed
+rather than restarted from scratch.
+
+A worker claims a job with a conditional UPDATE and keeps its heartbeat fresh
+from a background thread, so a long stage is never mistaken for a lost
+worker and two workers never train the same job into the same directory.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, update
+
+from models.database import db
+from models.custom_ai_builder import CustomAIBuilder, CustomAIModel, TrainingJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('succeeded', 'failed', 'cancelled')
+
+# A running job whose heartbeat is older than this is considered orphaned
+STALE_AFTER = timedelta(minutes=10)
+
+# How often a running job refreshes its heartbeat, including inside long stages
+HEARTBEAT_INTERVAL = timedelta(minutes=1)
+
+
+class TrainingCancelled(Exception):
+    """Raised from the progress callback when a cancel was requested"""
+
+
+class _Heartbeat:
+    """Refreshes a running job's heartbeat_at from a background thread
+
+    Progress callbacks only run between stages, and a single fit or
+    cross-validation can take longer than STALE_AFTER. Uses its own
+    connection, so it does not touch the request's session.
+    """
+
+    def __init__(self, engine, job_id, interval):
+        self.engine = engine
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f'training-heartbeat-{job_id}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(TrainingJob)
+                        .where(TrainingJob.id == self.job_id, TrainingJob.status == 'running')
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+            except Exception as e:
+                logger.warning(f"Heartbeat for training job {self.job_id} failed: {e}")
+
+
+def _run_in_process(job_id):
+    """Process-pool entry point: a fresh interpreter needs its own app context"""
+    from app import app
+
+    with app.app_context():
+        return TrainingJobManager().run(job_id)
+
+
+class TrainingJobManager:
+    """Creates, dispatches, runs and cancels training jobs"""
+
+    _pool = None
+
+    def __init__(self, builder=None, work_root=None, heartbeat_interval=None):
+        self.builder = builder or CustomAIBuilder()
+        self.heartbeat_interval = heartbeat_interval or HEARTBEAT_INTERVAL.total_seconds()
+        self.work_root = work_root or os.environ.get(
+            'TRAINING_JOB_DIR', os.path.join(self.builder.model_storage_path, 'jobs')
+        )
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    def submit(self, model_id, dataset_id, training_config=None, created_by='admin', executor=None):
+        """Record a job and dispatch it; returns the TrainingJob"""
+        active = TrainingJob.query.filter(
+            TrainingJob.model_id == model_id,
+            TrainingJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if active:
+            raise ValueError(f"Model {model_id} already has an active training job ({active.id})")
+
+        job = TrainingJob(
+            model_id=model_id,
+            dataset_id=dataset_id,
+            training_config=json.dumps(training_config or {}),
+            created_by=created_by,
+            message='Waiting for a training worker'
+        )
+        db.session.add(job)
+        db.session.flush()
+        job.work_dir = os.path.join(self.work_root, f'job_{job.id}')
+
+        model = db.session.get(CustomAIModel, model_id)
+        if model:
+            model.status = 'training'
+        db.session.commit()
+
+        self.dispatch(job, executor)
+        return job
+
+    def dispatch(self, job, executor=None):
+        """Hand the job to Celery, or to the local process pool if that fails"""
+        executor = executor or os.environ.get('TRAINING_JOB_EXECUTOR', 'celery')
+        if executor == 'celery':
+            try:
+                from tasks_ai_training import run_training_job
+
+                result = run_training_job.delay(job.id)
+                job.task_id = result.id
+                job.executor = 'celery'
+                db.session.commit()
+                return
+            except Exception as e:
+                logger.warning(f"Celery unavailable for training job {job.id}, using process pool: {e}")
+
+        job.executor = 'process'
+        db.session.commit()
+        self._process_pool().submit(_run_in_process, job.id)
+
+    @classmethod
+    def _process_pool(cls):
+        # spawn: the web worker holds threads and DB connections that must not be forked
+        if cls._pool is None:
+            cls._pool = ProcessPoolExecutor(
+                max_workers=int(os.environ.get('TRAINING_JOB_PROCESSES', 1)),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return cls._pool
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    def run(self, job_id):
+        """Run (or resume) a job in the current process"""
+        job = db.session.get(TrainingJob, job_id)
+        if job is None:
+            raise ValueError(f"Training job {job_id} not found")
+        if job.status in FINISHED_STATUSES:
+            return job.to_dict()
+        if job.cancel_requested:
+            return self._finish_cancelled(job)
+
+        if not self._claim(job_id):
+            # Another worker holds the job and its heartbeat is fresh; leave its work_dir alone
+            logger.info(f"Training job {job_id} is already running elsewhere")
+            db.session.refresh(job)
+            return job.to_dict()
+
+        job = db.session.get(TrainingJob, job_id)
+        job.started_at = job.started_at or datetime.utcnow()
+        if job.attempts > 1:
+            job.message = f'Resuming (attempt {job.attempts})'
+        db.session.commit()
+
+        heartbeat = _Heartbeat(db.engine, job_id, self.heartbeat_interval)
+        heartbeat.start()
+        try:
+            result = self.builder.train_model(
+                job.model_id, job.dataset_id, json.loads(job.training_config or '{}'),
+                progress=lambda stage, fraction, message=None: self._report(job_id, stage, fraction, message),
+                work_dir=job.work_dir
+            )
+        except TrainingCancelled:
+            heartbeat.stop()
+            db.session.rollback()
+            return self._finish_cancelled(db.session.get(TrainingJob, job_id))
+        except Exception as e:
+            heartbeat.stop()
+            db.session.rollback()
+            job = db.session.get(TrainingJob, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            job.message = 'Training failed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            self._cleanup(job)
+            raise
+        except BaseException:
+            # Worker shutdown: stop heartbeating so the job goes stale and is resumed
+            heartbeat.stop()
+            raise
+        heartbeat.stop()
+
+        job = db.session.get(TrainingJob, job_id)
+        job.status = 'succeeded'
+        job.stage = 'completed'
+        job.progress = 1.0
+        job.message = f"Accuracy {result['accuracy']:.2%}"
+        job.result = json.dumps({
+            'accuracy': result['accuracy'],
+            'cv_score': result['cv_score']
+        })
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        self._cleanup(job)
+        return job.to_dict()
+
+    def _claim(self, job_id):
+        """Atomically mark a queued (or orphaned) job as running; False if another worker has it"""
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(TrainingJob)
+            .where(
+                TrainingJob.id == job_id,
+                or_(
+                    TrainingJob.status == 'queued',
+                    and_(TrainingJob.status == 'running',
+                         or_(TrainingJob.heartbeat_at.is_(None), TrainingJob.heartbeat_at < now - STALE_AFTER))
+                )
+            )
+            .values(status='running', heartbeat_at=now, attempts=func.coalesce(TrainingJob.attempts, 0) + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return claimed == 1
+
+    def _report(self, job_id, stage, fraction, message=None):
+        """Progress callback: persist progress and honour cancellation"""
+        job = db.session.get(TrainingJob, job_id)
+        db.session.refresh(job, ['cancel_requested'])
+        if job.cancel_requested:
+            raise TrainingCancelled()
+        job.stage = stage
+        job.progress = fraction
+        job.message = message
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+    def _finish_cancelled(self, job):
+        job.status = 'cancelled'
+        job.message = 'Cancelled by administrator'
+        job.finished_at = datetime.utcnow()
+
+        # Put the model back the way it was before training started
+        model = db.session.get(CustomAIModel, job.model_id)
+        if model and model.status in ('training', 'error'):
+            model.status = 'ready' if model.model_file_path else 'created'
+        db.session.commit()
+        self._cleanup(job)
+        return job.to_dict()
+
+    def _cleanup(self, job):
+        if job.work_dir and os.path.isdir(job.work_dir):
+            shutil.rmtree(job.work_dir, ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Control
+    # ------------------------------------------------------------------
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs are cancelled immediately"""
+        job = db.session.get(TrainingJob, job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job.to_dict() if job else None
+
+        job.cancel_requested = True
+        db.session.commit()
+
+        if job.status == 'queued':
+            if job.task_id:
+                try:
+                    from celery_app import celery_app
+                    celery_app.control.revoke(job.task_id)
+                except Exception as e:
+                    logger.warning(f"Could not revoke training task {job.task_id}: {e}")
+            return self._finish_cancelled(job)
+
+        # Running jobs stop at the next stage boundary
+        return job.to_dict()
+
+    def get(self, job_id):
+        job = db.session.get(TrainingJob, job_id)
+        return job.to_dict() if job else None
+
+    def latest_for_model(self, model_id):
+        job = TrainingJob.query.filter_by(model_id=model_id).order_by(TrainingJob.id.desc()).first()
+        return job.to_dict() if job else None
+
+    def resume_stale_jobs(self):
+        """Re-dispatch running jobs whose worker stopped sending heartbeats"""
+        cutoff = datetime.utcnow() - STALE_AFTER
+        stale = TrainingJob.query.filter(
+            TrainingJob.status == 'running',
+            TrainingJob.heartbeat_at < cutoff
+        ).all()
+        resumed = 0
+        for job in stale:
+            # Conditional, so a job whose heartbeat came back in the meantime is left running
+            requeued = db.session.execute(
+                update(TrainingJob)
+                .where(TrainingJob.id == job.id, TrainingJob.status == 'running',
+                       TrainingJob.heartbeat_at < cutoff)
+                .values(status='queued', message='Re-queued after worker loss')
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.session.commit()
+            if not requeued:
+                continue
+            logger.warning(f"Resuming stale training job {job.id} from its last checkpoint")
+            db.session.refresh(job)
+            self.dispatch(job, job.executor)
+            resumed += 1
+        return resumed
+
+
+training_jobs = TrainingJobManager()
@@ -270,14 +270,40 @@ class TreatmentRecommender:
         """Generate comprehensive personalized treatment plan using AI consensus"""
         
         # Get AI consensus on treatment approach
-        treatment_query = {
+        ai_recommendations = self.ai_manager.diagnose_with_ensemble(
+            self._treatment_query(diagnosis, patient_profile, preferences)
+        )
+        
+        return self._build_treatment_plan(diagnosis, patient_profile, preferences, ai_recommendations)
+    
+    async def generate_personalized_treatment_plan_async(self, 
+                                                         diagnosis: Dict[str, Any],
+                                                         patient_profile: Dict[str, Any],
+                                                         preferences: Dict[str, Any] = None) -> TreatmentPlan:
+        """Async version of generate_personalized_treatment_plan"""
+        ai_recommendations = await self.ai_manager.diagnose_with_ensemble_async(
+            self._treatment_query(diagnosis, patient_profile, preferences)
+        )
+        
+        return self._build_treatment_plan(diagnosis, patient_profile, preferences, ai_recommendations)
+    
+    def _treatment_query(self, 
+                         diagnosis: Dict[str, Any],
+                         patient_profile: Dict[str, Any],
+                         preferences: Dict[str, Any] = None) -> Dict[str, Any]:
+        return {
             'diagnosis': diagnosis,
             'patient_profile': patient_profile,
             'preferences': preferences or {},
             'query_type': 'treatment_recommendation'
         }
-        
-        ai_recommendations = self.ai_manager.diagnose_with_ensemble(treatment_query)
+    
+    def _build_treatment_plan(self, 
+                              diagnosis: Dict[str, Any],
+                              patient_profile: Dict[str, Any],
+                              preferences: Dict[str, Any],
+                              ai_recommendations: Dict[str, Any]) -> TreatmentPlan:
+        """Assemble the plan around the models' consensus"""
         
         # Determine primary condition
         primary_condition = self._extract_primary_condition(diagnosis)
@@ -10,6 +10,9 @@ import logging
 import numpy as np
 import re
 import asyncio
+import bisect
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass
@@ -20,6 +23,7 @@ import hashlib
 
 # Import local models
 from models.model_training_analytics import ModelTrainingAnalytics
+from models.crisis_features import dataset_hash, feature_cache, model_feature_matrix, model_features
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +42,61 @@ class ModelTier(Enum):
     MODERATE = "moderate"  # < $0.01 per call
     EXPENSIVE = "expensive" # > $0.01 per call
 
+# Paid tiers each plan may escalate through, cheapest first
+TIER_ESCALATION = {
+    'basic': [ModelTier.CHEAP],
+    'premium': [ModelTier.CHEAP, ModelTier.MODERATE],
+    'enterprise': [ModelTier.CHEAP, ModelTier.MODERATE, ModelTier.EXPENSIVE]
+}
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds) for one pipeline stage"""
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        index = bisect.bisect_left(self.BUCKETS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation"""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.BUCKETS[index] if index < len(self.BUCKETS) else float('inf')
+        return float('inf')
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts, count, total = list(self.counts), self.count, self.total
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.BUCKETS + ('+Inf',), counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        return {
+            'count': count,
+            'sum': round(total, 6),
+            'avg': round(total / count, 6) if count else None,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': buckets
+        }
+
 @dataclass
 class CrisisPrediction:
     """Crisis prediction result"""
@@ -64,8 +123,12 @@ class UniversalCrisisPredictor:
         self.load_custom_model()
         self.executor = ThreadPoolExecutor(max_workers=3)
 
-        # Crisis detection patterns (works offline)
+        # Crisis detection patterns (works offline), compiled once rather than per message
         self.crisis_patterns = self._initialize_crisis_patterns()
+        self.compiled_patterns = {
+            category: [re.compile(pattern, re.IGNORECASE) for pattern in config['patterns']]
+            for category, config in self.crisis_patterns.items()
+        }
 
         # Model routing configuration
         self.model_routes = {
@@ -93,6 +156,23 @@ class UniversalCrisisPredictor:
         self.prediction_cache = {}
         self.cache_ttl = 300  # 5 minutes
 
+        # Staged pipeline: escalate while the verdict sits in the uncertain band
+        self.escalation_band = (0.25, 0.75)
+        self.deadline = float(os.environ.get('CRISIS_PREDICTION_DEADLINE', 2.0))
+        self.tier_costs = {
+            ModelTier.CHEAP: 0.001,
+            ModelTier.MODERATE: 0.01,
+            ModelTier.EXPENSIVE: 0.03
+        }
+        # Simulated provider round trips until the tier models are wired in
+        self.tier_latency = {
+            ModelTier.CHEAP: 0.1,
+            ModelTier.MODERATE: 0.3,
+            ModelTier.EXPENSIVE: 0.6
+        }
+        self.stage_latency = {stage: LatencyHistogram()
+                              for stage in ['free'] + [tier.value for tier in TIER_ESCALATION['enterprise']] + ['total']}
+
     def _initialize_crisis_patterns(self) -> Dict[str, Dict[str, Any]]:
         """Initialize crisis detection patterns for offline detection"""
         return {
@@ -171,10 +251,12 @@ class UniversalCrisisPredictor:
                             text: str,
                             user_tier: str = 'free',
                             context: Optional[Dict[str, Any]] = None,
-                            force_free: bool = False) -> CrisisPrediction:
+                            force_free: bool = False,
+                            deadline: Optional[float] = None) -> CrisisPrediction:
         """
         Predict crisis with tier-appropriate models
-        Always runs free detection first for immediate response
+        Free detectors run in parallel; paid tiers start speculatively and
+        escalate only while confidence is uncertain, within a hard deadline
         """
 
         # Check cache first
@@ -184,62 +266,234 @@ class UniversalCrisisPredictor:
             if (datetime.now() - cached['timestamp']).seconds < self.cache_ttl:
                 return cached['prediction']
 
-        # Always run free detection first for immediate response
-        free_prediction = await self._run_free_detection(text, context)
-
-        # If critical crisis detected, return immediately
-        if free_prediction.severity == CrisisSeverity.CRITICAL:
-            logger.warning(f"CRITICAL crisis detected: {free_prediction.risk_factors}")
-            return free_prediction
+        started = time.perf_counter()
+        if force_free or user_tier == 'free':
+            tiers = []
+        else:
+            tiers = TIER_ESCALATION.get(user_tier, TIER_ESCALATION['premium'])
 
-        # If user is free tier or force_free, return free prediction
-        if user_tier == 'free' or force_free:
+        if not tiers:
+            free_prediction = await self._run_free_detection(text, context)
+            self.stage_latency['total'].observe(time.perf_counter() - started)
+            if free_prediction.severity == CrisisSeverity.CRITICAL:
+                logger.warning(f"CRITICAL crisis detected: {free_prediction.risk_factors}")
             return free_prediction
 
-        # For paid tiers, enhance with additional models
-        enhanced_prediction = await self._enhance_with_paid_models(
-            text, context, user_tier, free_prediction
+        prediction = await self._run_staged_pipeline(
+            text, context, tiers, started + (deadline if deadline is not None else self.deadline)
         )
+        self.stage_latency['total'].observe(time.perf_counter() - started)
 
-        # Cache the result
-        self.prediction_cache[cache_key] = {
-            'prediction': enhanced_prediction,
-            'timestamp': datetime.now()
-        }
+        # If critical crisis detected, return immediately
+        if prediction.severity == CrisisSeverity.CRITICAL and prediction.model_used == 'free_ensemble':
+            logger.warning(f"CRITICAL crisis detected: {prediction.risk_factors}")
+            return prediction
+
+        # Cache the result, unless the deadline cut it short: the next call should get the full pipeline
+        truncated = 'deadline_exceeded' in prediction.risk_factors or prediction.model_used == 'deadline_fallback'
+        if not truncated:
+            self.prediction_cache[cache_key] = {
+                'prediction': prediction,
+                'timestamp': datetime.now()
+            }
 
         # Log for training data
-        await self._log_prediction(text, enhanced_prediction)
+        await self._log_prediction(text, prediction)
+
+        return prediction
+
+    async def _run_staged_pipeline(self,
+                                   text: str,
+                                   context: Optional[Dict[str, Any]],
+                                   tiers: List[ModelTier],
+                                   deadline_at: float) -> CrisisPrediction:
+        """Free stage, then paid tiers cheapest first, returning the best verdict by the deadline"""
+
+        started = time.perf_counter()
+
+        # The cheap tier only needs the text, so start it alongside the free stage
+        pending = asyncio.ensure_future(self._run_paid_stage(tiers[0], text, context))
+        stages = []
+        deadline_hit = False
+
+        try:
+            try:
+                free_prediction = await asyncio.wait_for(
+                    self._run_free_detection(text, context), max(deadline_at - time.perf_counter(), 0)
+                )
+            except asyncio.TimeoutError:
+                return self._deadline_fallback(started)
+
+            if free_prediction.severity == CrisisSeverity.CRITICAL:
+                return free_prediction
+
+            stages.append({
+                'is_crisis': free_prediction.is_crisis,
+                'severity': free_prediction.severity,
+                'confidence': free_prediction.confidence,
+                'risk_factors': free_prediction.risk_factors,
+                'method': 'free_ensemble',
+                'cost': 0.0
+            })
+
+            for index, tier in enumerate(tiers):
+                if index:
+                    pending = asyncio.ensure_future(self._run_paid_stage(tier, text, context))
+
+                done, _ = await asyncio.wait({pending}, timeout=max(deadline_at - time.perf_counter(), 0))
+                if not done:
+                    deadline_hit = True
+                    break
+
+                result = pending.result()
+                if result is None:
+                    continue
+                stages.append(result)
+
+                # Each tier is trusted over the smaller ones, so its own certainty decides
+                low, high = self.escalation_band
+                if not low <= result['confidence'] < high:
+                    break
+        finally:
+            if not pending.done():
+                pending.cancel()
+
+        return self._build_staged_prediction(stages, time.perf_counter() - started, deadline_hit)
+
+    async def _run_paid_stage(self,
+                              tier: ModelTier,
+                              text: str,
+                              context: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Run one paid tier and record its latency"""
+
+        started = time.perf_counter()
+        try:
+            result = await self._call_tier_model(tier, text, context)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"{tier.value} tier crisis model failed: {e}")
+            return None
+
+        self.stage_latency[tier.value].observe(time.perf_counter() - started)
+        return result
+
+    async def _call_tier_model(self,
+                               tier: ModelTier,
+                               text: str,
+                               context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Get a verdict from the first model routed to a paid tier"""
+
+        # This would integrate with actual AI providers
+        # For now, simulate the call with the offline detectors
+        await asyncio.sleep(self.tier_latency[tier])
+
+        verdict = self._aggregate_predictions([
+            self._detect_crisis_patterns(text),
+            self._apply_crisis_rules(text, context)
+        ])
+        boost = {ModelTier.CHEAP: 0.1, ModelTier.MODERATE: 0.15, ModelTier.EXPENSIVE: 0.2}[tier]
+        if verdict['confidence'] > 0:
+            verdict['confidence'] = min(verdict['confidence'] + boost, 0.99)
+
+        verdict.update({
+            'method': f"{tier.value}:{self.model_routes[tier][0]}",
+            'cost': self.tier_costs[tier]
+        })
+        return verdict
+
+    def _combine_stages(self, stages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge stage verdicts, trusting later (larger) tiers more and keeping the worst severity"""
+
+        weights = {'free_ensemble': 1.0, 'cheap': 1.5, 'moderate': 2.0, 'expensive': 3.0}
+        severity_order = [CrisisSeverity.MINIMAL, CrisisSeverity.LOW, CrisisSeverity.MEDIUM,
+                          CrisisSeverity.HIGH, CrisisSeverity.CRITICAL]
+
+        total_weight = 0.0
+        weighted_confidence = 0.0
+        severity = CrisisSeverity.MINIMAL
+        risk_factors = []
+        for stage in stages:
+            weight = weights.get(stage['method'].split(':')[0], 1.0)
+            weighted_confidence += stage['confidence'] * weight
+            total_weight += weight
+            severity = max(severity, stage['severity'], key=severity_order.index)
+            risk_factors.extend(f for f in stage['risk_factors'] if f not in risk_factors)
 
-        return enhanced_prediction
+        confidence = weighted_confidence / max(total_weight, 0.001)
+        return {
+            'is_crisis': confidence >= 0.4 or severity_order.index(severity) >= severity_order.index(CrisisSeverity.HIGH),
+            'severity': severity,
+            'confidence': confidence,
+            'risk_factors': risk_factors
+        }
+
+    def _build_staged_prediction(self,
+                                 stages: List[Dict[str, Any]],
+                                 latency: float,
+                                 deadline_hit: bool) -> CrisisPrediction:
+        """Turn the completed stages into the returned prediction"""
+
+        combined = self._combine_stages(stages)
+        risk_factors = combined['risk_factors']
+        if len(stages) > 1:
+            risk_factors.append('enhanced_analysis')
+        if deadline_hit:
+            risk_factors.append('deadline_exceeded')
+            logger.warning(f"Crisis prediction deadline hit after {[s['method'] for s in stages]}")
+
+        return CrisisPrediction(
+            is_crisis=combined['is_crisis'],
+            severity=combined['severity'],
+            confidence=combined['confidence'],
+            risk_factors=risk_factors,
+            recommended_actions=self._get_recommended_actions(combined['severity']),
+            model_used='+'.join(stage['method'] for stage in stages),
+            cost=sum(stage['cost'] for stage in stages),
+            latency=latency,
+            requires_human_review=deadline_hit or combined['confidence'] < 0.8
+        )
+
+    def _deadline_fallback(self, started: float) -> CrisisPrediction:
+        """Verdict when not even the free stage finished in time"""
+
+        logger.warning("Crisis prediction deadline hit before free detection finished")
+        return CrisisPrediction(
+            is_crisis=False,
+            severity=CrisisSeverity.MEDIUM,
+            confidence=0.0,
+            risk_factors=['deadline_exceeded'],
+            recommended_actions=self._get_recommended_actions(CrisisSeverity.MEDIUM),
+            model_used='deadline_fallback',
+            cost=0.0,
+            latency=time.perf_counter() - started,
+            requires_human_review=True
+        )
 
     async def _run_free_detection(self,
                                  text: str,
                                  context: Optional[Dict[str, Any]] = None) -> CrisisPrediction:
         """Run completely free crisis detection"""
 
-        start_time = datetime.now()
-
-        # 1. Pattern-based detection (instant, no cost)
-        pattern_result = self._detect_crisis_patterns(text)
-
-        # 2. Rule-based detection (instant, no cost)
-        rule_result = self._apply_crisis_rules(text, context)
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
 
-        # 3. Custom model if available (near-instant, no cost)
-        custom_result = None
+        # Pattern, rule and custom model detectors are independent; run them side by side
+        detectors = [
+            loop.run_in_executor(self.executor, self._detect_crisis_patterns, text),
+            loop.run_in_executor(self.executor, self._apply_crisis_rules, text, context)
+        ]
         if self.custom_model:
-            custom_result = self._run_custom_model(text, context)
+            detectors.append(loop.run_in_executor(self.executor, self._run_custom_model, text, context))
 
-        # Combine results
-        predictions = [pattern_result, rule_result]
-        if custom_result:
-            predictions.append(custom_result)
+        predictions = [p for p in await asyncio.gather(*detectors) if p]
 
         # Aggregate predictions
         final_prediction = self._aggregate_predictions(predictions)
 
         # Calculate latency
-        latency = (datetime.now() - start_time).total_seconds()
+        latency = time.perf_counter() - started
+        self.stage_latency['free'].observe(latency)
 
         return CrisisPrediction(
             is_crisis=final_prediction['is_crisis'],
@@ -262,8 +516,8 @@ class UniversalCrisisPredictor:
         confidence = 0.0
 
         for category, config in self.crisis_patterns.items():
-            for pattern in config['patterns']:
-                if re.search(pattern, text_lower, re.IGNORECASE):
+            for pattern in self.compiled_patterns[category]:
+                if pattern.search(text_lower):
                     detected_patterns.append(category)
                     confidence += config['confidence_boost']
 
@@ -405,30 +659,7 @@ class UniversalCrisisPredictor:
 
     def _extract_model_features(self, text: str, context: Optional[Dict[str, Any]]) -> np.ndarray:
         """Extract features for ML model"""
-
-        features = []
-
-        # Text features
-        features.append(len(text))
-        features.append(len(text.split()))
-        features.append(text.count('!'))
-        features.append(text.count('?'))
-        features.append(sum(1 for c in text if c.isupper()) / max(len(text), 1))
-
-        # Pattern matches
-        text_lower = text.lower()
-        crisis_keywords = ['suicide', 'die', 'kill', 'hurt', 'pain', 'hopeless', 'worthless']
-        features.append(sum(1 for kw in crisis_keywords if kw in text_lower))
-
-        # Context features (if available)
-        if context:
-            features.append(float(context.get('session_count', 0)))
-            features.append(float(context.get('days_since_last_crisis', 30)))
-            features.append(float(context.get('user_age', 25)))
-        else:
-            features.extend([0, 30, 25])  # Default values
-
-        return np.array(features)
+        return model_features(text, context)
 
     def _aggregate_predictions(self, predictions: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Aggregate multiple predictions into final result"""
@@ -500,34 +731,6 @@ class UniversalCrisisPredictor:
             'risk_factors': list(set(all_risk_factors))  # Remove duplicates
         }
 
-    async def _enhance_with_paid_models(self,
-                                       text: str,
-                                       context: Optional[Dict[str, Any]],
-                                       user_tier: str,
-                                       base_prediction: CrisisPrediction) -> CrisisPrediction:
-        """Enhance prediction with paid models for premium users"""
-
-        # This would integrate with actual AI providers
-        # For now, return enhanced version of base prediction
-
-        # Simulate API call delay
-        await asyncio.sleep(0.1)
-
-        # In production, would call actual models based on tier
-        enhanced = CrisisPrediction(
-            is_crisis=base_prediction.is_crisis,
-            severity=base_prediction.severity,
-            confidence=min(base_prediction.confidence + 0.1, 0.99),  # Boost confidence
-            risk_factors=base_prediction.risk_factors + ['enhanced_analysis'],
-            recommended_actions=base_prediction.recommended_actions,
-            model_used=f'{base_prediction.model_used}+{user_tier}_models',
-            cost=0.001 if user_tier == 'basic' else 0.01,  # Simulated cost
-            latency=base_prediction.latency + 0.5,
-            requires_human_review=base_prediction.confidence < 0.8
-        )
-
-        return enhanced
-
     def _get_recommended_actions(self, severity: CrisisSeverity) -> List[str]:
         """Get recommended actions based on severity"""
 
@@ -593,17 +796,13 @@ class UniversalCrisisPredictor:
             return False
 
         try:
-            # Extract features and labels
-            X = []
-            y = []
-
-            for text, is_crisis in training_data:
-                features = self._extract_model_features(text, {})
-                X.append(features)
-                y.append(int(is_crisis))
-
-            X = np.array(X)
-            y = np.array(y)
+            # Extract features and labels (the same extractor inference uses)
+            texts = [text for text, _ in training_data]
+            y = np.array([int(is_crisis) for _, is_crisis in training_data])
+            X, = feature_cache.get_or_compute(
+                dataset_hash('crisis_model', np.array(texts, dtype=object).astype(str), y),
+                lambda: (model_feature_matrix(texts),)
+            )
 
             # Train a simple model quickly
             from sklearn.ensemble import RandomForestClassifier
@@ -632,6 +831,10 @@ class UniversalCrisisPredictor:
             logger.error(f"Emergency training failed: {e}")
             return False
 
+    def get_stage_latency(self) -> Dict[str, Dict[str, Any]]:
+        """Latency histograms for each pipeline stage"""
+        return {stage: histogram.snapshot() for stage, histogram in self.stage_latency.items()}
+
     def get_system_status(self) -> Dict[str, Any]:
         """Get current system status and capabilities"""
 
@@ -645,6 +848,8 @@ class UniversalCrisisPredictor:
             ],
             'cache_size': len(self.prediction_cache),
             'patterns_loaded': len(self.crisis_patterns),
+            'deadline_seconds': self.deadline,
+            'stage_latency': self.get_stage_latency(),
             'status': 'operational'
         }
 
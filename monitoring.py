@@ -10,16 +10,21 @@ import time
 import psutil
 import logging
 import smtplib
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 from dataclasses import dataclass
 from enum import Enum
 import requests
 import docker
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from models.log_analyzer import LogTailAnalyzer
+from models.metrics_store import MetricsTimeSeries
+from models.request_metrics import RequestMetrics, request_metrics
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -59,7 +64,12 @@ class ApplicationMetrics:
 class MindMendMonitoring:
     def __init__(self):
         self.docker_client = docker.from_env()
-        self.metrics_history = []
+        # One row per cycle in a fixed-size ring, with hourly/daily rollups kept on disk
+        self.metrics_store = MetricsTimeSeries(
+            os.environ.get("METRICS_STORE_PATH", "/var/log/mindmend/metrics_history.npz")
+        )
+        # cpu_percent(interval=None) reports usage since the previous call; prime it
+        psutil.cpu_percent(interval=None)
         self.alert_config = {
             "cpu_threshold": 85,
             "memory_threshold": 90,
@@ -79,11 +89,19 @@ class MindMendMonitoring:
         
         self.last_alerts = {}
         self.alert_cooldown = 300  # 5 minutes cooldown between similar alerts
+
+        # Request metrics shared by the app workers; each cycle reports the delta since the last one
+        self.request_metrics = request_metrics
+        self.ai_endpoints = ('/ai/', '/api/therapy-session', '/api/ai-models')
+        self._last_request_snapshot = None
+        self.request_window = None
+
+        self.log_analyzers = {}
     
     def collect_system_metrics(self) -> SystemMetrics:
         """Collect system performance metrics"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             network = psutil.net_io_counters()
@@ -109,13 +127,15 @@ class MindMendMonitoring:
     def collect_application_metrics(self) -> ApplicationMetrics:
         """Collect application-specific metrics"""
         try:
-            # Get active sessions (placeholder - implement with your session store)
+            self._refresh_request_window()
+
+            # Get active sessions (open Socket.IO connections)
             active_sessions = self._get_active_sessions()
             
-            # Get response time from recent logs (placeholder)
+            # Get response time from request instrumentation
             response_time_avg = self._calculate_avg_response_time()
             
-            # Get error rate from logs
+            # Get error rate from request instrumentation
             error_rate = self._calculate_error_rate()
             
             # Get AI model usage
@@ -141,18 +161,21 @@ class MindMendMonitoring:
         container_status = {}
         
         try:
-            containers = self.docker_client.containers.list(all=True)
-            
-            for container in containers:
-                if "mindmend" in container.name:
-                    container_status[container.name] = {
-                        "status": container.status,
-                        "health": getattr(container.attrs["State"], "Health", {}).get("Status", "unknown"),
-                        "restart_count": container.attrs["RestartCount"],
-                        "started_at": container.attrs["State"]["StartedAt"],
-                        "cpu_usage": self._get_container_cpu_usage(container),
-                        "memory_usage": self._get_container_memory_usage(container)
-                    }
+            containers = [c for c in self.docker_client.containers.list(all=True) if "mindmend" in c.name]
+
+            # stats(stream=False) waits for two samples per container; poll them side by side
+            with ThreadPoolExecutor(max_workers=max(1, min(len(containers), 8))) as pool:
+                usages = list(pool.map(self._get_container_usage, containers))
+
+            for container, (cpu_usage, memory_usage) in zip(containers, usages):
+                container_status[container.name] = {
+                    "status": container.status,
+                    "health": container.attrs["State"].get("Health", {}).get("Status", "unknown"),
+                    "restart_count": container.attrs["RestartCount"],
+                    "started_at": container.attrs["State"]["StartedAt"],
+                    "cpu_usage": cpu_usage,
+                    "memory_usage": memory_usage
+                }
         except Exception as e:
             logger.error(f"Error checking Docker health: {e}")
         
@@ -193,38 +216,17 @@ class MindMendMonitoring:
         """Analyze application logs for errors and patterns"""
         if not os.path.exists(log_file):
             return {"error": "Log file not found"}
-        
-        cutoff_time = datetime.utcnow() - timedelta(seconds=time_window)
-        error_count = 0
-        warning_count = 0
-        total_requests = 0
-        error_patterns = {}
-        
+
+        # Tail from where the previous cycle stopped instead of re-reading the file
+        key = (log_file, time_window)
+        if key not in self.log_analyzers:
+            self.log_analyzers[key] = LogTailAnalyzer(log_file, window_seconds=time_window)
+
         try:
-            with open(log_file, 'r') as f:
-                for line in f:
-                    # Parse log line timestamp and level
-                    if "ERROR" in line:
-                        error_count += 1
-                        # Extract error patterns
-                        if ":" in line:
-                            error_type = line.split(":")[-1].strip()[:50]
-                            error_patterns[error_type] = error_patterns.get(error_type, 0) + 1
-                    elif "WARNING" in line:
-                        warning_count += 1
-                    elif any(method in line for method in ["GET", "POST", "PUT", "DELETE"]):
-                        total_requests += 1
+            return self.log_analyzers[key].analyze()
         except Exception as e:
             logger.error(f"Error analyzing logs: {e}")
             return {"error": str(e)}
-        
-        return {
-            "error_count": error_count,
-            "warning_count": warning_count,
-            "total_requests": total_requests,
-            "error_rate": (error_count / max(total_requests, 1)) * 100,
-            "top_errors": sorted(error_patterns.items(), key=lambda x: x[1], reverse=True)[:5]
-        }
     
     def send_alert(self, level: AlertLevel, title: str, message: str, metrics: Dict = None):
         """Send alert via email"""
@@ -244,7 +246,7 @@ class MindMendMonitoring:
         
         try:
             # Create email
-            msg = MimeMultipart()
+            msg = MIMEMultipart()
             msg['From'] = self.email_config["email"]
             msg['To'] = ", ".join(self.email_config["alert_recipients"])
             msg['Subject'] = f"[MindMend {level.value.upper()}] {title}"
@@ -275,7 +277,7 @@ Server: {os.uname().nodename}
 MindMend Monitoring System
 """
             
-            msg.attach(MimeText(body, 'plain'))
+            msg.attach(MIMEText(body, 'plain'))
             
             # Send email
             with smtplib.SMTP(self.email_config["smtp_server"], self.email_config["smtp_port"]) as server:
@@ -332,10 +334,11 @@ MindMend Monitoring System
                     {"response_time_avg": app_metrics.response_time_avg}
                 )
     
-    def generate_health_report(self) -> Dict:
+    def generate_health_report(self, system_metrics: SystemMetrics = None,
+                               app_metrics: ApplicationMetrics = None) -> Dict:
         """Generate comprehensive health report"""
-        system_metrics = self.collect_system_metrics()
-        app_metrics = self.collect_application_metrics()
+        system_metrics = system_metrics or self.collect_system_metrics()
+        app_metrics = app_metrics or self.collect_application_metrics()
         docker_health = self.check_docker_health()
         service_status = self.check_service_endpoints()
         log_analysis = self.analyze_logs("/var/log/mindmend/app.log")
@@ -347,7 +350,8 @@ MindMend Monitoring System
             "application_metrics": app_metrics.__dict__ if app_metrics else None,
             "docker_health": docker_health,
             "service_status": service_status,
-            "log_analysis": log_analysis
+            "log_analysis": log_analysis,
+            "trends": self.metrics_store.report()
         }
         
         # Determine overall status
@@ -383,21 +387,24 @@ MindMend Monitoring System
             
             # Store metrics
             if system_metrics and app_metrics:
-                self.metrics_history.append({
-                    "timestamp": datetime.utcnow(),
-                    "system": system_metrics,
-                    "application": app_metrics
+                self.metrics_store.record({
+                    "cpu_percent": system_metrics.cpu_percent,
+                    "memory_percent": system_metrics.memory_percent,
+                    "disk_percent": system_metrics.disk_percent,
+                    "bytes_sent": system_metrics.network_io["bytes_sent"],
+                    "bytes_recv": system_metrics.network_io["bytes_recv"],
+                    "process_count": system_metrics.process_count,
+                    "active_sessions": app_metrics.active_sessions,
+                    "response_time_avg": app_metrics.response_time_avg,
+                    "error_rate": app_metrics.error_rate
                 })
-                
-                # Keep only last 1440 entries (24 hours if run every minute)
-                if len(self.metrics_history) > 1440:
-                    self.metrics_history = self.metrics_history[-1440:]
+                self.metrics_store.save()
             
             # Check thresholds
             self.check_thresholds(system_metrics, app_metrics)
             
             # Generate and save health report
-            health_report = self.generate_health_report()
+            health_report = self.generate_health_report(system_metrics, app_metrics)
             self._save_health_report(health_report)
             
             logger.info("Monitoring cycle completed successfully")
@@ -410,46 +417,69 @@ MindMend Monitoring System
                 f"Error in monitoring cycle: {str(e)}"
             )
     
+    def _refresh_request_window(self) -> Dict:
+        """Aggregate worker request metrics accumulated since the previous cycle"""
+        snapshot = self.request_metrics.snapshot()
+        self.request_window = RequestMetrics.window(snapshot, self._last_request_snapshot)
+        self._last_request_snapshot = snapshot
+        return self.request_window
+
+    def _request_totals(self, transport: str = 'http') -> Dict:
+        window = self.request_window or self._refresh_request_window()
+        totals = {'count': 0, 'errors': 0, 'sum': 0.0}
+        for name, stats in window['endpoints'].items():
+            if name.startswith(f'{transport} '):
+                for key in totals:
+                    totals[key] += stats[key]
+        return totals
+
     def _get_active_sessions(self) -> int:
         """Get count of active user sessions"""
-        # Placeholder - implement with your session store
-        return 0
-    
+        window = self.request_window or self._refresh_request_window()
+        return window['gauges']['socketio_connections']
+
     def _calculate_avg_response_time(self) -> float:
-        """Calculate average response time from logs"""
-        # Placeholder - implement log parsing
-        return 0.0
-    
+        """Calculate average HTTP response time (seconds) since the last cycle"""
+        totals = self._request_totals()
+        return totals['sum'] / totals['count'] if totals['count'] else 0.0
+
     def _calculate_error_rate(self) -> float:
-        """Calculate error rate from logs"""
-        # Placeholder - implement log parsing
-        return 0.0
-    
+        """Calculate HTTP error rate (percent of 5xx responses) since the last cycle"""
+        totals = self._request_totals()
+        return totals['errors'] / totals['count'] * 100 if totals['count'] else 0.0
+
     def _get_ai_model_usage(self) -> Dict:
         """Get AI model usage statistics"""
-        # Placeholder - implement model usage tracking
-        return {}
-    
+        window = self.request_window or self._refresh_request_window()
+        return {
+            name.split(' ', 1)[1]: RequestMetrics.summarize(stats)
+            for name, stats in window['endpoints'].items()
+            if name.startswith('http ') and any(prefix in name for prefix in self.ai_endpoints)
+        }
+
     def _get_database_connections(self) -> int:
         """Get active database connections"""
         # Placeholder - implement database connection counting
         return 0
     
-    def _get_container_cpu_usage(self, container) -> float:
-        """Get CPU usage for Docker container"""
-        try:
-            stats = container.stats(stream=False)
-            return 0.0  # Placeholder calculation
-        except:
-            return 0.0
-    
-    def _get_container_memory_usage(self, container) -> Dict:
-        """Get memory usage for Docker container"""
+    def _get_container_usage(self, container) -> tuple:
+        """Get CPU percent and memory usage for a Docker container from one stats call"""
         try:
             stats = container.stats(stream=False)
-            return {"usage": 0, "limit": 0}  # Placeholder
-        except:
-            return {"usage": 0, "limit": 0}
+        except Exception:
+            return 0.0, {"usage": 0, "limit": 0}
+
+        cpu_stats = stats.get("cpu_stats", {})
+        precpu_stats = stats.get("precpu_stats", {})
+        cpu_delta = (cpu_stats.get("cpu_usage", {}).get("total_usage", 0)
+                     - precpu_stats.get("cpu_usage", {}).get("total_usage", 0))
+        system_delta = cpu_stats.get("system_cpu_usage", 0) - precpu_stats.get("system_cpu_usage", 0)
+        online_cpus = cpu_stats.get("online_cpus") or len(cpu_stats.get("cpu_usage", {}).get("percpu_usage") or [1])
+        cpu_percent = cpu_delta / system_delta * online_cpus * 100 if cpu_delta > 0 and system_delta > 0 else 0.0
+
+        memory_stats = stats.get("memory_stats", {})
+        memory_usage = {"usage": memory_stats.get("usage", 0), "limit": memory_stats.get("limit", 0)}
+        return round(cpu_percent, 2), memory_usage
     
     def _check_database_connection(self, service: str) -> Dict:
         """Check database connection health"""
@@ -16,6 +16,7 @@ from flask import request, jsonify, current_app, session
 from flask_login import current_user
 from cryptography.fernet import Fernet
 from models.database import db, User, Payment, Subscription
+from models.rate_limiter import rate_limiter
 import stripe
 
 logger = logging.getLogger(__name__)
@@ -232,24 +233,14 @@ def rate_limit_payments(max_attempts=5, window=3600):
             if not current_user.is_authenticated:
                 return f(*args, **kwargs)
             
-            # Check rate limit in session or cache
-            key = f"payment_attempts_{current_user.id}"
-            attempts = session.get(key, [])
-            
-            # Clean old attempts
-            now = time.time()
-            attempts = [t for t in attempts if now - t < window]
-            
-            if len(attempts) >= max_attempts:
+            # Shared across workers and not stored in the client's cookie
+            result = rate_limiter.hit(f"payment:{current_user.id}", max_attempts, window)
+            if not result.allowed:
                 return jsonify({
                     'error': 'Too many payment attempts. Please try again later.',
-                    'retry_after': int(window - (now - min(attempts)))
+                    'retry_after': int(result.retry_after) + 1
                 }), 429
             
-            # Record this attempt
-            attempts.append(now)
-            session[key] = attempts
-            
             return f(*args, **kwargs)
         return decorated_function
     return decorator
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark avatar lip-sync timeline generation.
+
+Generates timelines for a synthetic mix of therapy replies, where a share of
+the turns are canned phrases (greetings, fallbacks) and the rest are unique
+sentences. It reports timelines per second for the old per-call
+implementation, the engine with an empty cache (distinct texts only), the
+engine on the realistic mix and on canned phrases alone, and incremental
+generation from streamed deltas.
+
+Usage:
+    python scripts/benchmark_lip_sync.py [--turns 20000] [--canned-share 0.3]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.lip_sync import LipSyncEngine, LipSyncStream  # noqa: E402
+
+CANNED = [
+    "Hello, I'm here to support you on your journey. How are you feeling today?",
+    "I'm here to listen and support you. Please feel free to share what's on your mind.",
+    "Let's take a moment to breathe together. When you're ready, please continue...",
+    "I understand you're reaching out. How can I help you today?",
+]
+
+VOCABULARY = (
+    'that sounds really difficult and it makes sense you feel this way right now '
+    'anxiety often peaks before stressful moments let us try a short grounding exercise '
+    'notice five things you can see then take one slow breath and tell me how it felt '
+    'your feelings are valid thank you for sharing this with me what would help most today'
+).split()
+
+
+def legacy_lip_sync(text):
+    """The per-call implementation the engine replaced"""
+    phoneme_mapping = {
+        'a': 'open_wide', 'e': 'open_medium', 'i': 'closed_smile', 'o': 'rounded_open',
+        'u': 'rounded_closed', 'm': 'lips_together', 'p': 'lips_together', 'b': 'lips_together',
+        'f': 'lower_lip_teeth', 'v': 'lower_lip_teeth', 's': 'teeth_together', 'z': 'teeth_together',
+        'th': 'tongue_teeth', 'l': 'tongue_tip', 'n': 'tongue_tip', 't': 'tongue_tip', 'd': 'tongue_tip'
+    }
+    timeline = []
+    current_time = 0
+    for word in text.split():
+        word_duration = len(word) * 0.1
+        shape = 'neutral'
+        for char in word.lower():
+            if char in phoneme_mapping:
+                shape = phoneme_mapping[char]
+                break
+        timeline.append({'start_time': current_time, 'end_time': current_time + word_duration,
+                         'mouth_shape': shape, 'word': word})
+        current_time += word_duration + 0.1
+    return {'timeline': timeline, 'total_duration': current_time, 'sync_accuracy': 'simplified'}
+
+
+def workload(turns, canned_share, seed=3):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(turns):
+        if rng.random() < canned_share:
+            texts.append(rng.choice(CANNED))
+        else:
+            words = rng.choices(VOCABULARY, k=rng.randint(8, 30))
+            texts.append(' '.join(words).capitalize() + '.')
+    return texts
+
+
+def rate(generate, texts):
+    started = time.perf_counter()
+    for text in texts:
+        generate(text)
+    return len(texts) / (time.perf_counter() - started)
+
+
+def streamed(text):
+    # Deltas of a few characters, roughly what a provider streams
+    stream = LipSyncStream()
+    for start in range(0, len(text), 4):
+        stream.feed(text[start:start + 4])
+    stream.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--turns', type=int, default=20000)
+    parser.add_argument('--canned-share', type=float, default=0.3, help='share of turns that are canned phrases')
+    args = parser.parse_args()
+
+    texts = workload(args.turns, args.canned_share)
+    distinct = list(dict.fromkeys(texts))
+
+    legacy = rate(legacy_lip_sync, texts)
+    cold = rate(LipSyncEngine(max_entries=1).timeline, distinct)
+    engine = LipSyncEngine(max_entries=512)
+    mixed = rate(engine.timeline, texts)
+    hit_rate = engine.stats()['hit_rate']
+    hits = rate(engine.timeline, CANNED * (args.turns // len(CANNED)))
+    incremental = rate(streamed, texts)
+
+    print(f"turns:                {len(texts):,} ({len(distinct):,} distinct, {args.canned_share:.0%} canned)")
+    print(f"legacy per call:      {legacy:10,.0f} timelines/s")
+    print(f"engine, distinct:     {cold:10,.0f} timelines/s")
+    print(f"engine, mixed:        {mixed:10,.0f} timelines/s (cache hit rate {hit_rate:.0%})")
+    print(f"engine, cached only:  {hits:10,.0f} timelines/s")
+    print(f"incremental stream:   {incremental:10,.0f} timelines/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request overhead of the shared rate limiter.
+
+Times RateLimiter.hit() against the memory and shared-memory backends over a
+population of client keys, next to the old per-IP list of timestamps that
+was filtered on every request. The shared-memory backend is also timed with
+several processes hitting the same table at once.
+
+Usage:
+    python scripts/benchmark_rate_limiter.py [--calls 200000] [--keys 10000] [--workers 4]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.rate_limiter import MemoryBackend, RateLimiter, SharedMemoryBackend  # noqa: E402
+
+LIMIT = 100
+PERIOD = 60
+
+
+class LegacyListLimiter:
+    """The old SecurityManager.is_rate_limited: a list of timestamps per IP"""
+
+    def __init__(self):
+        self.attempts = {}
+
+    def hit(self, key):
+        now = time.time()
+        attempts = [t for t in self.attempts.get(key, []) if now - t < PERIOD]
+        if len(attempts) >= LIMIT:
+            self.attempts[key] = attempts
+            return False
+        attempts.append(now)
+        self.attempts[key] = attempts
+        return True
+
+
+def client_keys(n, calls, seed=3):
+    rng = random.Random(seed)
+    population = [f'ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}' for i in range(n)]
+    return [rng.choice(population) for _ in range(calls)]
+
+
+def time_calls(hit, keys):
+    latencies = np.empty(len(keys))
+    for i, key in enumerate(keys):
+        started = time.perf_counter()
+        hit(key)
+        latencies[i] = time.perf_counter() - started
+    return latencies
+
+
+def describe(name, latencies):
+    p50, p99 = np.percentile(latencies * 1e6, [50, 99])
+    print(f"{name:<28} p50 {p50:6.2f} us   p99 {p99:7.2f} us   {len(latencies) / latencies.sum():>10,.0f} calls/s")
+
+
+def _worker(path, keys, queue):
+    limiter = RateLimiter(SharedMemoryBackend(path))
+    queue.put(time_calls(lambda key: limiter.hit(key, LIMIT, PERIOD), keys))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=200_000)
+    parser.add_argument('--keys', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    keys = client_keys(args.keys, args.calls)
+
+    legacy = LegacyListLimiter()
+    describe('legacy list per IP', time_calls(legacy.hit, keys))
+
+    memory = RateLimiter(MemoryBackend())
+    describe('gcra memory', time_calls(lambda key: memory.hit(key, LIMIT, PERIOD), keys))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'ratelimit.bin')
+        shm = RateLimiter(SharedMemoryBackend(path))
+        describe('gcra shm (1 process)', time_calls(lambda key: shm.hit(key, LIMIT, PERIOD), keys))
+
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        share = args.calls // args.workers
+        workers = [ctx.Process(target=_worker, args=(path, keys[i * share:(i + 1) * share], queue))
+                   for i in range(args.workers)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        describe(f'gcra shm ({args.workers} processes)', np.concatenate(results))
+        print(f"{'':<28} aggregate {share * args.workers / elapsed:,.0f} calls/s")
+
+
+if __name__ == '__main__':
+    main()
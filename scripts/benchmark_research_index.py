@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark the research retrieval index.
+
+Builds an index over a synthetic corpus (100k papers by default) and reports
+build time, matrix size and query latency percentiles. For comparison it also
+times the old per-paper cosine loop on a sample and extrapolates to the full
+corpus.
+
+Usage:
+    python scripts/benchmark_research_index.py [--papers 100000] [--queries 200]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.research_index import ResearchIndex  # noqa: E402
+
+VOCABULARY = (
+    'anxiety depression ptsd insomnia sleep mood screening diagnosis early detection '
+    'adolescents adults couples family conflict mediation communication therapy cbt dbt '
+    'emdr mindfulness stress resilience trauma relapse medication adherence biomarker '
+    'cortisol heart rate variability wearable smartphone digital intervention outcome '
+    'randomized trial cohort meta analysis systematic review efficacy remission suicide '
+    'risk prevention crisis support peer group clinician assessment questionnaire scale'
+).split()
+
+CATEGORIES = ['early_diagnosis', 'conflict_resolution', 'therapy_methods', 'general']
+
+
+def synthetic_corpus(n, seed=7):
+    rng = random.Random(seed)
+    for paper_id in range(1, n + 1):
+        words = rng.choices(VOCABULARY, k=rng.randint(40, 120))
+        yield paper_id, rng.choice(CATEGORIES), ' '.join(words)
+
+
+def percentile(samples, pct):
+    return float(np.percentile(np.asarray(samples) * 1000, pct))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--papers', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dimensions', type=int, default=256)
+    parser.add_argument('--legacy-sample', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    queries = [' '.join(rng.choices(VOCABULARY, k=5)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = ResearchIndex(index_dir=index_dir, dimensions=args.dimensions)
+
+        started = time.perf_counter()
+        index.build(list(synthetic_corpus(args.papers)))
+        build_seconds = time.perf_counter() - started
+        stats = index.stats()
+
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, limit=10)
+            latencies.append(time.perf_counter() - started)
+
+        filtered = []
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query, limit=10, category='therapy_methods')
+            filtered.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for paper_id, category, text in synthetic_corpus(100, seed=99):
+            index.add(args.papers + paper_id, category, text)
+        add_ms = (time.perf_counter() - started) * 10
+
+        # Old path: Python lists of embeddings compared one pair at a time
+        sample = [index.matrix[i].tolist() for i in range(min(args.legacy_sample, index.count))]
+        query_embedding = index.embed([queries[0]])[0].tolist()
+        started = time.perf_counter()
+        for embedding in sample:
+            cosine_similarity(np.array(query_embedding).reshape(1, -1), np.array(embedding).reshape(1, -1))
+        legacy_seconds = (time.perf_counter() - started) * index.count / max(len(sample), 1)
+
+    print(f"papers:              {stats['papers']:,}")
+    print(f"dimensions:          {stats['dimensions']}")
+    print(f"matrix size:         {stats['matrix_bytes'] / 1024 / 1024:.1f} MiB (float32, memory-mapped)")
+    print(f"build time:          {build_seconds:.1f} s")
+    print(f"query p50 / p95:     {percentile(latencies, 50):.2f} / {percentile(latencies, 95):.2f} ms")
+    print(f"filtered p50 / p95:  {percentile(filtered, 50):.2f} / {percentile(filtered, 95):.2f} ms")
+    print(f"incremental add:     {add_ms:.2f} ms/paper")
+    print(f"legacy loop (est.):  {legacy_seconds * 1000:.0f} ms/query")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold start of the Flask app.
+
+Imports the app in fresh interpreters and reports wall-clock and in-process
+import time, the heavy libraries that ended up loaded, and (with --preload)
+what building every lazy service costs on top. With --max-seconds it exits
+non-zero when the median import time goes over budget or a library named in
+--forbid is imported, so it can run as a startup regression gate in CI.
+
+Usage:
+    python scripts/benchmark_startup.py [--runs 5] [--preload]
+                                        [--max-seconds 2.0] [--forbid sklearn,openai,pandas]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('sklearn', 'scipy', 'pandas', 'openai', 'anthropic', 'torch', 'reportlab', 'celery')
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter() - started
+preload = {}
+if %(preload)r:
+    preload = app.services.preload()
+print(json.dumps({
+    'import_seconds': imported,
+    'preload': preload,
+    'heavy': [name for name in %(heavy)r if name in sys.modules],
+    'modules': len(sys.modules)
+}))
+"""
+
+
+def run_once(preload, watched):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', CHILD % {'preload': preload, 'heavy': watched}],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"app import failed:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report['wall_seconds'] = wall
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--preload', action='store_true')
+    parser.add_argument('--max-seconds', type=float)
+    parser.add_argument('--forbid', default='sklearn,openai,pandas')
+    args = parser.parse_args()
+
+    forbidden = [name for name in args.forbid.split(',') if name]
+    watched = tuple(dict.fromkeys(HEAVY_MODULES + tuple(forbidden)))
+    reports = [run_once(args.preload, watched) for _ in range(args.runs)]
+    imports = [report['import_seconds'] for report in reports]
+    walls = [report['wall_seconds'] for report in reports]
+    median_import = statistics.median(imports)
+
+    print(f"runs:                {args.runs}")
+    print(f"import app min/med:  {min(imports) * 1000:.0f} / {median_import * 1000:.0f} ms")
+    print(f"process wall min/med:{min(walls) * 1000:6.0f} / {statistics.median(walls) * 1000:.0f} ms")
+    print(f"modules loaded:      {reports[-1]['modules']}")
+    print(f"heavy libraries:     {', '.join(reports[-1]['heavy']) or 'none'}")
+    if args.preload:
+        for name, seconds in sorted(reports[-1]['preload'].items(), key=lambda item: -item[1]):
+            print(f"  preload {name:<32} {seconds * 1000:7.0f} ms")
+
+    failures = []
+    if args.max_seconds is not None and median_import > args.max_seconds:
+        failures.append(f"median import {median_import:.2f}s exceeds {args.max_seconds:.2f}s")
+    # Preloading imports everything on purpose
+    loaded = [] if args.preload else [name for name in forbidden if name in reports[-1]['heavy']]
+    if loaded:
+        failures.append(f"imported at startup: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Measure time to first token and first avatar speech for streamed therapy responses.
+
+Runs the ASGI entry point under gunicorn against the fake provider from
+load_test_ai_sessions.py. The provider waits --latency seconds, then streams
+its reply word by word, --token-delay seconds apart. The script compares
+waiting for the whole reply from /ai/individual with reading
+/api/therapy-session/stream. For the stream it reports when the first
+'token' event, the first avatar 'speech' event and the 'done' event arrived.
+
+Usage:
+    python scripts/benchmark_streaming.py [--latency 0.4] [--token-delay 0.03] [--runs 5]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from load_test_ai_sessions import free_port, session_cookie, start_fake_provider, start_server  # noqa: E402
+
+MESSAGE = 'I feel anxious before work'
+
+
+def buffered(port, cookie):
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    conn.request('POST', '/ai/individual', body=json.dumps({'message': MESSAGE}),
+                 headers={'Content-Type': 'application/json', 'Cookie': cookie})
+    conn.getresponse().read()
+    conn.close()
+    return time.perf_counter() - started
+
+
+def streamed(port, cookie):
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    conn.request('POST', '/api/therapy-session/stream',
+                 body=json.dumps({'message': MESSAGE, 'avatar_personality': 'compassionate'}),
+                 headers={'Content-Type': 'application/json', 'Cookie': cookie})
+    response = conn.getresponse()
+
+    arrivals = {}
+    while True:
+        line = response.readline()
+        if not line:
+            break
+        if line.startswith(b'event: '):
+            event = line[7:].strip().decode()
+            arrivals.setdefault(event, time.perf_counter() - started)
+            if event in ('done', 'error'):
+                break
+    conn.close()
+    return arrivals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--latency', type=float, default=0.4, help='provider delay before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.03, help='delay between streamed words')
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    provider_port = free_port()
+    start_fake_provider(provider_port, args.latency, args.token_delay)
+    env = dict(os.environ, OPENAI_API_KEY='load-test', OPENAI_BASE_URL=f'http://127.0.0.1:{provider_port}/v1',
+               RATE_LIMIT_BACKEND='memory')
+    os.environ.update(env)
+    cookie = session_cookie()
+
+    port = free_port()
+    server = start_server('asgi:application', 'asgi', 1, port, env)
+    try:
+        buffered(port, cookie)
+        streamed(port, cookie)  # warm-up: first requests load the crisis and health models
+        whole = [buffered(port, cookie) for _ in range(args.runs)]
+        streams = [streamed(port, cookie) for _ in range(args.runs)]
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    def median(event):
+        return statistics.median(arrival[event] for arrival in streams)
+
+    print(f"provider: {args.latency:.2f}s to first token, {args.token_delay * 1000:.0f} ms per word")
+    print(f"  buffered /ai/individual, full reply:    {statistics.median(whole):6.3f}s")
+    print(f"  streamed, first token:                  {median('token'):6.3f}s")
+    print(f"  streamed, first avatar speech chunk:    {median('speech'):6.3f}s")
+    print(f"  streamed, done:                         {median('done'):6.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Load test the AI endpoints: sync gunicorn workers against the ASGI entry point.
+
+Starts a fake OpenAI-compatible provider that answers every chat completion
+after a fixed delay, then serves the app twice with the same number of
+gunicorn workers: `app:app` on sync workers and `asgi:application` on the
+asgi worker. Both are driven with rising numbers of concurrent sessions
+posting to /ai/individual as a logged-in user. Sync workers top out at
+one session per worker per provider round trip; the ASGI workers keep
+serving until the per-provider cap (AI_MAX_CONCURRENCY_OPENAI) is reached.
+
+Usage:
+    python scripts/load_test_ai_sessions.py [--workers 2] [--latency 0.5]
+        [--concurrency 2,8,32,64] [--requests 3]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+LOAD_TEST_EMAIL = 'loadtest@mindmend.invalid'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+REPLY = ("It makes sense that mornings before work feel heavy right now. Anxiety often peaks when "
+         "we anticipate a stressful day. Let's try a short grounding exercise together. Notice five "
+         "things you can see around you. Then take one slow breath and tell me how that felt.")
+
+
+def start_fake_provider(port, latency, token_delay=0.0):
+    """OpenAI-compatible /chat/completions that waits `latency` seconds before answering
+
+    Streaming requests get the reply word by word, `token_delay` seconds apart;
+    others get all of it once the last word would have been generated.
+    """
+    completion = {
+        'id': 'chatcmpl-load', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4o',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': REPLY}}],
+        'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2}
+    }
+    body = json.dumps(completion).encode()
+
+    def chunk(data):
+        payload = f"data: {data}\n\n".encode()
+        return b'%x\r\n%s\r\n' % (len(payload), payload)
+
+    async def stream(writer):
+        writer.write(b'HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\n'
+                     b'transfer-encoding: chunked\r\n\r\n')
+        words = REPLY.split(' ')
+        for index, word in enumerate(words):
+            delta = {'id': 'chatcmpl-load', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'gpt-4o',
+                     'choices': [{'index': 0, 'finish_reason': None,
+                                  'delta': {'content': word if index == 0 else ' ' + word}}]}
+            writer.write(chunk(json.dumps(delta)))
+            await writer.drain()
+            await asyncio.sleep(token_delay)
+        writer.write(chunk('[DONE]') + b'0\r\n\r\n')
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':', 1)[1])
+                request = json.loads(await reader.readexactly(length) or b'{}')
+                await asyncio.sleep(latency)
+                if request.get('stream'):
+                    await stream(writer)
+                else:
+                    # A whole reply takes as long as streaming every word would
+                    await asyncio.sleep(token_delay * len(REPLY.split(' ')))
+                    writer.write(b'HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n'
+                                 b'content-length: %d\r\n\r\n%s' % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def serve():
+        async def main():
+            server = await asyncio.start_server(handle, '127.0.0.1', port, backlog=1024)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+
+
+def session_cookie():
+    """Sign a Flask session for a dedicated load-test patient"""
+    from app import app, db
+    from models.database import Patient
+
+    with app.app_context():
+        patient = Patient.query.filter_by(email=LOAD_TEST_EMAIL).first()
+        if patient is None:
+            patient = Patient(name='Load Test', email=LOAD_TEST_EMAIL, password_hash='!')
+            db.session.add(patient)
+            db.session.commit()
+        user_id = patient.id
+    value = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user_id)})
+    return f"{app.config['SESSION_COOKIE_NAME']}={value}"
+
+
+def start_server(target, worker_class, workers, port, env):
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-k', worker_class,
+         '--workers', str(workers), '--bind', f'127.0.0.1:{port}', '--timeout', '120',
+         '--log-level', 'warning', target],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.time() + 180
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"{target} exited with {server.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"{target} did not come up in time")
+
+
+def post(port, cookie):
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+    conn.request('POST', '/ai/individual', body=json.dumps({'message': 'I feel anxious before work'}),
+                 headers={'Content-Type': 'application/json', 'Cookie': cookie})
+    response = conn.getresponse()
+    ok = response.status == 200 and json.loads(response.read()).get('success')
+    conn.close()
+    return ok, time.perf_counter() - started
+
+
+def run_level(port, cookie, concurrency, requests_per_client):
+    total = concurrency * requests_per_client
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(lambda _: post(port, cookie), range(total)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for _, latency in results)
+    return {
+        'sessions_per_second': total / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'failed': sum(1 for ok, _ in results if not ok)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.5, help='fake provider delay in seconds')
+    parser.add_argument('--concurrency', default='2,8,32,64')
+    parser.add_argument('--requests', type=int, default=3, help='requests per concurrent client')
+    args = parser.parse_args()
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    provider_port = free_port()
+    start_fake_provider(provider_port, args.latency)
+    env = dict(os.environ, OPENAI_API_KEY='load-test', OPENAI_BASE_URL=f'http://127.0.0.1:{provider_port}/v1',
+               RATE_LIMIT_BACKEND='memory')
+    os.environ.update(env)
+    cookie = session_cookie()
+
+    print(f"{args.workers} workers, provider latency {args.latency:.2f}s, "
+          f"ideal sync ceiling {args.workers / args.latency:.1f} sessions/s")
+    print(f"{'server':>6} {'clients':>8} {'sessions/s':>11} {'p50 s':>7} {'p95 s':>7} {'failed':>7}")
+    for label, target, worker_class in (('sync', 'app:app', 'sync'), ('asgi', 'asgi:application', 'asgi')):
+        port = free_port()
+        server = start_server(target, worker_class, args.workers, port, env)
+        try:
+            for concurrency in levels:
+                result = run_level(port, cookie, concurrency, args.requests)
+                print(f"{label:>6} {concurrency:>8} {result['sessions_per_second']:>11.1f} "
+                      f"{result['p50']:>7.2f} {result['p95']:>7.2f} {result['failed']:>7}")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory with and without prefork preloading.
+
+Starts gunicorn twice with the repository's gunicorn.conf.py: once with
+GUNICORN_PRELOAD=0 (each worker imports the app and loads every model
+itself) and once with GUNICORN_PRELOAD=1 (the master loads them and workers
+inherit the pages). After a few warm-up requests it reports each worker's
+unique set size (USS, memory only that process holds), proportional set size
+(PSS) and RSS. Shared pages count towards RSS but not USS, so the USS column
+is what each additional worker really costs.
+
+Usage:
+    python scripts/measure_worker_memory.py [--workers 4] [--requests 40]
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import psutil
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_workers(master, workers, url, timeout=180):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if master.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {master.returncode}")
+        children = psutil.Process(master.pid).children()
+        if len(children) >= workers:
+            try:
+                urllib.request.urlopen(url, timeout=5).read()
+                return children
+            except OSError:
+                pass
+        time.sleep(0.5)
+    raise RuntimeError("workers did not come up in time")
+
+
+def create_tables():
+    # Without preloading every worker runs db.create_all() at once; have the schema in place first
+    subprocess.run([sys.executable, '-c', 'import app'], cwd=REPO_ROOT, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def measure(preload, workers, requests):
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/health'
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0')
+    master = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--workers', str(workers),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        children = wait_for_workers(master, workers, url)
+        for _ in range(requests):
+            urllib.request.urlopen(url, timeout=10).read()
+        time.sleep(1)
+
+        rows = []
+        for child in children:
+            info = child.memory_full_info()
+            rows.append((child.pid, info.uss, getattr(info, 'pss', 0), info.rss))
+        master_uss = psutil.Process(master.pid).memory_full_info().uss
+        return rows, master_uss
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+
+
+def report(title, rows, master_uss):
+    mib = 1024 * 1024
+    print(f"\n{title}")
+    print(f"  {'pid':>8} {'USS MiB':>9} {'PSS MiB':>9} {'RSS MiB':>9}")
+    for pid, uss, pss, rss in rows:
+        print(f"  {pid:>8} {uss / mib:9.1f} {pss / mib:9.1f} {rss / mib:9.1f}")
+    total = sum(row[1] for row in rows)
+    print(f"  master USS {master_uss / mib:.1f} MiB; workers' unique total {total / mib:.1f} MiB, "
+          f"{total / len(rows) / mib:.1f} MiB per worker")
+    return total / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=40)
+    args = parser.parse_args()
+
+    create_tables()
+    before = report('Per-worker loading (GUNICORN_PRELOAD=0)', *measure(False, args.workers, args.requests))
+    after = report('Prefork preloading (GUNICORN_PRELOAD=1)', *measure(True, args.workers, args.requests))
+    print(f"\nUnique memory per worker: {before / 1024 / 1024:.1f} -> {after / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
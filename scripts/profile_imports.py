@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Profile what importing the app costs, module by module.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+reports the slowest imports by cumulative time, the first-party modules
+(files in this repository) with what they pulled in, and self time summed per
+top-level package. Cumulative time is charged to the module that imported a
+dependency first, so after fixing one offender the cost can move to the next
+importer rather than disappear.
+
+Usage:
+    python scripts/profile_imports.py [--module app] [--top 25]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_importtime(module):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        fields = line[len('import time:'):].split('|')
+        self_us, cumulative_us, name = int(fields[0]), int(fields[1]), fields[2]
+        depth = (len(name) - len(name.lstrip(' '))) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def slowest(rows, limit, exclude=None):
+    # A package and the submodule it imports first can both report the same total; keep one line per name
+    seen = set()
+    for row in sorted(rows, key=lambda row: -row[2]):
+        if row[0] in seen or row[0] == exclude:
+            continue
+        seen.add(row[0])
+        yield row
+        if len(seen) >= limit:
+            return
+
+
+def first_party(name):
+    top = name.split('.')[0]
+    return os.path.exists(os.path.join(REPO_ROOT, f'{top}.py')) or \
+        os.path.exists(os.path.join(REPO_ROOT, top, '__init__.py'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--top', type=int, default=25)
+    args = parser.parse_args()
+
+    rows = run_importtime(args.module)
+    total = next((cumulative for name, _, cumulative, _ in reversed(rows) if name == args.module), 0)
+
+    print(f"import {args.module}: {total / 1000:.0f} ms ({len(rows)} modules)\n")
+
+    print("Slowest imports (cumulative):")
+    for name, self_us, cumulative_us, depth in slowest(rows, args.top, exclude=args.module):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {self_us / 1000:7.1f} ms self  {name}")
+
+    print("\nFirst-party modules (cumulative, includes third-party imports they triggered first):")
+    ours = [row for row in rows if first_party(row[0])]
+    for name, self_us, cumulative_us, depth in slowest(ours, args.top, exclude=args.module):
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split('.')[0]] += self_us
+    print("\nSelf time by top-level package:")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,13 +8,14 @@ from flask import request, session, abort, redirect, url_for
 from functools import wraps
 import hashlib
 import hmac
-import time
 import logging
 import re
 from datetime import datetime, timedelta, UTC
 import json
 import os
 
+from models.rate_limiter import rate_limiter
+
 class SecurityManager:
     def __init__(self, app=None):
         self.app = app
@@ -25,7 +26,7 @@ class SecurityManager:
         self.max_login_attempts = 5
         self.lockout_duration = 900  # 15 minutes
         self.session_timeout = 3600  # 1 hour
-        self.failed_attempts = {}
+        self.requests_per_minute = 100
         self.blocked_ips = set()
         
         # HIPAA compliance settings
@@ -114,28 +115,8 @@ class SecurityManager:
             return request.remote_addr
     
     def is_rate_limited(self, ip):
-        """Check if IP is rate limited"""
-        current_time = time.time()
-        window = 60  # 1 minute window
-        max_requests = 100  # Max requests per minute
-        
-        # Clean old entries
-        if ip in self.failed_attempts:
-            self.failed_attempts[ip] = [
-                timestamp for timestamp in self.failed_attempts[ip]
-                if current_time - timestamp < window
-            ]
-        
-        # Check if over limit
-        if ip in self.failed_attempts and len(self.failed_attempts[ip]) >= max_requests:
-            return True
-        
-        # Add current request
-        if ip not in self.failed_attempts:
-            self.failed_attempts[ip] = []
-        self.failed_attempts[ip].append(current_time)
-        
-        return False
+        """Check if IP is rate limited (shared across workers)"""
+        return not rate_limiter.hit(f'ip:{ip}', self.requests_per_minute, 60).allowed
     
     def log_security_event(self, event_type, data):
         """Log security events"""
@@ -11,7 +11,13 @@ import base64
 import hashlib
 import logging
 import os
-from models.therapy_ai_integration import therapy_ai_integration
+import re
+from functools import lru_cache
+from models.lazy_loader import lazy_service
+from models.lip_sync import SYNC_ACCURACY, lip_sync_engine
+
+therapy_ai_integration = lazy_service('therapy_ai_integration',
+                                      'models.therapy_ai_integration:therapy_ai_integration')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +25,35 @@ logger = logging.getLogger(__name__)
 
 avatar_bp = Blueprint('avatar', __name__, url_prefix='/api/avatar')
 
+SENTENCE_SPLIT = re.compile(r'[.!?]+')
+
+
+@lru_cache(maxsize=1024)
+def _text_chunks(text, max_chunk_length):
+    """Sentence-grouped TTS chunks; depends only on its arguments, so memoized"""
+    # Split by sentences first
+    chunks = []
+    current_chunk = ""
+    
+    for sentence in SENTENCE_SPLIT.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+            
+        # If adding this sentence exceeds max length, start new chunk
+        if len(current_chunk) + len(sentence) > max_chunk_length and current_chunk:
+            chunks.append(current_chunk.strip())
+            current_chunk = sentence
+        else:
+            current_chunk += " " + sentence if current_chunk else sentence
+    
+    # Add final chunk
+    if current_chunk.strip():
+        chunks.append(current_chunk.strip())
+    
+    return tuple(chunks)
+
+
 class SpeakingAvatarSystem:
     """Advanced speaking avatar system for immersive therapy"""
     
@@ -96,10 +131,22 @@ class SpeakingAvatarSystem:
             }
         }
         
+        self.fallback_responses = {
+            'compassionate': "I'm here to listen and support you. Please feel free to share what's on your mind.",
+            'professional': "I apologize for the technical difficulty. Let's continue our session. How can I assist you?",
+            'encouraging': "Even with a small hiccup, we're making progress! What would you like to explore next?",
+            'calming': "Let's take a moment to breathe together. When you're ready, please continue..."
+        }
+        self.default_fallback_response = "I'm here to help. Please let me know how I can support you today."
+        
         # Speech synthesis queue for smoother delivery
         self.speech_queue = []
         self.current_speech_id = None
         
+        # Greetings and fallbacks are spoken over and over; time them once
+        lip_sync_engine.warm([config['greeting'] for config in self.avatar_personalities.values()] +
+                             list(self.fallback_responses.values()) + [self.default_fallback_response])
+        
     def generate_avatar_response(self, user_message, session_context, avatar_personality='compassionate'):
         """Generate comprehensive avatar response with speech and animation"""
         try:
@@ -144,12 +191,39 @@ class SpeakingAvatarSystem:
             
         except Exception as e:
             logger.error(f"Error generating avatar response: {e}")
+            fallback_response = self._get_fallback_response(avatar_personality)
             return {
                 'success': False,
                 'error': str(e),
-                'fallback_response': self._get_fallback_response(avatar_personality)
+                'fallback_response': fallback_response,
+                'fallback_lip_sync_data': self._generate_lip_sync_data(fallback_response)
             }
     
+    def speak_sentence(self, sentence, personality='compassionate', emotion_context=None, start_time=0.0,
+                       lip_sync=None):
+        """Speech chunks for one completed sentence of a streamed response
+
+        Timelines come from a LipSyncStream, so their times run on the
+        response's clock from start_time; pass the same stream for every
+        sentence of a response to keep them back to back.
+        """
+        lip_sync = lip_sync or lip_sync_engine.stream(start_time)
+        chunks = []
+        for text in self._break_text_into_chunks(sentence):
+            chunk_start = lip_sync.current_time
+            timeline = lip_sync.feed(text) + lip_sync.flush()
+            chunks.append({
+                'text': text,
+                'start_time': chunk_start,
+                'speech_data': self._prepare_speech_synthesis(text, personality, emotion_context or {}),
+                'lip_sync_data': {
+                    'timeline': timeline,
+                    'total_duration': lip_sync.current_time - chunk_start,
+                    'sync_accuracy': SYNC_ACCURACY
+                }
+            })
+        return chunks
+    
     def _determine_animation_type(self, response_text, user_message):
         """Determine appropriate animation based on content analysis"""
         response_lower = response_text.lower()
@@ -215,30 +289,7 @@ class SpeakingAvatarSystem:
     
     def _break_text_into_chunks(self, text, max_chunk_length=100):
         """Break text into smaller chunks for better TTS synthesis"""
-        import re
-        
-        # Split by sentences first
-        sentences = re.split(r'[.!?]+', text)
-        chunks = []
-        current_chunk = ""
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-                
-            # If adding this sentence exceeds max length, start new chunk
-            if len(current_chunk) + len(sentence) > max_chunk_length and current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = sentence
-            else:
-                current_chunk += " " + sentence if current_chunk else sentence
-        
-        # Add final chunk
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
-        
-        return chunks
+        return list(_text_chunks(text, max_chunk_length))
     
     def _generate_visual_state(self, animation_type, personality, speech_duration):
         """Generate avatar visual state and animation parameters"""
@@ -263,56 +314,7 @@ class SpeakingAvatarSystem:
     
     def _generate_lip_sync_data(self, text):
         """Generate lip synchronization data for realistic speech animation"""
-        # Simplified phoneme mapping for lip sync
-        phoneme_mapping = {
-            'a': 'open_wide',
-            'e': 'open_medium', 
-            'i': 'closed_smile',
-            'o': 'rounded_open',
-            'u': 'rounded_closed',
-            'm': 'lips_together',
-            'p': 'lips_together',
-            'b': 'lips_together',
-            'f': 'lower_lip_teeth',
-            'v': 'lower_lip_teeth',
-            's': 'teeth_together',
-            'z': 'teeth_together',
-            'th': 'tongue_teeth',
-            'l': 'tongue_tip',
-            'n': 'tongue_tip',
-            't': 'tongue_tip',
-            'd': 'tongue_tip'
-        }
-        
-        # Generate simple lip sync timeline
-        words = text.split()
-        lip_sync_timeline = []
-        current_time = 0
-        
-        for word in words:
-            word_duration = len(word) * 0.1  # Rough timing
-            
-            # Analyze phonemes in word (simplified)
-            dominant_mouth_shape = 'neutral'
-            for char in word.lower():
-                if char in phoneme_mapping:
-                    dominant_mouth_shape = phoneme_mapping[char]
-                    break
-            
-            lip_sync_timeline.append({
-                'start_time': current_time,
-                'end_time': current_time + word_duration,
-                'mouth_shape': dominant_mouth_shape,
-                'word': word
-            })
-            
-            current_time += word_duration + 0.1  # Brief pause between words
-        
-        return {
-            'timeline': lip_sync_timeline,
-            'total_duration': current_time,
-            'sync_accuracy': 'simplified'  # In production, use advanced phoneme analysis
-        }
+        return lip_sync_engine.timeline(text)
     
     def _get_background_setting(self, personality):
         """Get appropriate background setting for personality"""
@@ -341,13 +343,7 @@ class SpeakingAvatarSystem:
     
     def _get_fallback_response(self, personality):
         """Get fallback response when system fails"""
-        fallbacks = {
-            'compassionate': "I'm here to listen and support you. Please feel free to share what's on your mind.",
-            'professional': "I apologize for the technical difficulty. Let's continue our session. How can I assist you?",
-            'encouraging': "Even with a small hiccup, we're making progress! What would you like to explore next?",
-            'calming': "Let's take a moment to breathe together. When you're ready, please continue..."
-        }
-        return fallbacks.get(personality, "I'm here to help. Please let me know how I can support you today.")
+        return self.fallback_responses.get(personality, self.default_fallback_response)
 
 # Initialize avatar system
 avatar_system = SpeakingAvatarSystem()
@@ -502,6 +498,7 @@ def get_avatar_status():
             'animation_system_active': True,
             'latest_interaction': latest_response['interaction_id'] if latest_response and latest_response.get('success') else None,
             'speech_queue_length': len(avatar_system.speech_queue),
+            'lip_sync_cache': lip_sync_engine.stats(),
             'system_capabilities': {
                 'text_to_speech': True,
                 'lip_synchronization': True,
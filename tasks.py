@@ -7,7 +7,8 @@ Tasks include email notifications, AI analysis, data cleanup, and analytics.
 
 from celery_app import celery_app as celery
 from datetime import datetime, timedelta, UTC
-from models.database import db, Session, Patient, BiometricData, Subscription, Payment
+from models.database import db, Session, Patient, Subscription, Payment
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -103,6 +104,134 @@ def send_session_reminder(user_id, session_date):
 # AI Processing Tasks
 # =======================
 
+AI_ANALYSIS_BATCH_SIZE = 25
+AI_ANALYSIS_CLAIM_TIMEOUT = timedelta(minutes=30)
+
+
+def _insert_claim_markers(rows):
+    """
+    Insert SessionAnalysis marker rows, skipping sessions another batch inserted first.
+
+    Two batches can both see a session as unmarked; the loser's row hits the
+    unique session_id constraint. Only that row is dropped (the winner's claim
+    stands) instead of failing the whole batch.
+    """
+    from sqlalchemy import insert
+    from sqlalchemy.exc import IntegrityError
+    from models.database import SessionAnalysis
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(SessionAnalysis), rows)
+    except IntegrityError:
+        for row in rows:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(SessionAnalysis), [row])
+            except IntegrityError:
+                logger.info(f"Session {row['session_id']} was claimed by another batch")
+
+
+def _analyze_session_batch(session_ids, task_id):
+    """
+    Claim, analyze and persist a chunk of sessions.
+
+    Sessions are claimed through a SessionAnalysis marker row first, so a retry
+    (same task id) picks up where it left off while sessions that are already
+    completed or held by another worker's live claim are skipped.
+    """
+    from sqlalchemy import update
+    from models.database import SessionAnalysis
+
+    now = datetime.now(UTC)
+
+    existing = {
+        row.session_id for row in db.session.query(SessionAnalysis.session_id)
+        .filter(SessionAnalysis.session_id.in_(session_ids))
+    }
+    new_ids = [sid for sid in session_ids if sid not in existing]
+    if new_ids:
+        _insert_claim_markers([
+            {'session_id': sid, 'status': 'processing', 'claimed_by': task_id, 'claimed_at': now}
+            for sid in new_ids
+        ])
+
+    db.session.execute(
+        update(SessionAnalysis)
+        .where(
+            SessionAnalysis.session_id.in_(session_ids),
+            db.or_(
+                SessionAnalysis.status == 'failed',
+                db.and_(
+                    SessionAnalysis.status == 'processing',
+                    db.or_(
+                        SessionAnalysis.claimed_by == task_id,
+                        SessionAnalysis.claimed_at < now - AI_ANALYSIS_CLAIM_TIMEOUT
+                    )
+                )
+            )
+        )
+        .values(status='processing', claimed_by=task_id, claimed_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+    claimed = dict(
+        db.session.query(SessionAnalysis.session_id, SessionAnalysis.id).filter(
+            SessionAnalysis.session_id.in_(session_ids),
+            SessionAnalysis.status == 'processing',
+            SessionAnalysis.claimed_by == task_id
+        ).all()
+    )
+    skipped = len(session_ids) - len(claimed)
+
+    if not claimed:
+        return {'status': 'success', 'processed': 0, 'skipped': skipped, 'analyses': {}}
+
+    sessions = db.session.query(
+        Session.id, Session.session_type, Session.input_text, Session.ai_response
+    ).filter(Session.id.in_(list(claimed))).all()
+
+    # Shared module-level manager, constructed once per worker process
+    from models.ai_manager import ai_manager
+
+    analyses = ai_manager.analyze_sessions_batch([
+        {
+            'session_id': row.id,
+            'session_type': row.session_type,
+            'input_text': row.input_text,
+            'ai_response': row.ai_response
+        }
+        for row in sessions
+    ])
+
+    processed_at = datetime.now(UTC)
+    found_ids = {row.id for row in sessions}
+    updates = []
+    for session_id, marker_id in claimed.items():
+        if session_id in found_ids:
+            analysis = dict(analyses[session_id], processed_at=processed_at.isoformat())
+            updates.append({
+                'id': marker_id,
+                'status': 'completed',
+                'analysis_data': json.dumps(analysis),
+                'analyzed_at': processed_at
+            })
+        else:
+            updates.append({'id': marker_id, 'status': 'failed'})
+
+    # Single bulk UPDATE by primary key
+    db.session.execute(update(SessionAnalysis), updates)
+    db.session.commit()
+
+    return {
+        'status': 'success',
+        'processed': len(found_ids),
+        'skipped': skipped,
+        'analyses': {sid: analyses[sid] for sid in found_ids}
+    }
+
+
 @celery.task(bind=True, max_retries=2)
 def process_ai_analysis(self, session_id):
     """
@@ -115,62 +244,79 @@ def process_ai_analysis(self, session_id):
         dict: Analysis results
     """
     try:
-        session = Session.query.get(session_id)
-        if not session:
-            return {'status': 'error', 'message': 'Session not found'}
-
-        # Import AI models (lazy load to avoid startup issues)
-        from models.ai_manager import AIManager
-
-        ai_manager = AIManager()
-
-        # Perform deep analysis
-        analysis = {
-            'session_id': session_id,
-            'sentiment': ai_manager.analyze_sentiment(session.ai_response or ''),
-            'themes': ai_manager.extract_themes(session.ai_response or ''),
-            'recommendations': ai_manager.generate_recommendations(session_id),
-            'processed_at': datetime.now(UTC).isoformat()
-        }
-
-        # Update session with analysis
-        session.analysis_data = str(analysis)
-        db.session.commit()
+        result = _analyze_session_batch([session_id], self.request.id or 'local')
 
         logger.info(f"AI analysis completed for session {session_id}")
 
-        return {'status': 'success', 'analysis': analysis}
+        return {'status': 'success', 'analysis': result['analyses'].get(session_id)}
 
     except Exception as exc:
+        db.session.rollback()
         logger.error(f"AI analysis failed for session {session_id}: {exc}")
         raise self.retry(exc=exc, countdown=120)
 
 
+@celery.task(bind=True, max_retries=2)
+def process_ai_analysis_batch(self, session_ids):
+    """
+    Process AI analysis for a chunk of therapy sessions in one worker invocation.
+
+    Args:
+        session_ids: List of Session IDs to analyze
+
+    Returns:
+        dict: Processed/skipped counts and analysis results keyed by session ID
+    """
+    try:
+        result = _analyze_session_batch(session_ids, self.request.id or 'local')
+
+        logger.info(f"AI analysis completed for {result['processed']} sessions ({result['skipped']} skipped)")
+
+        return result
+
+    except Exception as exc:
+        db.session.rollback()
+        logger.error(f"AI analysis failed for sessions {session_ids}: {exc}")
+        raise self.retry(exc=exc, countdown=120)
+
+
 @celery.task
-def process_pending_ai_analyses():
+def process_pending_ai_analyses(limit=500):
     """
     Process all pending AI analyses (runs periodically via beat).
 
+    Pending sessions are dispatched in chunks of AI_ANALYSIS_BATCH_SIZE so each
+    worker invocation analyzes a whole chunk.
+
     Returns:
         dict: Summary of processed sessions
     """
+    from models.database import SessionAnalysis
+
     # Find sessions needing analysis (created in last hour, not analyzed)
     cutoff = datetime.now(UTC) - timedelta(hours=1)
-    pending_sessions = Session.query.filter(
-        Session.created_at >= cutoff,
-        Session.analysis_data == None
-    ).limit(50).all()
+    pending_ids = [
+        row.id for row in db.session.query(Session.id)
+        .outerjoin(SessionAnalysis, SessionAnalysis.session_id == Session.id)
+        .filter(
+            Session.timestamp >= cutoff,
+            db.or_(SessionAnalysis.id == None, SessionAnalysis.status == 'failed')
+        )
+        .order_by(Session.id)
+        .limit(limit)
+    ]
 
-    processed = 0
-    for session in pending_sessions:
-        process_ai_analysis.delay(session.id)
-        processed += 1
+    batches = 0
+    for start in range(0, len(pending_ids), AI_ANALYSIS_BATCH_SIZE):
+        process_ai_analysis_batch.delay(pending_ids[start:start + AI_ANALYSIS_BATCH_SIZE])
+        batches += 1
 
-    logger.info(f"Queued {processed} sessions for AI analysis")
+    logger.info(f"Queued {len(pending_ids)} sessions for AI analysis in {batches} batches")
 
     return {
         'status': 'success',
-        'queued': processed,
+        'queued': len(pending_ids),
+        'batches': batches,
         'timestamp': datetime.now(UTC).isoformat()
     }
 
@@ -184,6 +330,10 @@ def cleanup_old_sessions(days=90):
     """
     Clean up old session data.
 
+    Deletes expired free-tier sessions in checkpointed key-range batches,
+    removing their video analyses and exercises first. An interrupted run
+    resumes from its checkpoint on the next invocation.
+
     Args:
         days: Delete sessions older than this many days
 
@@ -191,28 +341,13 @@ def cleanup_old_sessions(days=90):
         dict: Cleanup summary
     """
     try:
-        cutoff_date = datetime.now(UTC) - timedelta(days=days)
-
-        # Find old sessions (not premium users - they keep data longer)
-        old_sessions = Session.query.join(Patient).filter(
-            Session.created_at < cutoff_date,
-            Patient.subscription_tier == 'free'
-        ).all()
+        from models.data_retention import RetentionManager
 
-        deleted_count = len(old_sessions)
+        result = RetentionManager().run_policy('sessions', days=days)
 
-        for session in old_sessions:
-            db.session.delete(session)
+        logger.info(f"Cleaned up {result['deleted']} old sessions")
 
-        db.session.commit()
-
-        logger.info(f"Cleaned up {deleted_count} old sessions")
-
-        return {
-            'status': 'success',
-            'deleted': deleted_count,
-            'cutoff_date': cutoff_date.isoformat()
-        }
+        return {'status': 'success', **result}
 
     except Exception as exc:
         logger.error(f"Session cleanup failed: {exc}")
@@ -224,17 +359,13 @@ def cleanup_old_sessions(days=90):
 def cleanup_old_biometric_data(days=180):
     """Clean up old biometric data."""
     try:
-        cutoff_date = datetime.now(UTC) - timedelta(days=days)
-
-        deleted = BiometricData.query.filter(
-            BiometricData.timestamp < cutoff_date
-        ).delete()
+        from models.data_retention import RetentionManager
 
-        db.session.commit()
+        result = RetentionManager().run_policy('biometric_data', days=days)
 
-        logger.info(f"Cleaned up {deleted} old biometric records")
+        logger.info(f"Cleaned up {result['deleted']} old biometric records")
 
-        return {'status': 'success', 'deleted': deleted}
+        return {'status': 'success', **result}
 
     except Exception as exc:
         logger.error(f"Biometric cleanup failed: {exc}")
@@ -242,6 +373,24 @@ def cleanup_old_biometric_data(days=180):
         return {'status': 'error', 'message': str(exc)}
 
 
+@celery.task
+def apply_retention_policies():
+    """Run every enabled retention policy (see RETENTION_POLICIES config)."""
+    try:
+        from models.data_retention import RetentionManager
+
+        results = RetentionManager().run_all()
+
+        logger.info(f"Retention policies applied: {results}")
+
+        return {'status': 'success', 'policies': results}
+
+    except Exception as exc:
+        logger.error(f"Retention run failed: {exc}")
+        db.session.rollback()
+        return {'status': 'error', 'message': str(exc)}
+
+
 # =======================
 # Analytics & Reporting Tasks
 # =======================
@@ -251,38 +400,24 @@ def generate_daily_analytics():
     """
     Generate daily analytics report.
 
+    Persists yesterday's DailyAnalyticsSnapshot and queues a backfill for
+    any earlier days that are missing.
+
     Returns:
         dict: Analytics summary
     """
     try:
+        from models.analytics_snapshot import analytics_snapshots
+
         today = datetime.now(UTC).date()
         yesterday = today - timedelta(days=1)
 
-        # Calculate metrics
-        new_users = Patient.query.filter(
-            db.func.date(Patient.created_at) == yesterday
-        ).count()
-
-        sessions_today = Session.query.filter(
-            db.func.date(Session.created_at) == yesterday
-        ).count()
-
-        active_users = Session.query.filter(
-            db.func.date(Session.created_at) == yesterday
-        ).distinct(Session.patient_id).count()
-
-        analytics = {
-            'date': yesterday.isoformat(),
-            'new_users': new_users,
-            'total_sessions': sessions_today,
-            'active_users': active_users,
-            'avg_sessions_per_user': round(sessions_today / max(active_users, 1), 2),
-            'generated_at': datetime.now(UTC).isoformat()
-        }
+        analytics = analytics_snapshots.snapshot_day(yesterday)
+        analytics['generated_at'] = datetime.now(UTC).isoformat()
 
         logger.info(f"Daily analytics: {analytics}")
 
-        # TODO: Store in analytics table or send to admin
+        backfill_daily_analytics.delay()
 
         return {'status': 'success', 'analytics': analytics}
 
@@ -291,6 +426,117 @@ def generate_daily_analytics():
         return {'status': 'error', 'message': str(exc)}
 
 
+@celery.task
+def backfill_daily_analytics(days=90, chunk_days=7):
+    """
+    Backfill missing daily analytics snapshots.
+
+    Missing days in the window are split into contiguous chunks that are
+    computed in parallel by generate_analytics_chunk.
+
+    Args:
+        days: How far back to look for missing snapshots
+        chunk_days: Maximum number of days per chunk task
+
+    Returns:
+        dict: Number of chunks dispatched
+    """
+    try:
+        from celery import group
+        from models.analytics_snapshot import analytics_snapshots
+
+        today = datetime.now(UTC).date()
+        chunks = analytics_snapshots.missing_chunks(today - timedelta(days=days), today, chunk_days)
+
+        if chunks:
+            group(
+                generate_analytics_chunk.s(start.isoformat(), end.isoformat())
+                for start, end in chunks
+            ).apply_async()
+
+        logger.info(f"Dispatched {len(chunks)} analytics backfill chunks")
+
+        return {'status': 'success', 'chunks': len(chunks)}
+
+    except Exception as exc:
+        logger.error(f"Analytics backfill failed: {exc}")
+        return {'status': 'error', 'message': str(exc)}
+
+
+@celery.task
+def generate_analytics_chunk(start_date, end_date):
+    """Compute and persist snapshots for [start_date, end_date) (ISO dates)."""
+    from datetime import date
+    from models.analytics_snapshot import analytics_snapshots
+
+    try:
+        stored = analytics_snapshots.snapshot_range(
+            date.fromisoformat(start_date), date.fromisoformat(end_date)
+        )
+        return {'status': 'success', 'days': stored, 'start': start_date, 'end': end_date}
+
+    except Exception as exc:
+        logger.error(f"Analytics chunk {start_date}..{end_date} failed: {exc}")
+        db.session.rollback()
+        return {'status': 'error', 'message': str(exc)}
+
+
+@celery.task
+def generate_audit_report_file(start_date, end_date, format='ndjson'):
+    """
+    Write a signed HIPAA audit report file for a (possibly very large) range.
+
+    Args:
+        start_date: ISO start of the period
+        end_date: ISO end of the period
+        format: ndjson or csv
+
+    Returns:
+        dict: Report and signature manifest paths
+    """
+    try:
+        from models.audit_log import AuditLogger
+
+        result = AuditLogger.write_signed_report(
+            datetime.fromisoformat(start_date), datetime.fromisoformat(end_date), format
+        )
+
+        logger.info(f"Audit report written to {result['report_path']}")
+
+        return {'status': 'success', **result}
+
+    except Exception as exc:
+        logger.error(f"Audit report generation failed: {exc}")
+        return {'status': 'error', 'message': str(exc)}
+
+
+@celery.task
+def generate_peer_matches(connection_type='support_buddy', k=10):
+    """
+    Nightly batch peer match generation for every active peer profile.
+
+    Args:
+        connection_type: ConnectionType value to generate matches for
+        k: Matches stored per user
+
+    Returns:
+        dict: Users processed and matches stored
+    """
+    try:
+        from models.social_connection_manager import social_connection_manager, ConnectionType
+
+        result = social_connection_manager.generate_batch_matches(ConnectionType(connection_type), k=k)
+
+        logger.info(f"Generated {result['matches_stored']} peer matches for {result['users']} users")
+
+        return {'status': 'success', **result}
+
+    except Exception as exc:
+        logger.error(f"Peer match generation failed: {exc}")
+        db.session.rollback()
+        return {'status': 'error', 'message': str(exc)}
+
+
 # =======================
 # Subscription & Payment Tasks
 # =======================
@@ -410,5 +656,7 @@ from tasks_ai_training import (
     train_custom_crisis_model,
     collect_model_feedback,
     emergency_crisis_model_update,
-    analyze_model_performance
+    analyze_model_performance,
+    run_training_job,
+    resume_stale_training_jobs
 )
@@ -246,6 +246,42 @@ def analyze_model_performance():
         return {'status': 'error', 'message': str(exc)}
 
 
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def run_training_job(self, job_id):
+    """
+    Run an admin-submitted custom model training job.
+
+    acks_late + reject_on_worker_lost re-deliver the task if the worker
+    dies; the job then resumes from its last stage checkpoint.
+    """
+    try:
+        from models.training_jobs import TrainingJobManager
+
+        result = TrainingJobManager().run(job_id)
+
+        logger.info(f"Training job {job_id} finished: {result['status']}")
+        return {'status': 'success', 'job': result}
+
+    except Exception as exc:
+        logger.error(f"Training job {job_id} failed: {exc}")
+        return {'status': 'error', 'job_id': job_id, 'message': str(exc)}
+
+
+@celery.task
+def resume_stale_training_jobs():
+    """Re-dispatch training jobs whose worker stopped sending heartbeats."""
+    try:
+        from models.training_jobs import TrainingJobManager
+
+        resumed = TrainingJobManager().resume_stale_jobs()
+        return {'status': 'success', 'resumed': resumed}
+
+    except Exception as exc:
+        logger.error(f"Stale training job check failed: {exc}")
+        db.session.rollback()
+        return {'status': 'error', 'message': str(exc)}
+
+
 # Register tasks with Celery
 __all__ = [
     'check_crisis_model_performance',
@@ -255,5 +291,7 @@ __all__ = [
     'train_custom_crisis_model',
     'collect_model_feedback',
     'emergency_crisis_model_update',
-    'analyze_model_performance'
+    'analyze_model_performance',
+    'run_training_job',
+    'resume_stale_training_jobs'
 ]
\ No newline at end of file
@@ -9,6 +9,12 @@ APP_DIR = os.path.abspath(os.path.join(TESTS_DIR, ".."))
 if APP_DIR not in sys.path:
     sys.path.insert(0, APP_DIR)
 
+# Write audit events synchronously so tests can assert on them immediately
+os.environ.setdefault("AUDIT_LOG_MODE", "sync")
+
+# Keep rate limit state inside the test process instead of the host-wide table
+os.environ.setdefault("RATE_LIMIT_BACKEND", "memory")
+
 
 @pytest.fixture()
 def app():
@@ -21,4 +27,3 @@ def client(app):
     with app.test_client() as client:
         with app.app_context():
             yield client
-
@@ -0,0 +1,117 @@
+"""
+Tests for cached admin dashboard metrics
+"""
+
+import threading
+import time
+import pytest
+from datetime import datetime, timedelta
+from app import app, db
+from models.database import Patient, Session, Payment, Subscription
+from models.admin_metrics import AdminMetricsService, MetricsCache
+
+
+@pytest.fixture(scope='function')
+def metrics_db():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+        # Later modules (test_all_endpoints) expect the schema to exist
+        db.create_all()
+
+
+def _session(name, when, **kwargs):
+    return Session(patient_name=name, session_type='individual', input_text='hi',
+                   ai_response='hello', timestamp=when, **kwargs)
+
+
+def test_overview_counts_windows_and_distinct_users(metrics_db):
+    now = datetime(2025, 6, 15, 14, 30)
+    today = datetime(2025, 6, 15)
+
+    ana = Patient(name='Ana', email='ana@test.com', created_at=today + timedelta(hours=1))
+    ben = Patient(name='Ben', email='ben@test.com', created_at=today - timedelta(days=3))
+    old = Patient(name='Old', email='old@test.com', created_at=today - timedelta(days=60))
+    db.session.add_all([ana, ben, old])
+    db.session.flush()
+    db.session.add_all([
+        _session('Ana', today + timedelta(hours=2), duration_minutes=30),
+        _session('Ana', today - timedelta(days=2), duration_minutes=10, alerts='["risk"]'),
+        _session('Ben', today - timedelta(days=5)),
+        _session('Old', today - timedelta(days=40)),
+        Payment(patient_id=ana.id, amount=20.0, status='succeeded', created_at=today - timedelta(days=1)),
+        Payment(patient_id=old.id, amount=50.0, status='succeeded', created_at=today - timedelta(days=90)),
+        Payment(patient_id=old.id, amount=99.0, status='failed', created_at=today),
+        Subscription(patient_id=ana.id, tier='premium', status='active'),
+        Subscription(patient_id=ben.id, tier='premium', status='canceled'),
+    ])
+    db.session.commit()
+
+    overview = AdminMetricsService(overview_ttl=60).get_overview(now)
+
+    assert overview['user_stats'] == {'total_users': 3, 'new_today': 1, 'new_week': 2,
+                                      'active_week': 2, 'growth_rate': 200.0}
+    assert overview['session_stats'] == {'total_sessions': 4, 'sessions_today': 1,
+                                         'sessions_week': 3, 'avg_duration': 20.0}
+    assert overview['revenue_stats']['total_revenue'] == pytest.approx(70.0)
+    assert overview['revenue_stats']['revenue_month'] == pytest.approx(20.0)
+    assert overview['subscription_stats'] == {'premium': 1}
+    assert [a['patient'] for a in overview['crisis_alerts']] == ['Ana']
+
+
+def test_results_are_cached_per_window(metrics_db):
+    service = AdminMetricsService(overview_ttl=60, live_ttl=60)
+    hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    first = service.get_live(hour + timedelta(minutes=5))
+    db.session.add(_session('Ana', hour + timedelta(minutes=6)))
+    db.session.commit()
+
+    assert service.get_live(hour + timedelta(minutes=10)) is first
+    # The next hour is a new window
+    assert service.get_live(hour + timedelta(hours=1, minutes=1))['active_sessions'] == 0
+    assert service.cache.computations == 2
+
+
+def test_concurrent_misses_compute_once():
+    cache = MetricsCache()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return len(calls)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute(('k', 1), 60, slow)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [1] * 8
+
+
+def test_expired_entry_serves_stale_value_while_refreshing():
+    cache = MetricsCache()
+    cache.get_or_compute(('k', 1), 0, lambda: 'old')
+    started, release = threading.Event(), threading.Event()
+
+    def refresh():
+        started.set()
+        release.wait(2)
+        return 'new'
+
+    worker = threading.Thread(target=lambda: cache.get_or_compute(('k', 1), 60, refresh))
+    worker.start()
+    started.wait(2)
+    assert cache.get_or_compute(('k', 1), 60, lambda: 'other') == 'old'
+    release.set()
+    worker.join()
+    assert cache.get_or_compute(('k', 1), 60, lambda: 'other') == 'new'
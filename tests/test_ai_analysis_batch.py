@@ -0,0 +1,135 @@
+"""
+Tests for batched AI session analysis: claims, idempotent retries and fallbacks
+"""
+
+import json
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from app import app, db
+from models.ai_manager import AIManager
+from models.database import Session, SessionAnalysis
+
+import tasks
+
+
+@pytest.fixture(scope='function')
+def analysis_db(monkeypatch):
+    app.config['TESTING'] = True
+    calls = []
+
+    def fake_batch(sessions):
+        calls.append([item['session_id'] for item in sessions])
+        return {item['session_id']: {'session_id': item['session_id'], 'sentiment': 'neutral'}
+                for item in sessions}
+
+    from models.ai_manager import ai_manager
+    monkeypatch.setattr(ai_manager, 'analyze_sessions_batch', fake_batch)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield calls
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+
+
+def _sessions(count):
+    sessions = [Session(patient_name='Batch User', session_type='individual',
+                        input_text=f'message {i}', ai_response='reply') for i in range(count)]
+    db.session.add_all(sessions)
+    db.session.commit()
+    return [session.id for session in sessions]
+
+
+def _statuses(ids):
+    return {row.session_id: (row.status, row.claimed_by)
+            for row in SessionAnalysis.query.filter(SessionAnalysis.session_id.in_(ids))}
+
+
+def test_retry_with_same_task_id_resumes_without_reanalysing(analysis_db):
+    calls = analysis_db
+    ids = _sessions(3)
+
+    from models.ai_manager import ai_manager
+    real_batch = ai_manager.analyze_sessions_batch
+
+    def crash(sessions):
+        raise RuntimeError('worker lost')
+
+    ai_manager.analyze_sessions_batch = crash
+    with pytest.raises(RuntimeError):
+        tasks._analyze_session_batch(ids, 'task-1')
+    ai_manager.analyze_sessions_batch = real_batch
+    assert set(_statuses(ids).values()) == {('processing', 'task-1')}
+
+    # Another worker respects the live claim; the retry of task-1 takes its sessions back
+    assert tasks._analyze_session_batch(ids, 'task-2')['skipped'] == 3
+    result = tasks.process_ai_analysis_batch.apply(args=[ids], task_id='task-1').get()
+    assert (result['processed'], result['skipped']) == (3, 0)
+
+    # A redelivery of the finished task analyses nothing again
+    again = tasks.process_ai_analysis_batch.apply(args=[ids], task_id='task-1').get()
+    assert (again['processed'], again['skipped']) == (0, 3)
+    assert calls == [ids]
+    assert set(_statuses(ids).values()) == {('completed', 'task-1')}
+
+
+def test_completed_sessions_are_skipped_and_stale_claims_taken_over(analysis_db):
+    calls = analysis_db
+    done_id, stale_id, live_id = _sessions(3)
+    long_ago = datetime.now(UTC) - tasks.AI_ANALYSIS_CLAIM_TIMEOUT - timedelta(minutes=1)
+    db.session.add_all([
+        SessionAnalysis(session_id=done_id, status='completed', claimed_by='old',
+                        analysis_data=json.dumps({'sentiment': 'positive'})),
+        SessionAnalysis(session_id=stale_id, status='processing', claimed_by='dead-worker', claimed_at=long_ago),
+        SessionAnalysis(session_id=live_id, status='processing', claimed_by='busy-worker',
+                        claimed_at=datetime.now(UTC)),
+    ])
+    db.session.commit()
+
+    result = tasks._analyze_session_batch([done_id, stale_id, live_id], 'task-3')
+
+    assert (result['processed'], result['skipped']) == (1, 2)
+    assert calls == [[stale_id]]
+    statuses = _statuses([done_id, stale_id, live_id])
+    assert statuses[done_id] == ('completed', 'old')
+    assert statuses[stale_id] == ('completed', 'task-3')
+    assert statuses[live_id] == ('processing', 'busy-worker')
+
+
+def test_marker_inserted_by_another_batch_does_not_fail_the_rest(analysis_db):
+    first, second = _sessions(2)
+    db.session.add(SessionAnalysis(session_id=first, status='processing', claimed_by='other-batch',
+                                   claimed_at=datetime.now(UTC)))
+    db.session.commit()
+
+    # This batch saw both sessions as unmarked before the other batch committed
+    now = datetime.now(UTC)
+    tasks._insert_claim_markers([
+        {'session_id': sid, 'status': 'processing', 'claimed_by': 'task-4', 'claimed_at': now}
+        for sid in (first, second)
+    ])
+    db.session.commit()
+
+    assert _statuses([first, second]) == {first: ('processing', 'other-batch'),
+                                          second: ('processing', 'task-4')}
+
+
+def test_batch_analysis_falls_back_when_the_model_call_raises(monkeypatch):
+    manager = AIManager()
+
+    def unavailable(**kwargs):
+        raise ConnectionError('provider down')
+
+    monkeypatch.setattr(manager.openai_client.chat.completions, 'create', unavailable)
+    results = manager.analyze_sessions_batch([
+        {'session_id': 7, 'input_text': 'I feel anxious and worried', 'session_type': 'individual'},
+        {'session_id': 8, 'input_text': '', 'session_type': 'couple'},
+    ])
+
+    assert set(results) == {7, 8}
+    assert all(result['fallback'] for result in results.values())
+    assert results[7]['sentiment'] == 'negative'
+    assert results[7]['recommendations'][0] == 'Practice deep breathing exercises'
+    assert results[8]['risk_level'] == 'unknown'
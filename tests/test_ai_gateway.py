@@ -0,0 +1,188 @@
+"""
+Tests for the AI provider gateway and the ASGI entry point for the AI endpoints
+"""
+
+import asyncio
+import contextvars
+import json
+import time
+
+import pytest
+
+from models.ai_gateway import AIGateway, ProviderBusy, ai_gateway
+
+request_tag = contextvars.ContextVar('request_tag', default=None)
+
+
+def test_slots_cap_concurrency_and_reject_after_queue_timeout():
+    gateway = AIGateway(limits={'openai': 2}, queue_timeout=0.05)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with gateway.slot('openai'):
+            peak = max(peak, gateway.stats()['openai']['in_flight'])
+            await asyncio.sleep(0.2)
+
+    async def main():
+        return await asyncio.gather(*(call() for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert peak == 2
+    assert sum(isinstance(result, ProviderBusy) for result in results) == 1
+    stats = gateway.stats()['openai']
+    assert stats['requests'] == 2 and stats['rejected'] == 1 and stats['in_flight'] == 0
+
+
+def test_run_bridges_sync_callers_with_their_context():
+    gateway = AIGateway()
+
+    async def tagged():
+        await asyncio.sleep(0)
+        return request_tag.get(), await asyncio.to_thread(request_tag.get)
+
+    token = request_tag.set('caller')
+    try:
+        assert gateway.run(tagged()) == ('caller', 'caller')
+    finally:
+        request_tag.reset(token)
+
+    async def nested():
+        gateway.run(tagged())
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(nested())
+
+
+def test_ensemble_diagnosis_queries_models_concurrently(monkeypatch):
+    from models.ai_model_manager import AIModelManager, ModelType
+
+    async def slow_chat(model, messages, api_key=None, **params):
+        await asyncio.sleep(0.3)
+        return "Primary diagnosis: Generalized anxiety\nConfidence: 80%"
+
+    monkeypatch.setattr(ai_gateway, 'chat', slow_chat)
+    manager = AIModelManager()
+    manager.active_models = [name for name, config in manager.models.items()
+                             if config.type == ModelType.OPENAI_GPT]
+    assert len(manager.active_models) == 3
+
+    started = time.perf_counter()
+    diagnosis = manager.diagnose_with_ensemble({'symptoms': {'anxiety_level': 8}})
+
+    assert time.perf_counter() - started < 0.8
+    assert diagnosis['models_consulted'] == 3
+
+
+async def _call_asgi(path, body, cookie=None, client_ip='127.0.0.1'):
+    import asgi
+
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode(), 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b'cookie', f'session={cookie}'.encode())] if cookie else []
+    await asgi.application({'type': 'http', 'method': 'POST', 'path': path, 'headers': headers,
+                            'client': (client_ip, 40000)}, receive, send)
+    return sent[0]['status'], dict(sent[0]['headers']), json.loads(sent[1]['body'])
+
+
+def test_asgi_endpoints_require_login_and_share_the_flask_handlers(monkeypatch):
+    from app import app, db
+    from models.database import Patient
+
+    async def fake_chat(model, messages, api_key=None, **params):
+        return f"reply from {model}"
+
+    monkeypatch.setattr(ai_gateway, 'chat', fake_chat)
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        patient = Patient(name='Async User', email='async@test.com', password_hash='x')
+        db.session.add(patient)
+        db.session.commit()
+        user_id = patient.id
+    cookie = app.session_interface.get_signing_serializer(app).dumps({'_user_id': str(user_id)})
+
+    async def call(path, body, cookie=None):
+        status, _, payload = await _call_asgi(path, body, cookie)
+        return status, payload
+
+    try:
+        assert asyncio.run(call('/ai/individual', {'message': 'hi'}))[0] == 401
+        assert asyncio.run(call('/ai/individual', {'message': 'hi'}, 'forged'))[0] == 401
+        assert asyncio.run(call('/ai/unknown', {}, cookie))[0] == 404
+
+        status, payload = asyncio.run(call('/ai/couples', {'message': 'We keep arguing'}, cookie))
+        assert status == 200
+        assert payload == {'success': True, 'response': 'reply from gpt-4o', 'context': 'couples_therapy'}
+
+        with app.test_client() as client:
+            with client.session_transaction() as session:
+                session['_user_id'] = str(user_id)
+            response = client.post('/ai/couples', json={'message': 'We keep arguing'})
+        assert response.status_code == 200
+        assert response.get_json() == payload
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
+
+
+def test_asgi_enforces_blocked_ips_and_the_idle_session_timeout(monkeypatch):
+    from datetime import datetime, timedelta, UTC
+
+    from app import app, db, security_manager
+    from models.database import Patient
+    from models.request_metrics import request_metrics
+
+    async def fake_chat(model, messages, api_key=None, **params):
+        return 'reply'
+
+    monkeypatch.setattr(ai_gateway, 'chat', fake_chat)
+    monkeypatch.setattr(security_manager, 'blocked_ips', {'203.0.113.9'})
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        patient = Patient(name='Idle User', email='idle@test.com', password_hash='x')
+        db.session.add(patient)
+        db.session.commit()
+        user_id = patient.id
+    serializer = app.session_interface.get_signing_serializer(app)
+
+    def session_cookie(idle):
+        return serializer.dumps({'_user_id': str(user_id),
+                                 'last_activity': (datetime.now(UTC) - idle).isoformat()})
+
+    try:
+        before = request_metrics.snapshot()['endpoints'].get('http POST /ai/group', {}).get('count', 0)
+        status, _, _ = asyncio.run(_call_asgi('/ai/group', {'message': 'hi'}, session_cookie(timedelta(0)),
+                                              client_ip='203.0.113.9'))
+        assert status == 403
+
+        status, headers, _ = asyncio.run(_call_asgi('/ai/group', {'message': 'hi'},
+                                                    session_cookie(timedelta(hours=2))))
+        assert status == 401
+        # The expired session is cleared in the cookie sent back
+        cleared = serializer.loads(headers[b'set-cookie'].decode().split(';')[0].split('=', 1)[1])
+        assert '_user_id' not in cleared
+
+        status, headers, _ = asyncio.run(_call_asgi('/ai/group', {'message': 'hi'},
+                                                    session_cookie(timedelta(minutes=5))))
+        assert status == 200
+        assert b'set-cookie' in headers
+        assert request_metrics.snapshot()['endpoints']['http POST /ai/group']['count'] == before + 3
+    finally:
+        with app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.create_all()
@@ -0,0 +1,68 @@
+"""
+Tests for AIManager response assembly: prebuilt prompts, cached analysis and single-flight
+"""
+
+import asyncio
+
+from models.ai_gateway import ai_gateway
+from models.ai_manager import SYSTEM_PROMPTS, ai_manager
+
+
+def test_identical_messages_in_flight_reach_the_provider_once(monkeypatch):
+    calls = []
+
+    async def fake_chat(model, messages, api_key=None, **params):
+        calls.append(messages)
+        reply = f"reply {len(calls)}"
+        await asyncio.sleep(0.05)
+        if messages[1]['content'] == 'boom':
+            raise RuntimeError('provider down')
+        return reply
+
+    monkeypatch.setattr(ai_gateway, 'chat', fake_chat)
+
+    async def burst():
+        checkins = [ai_manager.get_therapeutic_response_async(text)
+                    for text in ['Hi, I just signed up'] * 10 + ['hi,  I just signed up  '] * 10]
+        group = ai_manager.get_therapeutic_response_async('Hi, I just signed up', session_type='group')
+        failures = [ai_manager.get_therapeutic_response_async('boom') for _ in range(3)]
+        return await asyncio.gather(*checkins, group, *failures)
+
+    results = asyncio.run(burst())
+    checkins, group, failures = results[:20], results[20], results[21:]
+
+    assert len(calls) == 3
+    assert {result['message'] for result in checkins} == {'reply 1'}
+    assert group['message'] == 'reply 2' and group['session_type'] == 'group'
+    assert all(result['confidence'] == 0.3 for result in failures)
+    # Callers each get their own response object
+    checkins[0]['recommendations'].append('mutated')
+    assert 'mutated' not in checkins[1]['recommendations']
+
+    # Nothing is cached once the shared call has finished
+    asyncio.run(ai_manager.get_therapeutic_response_async('Hi, I just signed up'))
+    assert len(calls) == 4
+    assert calls[0][0] is calls[3][0]
+    assert calls[0][0]['content'] == SYSTEM_PROMPTS['individual']
+
+
+def test_prompts_and_keyword_analysis_are_prebuilt():
+    assert all('\n            ' not in prompt for prompt in SYSTEM_PROMPTS.values())
+    assert ai_manager._get_system_prompt('unknown') == SYSTEM_PROMPTS['individual']
+
+    message = 'I feel  ANXIOUS and sad about this habit'
+    assert ai_manager._analyze_mood(message) == {'mood': 'negative', 'intensity': 4}
+    assert ai_manager._generate_recommendations(message, 'individual') == [
+        'Practice deep breathing exercises', 'Try progressive muscle relaxation', 'Engage in pleasant activities'
+    ]
+    assert ai_manager._suggest_next_steps(message, 'individual') == [
+        "Reflect on today's insights", 'Track patterns in a journal', 'Schedule your next session'
+    ]
+    assert ai_manager._generate_recommendations('hello', 'group') == [
+        'Continue journaling your thoughts', 'Maintain regular self-care routines'
+    ]
+
+    fallback = ai_manager._get_enhanced_fallback_response('i feel anxious and sad about this habit', 'couple')
+    assert 'In our couple session' in fallback['message']
+    assert fallback['recommendations'] == ai_manager._generate_recommendations(message, 'couple')
+    assert fallback['next_steps'][0] == 'Practice active listening with your partner'
@@ -0,0 +1,63 @@
+"""
+Tests for daily analytics snapshots
+"""
+
+import pytest
+from datetime import datetime, timedelta, UTC
+from app import app, db
+from models.database import Patient, Session, Payment, DailyAnalyticsSnapshot
+from models.analytics_snapshot import AnalyticsSnapshotManager
+
+
+@pytest.fixture(scope='function')
+def analytics_db():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+def test_snapshot_day_persists_metrics(analytics_db):
+    yesterday = datetime.now(UTC).date() - timedelta(days=1)
+    noon = datetime.combine(yesterday, datetime.min.time()) + timedelta(hours=12)
+
+    patient = Patient(name='Ana', email='ana@test.com', created_at=noon)
+    db.session.add(patient)
+    db.session.flush()
+    for name in ['Ana', 'Ana', 'Ben']:
+        db.session.add(Session(patient_name=name, session_type='individual',
+                               input_text='hi', ai_response='hello', timestamp=noon))
+    # Outside the day window
+    db.session.add(Session(patient_name='Ana', session_type='individual',
+                           input_text='hi', ai_response='hello', timestamp=noon - timedelta(days=1)))
+    db.session.add(Payment(patient_id=patient.id, amount=29.99, status='succeeded', created_at=noon))
+    db.session.add(Payment(patient_id=patient.id, amount=10.0, status='failed', created_at=noon))
+    db.session.commit()
+
+    metrics = AnalyticsSnapshotManager().snapshot_day(yesterday)
+
+    assert metrics['new_users'] == 1
+    assert metrics['total_sessions'] == 3
+    assert metrics['active_users'] == 2
+    assert metrics['avg_sessions_per_user'] == 1.5
+    assert metrics['revenue'] == pytest.approx(29.99)
+    stored = DailyAnalyticsSnapshot.query.filter_by(snapshot_date=yesterday).one()
+    assert stored.total_sessions == 3
+
+
+def test_missing_chunks_are_contiguous_and_bounded(analytics_db):
+    manager = AnalyticsSnapshotManager()
+    start = datetime(2025, 1, 1).date()
+    db.session.add(DailyAnalyticsSnapshot(snapshot_date=start + timedelta(days=3)))
+    db.session.commit()
+
+    chunks = manager.missing_chunks(start, start + timedelta(days=12), chunk_days=5)
+
+    assert chunks == [
+        (start, start + timedelta(days=3)),
+        (start + timedelta(days=4), start + timedelta(days=9)),
+        (start + timedelta(days=9), start + timedelta(days=12)),
+    ]
@@ -0,0 +1,89 @@
+"""
+Tests for streaming HIPAA audit reports
+"""
+
+import csv
+import io
+import json
+import pytest
+from datetime import datetime, timedelta
+from app import app, db
+from models.audit_log import AuditLog, AuditLogger
+
+
+@pytest.fixture(scope='function')
+def audit_db():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        now = datetime.utcnow()
+        for i in range(7):
+            db.session.add(AuditLog(
+                'PHI_READ' if i % 2 else 'LOGIN_FAILED',
+                f'Event {i}',
+                event_category='SECURITY' if i == 0 else 'DATA_ACCESS',
+                phi_accessed=bool(i % 2),
+                success=i != 3,
+                timestamp=now - timedelta(minutes=i)
+            ))
+        db.session.commit()
+        yield now
+        db.session.remove()
+        db.drop_all()
+
+
+def test_summary_uses_sql_aggregates(audit_db):
+    summary = AuditLogger.get_audit_summary(audit_db - timedelta(hours=1), audit_db)
+
+    assert summary['total_events'] == 7
+    assert summary['phi_access_events'] == 3
+    assert summary['security_events'] == 1
+    assert summary['failed_events'] == 1
+
+
+def test_keyset_pages_cover_every_event_once(audit_db):
+    events = list(AuditLogger.iter_audit_events(audit_db - timedelta(hours=1), audit_db, chunk_size=2))
+
+    assert [e['description'] for e in events] == [f'Event {i}' for i in range(7)]
+
+
+def test_ndjson_and_csv_streams(audit_db):
+    start = audit_db - timedelta(hours=1)
+
+    lines = ''.join(AuditLogger.stream_audit_report(start, audit_db, 'ndjson', chunk_size=3)).splitlines()
+    assert json.loads(lines[0])['record_type'] == 'summary'
+    assert len(lines) == 8
+
+    rows = list(csv.reader(io.StringIO(''.join(AuditLogger.stream_audit_report(start, audit_db, 'csv', chunk_size=3)))))
+    assert rows[0][0] == 'id'
+    assert len(rows) == 8
+
+
+def test_signed_report_file_verifies(audit_db, tmp_path):
+    result = AuditLogger.write_signed_report(
+        audit_db - timedelta(hours=1), audit_db, 'csv', output_dir=str(tmp_path), signing_key='test-key'
+    )
+
+    assert result['summary']['total_events'] == 7
+    assert AuditLogger.verify_signed_report(result['manifest_path'], signing_key='test-key')
+
+    with open(result['report_path'], 'a') as handle:
+        handle.write('tampered\n')
+    assert not AuditLogger.verify_signed_report(result['manifest_path'], signing_key='test-key')
+
+
+def test_date_only_end_includes_the_whole_day(audit_db):
+    from admin.compliance import _report_period
+
+    late = datetime(2025, 1, 31, 22, 30)
+    db.session.add(AuditLog('PHI_READ', 'Late event', phi_accessed=True, timestamp=late))
+    db.session.commit()
+
+    with app.test_request_context('/?start=2025-01-01&end=2025-01-31'):
+        start, end = _report_period()
+    assert (start, end.date()) == (datetime(2025, 1, 1), late.date())
+    assert AuditLogger.get_audit_summary(start, end)['total_events'] == 1
+
+    with app.test_request_context('/?start=2025-01-01&end=2025-01-31T12:00:00'):
+        assert _report_period()[1] == datetime(2025, 1, 31, 12)
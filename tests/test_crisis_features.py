@@ -0,0 +1,83 @@
+"""
+Tests for shared crisis feature extraction
+"""
+
+import numpy as np
+import pandas as pd
+
+from models.crisis_features import (
+    FeatureCache, consensus_features, crisis_feature_dict, dataset_hash,
+    model_feature_matrix, model_features, text_feature_frame, text_features
+)
+
+TEXTS = [
+    "I want to DIE tonight!!",
+    "",
+    "No point. Not anymore? no no??",
+    "Ça VA? ÉTÉ is nowhere",
+    "hurt myself\tnever  nobody cares",
+    "studied hard, kill myself? pills",
+    None,
+]
+
+
+def test_batch_and_single_extraction_are_identical():
+    frame = text_feature_frame(TEXTS * 3)
+    rows = np.array([text_features(text) for text in TEXTS * 3], dtype=float)
+
+    assert np.array_equal(frame.to_numpy(dtype=float), rows)
+    assert np.array_equal(model_feature_matrix(TEXTS), np.array([model_features(t) for t in TEXTS]))
+    assert text_feature_frame([]).shape == (0, 12)
+
+
+def test_features_keep_their_original_definitions():
+    text = "Nobody cares, I feel HOPELESS and want to die!"
+    lower = text.lower()
+
+    assert list(model_features(text, {'session_count': 4})) == [
+        len(text), len(text.split()), 1, 0,
+        sum(c.isupper() for c in text) / len(text),
+        sum(kw in lower for kw in ['suicide', 'die', 'kill', 'hurt', 'pain', 'hopeless', 'worthless']),
+        4.0, 30.0, 25.0
+    ]
+    features = crisis_feature_dict(text)
+    assert features['crisis_keywords'] == {'immediate': 2, 'high': 0, 'medium': 1, 'warning': 0}
+    assert features['sentiment_indicators'] == {'negation_count': 1}
+    assert features['urgency_score'] == 22
+
+
+def test_consensus_features_group_per_input():
+    df = pd.DataFrame({
+        'input_hash': ['b', 'a', 'a', 'b', 'a'],
+        'model_name': ['m1', 'm1', 'm2', 'm2', 'm2'],
+        'confidence': [0.9, 0.2, 0.4, 0.7, 0.6],
+        'crisis_detected': [1, 0, 0, 1, 1],
+        'risk_level': ['critical', None, 'unknown', 'high', 'low'],
+        'ground_truth': [None, 'crisis', None, 'crisis', None],
+    })
+
+    X, y = consensus_features(df)
+
+    np.testing.assert_allclose(X[0], [1 / 3, 0.4, 0.2, 3, 2.5, 3, 2])
+    np.testing.assert_allclose(X[1], [1.0, 0.8, np.std([0.9, 0.7], ddof=1), 2, 4.5, 5, 2])
+    # 'a' is labelled by its first row's ground truth; 'b' by majority vote
+    assert list(y) == [1, 1]
+
+
+def test_feature_cache_skips_extraction_for_same_dataset(tmp_path):
+    cache = FeatureCache(str(tmp_path), max_entries=2)
+    df = pd.DataFrame({'text': TEXTS[:3]})
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return (text_feature_frame(df['text']).to_numpy(),)
+
+    first, = cache.get_or_compute(dataset_hash(df), extract)
+    second, = cache.get_or_compute(dataset_hash(df), extract)
+    cache.get_or_compute(dataset_hash(df.iloc[:2]), extract)
+    cache.get_or_compute(dataset_hash(df.iloc[:1]), extract)
+
+    assert np.array_equal(first, second)
+    assert len(calls) == 3 and cache.hits == 1
+    assert len(list(tmp_path.iterdir())) == 2
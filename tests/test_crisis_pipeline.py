@@ -0,0 +1,109 @@
+"""
+Tests for the staged crisis prediction pipeline
+"""
+
+import asyncio
+import time
+import pytest
+
+from models.universal_crisis_predictor import CrisisSeverity, LatencyHistogram, ModelTier, UniversalCrisisPredictor
+
+
+@pytest.fixture
+def predictor():
+    predictor = UniversalCrisisPredictor()
+    predictor.custom_model = None
+    predictor.tier_latency = {ModelTier.CHEAP: 0.05, ModelTier.MODERATE: 0.05, ModelTier.EXPENSIVE: 0.05}
+    return predictor
+
+
+def _verdict(confidence, tier):
+    return {'is_crisis': confidence >= 0.4, 'severity': CrisisSeverity.MEDIUM, 'confidence': confidence,
+            'risk_factors': [f'{tier.value}_signal'], 'method': f'{tier.value}:model', 'cost': 0.01}
+
+
+def test_free_tier_skips_paid_stages(predictor):
+    prediction = asyncio.run(predictor.predict_crisis('Had a nice walk in the park today', user_tier='free'))
+
+    assert prediction.model_used == 'free_ensemble'
+    latency = predictor.get_stage_latency()
+    assert latency['free']['count'] == 1
+    assert latency['cheap']['count'] == 0
+
+
+def test_cheap_tier_starts_while_free_stage_runs(predictor):
+    events = []
+    detect = predictor._detect_crisis_patterns
+
+    def slow_patterns(text):
+        time.sleep(0.2)
+        events.append('free_done')
+        return detect(text)
+
+    async def tier_model(tier, text, context):
+        events.append(f'{tier.value}_started')
+        await asyncio.sleep(0.05)
+        return _verdict(0.9, tier)
+
+    predictor._detect_crisis_patterns = slow_patterns
+    predictor._call_tier_model = tier_model
+    prediction = asyncio.run(predictor.predict_crisis('I feel hopeless lately', user_tier='enterprise'))
+
+    assert events[:2] == ['cheap_started', 'free_done']
+    assert prediction.model_used == 'free_ensemble+cheap:model'
+    assert 'enhanced_analysis' in prediction.risk_factors
+
+
+def test_escalates_only_while_uncertain(predictor):
+    confidences = {ModelTier.CHEAP: 0.5, ModelTier.MODERATE: 0.95, ModelTier.EXPENSIVE: 0.95}
+    called = []
+
+    async def tier_model(tier, text, context):
+        called.append(tier)
+        return _verdict(confidences[tier], tier)
+
+    predictor._call_tier_model = tier_model
+    prediction = asyncio.run(predictor.predict_crisis('I feel hopeless and alone', user_tier='enterprise'))
+
+    assert called == [ModelTier.CHEAP, ModelTier.MODERATE]
+    assert prediction.cost == pytest.approx(0.02)
+
+    # Basic plans never go past the cheap tier
+    called.clear()
+    asyncio.run(predictor.predict_crisis('I feel hopeless and alone', user_tier='basic'))
+    assert called == [ModelTier.CHEAP]
+
+
+def test_deadline_returns_best_available_verdict(predictor):
+    predictor.tier_latency[ModelTier.CHEAP] = 5
+
+    started = time.perf_counter()
+    prediction = asyncio.run(predictor.predict_crisis('I feel hopeless and alone', user_tier='premium',
+                                                      deadline=0.2))
+
+    assert time.perf_counter() - started < 1
+    assert prediction.model_used == 'free_ensemble'
+    assert 'deadline_exceeded' in prediction.risk_factors
+    assert prediction.requires_human_review
+    assert predictor.get_stage_latency()['cheap']['count'] == 0
+
+    # A truncated verdict is not cached; the next request runs the paid tier again
+    assert predictor.prediction_cache == {}
+    predictor.tier_latency[ModelTier.CHEAP] = 0.05
+    retried = asyncio.run(predictor.predict_crisis('I feel hopeless and alone', user_tier='premium'))
+    assert 'deadline_exceeded' not in retried.risk_factors
+    assert predictor.get_stage_latency()['cheap']['count'] == 1
+
+
+def test_latency_histogram_buckets():
+    histogram = LatencyHistogram()
+    for seconds in (0.003, 0.02, 0.02, 0.3, 7):
+        histogram.observe(seconds)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['count'] == 5
+    assert snapshot['buckets']['0.005'] == 1
+    assert snapshot['buckets']['0.025'] == 3
+    assert snapshot['buckets']['+Inf'] == 5
+    assert snapshot['p50'] == 0.025
+    assert snapshot['p99'] == float('inf')
@@ -0,0 +1,82 @@
+"""
+Tests for the batched data retention engine
+"""
+
+import pytest
+from datetime import datetime, timedelta, UTC
+from app import app, db
+from models.database import Session, Patient, VideoAnalysis, Exercise, RetentionCheckpoint
+from models.data_retention import RetentionManager
+
+
+@pytest.fixture(scope='function')
+def retention_db():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+def _add_session(name, age_days):
+    session = Session(
+        patient_name=name,
+        session_type='individual',
+        input_text='hello',
+        ai_response='hi',
+        timestamp=datetime.now(UTC) - timedelta(days=age_days)
+    )
+    db.session.add(session)
+    db.session.flush()
+    return session
+
+
+def test_deletes_expired_free_tier_sessions_with_dependents(retention_db):
+    db.session.add_all([
+        Patient(name='Free User', email='free@test.com', subscription_tier='free'),
+        Patient(name='Premium User', email='premium@test.com', subscription_tier='premium'),
+    ])
+    expired_ids = []
+    for _ in range(7):
+        session = _add_session('Free User', 120)
+        expired_ids.append(session.id)
+        db.session.add(VideoAnalysis(session_id=session.id, confidence_score=0.5))
+        db.session.add(Exercise(session_id=session.id, exercise_type='breathing',
+                                title='Box', description='d', instructions='i'))
+    kept_recent = _add_session('Free User', 10).id
+    kept_premium = _add_session('Premium User', 120).id
+    db.session.commit()
+
+    manager = RetentionManager(overrides={'sessions': {'batch_size': 3}}, throttle_ratio=0)
+    result = manager.run_policy('sessions', days=90)
+
+    assert result['completed'] is True
+    assert result['deleted'] == 7
+    assert result['batches'] == 3
+    remaining = {s.id for s in Session.query.all()}
+    assert remaining == {kept_recent, kept_premium}
+    assert VideoAnalysis.query.count() == 0
+    assert Exercise.query.count() == 0
+
+
+def test_resumes_from_checkpoint(retention_db):
+    db.session.add(Patient(name='Free User', email='free@test.com', subscription_tier='free'))
+    ids = [_add_session('Free User', 200).id for _ in range(4)]
+    db.session.commit()
+
+    cutoff = datetime.now(UTC) - timedelta(days=90)
+    db.session.add(RetentionCheckpoint(
+        policy_name='sessions', status='running', cutoff_date=cutoff,
+        last_id=ids[1], rows_deleted=2, batches=1
+    ))
+    db.session.commit()
+
+    result = RetentionManager(throttle_ratio=0).run_policy('sessions')
+
+    assert result['deleted'] == 2
+    assert result['total_deleted'] == 4
+    # Rows at or below the checkpoint were treated as already processed
+    assert {s.id for s in Session.query.all()} == set(ids[:2])
+    assert RetentionCheckpoint.query.filter_by(policy_name='sessions').one().status == 'completed'
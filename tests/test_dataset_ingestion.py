@@ -0,0 +1,104 @@
+"""
+Tests for streaming training dataset ingestion
+"""
+
+import io
+import json
+
+import pyarrow.parquet as pq
+import pytest
+from app import app, db
+from models.custom_ai_builder import CustomAIBuilder, CustomAIModel
+from models.dataset_ingestion import DatasetIngestor, read_metadata
+
+RECORDS = [{'text': f'{word} feeling number {i}', 'category': label, 'score': i}
+           for i in range(30) for word, label in (('anxious', 'anxiety'), ('happy', 'positive'))]
+
+
+@pytest.fixture(scope='function')
+def builder(tmp_path):
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        builder = CustomAIBuilder()
+        builder.dataset_storage_path = str(tmp_path / 'datasets')
+        builder.model_storage_path = str(tmp_path / 'models')
+        (tmp_path / 'models').mkdir()
+        yield builder
+        db.session.remove()
+        db.drop_all()
+
+
+def test_jsonl_streams_into_parquet_with_stats(tmp_path):
+    payload = '\n'.join(json.dumps(r) for r in RECORDS).encode()
+    ingestor = DatasetIngestor(str(tmp_path), chunk_size=64, batch_rows=7)
+
+    metadata = ingestor.ingest(io.BytesIO(payload), 'mood.jsonl', 'category', 'mood')
+
+    assert metadata['rows'] == 60
+    assert metadata['source_format'] == 'jsonl'
+    assert [c['name'] for c in metadata['schema']] == ['text', 'category', 'score']
+    assert metadata['stats']['score'] == {'type': 'int64', 'count': 60, 'null_count': 0,
+                                          'min': 0, 'max': 29, 'mean': 14.5}
+    assert metadata['stats']['category']['value_counts'] == {'anxiety': 30, 'positive': 30}
+    assert pq.ParquetFile(metadata['parquet_path']).metadata.num_rows == 60
+    assert read_metadata(metadata['parquet_path'])['sha256'] == metadata['sha256']
+    assert not (tmp_path / 'mood.upload').exists()
+
+
+def test_csv_and_json_array_formats(tmp_path):
+    ingestor = DatasetIngestor(str(tmp_path), chunk_size=32, batch_rows=5)
+    csv_payload = 'text,category\n' + ''.join(f'"line, {i}",{"a" if i % 2 else "b"}\n' for i in range(20))
+    array_payload = json.dumps(RECORDS)
+
+    from_csv = ingestor.ingest(io.BytesIO(csv_payload.encode()), 'data.csv', 'category', 'csv')
+    from_array = ingestor.ingest(io.BytesIO(array_payload.encode()), 'data.json', 'category', 'array')
+
+    assert from_csv['rows'] == 20
+    assert pq.read_table(from_csv['parquet_path']).column('text')[3].as_py() == 'line, 3'
+    assert from_array['rows'] == 60
+    assert pq.read_table(from_array['parquet_path'], columns=['score']).column('score').to_pylist() == \
+        [r['score'] for r in RECORDS]
+
+
+def test_invalid_uploads_leave_nothing_behind(tmp_path):
+    ingestor = DatasetIngestor(str(tmp_path), max_bytes=100)
+
+    with pytest.raises(ValueError):
+        ingestor.ingest(io.BytesIO(b'x' * 1000), 'big.csv', None, 'big')
+    with pytest.raises(ValueError):
+        DatasetIngestor(str(tmp_path)).ingest(io.BytesIO(b'{"text": "a"}\n'), 'x.jsonl', 'label', 'missing')
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_training_reads_text_and_target_columns(builder):
+    payload = '\n'.join(json.dumps(r) for r in RECORDS)
+    dataset = builder.upload_dataset({'name': 'Mood', 'target_column': 'category', 'filename': 'mood.jsonl'}, payload)
+    model = CustomAIModel(name='Mood', model_type='classification', algorithm='naive_bayes', status='created')
+    db.session.add(model)
+    db.session.commit()
+
+    X, y, rows = builder._load_training_data(dataset, 'classification')
+    result = builder.train_model(model.id, dataset.id, {'n_jobs': 1})
+
+    assert dataset.size == 60
+    assert json.loads(dataset.columns) == ['text', 'category', 'score']
+    assert X[0] == 'anxious feeling number 0' and y[:2] == ['anxiety', 'positive'] and rows == 60
+    assert result['accuracy'] > 0.9
+    assert builder.get_dataset_profile(dataset.id)['stats']['text']['length_min'] > 0
+
+
+def test_rows_with_missing_text_train_as_empty_strings(builder):
+    records = RECORDS + [{'text': None, 'category': 'anxiety', 'score': 0}, {'category': 'positive', 'score': 1}]
+    payload = '\n'.join(json.dumps(r) for r in records)
+    dataset = builder.upload_dataset({'name': 'Gaps', 'target_column': 'category', 'filename': 'gaps.jsonl'}, payload)
+    model = CustomAIModel(name='Gaps', model_type='classification', algorithm='naive_bayes', status='created')
+    db.session.add(model)
+    db.session.commit()
+
+    X, y, rows = builder._load_training_data(dataset, 'classification')
+
+    assert X[-2:] == ['', ''] and y[-2:] == ['anxiety', 'positive'] and rows == 62
+    assert builder.train_model(model.id, dataset.id, {'n_jobs': 1})['accuracy'] > 0.9
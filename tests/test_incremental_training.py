@@ -0,0 +1,154 @@
+"""
+Tests for incremental crisis model training
+"""
+
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import joblib
+import pandas as pd
+import pytest
+
+from models.auto_training_pipeline import AutoTrainingPipeline, crisis_holdout
+from models.crisis_features import feature_cache
+from models.model_training_analytics import ModelTrainingAnalytics
+
+
+def _add_responses(db_path, inputs, start, prefix):
+    conn = sqlite3.connect(db_path)
+    for i in range(inputs):
+        crisis = i % 2 == 0
+        for j, model in enumerate(['gpt', 'claude', 'local']):
+            conn.execute("""
+                INSERT INTO model_responses
+                (session_id, model_name, input_hash, confidence, crisis_detected, risk_level, timestamp)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (f'{prefix}{i}', model, f'{prefix}{i}', 0.9 - j * 0.05 if crisis else 0.2 + j * 0.05,
+                  crisis if j < 2 else not crisis, 'critical' if crisis else 'low',
+                  start + timedelta(seconds=i)))
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'analytics.db')
+    ModelTrainingAnalytics(db_path=db_path)
+    monkeypatch.setattr(feature_cache, 'directory', str(tmp_path / 'features'))
+    monkeypatch.setenv('FEATURE_CACHE_DIR', str(tmp_path / 'features'))
+
+    pipeline = AutoTrainingPipeline(analytics_db=db_path)
+    pipeline.model_dir = str(tmp_path)
+    return pipeline
+
+
+def test_first_run_is_full_then_updates_are_incremental(pipeline):
+    now = datetime.now()
+    _add_responses(pipeline.analytics_db, 60, now - timedelta(days=2), 'old')
+
+    full = pipeline.run_training('crisis')
+    assert (full['mode'], full['success'], full['rows']) == ('full', True, 180)
+    trees = joblib.load(full['state_path']).forest_.n_estimators
+
+    _add_responses(pipeline.analytics_db, 20, now - timedelta(hours=1), 'new')
+    update = pipeline.run_training('crisis')
+
+    assert (update['mode'], update['success']) == ('incremental', True)
+    assert update['rows'] == 60  # only inputs newer than the watermark
+    assert update['history_rows'] == 240
+    assert joblib.load(update['state_path']).forest_.n_estimators == trees + 20
+    assert pipeline.get_watermark('crisis')['watermark'] == update['watermark'] > full['watermark']
+    assert update['estimated_full_seconds'] >= pipeline.get_watermark('crisis')['last_full_seconds']
+
+
+def test_no_new_rows_keeps_model_and_watermark(pipeline):
+    _add_responses(pipeline.analytics_db, 60, datetime.now() - timedelta(days=1), 'a')
+    pipeline.run_training('crisis')
+    before = pipeline.get_watermark('crisis')
+
+    result = pipeline.run_training('crisis')
+
+    assert result['skipped'] and result['mode'] == 'incremental'
+    assert pipeline.get_watermark('crisis') == before
+
+
+def test_full_rebuild_when_interval_elapsed(pipeline):
+    _add_responses(pipeline.analytics_db, 60, datetime.now() - timedelta(days=1), 'a')
+    pipeline.run_training('crisis')
+    conn = sqlite3.connect(pipeline.analytics_db)
+    conn.execute("UPDATE training_watermarks SET last_full_rebuild = ?",
+                 ((datetime.now() - pipeline.full_rebuild_interval).isoformat(),))
+    conn.commit()
+    conn.close()
+
+    assert pipeline.run_training('crisis')['mode'] == 'full'
+
+
+def test_parallel_cycle_reports_time_saved(pipeline):
+    _add_responses(pipeline.analytics_db, 60, datetime.now() - timedelta(days=1), 'a')
+    pipeline.max_workers = 2
+
+    cycle = asyncio.run(pipeline.run_training_cycle(['crisis', 'emotion']))
+
+    assert {r['model_type']: r['success'] for r in cycle['results']} == {'crisis': True, 'emotion': True}
+    assert 'crisis' in pipeline.active_models
+    summary = pipeline._incremental_training_summary()
+    assert summary['recent_cycles'][0]['cycle_id'] == cycle['cycle_id']
+    assert {run['model_type'] for run in summary['recent_cycles'][0]['runs']} == {'crisis', 'emotion'}
+    assert summary['total_time_saved_seconds'] == pytest.approx(cycle['time_saved_seconds'])
+
+
+def test_updates_are_validated_on_the_fixed_holdout(pipeline):
+    now = datetime.now()
+    _add_responses(pipeline.analytics_db, 60, now - timedelta(days=2), 'old')
+    pipeline.run_training('crisis')
+    _add_responses(pipeline.analytics_db, 20, now - timedelta(hours=1), 'new')
+
+    update = pipeline.run_training('crisis')
+
+    inputs = pd.Series([f'old{i}' for i in range(60)] + [f'new{i}' for i in range(20)])
+    assert update['mode'] == 'incremental'
+    assert update['metrics']['macro avg']['support'] == crisis_holdout(inputs).sum()
+
+
+def test_many_responses_to_one_input_do_not_force_a_rebuild(pipeline):
+    _add_responses(pipeline.analytics_db, 60, datetime.now() - timedelta(days=1), 'a')
+    pipeline.run_training('crisis')
+    before = pipeline.get_watermark('crisis')
+
+    # Twelve responses, but a single input: one training sample
+    conn = sqlite3.connect(pipeline.analytics_db)
+    for j in range(12):
+        conn.execute("""
+            INSERT INTO model_responses
+            (session_id, model_name, input_hash, confidence, crisis_detected, risk_level, timestamp)
+            VALUES ('solo', ?, 'solo', 0.9, 1, 'critical', ?)
+        """, (f'model{j}', datetime.now() - timedelta(minutes=5)))
+    conn.commit()
+    conn.close()
+
+    result = pipeline.run_training('crisis')
+
+    assert (result['mode'], result['success'], result['skipped']) == ('incremental', True, True)
+    assert pipeline.get_watermark('crisis') == before
+
+
+def test_failed_fallback_rebuild_is_recorded(pipeline, monkeypatch):
+    _add_responses(pipeline.analytics_db, 60, datetime.now() - timedelta(days=1), 'a')
+    pipeline.run_training('crisis')
+
+    def rejected_then_broken(mode, state):
+        if mode == 'incremental':
+            return {'success': False, 'rows': 3, 'fallback_full': True}
+        raise RuntimeError('rebuild failed')
+
+    monkeypatch.setattr(pipeline, '_train_crisis', rejected_then_broken)
+    result = pipeline.run_training('crisis')
+
+    assert (result['mode'], result['success'], result['error']) == ('full', False, 'rebuild failed')
+    assert pipeline.get_watermark('crisis')['needs_full'] == 1
+    conn = sqlite3.connect(pipeline.analytics_db)
+    runs = conn.execute("SELECT mode, success FROM training_runs ORDER BY id").fetchall()
+    conn.close()
+    assert runs[-1] == ('full', 0)
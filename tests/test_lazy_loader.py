@@ -0,0 +1,75 @@
+"""
+Tests for lazily constructed services and the app's cold-start imports
+"""
+
+import os
+import subprocess
+import sys
+import threading
+
+from models.lazy_loader import LazyService, ServiceRegistry
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Counter:
+    created = 0
+
+    def __init__(self):
+        Counter.created += 1
+        self.value = 41
+
+    def bump(self):
+        self.value += 1
+        return self.value
+
+
+def test_service_is_built_once_on_first_use():
+    Counter.created = 0
+    service = LazyService('counter', f'{__name__}:Counter')
+    assert not service.loaded
+    assert Counter.created == 0
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service.value)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert Counter.created == 1
+    assert results == [41] * 8
+    assert service.bump() == 42
+    service.value = 7
+    assert service.value == 7
+
+
+def test_registry_shares_and_preloads_services():
+    Counter.created = 0
+    registry = ServiceRegistry()
+    first = registry.register('counter', f'{__name__}:Counter')
+    assert registry.register('counter', f'{__name__}:Counter') is first
+    registry.register('broken', 'models.does_not_exist:Nothing')
+
+    timings = registry.preload()
+    assert set(timings) == {'counter'}
+    assert registry.status()['counter']['loaded']
+    assert not registry.status()['broken']['loaded']
+    assert Counter.created == 1
+
+
+def test_app_import_does_not_load_ml_libraries():
+    code = (
+        "import sys, app; "
+        "print('loaded:' + ','.join(m for m in ('sklearn', 'openai', 'pandas') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert result.stdout.strip().splitlines()[-1] == 'loaded:'
+
+
+def test_app_services_share_the_module_singletons():
+    import app
+    from models import ai_manager as ai_manager_module
+
+    assert app.ai_manager._resolve() is ai_manager_module.ai_manager
@@ -0,0 +1,69 @@
+"""
+Tests for avatar lip-sync timelines
+"""
+
+import pytest
+
+from models.lip_sync import LipSyncEngine, LipSyncStream, mouth_shape
+
+REPLY = "That sounds exhausting. Let's think about what helps, one breath at a time."
+
+
+def test_digraphs_win_over_their_first_letter():
+    assert mouth_shape('Think') == 'tongue_teeth'
+    assert mouth_shape('breath') == 'lips_together'
+    assert mouth_shape('time') == 'tongue_tip'
+    assert mouth_shape('...') == 'neutral'
+
+
+def test_streamed_timeline_matches_the_whole_text():
+    expected = LipSyncEngine().timeline(REPLY)
+
+    stream = LipSyncStream()
+    entries = []
+    for start in range(0, len(REPLY), 3):
+        entries += stream.feed(REPLY[start:start + 3])
+    entries += stream.flush()
+
+    assert entries == expected['timeline']
+    assert stream.current_time == pytest.approx(expected['total_duration'])
+    assert [entry['word'] for entry in entries] == REPLY.split()
+
+
+def test_engine_reuses_and_evicts_timelines():
+    engine = LipSyncEngine(max_entries=2)
+    engine.warm(['Hello there.', 'Take a breath.'])
+
+    assert engine.timeline('Hello there.')['timeline'][1]['mouth_shape'] == 'tongue_teeth'
+    engine.timeline('Something new.')  # evicts 'Take a breath.'
+    engine.timeline('Take a breath.')
+
+    stats = engine.stats()
+    assert (stats['hits'], stats['misses'], stats['cached_timelines']) == (1, 4, 2)
+
+
+def test_avatar_speech_uses_the_engine():
+    from speaking_avatar_api import avatar_system
+
+    greeting = avatar_system.avatar_personalities['calming']['greeting']
+    lip_sync = avatar_system._generate_lip_sync_data(greeting)
+    assert lip_sync['timeline'][0]['word'] == 'Welcome'
+
+    chunks = avatar_system.speak_sentence('Take a slow breath.', start_time=1.5)
+    assert chunks[0]['start_time'] == 1.5
+    assert chunks[0]['speech_data']['text_chunks'] == ['Take a slow breath']
+
+
+def test_streamed_sentences_share_one_lip_sync_clock():
+    from speaking_avatar_api import avatar_system
+
+    lip_sync = LipSyncEngine().stream()
+    spoken = []
+    for sentence in ('That sounds exhausting.', "Let's think about what helps, one breath at a time."):
+        spoken += avatar_system.speak_sentence(sentence, lip_sync=lip_sync)
+
+    timeline = [entry for chunk in spoken for entry in chunk['lip_sync_data']['timeline']]
+    spoken_text = ' '.join(chunk['text'] for chunk in spoken)
+    assert timeline == LipSyncEngine().timeline(spoken_text)['timeline']
+    assert spoken[1]['start_time'] == pytest.approx(spoken[0]['lip_sync_data']['total_duration'])
+    assert lip_sync.current_time == pytest.approx(sum(c['lip_sync_data']['total_duration'] for c in spoken))
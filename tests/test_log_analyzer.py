@@ -0,0 +1,86 @@
+"""
+Tests for the incremental log analyzer
+"""
+
+import os
+import time
+
+from models.log_analyzer import LogTailAnalyzer, parse_timestamp
+
+NOW = time.mktime(time.strptime('2025-09-15 12:30:30', '%Y-%m-%d %H:%M:%S'))
+
+
+def _stamp(minutes_ago):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(NOW - minutes_ago * 60))
+
+
+def _write(path, lines, mode='a'):
+    with open(path, mode) as f:
+        f.writelines(line + '\n' for line in lines)
+
+
+def test_window_is_enforced_and_tracebacks_inherit_time(tmp_path):
+    log = tmp_path / 'app.log'
+    _write(log, [
+        f'{_stamp(120)},001 - app - ERROR - Old failure 1',
+        f'{_stamp(10)},001 - app - ERROR - Database timeout after 31s',
+        'Traceback (most recent call last):',
+        f'{_stamp(9)},001 - app - WARNING - Slow response',
+        f'{_stamp(5)},001 - app - ERROR - Database timeout after 45s',
+        '127.0.0.1 - - [15/Sep/2025:12:29:00 +0000] "GET /health HTTP/1.1" 200 2',
+    ])
+
+    report = LogTailAnalyzer(str(log), window_seconds=3600).analyze(now=NOW)
+
+    assert report['error_count'] == 2
+    assert report['warning_count'] == 1
+    assert report['top_errors'][0] == ('Database timeout after Ns', 2)
+    assert [bucket['errors'] for bucket in report['per_minute']].count(1) == 2
+
+
+def test_only_new_lines_are_read_and_state_survives_restart(tmp_path):
+    log = tmp_path / 'app.log'
+    _write(log, [f'{_stamp(3)},001 - app - ERROR - First'])
+    analyzer = LogTailAnalyzer(str(log))
+    assert analyzer.analyze(now=NOW)['error_count'] == 1
+    first_offset = analyzer.offset
+
+    # A partial line is left for the next cycle
+    with open(log, 'a') as f:
+        f.write(f'{_stamp(2)},001 - app - ERROR - Sec')
+    assert analyzer.analyze(now=NOW)['error_count'] == 1
+    assert analyzer.offset == first_offset
+    _write(log, ['ond'])
+
+    restarted = LogTailAnalyzer(str(log))
+    report = restarted.analyze(now=NOW)
+    assert report['error_count'] == 2
+    assert dict(report['top_errors']) == {'First': 1, 'Second': 1}
+
+    # Buckets that fall out of the window are subtracted from the totals
+    assert restarted.analyze(now=NOW + 3600)['error_count'] == 0
+
+
+def test_rotation_and_truncation(tmp_path):
+    log = tmp_path / 'app.log'
+    _write(log, [f'{_stamp(4)},001 - app - ERROR - Before rotation'])
+    analyzer = LogTailAnalyzer(str(log))
+    analyzer.analyze(now=NOW)
+
+    _write(log, [f'{_stamp(3)},001 - app - ERROR - Tail of old file'])
+    os.rename(log, f'{log}.1')
+    _write(log, [f'{_stamp(2)},001 - app - WARNING - New file'], mode='w')
+
+    report = analyzer.analyze(now=NOW)
+    assert report['error_count'] == 2
+    assert report['warning_count'] == 1
+
+    # copytruncate: the file shrinks below the saved offset
+    _write(log, [f'{_stamp(1)},001 - app - CRITICAL - Gone'], mode='w')
+    assert analyzer.analyze(now=NOW)['error_count'] == 3
+
+
+def test_parse_timestamp_formats():
+    assert parse_timestamp('[2025-09-15 12:00:00 +0000] [42] [INFO] Booting worker') == 1757937600
+    assert parse_timestamp('1.2.3.4 - - [15/Sep/2025:12:00:00 +0000] "GET / HTTP/1.1" 200') == 1757937600
+    assert parse_timestamp('INFO:app:no timestamp here') is None
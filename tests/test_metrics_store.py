@@ -0,0 +1,64 @@
+"""
+Tests for the monitoring time-series store
+"""
+
+import numpy as np
+import pytest
+
+from models.metrics_store import DAY, HOUR, MetricsTimeSeries, RingSeries
+
+START = 1757894400  # 2025-09-15 00:00 UTC
+
+
+def test_ring_overwrites_oldest_and_views_are_chronological():
+    ring = RingSeries(capacity=4, width=1)
+    for i in range(6):
+        ring.append(START + i, [i])
+
+    views = ring.views()
+    assert [np.shares_memory(values, ring.values) for _, values in views] == [True, True]
+    assert np.concatenate([values[:, 0] for _, values in views]).tolist() == [2, 3, 4, 5]
+    assert np.concatenate([values[:, 0] for _, values in ring.views(since=START + 4)]).tolist() == [4, 5]
+
+
+def test_summary_percentiles_and_trend():
+    store = MetricsTimeSeries(fields=('cpu_percent', 'error_rate'), raw_capacity=120)
+    for minute in range(180):
+        store.record({'cpu_percent': 20 + minute * 0.5, 'error_rate': None}, timestamp=START + minute * 60)
+    now = START + 179 * 60
+
+    summary = store.summary('cpu_percent', HOUR, now=now)
+    assert summary['resolution'] == 'raw'
+    assert summary['samples'] == 61
+    assert summary['max'] == pytest.approx(109.5)
+    assert summary['p50'] == pytest.approx(94.5)
+    assert summary['trend_per_hour'] == pytest.approx(30.0)
+    assert store.summary('error_rate', HOUR, now=now)['mean'] is None
+
+    # The raw ring holds two hours, so a day comes from the hourly rollup
+    daily = store.summary('cpu_percent', DAY, now=now)
+    assert daily['resolution'] == 'hourly'
+    assert daily['samples'] == 2
+    assert daily['mean'] == pytest.approx((34.75 + 64.75) / 2)
+    assert daily['max'] == pytest.approx(79.5)
+
+
+def test_rollups_persist_across_restarts(tmp_path):
+    path = str(tmp_path / 'metrics.npz')
+    store = MetricsTimeSeries(path, raw_capacity=60)
+    for hour in range(30):
+        store.record({'memory_percent': 50 + hour}, timestamp=START + hour * HOUR)
+    store.save()
+
+    restored = MetricsTimeSeries(path, raw_capacity=60)
+    assert restored.hourly.size == 29
+    assert restored.daily.size == 1
+    assert restored.daily.values[0, restored.fields.index('memory_percent')] == pytest.approx(61.5)
+    assert restored.latest()['memory_percent'] == 79
+
+    # Accumulators carry on where they left off
+    restored.record({'memory_percent': 100}, timestamp=START + 30 * HOUR)
+    assert restored.hourly.size == 30
+
+    # A different layout starts a fresh history instead of failing
+    assert MetricsTimeSeries(path, raw_capacity=10).raw.size == 0
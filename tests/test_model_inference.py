@@ -0,0 +1,90 @@
+"""
+Tests for cached custom model inference
+"""
+
+import pickle
+
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.naive_bayes import MultinomialNB
+
+from app import app, db
+from models.custom_ai_builder import CustomAIBuilder, CustomAIModel
+from models.model_inference import InferenceServer, inference_server
+
+TEXTS = ['I feel anxious and worried', 'panic and worry all day',
+         'happy calm and relaxed', 'a calm and happy morning']
+LABELS = ['anxiety', 'anxiety', 'positive', 'positive']
+
+
+@pytest.fixture(scope='function')
+def deployed_model(tmp_path):
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        vectorizer = TfidfVectorizer()
+        estimator = MultinomialNB().fit(vectorizer.fit_transform(TEXTS), LABELS)
+        model_path, vectorizer_path = tmp_path / 'model.pkl', tmp_path / 'vectorizer.pkl'
+        model_path.write_bytes(pickle.dumps(estimator))
+        vectorizer_path.write_bytes(pickle.dumps(vectorizer))
+
+        model = CustomAIModel(name='Mood', model_type='classification', algorithm='naive_bayes',
+                              status='deployed', prediction_count=0,
+                              model_file_path=str(model_path), vectorizer_file_path=str(vectorizer_path))
+        db.session.add(model)
+        db.session.commit()
+        yield model
+        inference_server.flush()
+        db.session.remove()
+        db.drop_all()
+
+
+def test_batch_predict_uses_cached_model(deployed_model):
+    server = InferenceServer(max_models=2, flush_interval=3600)
+
+    results = server.predict_batch(deployed_model.id, ['worried and anxious', 'so calm and happy'])
+    server.predict_batch(deployed_model.id, ['panic'])
+
+    assert [r['prediction'] for r in results] == ['anxiety', 'positive']
+    assert all(0.5 < r['confidence'] <= 1.0 for r in results)
+    assert (server.misses, server.hits) == (1, 1)
+    server.flush()
+
+
+def test_prediction_counts_are_buffered_then_flushed(deployed_model):
+    server = InferenceServer(flush_interval=3600)
+
+    server.predict_batch(deployed_model.id, ['calm'] * 5)
+    db.session.refresh(deployed_model)
+    assert deployed_model.prediction_count == 0
+    assert server.pending_count(deployed_model.id) == 5
+
+    assert server.flush() == 5
+    db.session.refresh(deployed_model)
+    assert deployed_model.prediction_count == 5
+    assert server.pending_count(deployed_model.id) == 0
+
+
+def test_lru_eviction_and_undeployed_models(deployed_model):
+    server = InferenceServer(max_models=1, flush_interval=3600)
+    server.predict_batch(deployed_model.id, ['calm'])
+
+    # A retrain writes new files: the new key is loaded and the old one evicted
+    server.get_model(deployed_model.id, deployed_model.model_file_path, None, 'Mood')
+    assert len(server.stats()['cached_models']) == 1
+
+    deployed_model.status = 'ready'
+    db.session.commit()
+    with pytest.raises(ValueError):
+        server.predict_batch(deployed_model.id, ['calm'])
+    server.flush()
+
+
+def test_builder_predict_keeps_single_result_shape(deployed_model):
+    result = CustomAIBuilder().predict(deployed_model.id, 'anxious and worried')
+
+    assert result['success'] is True
+    assert result['prediction'] == 'anxiety'
+    assert result['model_name'] == 'Mood'
@@ -0,0 +1,120 @@
+"""
+Tests for the vectorized peer matching engine
+"""
+
+import random
+
+import pytest
+from app import app, db
+from models.database import Patient, PeerProfile, PeerMatchSuggestion
+from models.peer_matching import PeerMatchingEngine
+from models.social_connection_manager import SocialConnectionManager, ConnectionType
+
+CONDITIONS = ['anxiety', 'depression', 'ptsd', 'stress', 'grief', 'insomnia']
+INTERESTS = ['yoga', 'reading', 'hiking', 'art', 'cooking', 'music', 'gaming', 'running', 'chess']
+SLOTS = ['weekday_evenings', 'weekend_mornings', 'weekday_lunch']
+STAGES = ['beginning', 'active_treatment', 'maintenance']
+
+
+@pytest.fixture(scope='function')
+def peer_db():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+def _random_profile(rng, user_id):
+    return {
+        "user_id": user_id,
+        "age": rng.randint(18, 70),
+        "conditions": rng.sample(CONDITIONS, rng.randint(1, 3)),
+        "interests": rng.sample(INTERESTS, rng.randint(1, 4)),
+        "therapy_stage": rng.choice(STAGES),
+        "location": {"city": "Sydney", "state": "NSW"},
+        "availability": rng.sample(SLOTS, rng.randint(1, 2)),
+    }
+
+
+def test_vectorized_scores_match_reference_implementation():
+    rng = random.Random(3)
+    manager = SocialConnectionManager()
+    weights = manager.matching_algorithms["support_buddy"]["weight_factors"]
+    profiles = [_random_profile(rng, i) for i in range(1, 301)]
+
+    engine = PeerMatchingEngine(block_size=64)
+    engine.load(profiles)
+    user = profiles[0]
+
+    rows = engine.candidate_rows(user, 'support_buddy')
+    scores = engine.score_rows(user, rows, weights)
+    for row, score in zip(rows, scores):
+        candidate = engine.profiles[int(engine.user_ids[row])]
+        assert score == pytest.approx(manager._calculate_compatibility(user, candidate, weights), abs=1e-5)
+
+    top = engine.top_matches(user, 'support_buddy', weights, minimum_score=0.5, k=5)
+    expected = sorted(
+        (manager._calculate_compatibility(user, c, weights), c["user_id"]) for c in profiles[1:]
+        if set(c["availability"]) & set(user["availability"])
+    )[::-1]
+    # Compare scores rather than ids: float32 ties may order differently
+    assert [score for score, _ in top] == pytest.approx(
+        [score for score, _ in expected if score >= 0.5][:5], abs=1e-5)
+
+
+def test_inverted_indexes_prefilter_and_remove():
+    engine = PeerMatchingEngine()
+    engine.load([
+        {"user_id": 1, "availability": ["weekday_evenings"], "location": {"city": "Sydney", "state": "NSW"}},
+        {"user_id": 2, "availability": ["weekday_evenings"], "location": {"city": "Perth", "state": "WA"},
+         "connection_types": ["support_buddy"]},
+        {"user_id": 3, "availability": ["weekday_lunch"], "location": {"city": "Sydney", "state": "NSW"}},
+        {"user_id": 4, "availability": ["weekday_evenings"], "location": {"city": "Sydney", "state": "NSW"},
+         "connection_types": ["mentor_mentee"]},
+    ])
+    user = engine.profiles[1]
+
+    rows = engine.candidate_rows(user, 'support_buddy')
+    assert sorted(engine.user_ids[rows].tolist()) == [2]
+    assert engine.candidate_rows(user, 'support_buddy', location_scope='state').size == 0
+
+    engine.remove(2)
+    assert engine.candidate_rows(user, 'support_buddy').size == 0
+    assert engine.count == 3
+
+
+def test_find_peer_matches_keeps_demo_results():
+    manager = SocialConnectionManager()
+    matches = manager.find_peer_matches(1, ConnectionType.SUPPORT_BUDDY)
+
+    assert [m.user2_id for m in matches] == [3, 2]
+    assert all(m.compatibility_score >= 0.6 for m in matches)
+    assert "Both managing anxiety" in matches[1].shared_attributes
+
+
+def test_nightly_batch_stores_ranked_matches(peer_db):
+    rng = random.Random(5)
+    for i in range(1, 41):
+        patient = Patient(name=f'user{i}', email=f'user{i}@test.com')
+        db.session.add(patient)
+        db.session.flush()
+        profile = _random_profile(rng, patient.id)
+        db.session.add(PeerProfile(
+            patient_id=patient.id, age=profile["age"], conditions=profile["conditions"],
+            interests=profile["interests"], therapy_stage=profile["therapy_stage"],
+            city='Sydney', state='NSW', availability=profile["availability"]
+        ))
+    db.session.commit()
+
+    manager = SocialConnectionManager()
+    result = manager.generate_batch_matches(ConnectionType.SUPPORT_BUDDY, k=3)
+
+    assert result['users'] == 40
+    assert result['matches_stored'] == PeerMatchSuggestion.query.count()
+    suggestions = manager.get_suggested_matches(1)
+    assert [s['rank'] for s in suggestions] == list(range(1, len(suggestions) + 1))
+    scores = [s['compatibility_score'] for s in suggestions]
+    assert scores == sorted(scores, reverse=True)
@@ -0,0 +1,54 @@
+"""
+Tests for prefork preloading helpers
+"""
+
+import gc
+
+import joblib
+import numpy as np
+import pytest
+
+from models import prefork
+from models.ai_model_manager import AIModelManager, ModelConfig, ModelType
+
+
+class Estimator:
+    def __init__(self):
+        self.coefs_ = [np.ones((100, 10)), np.zeros(10)]
+        self.meta = {'classes': np.arange(3), 'name': 'demo'}
+        self.parts = np.empty(2, dtype=object)
+        self.parts[0] = np.ones(4)
+        self.parts[1] = self
+
+
+def test_freeze_arrays_covers_nested_arrays():
+    estimator = Estimator()
+    frozen = prefork.freeze_arrays(estimator)
+
+    assert frozen == 100 * 10 * 8 + 10 * 8 + 3 * estimator.meta['classes'].itemsize + 4 * 8
+    assert not estimator.coefs_[0].flags.writeable
+    assert not estimator.parts[0].flags.writeable
+    with pytest.raises(ValueError):
+        estimator.coefs_[1][0] = 1.0
+
+
+def test_ml_models_are_unpickled_once(tmp_path):
+    path = str(tmp_path / 'demo.pkl')
+    joblib.dump({'weights': np.arange(5.0)}, path)
+
+    manager = AIModelManager()
+    manager.register_model(ModelConfig(name='demo', type=ModelType.CUSTOM_ML, model_path=path,
+                                       accuracy_score=0.9))
+    assert 'demo' in manager.preload_ml_models()
+
+    first = manager.load_ml_model(path)
+    assert manager.load_ml_model(path) is first
+
+
+def test_after_fork_reenables_gc():
+    gc.disable()
+    try:
+        prefork.after_fork()
+        assert gc.isenabled()
+    finally:
+        gc.enable()
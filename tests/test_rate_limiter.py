@@ -0,0 +1,91 @@
+"""
+Tests for the shared GCRA rate limiter
+"""
+
+import multiprocessing
+
+import pytest
+
+from models.rate_limiter import MemoryBackend, RateLimiter, SharedMemoryBackend
+
+NOW = 1_000_000.0
+
+
+def test_burst_then_steady_rate():
+    limiter = RateLimiter(MemoryBackend())
+    results = [limiter.hit('ip:a', 5, 60, now=NOW) for _ in range(6)]
+
+    assert [r.allowed for r in results] == [True] * 5 + [False]
+    assert [r.remaining for r in results[:5]] == [4, 3, 2, 1, 0]
+    assert results[5].retry_after == pytest.approx(12.0)
+
+    # One hit is earned back every period / limit seconds
+    assert not limiter.hit('ip:a', 5, 60, now=NOW + 11.9).allowed
+    assert limiter.hit('ip:a', 5, 60, now=NOW + 12).allowed
+    assert limiter.hit('ip:b', 5, 60, now=NOW).allowed
+
+
+def test_check_does_not_consume():
+    limiter = RateLimiter(MemoryBackend())
+    for _ in range(3):
+        assert limiter.check('admin:x', 3, 900, now=NOW).allowed
+    for _ in range(3):
+        limiter.hit('admin:x', 3, 900, now=NOW)
+    assert not limiter.check('admin:x', 3, 900, now=NOW).allowed
+
+
+def test_memory_backend_sweeps_idle_keys():
+    backend = MemoryBackend(sweep_every=100)
+    limiter = RateLimiter(backend)
+    for i in range(99):
+        limiter.hit(f'ip:{i}', 10, 1, now=NOW)
+    assert len(backend) == 99
+
+    limiter.hit('ip:late', 10, 1, now=NOW + 5)
+    assert len(backend) == 1
+
+
+def test_shared_memory_reuses_idle_slots(tmp_path):
+    backend = SharedMemoryBackend(str(tmp_path / 'rl.bin'), buckets=1, bucket_size=4)
+    limiter = RateLimiter(backend)
+    for i in range(4):
+        limiter.hit(f'k{i}', 1, 10, now=NOW)
+    assert not limiter.hit('k0', 1, 10, now=NOW).allowed
+
+    # Once the old keys go idle their slots are handed to new ones
+    for i in range(4, 8):
+        assert limiter.hit(f'k{i}', 1, 10, now=NOW + 20).allowed
+    assert not limiter.hit('k7', 1, 10, now=NOW + 20).allowed
+
+
+def _hammer(path, results):
+    limiter = RateLimiter(SharedMemoryBackend(path))
+    results.put(sum(limiter.hit('ip:shared', 50, 3600).allowed for _ in range(40)))
+
+
+def test_shared_memory_limit_holds_across_processes(tmp_path):
+    path = str(tmp_path / 'rl.bin')
+    ctx = multiprocessing.get_context('fork')
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_hammer, args=(path, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    allowed = sum(results.get(timeout=30) for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    assert allowed == 50
+    assert not RateLimiter(SharedMemoryBackend(path)).check('ip:shared', 50, 3600).allowed
+
+
+def test_admin_lockout_uses_one_rate_for_every_caller():
+    from admin_security import AdminSecurity
+
+    security = AdminSecurity()
+    ip = '198.51.100.23'
+    for _ in range(security.max_failed_attempts):
+        assert security.check_rate_limit(ip)
+        security.record_failed_attempt(ip)
+
+    assert security.max_failed_attempts == 3
+    assert not security.check_rate_limit(ip)
@@ -0,0 +1,139 @@
+"""
+Tests for shared-memory request instrumentation
+"""
+
+import multiprocessing
+
+import pytest
+from flask import Flask
+from flask_socketio import SocketIO
+
+from models.request_metrics import BUCKET_BOUNDS, RequestMetrics, bucket_quantile
+
+
+@pytest.fixture
+def instrumented(tmp_path):
+    app = Flask(__name__)
+    socketio = SocketIO(app)
+    metrics = RequestMetrics(app, socketio, directory=str(tmp_path))
+
+    @app.route('/items/<int:item_id>')
+    def item(item_id):
+        return {'id': item_id}
+
+    @app.route('/boom')
+    def boom():
+        return 'failed', 503
+
+    @socketio.on('ping_event')
+    def ping_event(data):
+        return 'pong'
+
+    return app, socketio, metrics
+
+
+def test_http_requests_are_grouped_by_route(instrumented):
+    app, _, metrics = instrumented
+    client = app.test_client()
+    for item_id in range(3):
+        client.get(f'/items/{item_id}')
+    client.get('/boom')
+    client.get('/missing')
+
+    endpoints = metrics.snapshot()['endpoints']
+    assert endpoints['http GET /items/<int:item_id>']['count'] == 3
+    assert endpoints['http GET /boom']['errors'] == 1
+    assert endpoints['http GET <unmatched>']['count'] == 1
+    assert metrics.snapshot()['gauges']['in_flight'] == 0
+
+
+def test_socketio_events_and_connections(instrumented):
+    app, socketio, metrics = instrumented
+    client = socketio.test_client(app)
+    client.emit('ping_event', {}, callback=True)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['endpoints']['socketio / ping_event']['count'] == 1
+    assert snapshot['gauges']['socketio_connections'] == 1
+    client.disconnect()
+    assert metrics.snapshot()['gauges']['socketio_connections'] == 0
+
+
+def _worker(directory):
+    metrics = RequestMetrics(directory=directory)
+    for _ in range(5):
+        metrics.observe('http', 'GET /shared', 0.02, error=False)
+    metrics.observe('http', 'GET /shared', 3.0, error=True)
+
+
+def test_counters_are_aggregated_across_workers(tmp_path):
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_worker, args=(str(tmp_path),)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    metrics = RequestMetrics(directory=str(tmp_path))
+    metrics.observe('http', 'GET /shared', 0.02)
+    stats = metrics.snapshot()['endpoints']['http GET /shared']
+
+    assert stats['count'] == 19
+    assert stats['errors'] == 3
+    summary = RequestMetrics.summarize(stats)
+    assert 0.016 <= summary['p50'] <= 0.032
+    assert summary['p99'] > 2
+
+    # Monitoring reports the delta between cycles
+    before = metrics.snapshot()
+    metrics.observe('http', 'GET /shared', 0.5)
+    window = RequestMetrics.window(metrics.snapshot(), before)
+    assert window['endpoints']['http GET /shared']['count'] == 1
+
+
+def test_reused_pid_keeps_the_exited_workers_counters(tmp_path):
+    exited = RequestMetrics(directory=str(tmp_path))
+    exited.observe('http', 'GET /shared', 0.02)
+    exited._gauge('in_flight', 1)  # died mid-request
+
+    # A new worker that was given the same pid
+    worker = RequestMetrics(directory=str(tmp_path))
+    worker.observe('http', 'GET /shared', 0.02)
+
+    snapshot = worker.snapshot()
+    assert snapshot['endpoints']['http GET /shared']['count'] == 2
+    assert (snapshot['gauges']['workers'], snapshot['gauges']['in_flight']) == (1, 0)
+
+
+def test_prometheus_exposition(instrumented):
+    app, _, _ = instrumented
+    client = app.test_client()
+    client.get('/items/1')
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE mindmend_request_duration_seconds histogram' in body
+    assert 'mindmend_request_duration_seconds_count{transport="http",endpoint="GET /items/<int:item_id>"} 1' in body
+    assert 'le="+Inf"' in body
+    assert 'mindmend_request_errors_total{transport="http",endpoint="GET /items/<int:item_id>"} 0' in body
+
+
+def test_metrics_endpoint_is_denied_by_default(instrumented, monkeypatch):
+    app, _, _ = instrumented
+    client = app.test_client()
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.7'}).status_code == 403
+    assert client.get('/metrics', headers={'X-Forwarded-For': '203.0.113.9'}).status_code == 403
+    assert client.get('/metrics').status_code == 200  # direct scrape from loopback
+
+    monkeypatch.setenv('METRICS_TOKEN', 'scrape-secret')
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.7'},
+                      headers={'Authorization': 'Bearer scrape-secret'}).status_code == 200
+
+
+def test_bucket_quantile():
+    buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+    buckets[3] = 10  # 4ms..8ms
+    assert 0.004 <= bucket_quantile(buckets, 0.5) <= 0.008
+    assert bucket_quantile([0] * len(buckets), 0.5) is None
@@ -0,0 +1,115 @@
+"""
+Tests for the research retrieval index
+"""
+
+import numpy as np
+import pytest
+from app import app, db
+from models.research_index import ResearchIndex
+from models.research_manager import ResearchManager
+
+
+PAPERS = [
+    ('Early diagnosis of anxiety', 'early_diagnosis',
+     'Screening adolescents for anxiety symptoms improves early detection and diagnosis.'),
+    ('Sleep and depression', 'therapy_methods',
+     'Insomnia and poor sleep quality predict depressive episodes in adults.'),
+    ('Couples conflict mediation', 'conflict_resolution',
+     'Mediation and communication training reduce conflict between partners.'),
+    ('Mindfulness for stress', 'therapy_methods',
+     'Mindfulness based stress reduction lowers perceived stress and anxiety.'),
+]
+
+
+@pytest.fixture(scope='function')
+def research_db():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def manager(research_db, tmp_path):
+    manager = ResearchManager()
+    manager.index = ResearchIndex(index_dir=str(tmp_path), dimensions=8, initial_capacity=2)
+    return manager
+
+
+def _add_all(manager):
+    return [manager.add_research_paper({'title': title, 'category': category, 'abstract': abstract,
+                                        'doi': f'10.1000/{i}'})
+            for i, (title, category, abstract) in enumerate(PAPERS)]
+
+
+def test_search_ranks_relevant_paper_first(manager):
+    papers = _add_all(manager)
+    manager.rebuild_index()
+
+    results = manager.search_research('sleep insomnia depression', limit=2)
+
+    assert [r['id'] for r in results][0] == papers[1].id
+    assert len(results) == 2
+    assert results[0]['similarity_score'] >= results[1]['similarity_score']
+
+
+def test_category_filter_and_incremental_updates(manager, tmp_path):
+    papers = _add_all(manager)
+    assert manager.index.count == len(PAPERS)
+
+    results = manager.search_research('stress anxiety', category='therapy_methods', limit=10)
+    assert {r['category'] for r in results} == {'therapy_methods'}
+
+    assert manager.remove_research_paper(papers[3].id)
+    assert manager.index.count == len(PAPERS) - 1
+    assert papers[3].id not in [r['id'] for r in manager.search_research('mindfulness stress')]
+
+    # A second process sees the same persisted matrix
+    reloaded = ResearchIndex(index_dir=str(tmp_path))
+    assert reloaded.load()
+    assert sorted(reloaded.ids[:reloaded.count].tolist()) == sorted(p.id for p in papers[:3])
+
+
+def test_index_matrix_is_contiguous_float32(tmp_path):
+    index = ResearchIndex(index_dir=str(tmp_path), dimensions=4, initial_capacity=1)
+    index.build([(i, 'general', f'topic {i} anxiety therapy words {i * 7}') for i in range(1, 6)])
+    index.add(99, 'general', 'topic 3 anxiety therapy words 21')
+    index.remove(3)
+
+    assert isinstance(index.matrix, np.memmap)
+    assert index.matrix.dtype == np.float32
+    assert index.matrix.flags['C_CONTIGUOUS']
+    assert index.capacity >= index.count == 5
+    paper_id, similarity = index.search('topic 3 anxiety therapy words 21', limit=1)[0]
+    assert paper_id == 99
+    assert similarity == pytest.approx(1.0, abs=1e-5)
+
+
+def test_insights_for_condition_use_condition_index(manager):
+    from models.research_manager import ResearchInsight, ResearchInsightCondition
+
+    paper = manager.add_research_paper({'title': 'Anxiety cohort study', 'abstract': 'cohort', 'doi': '10.1000/x'})
+    db.session.add_all([
+        ResearchInsight(paper_id=paper.id, insight_type='intervention', title='low',
+                        confidence_level=0.9, clinical_relevance='low', applicable_conditions=['Anxiety']),
+        ResearchInsight(paper_id=paper.id, insight_type='intervention', title='high',
+                        confidence_level=0.9, clinical_relevance='high', applicable_conditions=['anxiety', 'PTSD']),
+        ResearchInsight(paper_id=paper.id, insight_type='risk_factor', title='other',
+                        confidence_level=0.95, clinical_relevance='high', applicable_conditions=['depression']),
+    ])
+    db.session.commit()
+
+    results = manager.get_insights_for_condition('ANXIETY', insight_type='intervention')
+
+    assert [r['title'] for r in results] == ['high', 'low']
+    assert results[0]['paper_title'] == 'Anxiety cohort study'
+    assert [r['title'] for r in manager.get_insights_for_condition('ptsd')] == ['high']
+
+    insight = ResearchInsight.query.filter_by(title='high').one()
+    insight.applicable_conditions = ['ptsd']
+    db.session.commit()
+    assert ResearchInsightCondition.query.filter_by(insight_id=insight.id).count() == 1
+    assert [r['title'] for r in manager.get_insights_for_condition('anxiety', 'intervention')] == ['low']
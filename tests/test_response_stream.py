@@ -0,0 +1,93 @@
+"""
+Tests for streamed therapy responses
+"""
+
+import json
+
+import pytest
+
+from models.ai_gateway import ai_gateway
+from models.response_stream import CrisisScanner, SentenceBuffer
+
+REPLY = ['That sounds', ' exhausting.', ' Version 2.', '5 of the plan', ' helps! Shall we', ' try it?']
+
+
+def test_sentences_are_released_once_the_next_token_arrives():
+    buffer = SentenceBuffer()
+    released = [buffer.feed(delta) for delta in REPLY]
+
+    assert released == [[], [], ['That sounds exhausting.'], [], ['Version 2.5 of the plan helps!'], []]
+    assert buffer.flush() == ['Shall we try it?']
+    assert buffer.text == ''.join(REPLY)
+
+
+def test_crisis_scanner_matches_across_sentences_and_reports_once():
+    scanned = []
+
+    def scan(text):
+        scanned.append(text)
+        return [{'category': 'self_harm'}] if 'hurt myself' in text else []
+
+    scanner = CrisisScanner(scan, overlap=20)
+    assert scanner.feed('Sometimes I want to hurt') == []
+    assert scanner.feed('myself when it gets bad.') == [{'category': 'self_harm'}]
+    assert scanner.feed('I said I hurt myself.') == []
+    assert all(len(text) <= 20 + 1 + 24 for text in scanned)
+
+
+@pytest.fixture
+def streaming_user(monkeypatch):
+    from app import app, db
+    from models.database import Patient
+
+    async def fake_stream(model, messages, api_key=None, **params):
+        for delta in REPLY:
+            yield delta
+
+    monkeypatch.setattr(ai_gateway, 'chat_stream', fake_stream)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        patient = Patient(name='Stream User', email='stream@test.com', password_hash='x')
+        db.session.add(patient)
+        db.session.commit()
+        user_id = patient.id
+    yield app, user_id
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+
+
+def test_sse_and_socketio_stream_tokens_speech_and_done(streaming_user):
+    from app import app, socketio
+    _, user_id = streaming_user
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    response = client.post('/api/therapy-session/stream',
+                           json={'message': 'I feel tired', 'avatar_personality': 'calming'})
+    assert response.mimetype == 'text/event-stream'
+
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+
+    names = [name for name, _ in events]
+    assert names.count('token') == len(REPLY)
+    assert names.count('speech') == 3
+    assert names[-1] == 'done'
+    # The first sentence is spoken before the rest of the reply has streamed
+    assert names.index('speech') < len(names) - 3
+    assert events[-1][1]['response'] == ''.join(REPLY)
+    speech = [payload for name, payload in events if name == 'speech']
+    assert speech[1]['start_time'] == pytest.approx(speech[0]['lip_sync_data']['total_duration'])
+
+    socket_client = socketio.test_client(app, flask_test_client=client)
+    socket_client.emit('therapy_message', {'message': 'I feel tired'})
+    received = [packet['name'] for packet in socket_client.get_received()]
+    assert received.count('token') == len(REPLY)
+    assert received[-1] == 'done'
+    socket_client.disconnect()
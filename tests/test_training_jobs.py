@@ -0,0 +1,164 @@
+"""
+Tests for background custom model training jobs
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from app import app, db
+from models.custom_ai_builder import CustomAIBuilder, CustomAIModel, TrainingDataset, TrainingJob
+from models import training_jobs
+from models.training_jobs import TrainingJobManager
+
+TEXTS = {
+    'anxiety': ['I feel anxious and worried all the time', 'my heart races and I panic',
+                'worried about everything tonight', 'nervous and anxious before work'],
+    'positive': ['I feel happy and calm today', 'great day with friends and family',
+                 'feeling grateful and relaxed', 'calm happy and content this morning'],
+}
+
+
+@pytest.fixture(scope='function')
+def training_db(tmp_path):
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        dataset_path = tmp_path / 'dataset.json'
+        records = [{'text': f'{text} {i}', 'category': label}
+                   for label, texts in TEXTS.items() for i in range(3) for text in texts]
+        dataset_path.write_text(json.dumps(records))
+
+        model = CustomAIModel(name='Mood', model_type='classification', algorithm='naive_bayes', status='created')
+        dataset = TrainingDataset(name='Mood data', file_path=str(dataset_path), target_column='category')
+        db.session.add_all([model, dataset])
+        db.session.commit()
+        yield model.id, dataset.id
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def manager(tmp_path):
+    builder = CustomAIBuilder()
+    builder.model_storage_path = str(tmp_path / 'models')
+    os.makedirs(builder.model_storage_path)
+    return TrainingJobManager(builder=builder, work_root=str(tmp_path / 'jobs'))
+
+
+def _queued_job(model_id, dataset_id, manager):
+    job = TrainingJob(model_id=model_id, dataset_id=dataset_id,
+                      training_config=json.dumps({'n_jobs': 1}))
+    db.session.add(job)
+    db.session.flush()
+    job.work_dir = os.path.join(manager.work_root, f'job_{job.id}')
+    db.session.commit()
+    return job.id
+
+
+def test_job_runs_to_completion_with_progress(training_db, manager):
+    model_id, dataset_id = training_db
+    job_id = _queued_job(model_id, dataset_id, manager)
+
+    stages = []
+    report = manager._report
+    manager._report = lambda *args: (stages.append(args[1]), report(*args))
+    result = manager.run(job_id)
+
+    assert result['status'] == 'succeeded'
+    assert result['progress'] == 1.0
+    assert stages[:3] == ['preparing', 'vectorizing', 'fitting']
+    assert 'cross_validating' in stages
+    model = db.session.get(CustomAIModel, model_id)
+    assert model.status == 'ready'
+    assert len(json.loads(model.training_history)['cv_scores']) == 5
+    assert not os.path.exists(db.session.get(TrainingJob, job_id).work_dir)
+
+
+def test_job_resumes_from_checkpoint(training_db, manager):
+    model_id, dataset_id = training_db
+    job_id = _queued_job(model_id, dataset_id, manager)
+    work_dir = db.session.get(TrainingJob, job_id).work_dir
+
+    # First attempt dies after fitting (worker lost)
+    def crash(job, stage, fraction, message=None):
+        if stage == 'evaluating':
+            raise SystemExit('worker lost')
+    manager._report = crash
+    with pytest.raises(SystemExit):
+        manager.run(job_id)
+    assert os.path.exists(os.path.join(work_dir, 'fitted.joblib'))
+
+    # The retry must not re-read the dataset
+    os.remove(db.session.get(TrainingDataset, dataset_id).file_path)
+    manager._report = lambda *args: None
+    db.session.rollback()
+
+    # A live worker still holds the job, so a second run leaves it alone
+    assert manager.run(job_id)['attempts'] == 1
+
+    # Once its heartbeat is stale the job is claimed again
+    db.session.get(TrainingJob, job_id).heartbeat_at = datetime.utcnow() - training_jobs.STALE_AFTER * 2
+    db.session.commit()
+    result = manager.run(job_id)
+
+    assert result['status'] == 'succeeded'
+    assert result['attempts'] == 2
+
+
+def test_heartbeat_keeps_a_long_stage_from_being_resumed(training_db, manager, monkeypatch):
+    model_id, dataset_id = training_db
+    job_id = _queued_job(model_id, dataset_id, manager)
+    monkeypatch.setattr(training_jobs, 'STALE_AFTER', timedelta(seconds=0.5))
+    manager.heartbeat_interval = 0.1
+    manager.dispatch = lambda job, executor=None: pytest.fail('live job was re-dispatched')
+
+    report = manager._report
+    during_fit = {}
+
+    def slow_fit(job, stage, fraction, message=None):
+        report(job, stage, fraction, message)
+        if stage == 'fitting':
+            # No progress callback for longer than STALE_AFTER
+            time.sleep(1.5)
+            during_fit['resumed'] = manager.resume_stale_jobs()
+            during_fit['rerun'] = manager.run(job)
+    manager._report = slow_fit
+
+    result = manager.run(job_id)
+
+    assert during_fit['resumed'] == 0
+    assert during_fit['rerun']['status'] == 'running'
+    assert result['status'] == 'succeeded'
+    assert result['attempts'] == 1
+
+
+def test_cancel_running_job_stops_at_next_stage(training_db, manager):
+    model_id, dataset_id = training_db
+    job_id = _queued_job(model_id, dataset_id, manager)
+
+    report = manager._report
+
+    def cancel_during_fit(job, stage, fraction, message=None):
+        if stage == 'fitting':
+            db.session.get(TrainingJob, job).cancel_requested = True
+            db.session.commit()
+        return report(job, stage, fraction, message)
+    manager._report = cancel_during_fit
+
+    result = manager.run(job_id)
+
+    assert result['status'] == 'cancelled'
+    assert db.session.get(CustomAIModel, model_id).status == 'created'
+
+
+def test_cancel_queued_job(training_db, manager):
+    model_id, dataset_id = training_db
+    job_id = _queued_job(model_id, dataset_id, manager)
+
+    assert manager.cancel(job_id)['status'] == 'cancelled'
+    assert manager.run(job_id)['status'] == 'cancelled'